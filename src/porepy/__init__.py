@@ -61,6 +61,7 @@ from porepy.fracs.fractures_2d import FractureNetwork2d
 
 # Numerics
 from porepy.numerics.discretization import VoidDiscretization
+from porepy.numerics.discretization_cache import DiscretizationCache
 from porepy.numerics.interface_laws.elliptic_discretization import (
     EllipticDiscretization,
 )
@@ -99,6 +100,7 @@ from porepy.numerics.fv.upwind import Upwind
 from porepy.numerics.interface_laws.hyperbolic_interface_laws import UpwindCoupling
 from porepy.numerics.fv.mass_matrix import MassMatrix
 from porepy.numerics.fv.mass_matrix import InvMassMatrix
+from porepy.numerics.transport_solver import TransportSolver
 
 # Contact mechanics
 from porepy.numerics.interface_laws.contact_mechanics_interface_laws import (
@@ -1,4 +1,5 @@
 from porepy.ad.forward_mode import Ad_array, initAdArrays
+from porepy.ad.fused_mode import Fused_ad_array, initFusedAdArrays
 
 from porepy.ad.functions import exp, log, sign, abs
 from porepy.ad.utils import concatenate
@@ -41,10 +41,8 @@ class Ad_array:
         return self.__add__(other)
 
     def __sub__(self, other):
-        b = _cast(other).copy()
-        b.val = -b.val
-        b.jac = -b.jac
-        return self + b
+        b = _cast(other)
+        return Ad_array(self.val - b.val, self.jac - b.jac)
 
     def __rsub__(self, other):
         return -self.__sub__(other)
@@ -93,11 +91,11 @@ class Ad_array:
     def __truediv__(self, other):
         return self * other ** -1
 
+    def __rtruediv__(self, other):
+        return other * self ** -1
+
     def __neg__(self):
-        b = self.copy()
-        b.val = -b.val
-        b.jac = -b.jac
-        return b
+        return Ad_array(-self.val, -self.jac)
 
     def copy(self):
         b = Ad_array()
@@ -112,15 +110,10 @@ class Ad_array:
         return b
 
     def diagvec_mul_jac(self, a):
-        try:
-            A = sps.diags(a)
-        except TypeError:
-            A = a
-
         if isinstance(self.jac, np.ndarray):
-            return np.array([A * J for J in self.jac])
+            return np.array([scale_rows(a, J) for J in self.jac])
         else:
-            return A * self.jac
+            return scale_rows(a, self.jac)
 
     def jac_mul_diagvec(self, a):
         try:
@@ -149,6 +142,37 @@ class Ad_array:
 #        return np.array([J * other for J in self.jac])
 
 
+def scale_rows(a, jac):
+    """ Multiply a Jacobian from the left with a diagonal matrix.
+
+    For sparse matrices in csr or csc format, the nonzero entries are scaled
+    directly, thus the diagonal matrix and the sparse matrix product are avoided.
+    The sparsity pattern of jac is kept, also for zero elements in a.
+
+    Parameters:
+        a (np.ndarray or scalar): Diagonal of the matrix, one value per row of jac.
+        jac: Jacobian matrix, sparse or dense.
+
+    Returns:
+        Same type as jac: The matrix diag(a) * jac.
+
+    """
+    is_vector = isinstance(a, np.ndarray) and a.ndim == 1
+    if is_vector and sps.isspmatrix_csr(jac) and a.size == jac.shape[0]:
+        data = jac.data * np.repeat(a, np.diff(jac.indptr))
+    elif is_vector and sps.isspmatrix_csc(jac) and a.size == jac.shape[0]:
+        data = jac.data * a[jac.indices]
+    else:
+        try:
+            A = sps.diags(a)
+        except TypeError:
+            A = a
+        return A * jac
+    return jac.__class__(
+        (data, jac.indices.copy(), jac.indptr.copy()), shape=jac.shape
+    )
+
+
 def _cast(variables):
     if isinstance(variables, list):
         out_var = []
@@ -1,10 +1,14 @@
 import numpy as np
 
 from porepy.ad.forward_mode import Ad_array
+from porepy.ad.fused_mode import Fused_ad_array
 
 
 def exp(var):
-    if isinstance(var, Ad_array):
+    if isinstance(var, Fused_ad_array):
+        val = np.exp(var.val)
+        return var.apply(val, val)
+    elif isinstance(var, Ad_array):
         val = np.exp(var.val)
         der = var.diagvec_mul_jac(np.exp(var.val))
         return Ad_array(val, der)
@@ -13,7 +17,9 @@ def exp(var):
 
 
 def log(var):
-    if not isinstance(var, Ad_array):
+    if isinstance(var, Fused_ad_array):
+        return var.apply(np.log(var.val), 1 / var.val)
+    elif not isinstance(var, Ad_array):
         return np.log(var)
 
     val = np.log(var.val)
@@ -22,14 +28,16 @@ def log(var):
 
 
 def sign(var):
-    if not isinstance(var, Ad_array):
+    if not isinstance(var, (Ad_array, Fused_ad_array)):
         return np.sign(var)
     else:
         return np.sign(var.val)
 
 
 def abs(var):
-    if not isinstance(var, Ad_array):
+    if isinstance(var, Fused_ad_array):
+        return var.apply(np.abs(var.val), np.sign(var.val))
+    elif not isinstance(var, Ad_array):
         return np.abs(var)
     else:
         val = np.abs(var.val)
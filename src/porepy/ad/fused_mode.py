@@ -0,0 +1,348 @@
+""" Forward mode automatic differentiation with fused elementwise operations.
+
+Ad_array in forward_mode computes the Jacobian of each intermediate result as a
+sparse matrix. For the elementwise operations that dominate constitutive laws
+(products, powers, exponentials etc.), the Jacobian of the result is the
+Jacobian of the operand with each row scaled. Fused_ad_array exploits this: The
+Jacobian is represented as a sum of terms diag(d_i) * J_i, where the J_i are
+base Jacobians (typically those of the primary variables), and elementwise
+operations only update the scaling vectors d_i. No sparse matrix is formed
+until the Jacobian is requested, or the array is multiplied with a sparse matrix
+(e.g. a discretization), in which case the terms are collapsed into a single
+base Jacobian.
+
+When the Jacobian is formed, the scaled entries of all terms are added into the
+combined sparsity pattern of the base Jacobians. The pattern, and the position
+of the entries of each base Jacobian in it, are computed once and reused as long
+as the structure of the base Jacobians is unchanged, e.g. during the iterations
+of a Newton loop. The stored patterns, and the Jacobians of the primary
+variables shared by initFusedAdArrays(), are kept in least recently used caches
+of at most _MAX_CACHE_SIZE items each. A pattern keeps the index arrays of its
+base Jacobians, but not the matrices themselves.
+
+Fused_ad_array and Ad_array cannot be mixed in an expression, as the columns of
+their Jacobians are not related.
+
+Example:
+    p, T = initFusedAdArrays([p0, T0])
+    rho = rho_0 * exp(c * (p - p_ref)) / (1 + beta * (T - T_ref))
+    residual = div * (rho * flux) + rho / dt
+    residual.val, residual.jac
+
+"""
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sps
+
+from porepy.ad.forward_mode import Ad_array
+
+
+def initFusedAdArrays(variables):
+    """ Initialize Fused_ad_arrays for a set of primary variables.
+
+    The Jacobians of the variables are stored, so that the base Jacobians, and
+    thereby the combined sparsity patterns, are shared between calls with
+    variables of the same sizes.
+
+    Parameters:
+        variables (np.ndarray or list of np.ndarray): Values of the variables.
+
+    Returns:
+        Fused_ad_array, or list of Fused_ad_array if variables is a list. The
+            Jacobian of each variable has one column per value of all variables.
+
+    """
+    if not isinstance(variables, list):
+        return initFusedAdArrays([variables])[0]
+
+    sizes = tuple(np.asarray(v).size for v in variables)
+    if sizes in _variable_jacobians:
+        _variable_jacobians.move_to_end(sizes)
+    else:
+        offsets = np.hstack((0, np.cumsum(sizes)))
+        jacs = []
+        for i, n in enumerate(sizes):
+            cols = np.arange(offsets[i], offsets[i + 1])
+            jacs.append(
+                sps.csr_matrix(
+                    (np.ones(n), cols, np.arange(n + 1)), shape=(n, offsets[-1])
+                )
+            )
+        _variable_jacobians[sizes] = jacs
+        if len(_variable_jacobians) > _MAX_CACHE_SIZE:
+            _variable_jacobians.popitem(last=False)
+
+    jacs = _variable_jacobians[sizes]
+    return [
+        Fused_ad_array(np.asarray(v, dtype=np.float).ravel(), jacs[i])
+        for i, v in enumerate(variables)
+    ]
+
+
+class Fused_ad_array:
+    """ Forward mode Ad array with the Jacobian represented by scaled base Jacobians.
+
+    The arithmetic operators and the functions in porepy.ad.functions apply to
+    Fused_ad_array as to Ad_array. Multiplication with a sparse matrix from the
+    left, A * x, is treated as a matrix-vector product.
+
+    Attributes:
+        val (np.ndarray): Values of the array.
+        jac (sps.csr_matrix): Jacobian of the array, formed on first access.
+
+    """
+
+    # Let numpy arrays defer to the operators of this class, so that e.g.
+    # np.ndarray * Fused_ad_array is computed by __rmul__
+    __array_ufunc__ = None
+
+    def __init__(self, val, jac=None):
+        """
+        Parameters:
+            val (np.ndarray or scalar): Values.
+            jac (sps.spmatrix, optional): Jacobian. If not given, the array is
+                treated as a constant.
+
+        """
+        self.val = val
+        # Map from id of a base Jacobian to its scaling, and the Jacobian itself.
+        # A scaling can be a scalar or a vector with one value per row.
+        self._terms = {}
+        if jac is not None:
+            jac = _canonical(jac)
+            self._terms[id(jac)] = (1.0, jac)
+        self._jac = None
+
+    # Elementwise operations. These only update the scalings of the terms.
+
+    def __add__(self, other):
+        b = _cast(other)
+        return self._combine(self.val + b.val, b, 1.0, 1.0)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        b = _cast(other)
+        return self._combine(self.val - b.val, b, 1.0, -1.0)
+
+    def __rsub__(self, other):
+        b = _cast(other)
+        return b._combine(b.val - self.val, self, 1.0, -1.0)
+
+    def __neg__(self):
+        return self._scale(-self.val, -1.0)
+
+    def __mul__(self, other):
+        _check_operand(other)
+        if isinstance(other, Fused_ad_array):
+            return self._combine(self.val * other.val, other, other.val, self.val)
+        elif sps.issparse(other):
+            raise ValueError(
+                "Multiplication with a sparse matrix is only defined from the left"
+            )
+        return self._scale(self.val * other, other)
+
+    def __rmul__(self, other):
+        _check_operand(other)
+        if sps.issparse(other):
+            return self._matrix_product(other)
+        return self._scale(other * self.val, other)
+
+    def __truediv__(self, other):
+        _check_operand(other)
+        if isinstance(other, Fused_ad_array):
+            return self * other ** -1
+        return self._scale(self.val / other, 1 / other)
+
+    def __rtruediv__(self, other):
+        _check_operand(other)
+        return other * self ** -1
+
+    def __pow__(self, other):
+        _check_operand(other)
+        if not isinstance(other, Fused_ad_array):
+            val = self.val ** other
+            return self._scale(val, other * self.val ** (other - 1))
+        val = self.val ** other.val
+        return self._combine(
+            val,
+            other,
+            other.val * self.val ** (other.val - 1),
+            val * np.log(self.val),
+        )
+
+    def __rpow__(self, other):
+        _check_operand(other)
+        val = other ** self.val
+        return self._scale(val, val * np.log(other))
+
+    def apply(self, val, der):
+        """ Result of an elementwise function applied to the array.
+
+        Parameters:
+            val (np.ndarray): Values of the function.
+            der (np.ndarray): Derivative of the function, evaluated at self.val.
+
+        Returns:
+            Fused_ad_array: The function values, with the Jacobian of self scaled
+                by the derivative.
+
+        """
+        return self._scale(val, der)
+
+    # Evaluation of the Jacobian
+
+    @property
+    def jac(self):
+        if self._jac is None:
+            if len(self._terms) == 0:
+                # Consistent with Ad_array for constants
+                self._jac = 0.0
+            else:
+                self._jac = self._assemble()
+        return self._jac
+
+    def full_jac(self):
+        return self.jac
+
+    def copy(self):
+        b = Fused_ad_array(np.copy(self.val))
+        b._terms = dict(self._terms)
+        return b
+
+    def _assemble(self):
+        scalings = [s for s, _ in self._terms.values()]
+        bases = [J for _, J in self._terms.values()]
+        pattern = _pattern(bases)
+
+        data = np.zeros(pattern.indices.size)
+        for s, J, rows, pos in zip(scalings, bases, pattern.rows, pattern.positions):
+            if isinstance(s, np.ndarray) and s.ndim > 0:
+                s = s[rows]
+            # The positions within a base Jacobian are unique, see _canonical()
+            data[pos] += s * J.data
+
+        return sps.csr_matrix(
+            (data, pattern.indices.copy(), pattern.indptr.copy()), shape=pattern.shape
+        )
+
+    def _matrix_product(self, A):
+        # Products with a matrix are not elementwise: Collapse the terms, and start
+        # a new chain of elementwise operations from the product
+        val = A * self.val
+        jac = self.jac
+        if np.isscalar(jac):
+            return Fused_ad_array(val)
+        return Fused_ad_array(val, (A * jac).tocsr())
+
+    def _scale(self, val, s):
+        c = Fused_ad_array(val)
+        if np.isscalar(s) and s == 1:
+            c._terms = dict(self._terms)
+        else:
+            c._terms = {key: (t[0] * s, t[1]) for key, t in self._terms.items()}
+        return c
+
+    def _combine(self, val, other, s_self, s_other):
+        # Sum of the terms of self and other, scaled by s_self and s_other.
+        # Terms with the same base Jacobian are merged.
+        c = self._scale(val, s_self)
+        for key, (s, J) in other._terms.items():
+            if key in c._terms:
+                c._terms[key] = (c._terms[key][0] + s * s_other, J)
+            else:
+                c._terms[key] = (s * s_other, J)
+        return c
+
+
+class _JacobianPattern:
+    """ Combined sparsity pattern of a set of base Jacobians.
+
+    For each base Jacobian, the row of its nonzero entries, and their position in
+    the data array of the combined pattern, are stored. Of the base Jacobians
+    themselves, only the index arrays are kept.
+    """
+
+    def __init__(self, bases):
+        self.structure = [(J.indptr, J.indices) for J in bases]
+        self.shape = bases[0].shape
+
+        # The union of the patterns. The matrices have positive data, thus no
+        # entries cancel.
+        union = sps.csr_matrix(self.shape)
+        for J in bases:
+            union = union + sps.csr_matrix(
+                (np.ones(J.indices.size), J.indices, J.indptr), shape=self.shape
+            )
+        union.sort_indices()
+        self.indptr = union.indptr
+        self.indices = union.indices
+
+        num_cols = self.shape[1]
+        union_rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        keys = union_rows * num_cols + self.indices
+
+        self.rows = []
+        self.positions = []
+        for J in bases:
+            rows = np.repeat(np.arange(self.shape[0]), np.diff(J.indptr))
+            self.rows.append(rows)
+            self.positions.append(np.searchsorted(keys, rows * num_cols + J.indices))
+
+    def matches(self, bases):
+        return all(
+            (J.indptr is indptr and J.indices is indices)
+            or (
+                np.array_equal(J.indptr, indptr) and np.array_equal(J.indices, indices)
+            )
+            for J, (indptr, indices) in zip(bases, self.structure)
+        )
+
+
+def _pattern(bases):
+    # Find a stored pattern for base Jacobians with the same structure, or compute
+    # and store a new one.
+    # The cache is keyed on the sizes, and the patterns are told apart by their
+    # structure.
+    sizes = tuple((J.shape, J.nnz) for J in bases)
+    for key, pattern in _patterns.items():
+        if key[0] == sizes and pattern.matches(bases):
+            _patterns.move_to_end(key)
+            return pattern
+
+    pattern = _JacobianPattern(bases)
+    _patterns[(sizes, id(pattern))] = pattern
+    if len(_patterns) > _MAX_CACHE_SIZE:
+        _patterns.popitem(last=False)
+    return pattern
+
+
+def _canonical(jac):
+    # Base Jacobians are stored in csr format without duplicate entries, so that
+    # each entry has a unique position in the combined pattern.
+    if not sps.isspmatrix_csr(jac):
+        jac = sps.csr_matrix(jac)
+    if not jac.has_canonical_format:
+        jac = jac.copy()
+        jac.sum_duplicates()
+    return jac
+
+
+def _check_operand(other):
+    if isinstance(other, Ad_array):
+        raise TypeError("Fused_ad_array and Ad_array cannot be combined")
+
+
+def _cast(variable):
+    if isinstance(variable, Fused_ad_array):
+        return variable
+    _check_operand(variable)
+    return Fused_ad_array(variable)
+
+
+_MAX_CACHE_SIZE = 64
+# Least recently used caches, see the module documentation
+_variable_jacobians = OrderedDict()
+_patterns = OrderedDict()
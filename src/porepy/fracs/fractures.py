@@ -12,6 +12,10 @@ see FractureNetwork.on_domain_boundary.
 import warnings
 import time
 import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import csv
 from sympy.geometry import Point, Polygon
@@ -31,6 +35,7 @@ import porepy as pp
 
 # Import of internally developed packages.
 from porepy.utils import setmembership, sort_points
+from porepy.utils.parallel import process_pool_context
 from porepy.grids.constants import GmshConstants
 
 # Module-wide logger
@@ -698,6 +703,24 @@ class FractureNetwork3d(object):
         """
         # The implementation in this function is fairly straightforward, all
         # technical difficulties are hidden in other functions.
+        in_file, out_file = self._prepare_gmsh(mesh_args, dfn, file_name)
+
+        # Run gmsh to generate grid
+        gmsh_status = pp.grids.gmsh.gmsh_interface.run_gmsh(in_file, out_file, dims=3)
+        logger.info("Gmsh completed with status " + str(gmsh_status))
+
+        return self._grid_bucket_from_gmsh(out_file, dfn, **kwargs)
+
+    def _prepare_gmsh(self, mesh_args, dfn, file_name):
+        """ Process the geometry of the network, and write the gmsh .geo file.
+
+        See mesh() for a description of the parameters.
+
+        Returns:
+            str: Name of the gmsh configuration file.
+            str: Name of the gmsh output file.
+
+        """
         if not dfn and not self.bounding_box_imposed:
             self.impose_external_boundary(self.domain)
 
@@ -726,13 +749,17 @@ class FractureNetwork3d(object):
         in_file = file_name + ".geo"
         out_file = file_name + ".msh"
 
-        # Dump the network description to gmsh .geo format, and run gmsh to
-        # generate grid
+        # Dump the network description to gmsh .geo format
         in_3d = not dfn
         self.to_gmsh(in_file, in_3d=in_3d)
-        gmsh_status = pp.grids.gmsh.gmsh_interface.run_gmsh(in_file, out_file, dims=3)
-        logger.info("Gmsh completed with status " + str(gmsh_status))
+        return in_file, out_file
 
+    def _grid_bucket_from_gmsh(self, out_file, dfn, **kwargs):
+        """ Process the gmsh .msh output file to a mixed-dimensional grid.
+
+        See mesh() for a description of the parameters.
+
+        """
         if dfn:
             grid_list = pp.fracs.simplex.triangle_grid_embedded(self, out_file)
         else:
@@ -770,7 +797,7 @@ class FractureNetwork3d(object):
                 frac_arr.append(i)
         return frac_arr
 
-    def find_intersections(self, use_orig_points=False):
+    def find_intersections(self, use_orig_points=False, num_workers=1):
         """
         Find intersections between fractures in terms of coordinates.
 
@@ -792,6 +819,9 @@ class FractureNetwork3d(object):
                 fracture description in the search for intersections. Defaults
                 to False. If True, all fractures will have their attribute p
                 reset to their original value.
+            num_workers (int, optional): Number of processes used in the
+                computation of intersections, see pp.intersections.polygons_3d().
+                Defaults to 1.
 
         """
         self.has_checked_intersections = True
@@ -811,38 +841,27 @@ class FractureNetwork3d(object):
         # Obtain intersection points, indexes of intersection points for each fracture
         # information on whether the fracture is on the boundary, and pairs of fractures
         # that intersect.
-        isect, point_ind, bound_info, frac_pairs, _ = pp.intersections.polygons_3d(
-            polys
+        isect, _, bound_info, frac_pairs, _ = pp.intersections.polygons_3d(
+            polys, num_workers=num_workers
         )
 
+        # Each pair of intersecting fractures gives two intersection points, which
+        # are stored consecutively in isect, in the order of frac_pairs. The boundary
+        # information of each fracture is also stored in the order of frac_pairs.
+        num_isect_of_frac = np.zeros(len(polys), dtype=np.int)
+
         # Loop over all pairs of intersection pairs, add the intersections to the
         # internal list.
-        for pair in frac_pairs:
+        for pair_ind, pair in enumerate(frac_pairs):
             # Indices of the relevant pairs.
             ind_0, ind_1 = pair
-            # Find the common indices of intersection points (referring to isect)
-            # and find where they are located in the array point_ind[ind_0]
-            common_ind, i0 = pp.utils.setmembership.ismember_rows(
-                point_ind[ind_1], point_ind[ind_0]
-            )
-            # Convert from boolean indices to indices
-            common_ind = np.where(common_ind)[0]
-            # There should be exactly two intersection points
-            assert common_ind.size == 2
-
-            # Do the same exercise with the second fracture
-            common_ind_2, i1 = pp.utils.setmembership.ismember_rows(
-                point_ind[ind_0], point_ind[ind_1]
-            )
-            common_ind_2 = np.where(common_ind_2)[0]
-            assert common_ind_2.size == 2
 
             # Check if the intersection points form a boundary edge of each of the
-            # fractures. The indexing is a bit involved, but is based on there being
-            # two intersection points for each segment - thus the indices in i0 and i1
-            # must be divided by two.
-            on_bound_0 = bound_info[ind_0][np.floor(i0[0] / 2).astype(np.int)]
-            on_bound_1 = bound_info[ind_1][np.floor(i1[0] / 2).astype(np.int)]
+            # fractures.
+            on_bound_0 = bound_info[ind_0][num_isect_of_frac[ind_0]]
+            on_bound_1 = bound_info[ind_1][num_isect_of_frac[ind_1]]
+            num_isect_of_frac[ind_0] += 1
+            num_isect_of_frac[ind_1] += 1
 
             # Add the intersection to the internal list
             self.intersections.append(
@@ -850,7 +869,7 @@ class FractureNetwork3d(object):
                     len(self.intersections),
                     self._fractures[ind_0],
                     self._fractures[ind_1],
-                    isect[:, point_ind[ind_1][common_ind]],
+                    isect[:, 2 * pair_ind : 2 * pair_ind + 2],
                     bound_first=on_bound_0,
                     bound_second=on_bound_1,
                 )
@@ -2393,3 +2412,92 @@ class FractureNetwork3d(object):
                 point_tags[p] = constants.AUXILIARY_TAG
 
         return point_tags, edge_tags
+
+
+def mesh_networks(
+    networks,
+    mesh_args,
+    dfn=False,
+    num_workers=None,
+    timeout=None,
+    num_threads=1,
+    **kwargs
+):
+    """ Mesh several fracture networks concurrently.
+
+    The target applications are parameter sweeps, say, over mesh sizes, and sets of
+    independent networks. The networks are processed as in
+    FractureNetwork3d.mesh(), except that several gmsh processes run at the same
+    time, and the gmsh output is converted to grids in a pool of processes.
+
+    Each job uses a separate temporary directory for the communication with gmsh.
+
+    Parameters:
+        networks (list of FractureNetwork3d): Networks to be meshed. The networks
+            are modified as by FractureNetwork3d.mesh(), thus the same network
+            object should not be given twice.
+        mesh_args (dict, or list of dicts): Mesh arguments, see
+            FractureNetwork3d.mesh(). If a list is given, it should have one item
+            per network.
+        dfn (boolean, optional): If True, DFN meshes are created.
+        num_workers (int, optional): Number of gmsh processes, and of processes
+            used to convert the gmsh output, running at the same time. See
+            pp.grids.gmsh.gmsh_interface.run_gmsh_parallel() for the default
+            value. If 1, the conversion is done in the calling process.
+        timeout (float, optional): Time, in seconds, after which a gmsh process is
+            terminated. By default, there is no limit.
+        num_threads (int, optional): Number of threads used by each gmsh process.
+            Defaults to 1.
+        **kwargs: Passed on to the construction of the GridBuckets.
+
+    Returns:
+        list of GridBucket: Mixed-dimensional meshes, one per network.
+
+    Raises:
+        ValueError if gmsh fails for one of the networks.
+        subprocess.TimeoutExpired if gmsh did not finish within the timeout.
+
+    """
+    if isinstance(mesh_args, dict):
+        mesh_args = [mesh_args] * len(networks)
+    if len(mesh_args) != len(networks):
+        raise ValueError("Need one set of mesh arguments per network")
+
+    work_dirs = [tempfile.mkdtemp(prefix="porepy_mesh_") for _ in networks]
+    try:
+        jobs = []
+        for network, args, work_dir in zip(networks, mesh_args, work_dirs):
+            file_name = os.path.join(work_dir, "gmsh_frac_file")
+            in_file, out_file = network._prepare_gmsh(args, dfn, file_name)
+            jobs.append((in_file, out_file, 3))
+
+        status = pp.grids.gmsh.gmsh_interface.run_gmsh_parallel(
+            jobs, max_workers=num_workers, timeout=timeout, num_threads=num_threads
+        )
+        for i, s in enumerate(status):
+            logger.info("Gmsh completed network %d with status %d" % (i, s))
+            if s != 0:
+                raise ValueError("Gmsh failed for network " + str(i))
+
+        items = [(network, job[1]) for network, job in zip(networks, jobs)]
+        if num_workers == 1 or len(items) == 1:
+            return [
+                network._grid_bucket_from_gmsh(out_file, dfn, **kwargs)
+                for network, out_file in items
+            ]
+
+        context = process_pool_context()
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_grid_bucket_from_gmsh, network, out_file, dfn, kwargs)
+                for network, out_file in items
+            ]
+            return [future.result() for future in futures]
+    finally:
+        for work_dir in work_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _grid_bucket_from_gmsh(network, out_file, dfn, kwargs):
+    # Picklable wrapper, for use in a process pool
+    return network._grid_bucket_from_gmsh(out_file, dfn, **kwargs)
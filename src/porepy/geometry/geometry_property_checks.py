@@ -286,14 +286,13 @@ def points_are_planar(pts, normal=None, tol=1e-5):
     else:
         normal = normal.flatten() / np.linalg.norm(normal)
 
-    check_all = np.zeros(pts.shape[1] - 1, dtype=np.bool)
+    # Normalized vectors from the first point to the others
+    diff = pts[:, 0].reshape((-1, 1)) - pts[:, 1:]
+    den = np.linalg.norm(diff, axis=0)
+    den[den == 0] = 1
+    dotprod = np.dot(normal, diff / den)
 
-    for idx, p in enumerate(pts[:, 1:].T):
-        den = np.linalg.norm(pts[:, 0] - p)
-        dotprod = np.dot(normal, (pts[:, 0] - p) / (den if den else 1))
-        check_all[idx] = np.isclose(dotprod, 0, atol=tol, rtol=0)
-
-    return np.all(check_all)
+    return np.all(np.isclose(dotprod, 0, atol=tol, rtol=0))
 
 
 def point_in_cell(poly, p, if_make_planar=True):
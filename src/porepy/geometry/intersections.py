@@ -3,13 +3,16 @@ Module with functions for computing intersections between geometric objects.
 
 """
 
-import numpy as np
 import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 import shapely.geometry as shapely_geometry
 import shapely.speedups as shapely_speedups
 
 import porepy as pp
+from porepy.utils.parallel import process_pool_context
 
 # Module level logger
 logger = logging.getLogger(__name__)
@@ -352,7 +355,7 @@ def segments_3d(start_1, end_1, start_2, end_2, tol=1e-8):
             return None
 
 
-def polygons_3d(polys, tol=1e-8):
+def polygons_3d(polys, tol=1e-8, num_workers=1):
     """ Compute the intersection between polygons embedded in 3d.
 
     In addition to intersection points, the function also decides:
@@ -398,76 +401,23 @@ def polygons_3d(polys, tol=1e-8):
             the tuple is replaced by an empty list.
 
     """
-    # Obtain bounding boxes for the polygons
-    x_min, x_max, y_min, y_max, z_min, z_max = _axis_aligned_bounding_box_3d(polys)
-
-    # Identify overlapping bounding boxes: First, use a fast method to find
-    # overlapping rectangles in the xy-plane.
-    pairs_xy = _identify_overlapping_rectangles(x_min, x_max, y_min, y_max)
-    # Next, find overlapping intervals in the z-directien
-    pairs_z = _identify_overlapping_intervals(z_min, z_max)
-
-    # Finally, do the intersection
-    pairs = _intersect_pairs(pairs_xy, pairs_z)
-
-    # Various utility functions
-    def center(p):
-        # Compute the mean coordinate of a set of points
-        return p.mean(axis=1).reshape((-1, 1))
+    polys = list(polys)
+    num_polys = len(polys)
 
-    def normalize(v):
-        # Normalize a vector
-        nrm = np.sqrt(np.sum(v ** 2, axis=0))
-        return v / nrm
+    # Broad phase: Obtain bounding boxes for the polygons, and identify pairs of
+    # overlapping boxes.
+    x_min, x_max, y_min, y_max, z_min, z_max = _axis_aligned_bounding_box_3d(polys)
+    pairs = _identify_overlapping_boxes_3d(x_min, x_max, y_min, y_max, z_min, z_max)
 
-    def mod_sign(v, tol=1e-8):
-        # Modified signum function: The value is 0 if it is very close to zero.
-        if isinstance(v, np.ndarray):
-            sgn = np.sign(v)
-            sgn[np.abs(v) < tol] = 0
-            return sgn
-        else:
-            if abs(v) < tol:
-                return 0
-            elif v < 0:
-                return -1
-            else:
-                return 1
-
-    def intersection(start, end, normal, center):
-        # Find a point p on the segment between start and end, so that the vector
-        # p - center is perpendicular to normal
-
-        # Vector along the segment
-        dx = end - start
-        dot_prod = np.sum(normal.ravel() * dx)
-        assert np.abs(dot_prod) > 1e-6
-        t = -np.sum((start - center.ravel()) * normal.ravel()) / dot_prod
-
-        assert t >= 0 and t <= 1
-        return start + t * dx
-
-    def vector_pointset_point(a, b, tol=1e-4):
-        # Create a set of non-zero vectors from a point in the plane spanned by
-        # a, to all points in b
-        found = None
-        # Loop over all points in a, search for a point that is sufficiently
-        # far away from b. Mainly this involves finding a point in a which is
-        # not in b
-        for i in range(a.shape[1]):
-            dist = np.sqrt(np.sum((b - a[:, i].reshape((-1, 1))) ** 2, axis=0))
-            if np.min(dist) > tol:
-                found = i
-                break
-        if found is None:
-            # All points in a are also in b. We could probably use some other
-            # point in a, but this seems so strange that we will rather
-            # raise an error, with the expectation that this should never happen.
-            raise ValueError("Coinciding polygons")
-
-        return b - a[:, found].reshape((-1, 1))
+    # Normal vectors of the polygons
+    normals = np.zeros((3, num_polys))
+    for pi in np.unique(pairs):
+        normals[:, pi] = pp.map_geometry.compute_normal(polys[pi])
 
-    num_polys = len(polys)
+    # Coarse filtering, vectorized over all pairs: Discard pairs where one of the
+    # polygons does not cross the plane of the other.
+    if num_polys > 0:
+        pairs = pairs[:, _polygon_planes_crossed(polys, pairs, normals, tol)]
 
     # Storage array for storing the index of the intersection points for each polygon
     isect_pt = np.empty(num_polys, dtype=np.object)
@@ -486,568 +436,729 @@ def polygons_3d(polys, tol=1e-8):
     new_pt = []
     new_pt_ind = 0
 
-    # Index of the main fractures, to which the other ones will be compared.
-    start_inds = np.unique(pairs[0])
-
     # Store index of pairs of intersecting polygons
     polygon_pairs = []
 
-    # Loop over all fracture pairs (taking more than one simultaneously if an index
-    # occurs several times in pairs[0]), and look for intersections
-    for di, line_ind in enumerate(start_inds):
-        # The algorithm first does a coarse filtering, to check if the candidate
-        # pairs both crosses each others plane. For those pairs that passes
-        # this test, we next compute the intersection points, and check if
-        # they are contained within the fractures.
-
-        # The main fracture, from the first row in pairs
-        main = line_ind
-
-        # Find the other fracture of all pairs starting with the main one
-        hit = np.where(pairs[0] == main)
-        other = pairs[1, hit][0]
-
-        # Center point and normal vector of the main fracture
-        main_center = center(polys[main])
-        main_normal = pp.map_geometry.compute_normal(polys[main]).reshape((-1, 1))
-
-        # Create an expanded version of the main points, so that the start
-        # and end points are the same. Thus the segments can be formed by
-        # merging main_p_expanded[:-1] with main_p_expanded[1:]
-        num_main = polys[main].shape[1]
-        ind_main_cyclic = np.arange(num_main + 1) % num_main
-        main_p_expanded = polys[main][:, ind_main_cyclic]
-
-        # Loop over the other polygon in the pairs, look for intersections
-        for o in other:
-            # Expanded version of the other polygon
-            num_other = polys[o].shape[1]
-            ind_other_cyclic = np.arange(num_other + 1) % num_other
-            other_p_expanded = polys[o][:, ind_other_cyclic]
-
-            # Normal vector and cetner of the other polygon
-            other_normal = pp.map_geometry.compute_normal(polys[o]).reshape((-1, 1))
-            other_center = center(polys[o])
-
-            # Point a vector from the main center to the vertexes of the
-            # other polygon. Then take the dot product with the normal vector
-            # of the main fracture. If all dot products have the same sign,
-            # the other fracture does not cross the plane of the main polygon.
-            # Note that we use mod_sign to safeguard the computation - if
-            # the vertexes are close, we will take a closer look at the combination
-            vec_from_main = normalize(
-                vector_pointset_point(polys[main], other_p_expanded)
-            )
-            dot_prod_from_main = mod_sign(np.sum(main_normal * vec_from_main, axis=0))
+    # Compute the intersection points for the remaining pairs, and check if they
+    # are contained within the polygons.
+    items = [
+        (polys[main], polys[o], normals[:, main], normals[:, o])
+        for main, o in pairs.T
+    ]
+    if num_workers is None or num_workers <= 1 or len(items) < 2:
+        results = [_polygon_pair_intersection(*item, tol) for item in items]
+    else:
+        results = _map_in_process_pool(
+            _polygon_pair_intersection_chunk, items, num_workers, tol
+        )
 
-            # Similar procedure: Vector from ohter center to the main polygon,
-            # then dot product.
-            vec_from_other = normalize(vector_pointset_point(polys[o], main_p_expanded))
-            dot_prod_from_other = mod_sign(
-                np.sum(other_normal * vec_from_other, axis=0)
-            )
+    for (main, o), res in zip(pairs.T, results):
+        if res is None:
+            continue
+        isect_pt_loc, seg_vert_main, seg_vert_other, bound_main, bound_other = res
+        segment_vertex_intersection[main] += seg_vert_main
+        segment_vertex_intersection[o] += seg_vert_other
+
+        # Append data for this combination of polygons.
+        new_pt.append(np.array(isect_pt_loc).T)
+        num_new = len(isect_pt_loc)
+        isect_pt[main].append(new_pt_ind + np.arange(num_new))
+        isect_pt[o].append(new_pt_ind + np.arange(num_new))
+        new_pt_ind += num_new
+        is_bound_isect[main].append(bound_main)
+        is_bound_isect[o].append(bound_other)
+        polygon_pairs.append((main, o))
 
-            # If one of the polygons lie completely on one side of the other,
-            # there can be no intersection.
-            if (
-                np.all(dot_prod_from_main > 0)
-                or np.all(dot_prod_from_main < 0)
-                or np.all(dot_prod_from_other > 0)
-                or np.all(dot_prod_from_other < 0)
-            ):
-                continue
+    # Cleanup and return. Puh!
+    if len(new_pt) > 0:
+        new_pt = np.hstack([v for v in new_pt])
+        for i in range(isect_pt.size):
+            if len(isect_pt[i]) > 0:
+                isect_pt[i] = np.hstack([v for v in isect_pt[i]])
+            else:
+                isect_pt[i] = np.empty(0)
 
-            # At this stage, we are fairly sure both polygons cross the plane of
-            # the other polygon.
-            # Identify the segments where the polygon crosses the plane
-            sign_change_main = np.where(np.abs(np.diff(dot_prod_from_main)) > 0)[0]
-            sign_change_other = np.where(np.abs(np.diff(dot_prod_from_other)) > 0)[0]
-
-            # The default option is that the intersection is not on the boundary
-            # of main or other, that is, the two intersection points are identical
-            # to two vertexes of the polygon
-            isect_on_boundary_main = False
-            isect_on_boundary_other = False
-
-            # We know that the polygons at least are very close to intersecting each
-            # others planes. There are four options, differing in whether the vertexes
-            # are in the plane of the other polygon or not:
-            #   1) The polygon has no vertex in the other plane. Intersection is found
-            #      by computing interseciton between polygon segments and the other
-            #      plane.
-            #   2) The polygon has one vertex in the other plane. This is one intersection
-            #      point. The other one should be on a segment, that is, the polygon
-            #      should have points on both sides of the plane.
-            #   3) The polygon has two vertexes in the other plane. These will be the
-            #      intersection points. The remaining vertexes should be on the same
-            #      side of the plane.
-            #   4) All vertexes lie in the plane. The intersection points will be found
-            #      by what is essentially a 2d algorithm. Note that the current
-            #      implementation if this case is a bit rudimentary.
-            #
-            # NOTE: This part of the code only considers intersection between polygon
-            # and plane. The analysis if whether the interseciton points are within
-            # each polygon is done below.
-            #
-            # We first compute the interseciton of the other polygon with the plane of
-            # the main one. The reverse operation is found below.
-            if np.all(dot_prod_from_main != 0):
-                # In the case where one polygon does not have a vertex in the plane of
-                # the other polygon, there should be exactly two segments crossing the plane.
-                assert sign_change_main.size == 2
-                # Compute the intersection points between the segments of the other polygon
-                # and the plane of the main polygon.
-                other_intersects_main_0 = intersection(
-                    other_p_expanded[:, sign_change_main[0]],
-                    other_p_expanded[:, sign_change_main[0] + 1],
-                    main_normal,
-                    main_center,
-                )
-                other_intersects_main_1 = intersection(
-                    other_p_expanded[:, sign_change_main[1]],
-                    other_p_expanded[:, sign_change_main[1] + 1],
-                    main_normal,
-                    main_center,
-                )
-                # First indices, next is whether this refers to segment. False means vertex.
-                seg_vert_other_0 = (sign_change_main[0], True)
-                seg_vert_other_1 = (sign_change_main[1], True)
-
-            elif np.sum(dot_prod_from_main[:-1] == 0) == 1:
-                # The first and last element represent the same point, thus include
-                # only one of them when counting the number of points in the plane
-                # of the other fracture.
-                hit = np.where(dot_prod_from_main[:-1] == 0)[0]
-                other_intersects_main_0 = other_p_expanded[:, hit[0]]
-                sign_change_full = np.where(np.abs(np.diff(dot_prod_from_main)) > 1)[0]
-                if sign_change_full.size == 0:
-                    # This corresponds to a point contact between one polygon and the
-                    # other (at least other plane, perhaps also other polygon)
-                    # Simply ignore this for now.S
-                    continue
-                other_intersects_main_1 = intersection(
-                    other_p_expanded[:, sign_change_full[0]],
-                    other_p_expanded[:, sign_change_full[0] + 1],
-                    main_normal,
-                    main_center,
+    else:
+        new_pt = np.empty((3, 0))
+        for i in range(isect_pt.size):
+            isect_pt[i] = np.empty(0)
+
+    return new_pt, isect_pt, is_bound_isect, polygon_pairs, segment_vertex_intersection
+
+
+def _polygon_pair_intersection(poly_main, poly_other, main_normal, other_normal, tol):
+    """ Compute the intersection between two polygons, see polygons_3d() for a
+    description of the cases covered.
+
+    Parameters:
+        poly_main (np.array, 3 x n): Vertexes of the first polygon.
+        poly_other (np.array, 3 x m): Vertexes of the second polygon.
+        main_normal (np.array, size 3): Unit normal vector of the first polygon.
+        other_normal (np.array, size 3): Unit normal vector of the second polygon.
+        tol (double): Geometric tolerance.
+
+    Returns:
+        None if the polygons do not intersect. Otherwise, a tuple of
+        list of np.array: The two intersection points.
+        list: Segment or vertex information for the intersection points on the
+            first polygon, see polygons_3d().
+        list: Segment or vertex information for the intersection points on the
+            second polygon.
+        boolean: Whether the intersection is on the boundary of the first polygon.
+        boolean: Whether the intersection is on the boundary of the second polygon.
+
+    """
+    seg_vert_main = []
+    seg_vert_other = []
+
+    # Center points of the polygons
+    main_center = _polygon_center(poly_main)
+    other_center = _polygon_center(poly_other)
+    main_normal = main_normal.reshape((-1, 1))
+    other_normal = other_normal.reshape((-1, 1))
+
+    # Create expanded versions of the polygons, so that the start and end points
+    # are the same. Thus the segments can be formed by merging
+    # main_p_expanded[:-1] with main_p_expanded[1:]
+    num_main = poly_main.shape[1]
+    ind_main_cyclic = np.arange(num_main + 1) % num_main
+    main_p_expanded = poly_main[:, ind_main_cyclic]
+
+    num_other = poly_other.shape[1]
+    ind_other_cyclic = np.arange(num_other + 1) % num_other
+    other_p_expanded = poly_other[:, ind_other_cyclic]
+
+    # Point a vector from the main center to the vertexes of the
+    # other polygon. Then take the dot product with the normal vector
+    # of the main fracture. If all dot products have the same sign,
+    # the other fracture does not cross the plane of the main polygon.
+    # Note that we use mod_sign to safeguard the computation - if
+    # the vertexes are close, we will take a closer look at the combination
+    vec_from_main = _normalize(
+        _vector_pointset_point(poly_main, other_p_expanded)
+    )
+    dot_prod_from_main = _mod_sign(np.sum(main_normal * vec_from_main, axis=0))
+
+    # Similar procedure: Vector from ohter center to the main polygon,
+    # then dot product.
+    vec_from_other = _normalize(_vector_pointset_point(poly_other, main_p_expanded))
+    dot_prod_from_other = _mod_sign(
+        np.sum(other_normal * vec_from_other, axis=0)
+    )
+
+    # If one of the polygons lie completely on one side of the other,
+    # there can be no intersection.
+    if (
+        np.all(dot_prod_from_main > 0)
+        or np.all(dot_prod_from_main < 0)
+        or np.all(dot_prod_from_other > 0)
+        or np.all(dot_prod_from_other < 0)
+    ):
+        return None
+
+    # At this stage, we are fairly sure both polygons cross the plane of
+    # the other polygon.
+    # Identify the segments where the polygon crosses the plane
+    sign_change_main = np.where(np.abs(np.diff(dot_prod_from_main)) > 0)[0]
+    sign_change_other = np.where(np.abs(np.diff(dot_prod_from_other)) > 0)[0]
+
+    # The default option is that the intersection is not on the boundary
+    # of main or other, that is, the two intersection points are identical
+    # to two vertexes of the polygon
+    isect_on_boundary_main = False
+    isect_on_boundary_other = False
+
+    # We know that the polygons at least are very close to intersecting each
+    # others planes. There are four options, differing in whether the vertexes
+    # are in the plane of the other polygon or not:
+    #   1) The polygon has no vertex in the other plane. Intersection is found
+    #      by computing interseciton between polygon segments and the other
+    #      plane.
+    #   2) The polygon has one vertex in the other plane. This is one intersection
+    #      point. The other one should be on a segment, that is, the polygon
+    #      should have points on both sides of the plane.
+    #   3) The polygon has two vertexes in the other plane. These will be the
+    #      intersection points. The remaining vertexes should be on the same
+    #      side of the plane.
+    #   4) All vertexes lie in the plane. The intersection points will be found
+    #      by what is essentially a 2d algorithm. Note that the current
+    #      implementation if this case is a bit rudimentary.
+    #
+    # NOTE: This part of the code only considers intersection between polygon
+    # and plane. The analysis if whether the interseciton points are within
+    # each polygon is done below.
+    #
+    # We first compute the interseciton of the other polygon with the plane of
+    # the main one. The reverse operation is found below.
+    if np.all(dot_prod_from_main != 0):
+        # In the case where one polygon does not have a vertex in the plane of
+        # the other polygon, there should be exactly two segments crossing the plane.
+        assert sign_change_main.size == 2
+        # Compute the intersection points between the segments of the other polygon
+        # and the plane of the main polygon.
+        other_intersects_main_0 = _segment_plane_intersection(
+            other_p_expanded[:, sign_change_main[0]],
+            other_p_expanded[:, sign_change_main[0] + 1],
+            main_normal,
+            main_center,
+        )
+        other_intersects_main_1 = _segment_plane_intersection(
+            other_p_expanded[:, sign_change_main[1]],
+            other_p_expanded[:, sign_change_main[1] + 1],
+            main_normal,
+            main_center,
+        )
+        # First indices, next is whether this refers to segment. False means vertex.
+        seg_vert_other_0 = (sign_change_main[0], True)
+        seg_vert_other_1 = (sign_change_main[1], True)
+
+    elif np.sum(dot_prod_from_main[:-1] == 0) == 1:
+        # The first and last element represent the same point, thus include
+        # only one of them when counting the number of points in the plane
+        # of the other fracture.
+        hit = np.where(dot_prod_from_main[:-1] == 0)[0]
+        other_intersects_main_0 = other_p_expanded[:, hit[0]]
+        sign_change_full = np.where(np.abs(np.diff(dot_prod_from_main)) > 1)[0]
+        if sign_change_full.size == 0:
+            # This corresponds to a point contact between one polygon and the
+            # other (at least other plane, perhaps also other polygon)
+            # Simply ignore this for now.S
+            return None
+        other_intersects_main_1 = _segment_plane_intersection(
+            other_p_expanded[:, sign_change_full[0]],
+            other_p_expanded[:, sign_change_full[0] + 1],
+            main_normal,
+            main_center,
+        )
+        seg_vert_other_0 = (hit[0], False)
+        seg_vert_other_1 = (sign_change_full[0], True)
+
+    elif np.all(dot_prod_from_main[:-1] == 0):
+        # The two polygons lie in the same plane. The intersection points will
+        # be found on the segments of the polygons
+        isect = np.zeros((3, 0))
+        # Loop over both set of polygon segments, look for intersections
+        for sm in range(poly_main.shape[1]):
+            # Store the intersection points found for this segment of the main
+            # polygon. If there are more than one, we know that the intersection
+            # is on the boundary of that polygon.
+            tmp_isect = np.zeros((3, 0))
+            for so in range(poly_other.shape[1]):
+                loc_isect = segments_3d(
+                    main_p_expanded[:, sm],
+                    main_p_expanded[:, sm + 1],
+                    other_p_expanded[:, so],
+                    other_p_expanded[:, so + 1],
                 )
-                seg_vert_other_0 = (hit[0], False)
-                seg_vert_other_1 = (sign_change_full[0], True)
-
-            elif np.all(dot_prod_from_main[:-1] == 0):
-                # The two polygons lie in the same plane. The intersection points will
-                # be found on the segments of the polygons
-                isect = np.zeros((3, 0))
-                # Loop over both set of polygon segments, look for intersections
-                for sm in range(polys[main].shape[1]):
-                    # Store the intersection points found for this segment of the main
-                    # polygon. If there are more than one, we know that the intersection
-                    # is on the boundary of that polygon.
-                    tmp_isect = np.zeros((3, 0))
-                    for so in range(polys[o].shape[1]):
-                        loc_isect = segments_3d(
-                            main_p_expanded[:, sm],
-                            main_p_expanded[:, sm + 1],
-                            other_p_expanded[:, so],
-                            other_p_expanded[:, so + 1],
-                        )
-                        if loc_isect is None:
-                            continue
-                        else:
-                            isect = np.hstack((isect, loc_isect))
-                            tmp_isect = np.hstack((tmp_isect, loc_isect))
-
-                    # Uniquify the intersection points found on this segment of main.
-                    # If more than one, the intersection is on the boundary of main.
-                    tmp_unique_isect, *rest = pp.utils.setmembership.unique_columns_tol(
-                        tmp_isect, tol=tol
-                    )
-                    if tmp_unique_isect.shape[1] > 1:
-                        isect_on_boundary_main = True
-
-                isect, *rest = pp.utils.setmembership.unique_columns_tol(isect, tol=tol)
-
-                if isect.shape[1] == 0:
-                    # The polygons share a plane, but no intersections
+                if loc_isect is None:
                     continue
-                elif isect.shape[1] == 1:
-                    # Point contact. Not really sure what to do with this, ignore for now
-                    continue
-                elif isect.shape[1] == 2:
-                    other_intersects_main_0 = isect[:, 0]
-                    other_intersects_main_1 = isect[:, 1]
                 else:
-                    raise ValueError("There should be at most two intersections")
+                    isect = np.hstack((isect, loc_isect))
+                    tmp_isect = np.hstack((tmp_isect, loc_isect))
 
-                seg_vert_other_0 = (0, "not implemented for shared planes")
-                seg_vert_other_1 = (0, "not implemented for shared planes")
+            # Uniquify the intersection points found on this segment of main.
+            # If more than one, the intersection is on the boundary of main.
+            tmp_unique_isect, *rest = pp.utils.setmembership.unique_columns_tol(
+                tmp_isect, tol=tol
+            )
+            if tmp_unique_isect.shape[1] > 1:
+                isect_on_boundary_main = True
 
-            else:
-                # Both of the intersection points are vertexes.
-                # Check that there are only two points - if this assertion fails,
-                # there is a hanging node of the other polygon, which is in the
-                # plane of the other polygon. Extending to cover this case should
-                # be possible, but further treatment is unclear at the moment.
-                assert np.sum(dot_prod_from_main[:-1] == 0) == 2
-                hit = np.where(dot_prod_from_main[:-1] == 0)[0]
-                other_intersects_main_0 = other_p_expanded[:, hit[0]]
-                # Pick the last of the intersection points. This is valid also for
-                # multiple (>2) intersection points, but we keep the assertion for now.
-                other_intersects_main_1 = other_p_expanded[:, hit[1]]
-
-                seg_vert_other_0 = (hit[0], False)
-                seg_vert_other_1 = (hit[1], False)
-
-                # The other polygon has an edge laying in the plane of the main polygon.
-                # This will be registered as a boundary intersection, but only if
-                # the polygons (not only plane) intersect.
-                if (
-                    hit[0] + 1 == hit[-1]
-                    or hit[0] == 0
-                    and hit[-1] == (dot_prod_from_main.size - 2)
-                ):
-                    isect_on_boundary_other = True
-
-            # Next, analyze intersection between main polygon and the plane of the other
-            if np.all(dot_prod_from_other != 0):
-                # In the case where one polygon does not have a vertex in the plane of
-                # the other polygon, there should be exactly two segments crossing the plane.
-                assert sign_change_other.size == 2
-                # Compute the intersection points between the segments of the main polygon
-                # and the plane of the other polygon.
-                main_intersects_other_0 = intersection(
-                    main_p_expanded[:, sign_change_other[0]],
-                    main_p_expanded[:, sign_change_other[0] + 1],
-                    other_normal,
-                    other_center,
-                )
-                main_intersects_other_1 = intersection(
-                    main_p_expanded[:, sign_change_other[1]],
-                    main_p_expanded[:, sign_change_other[1] + 1],
-                    other_normal,
-                    other_center,
-                )
-                seg_vert_main_0 = (sign_change_other[0], True)
-                seg_vert_main_1 = (sign_change_other[1], True)
-
-            elif np.sum(dot_prod_from_other[:-1] == 0) == 1:
-                # The first and last element represent the same point, thus include
-                # only one of them when counting the number of points in the plane
-                # of the other fracture.
-                hit = np.where(dot_prod_from_other[:-1] == 0)[0]
-                main_intersects_other_0 = main_p_expanded[:, hit[0]]
-                sign_change_full = np.where(np.abs(np.diff(dot_prod_from_other)) > 1)[0]
-                if sign_change_full.size == 0:
-                    # This corresponds to a point contact between one polygon and the
-                    # other (at least other plane, perhaps also other polygon)
-                    # Simply ignore this for now.S
-                    continue
-                main_intersects_other_1 = intersection(
-                    main_p_expanded[:, sign_change_full[0]],
-                    main_p_expanded[:, sign_change_full[0] + 1],
-                    other_normal,
-                    other_center,
+        isect, *rest = pp.utils.setmembership.unique_columns_tol(isect, tol=tol)
+
+        if isect.shape[1] == 0:
+            # The polygons share a plane, but no intersections
+            return None
+        elif isect.shape[1] == 1:
+            # Point contact. Not really sure what to do with this, ignore for now
+            return None
+        elif isect.shape[1] == 2:
+            other_intersects_main_0 = isect[:, 0]
+            other_intersects_main_1 = isect[:, 1]
+        else:
+            raise ValueError("There should be at most two intersections")
+
+        seg_vert_other_0 = (0, "not implemented for shared planes")
+        seg_vert_other_1 = (0, "not implemented for shared planes")
+
+    else:
+        # Both of the intersection points are vertexes.
+        # Check that there are only two points - if this assertion fails,
+        # there is a hanging node of the other polygon, which is in the
+        # plane of the other polygon. Extending to cover this case should
+        # be possible, but further treatment is unclear at the moment.
+        assert np.sum(dot_prod_from_main[:-1] == 0) == 2
+        hit = np.where(dot_prod_from_main[:-1] == 0)[0]
+        other_intersects_main_0 = other_p_expanded[:, hit[0]]
+        # Pick the last of the intersection points. This is valid also for
+        # multiple (>2) intersection points, but we keep the assertion for now.
+        other_intersects_main_1 = other_p_expanded[:, hit[1]]
+
+        seg_vert_other_0 = (hit[0], False)
+        seg_vert_other_1 = (hit[1], False)
+
+        # The other polygon has an edge laying in the plane of the main polygon.
+        # This will be registered as a boundary intersection, but only if
+        # the polygons (not only plane) intersect.
+        if (
+            hit[0] + 1 == hit[-1]
+            or hit[0] == 0
+            and hit[-1] == (dot_prod_from_main.size - 2)
+        ):
+            isect_on_boundary_other = True
+
+    # Next, analyze intersection between main polygon and the plane of the other
+    if np.all(dot_prod_from_other != 0):
+        # In the case where one polygon does not have a vertex in the plane of
+        # the other polygon, there should be exactly two segments crossing the plane.
+        assert sign_change_other.size == 2
+        # Compute the intersection points between the segments of the main polygon
+        # and the plane of the other polygon.
+        main_intersects_other_0 = _segment_plane_intersection(
+            main_p_expanded[:, sign_change_other[0]],
+            main_p_expanded[:, sign_change_other[0] + 1],
+            other_normal,
+            other_center,
+        )
+        main_intersects_other_1 = _segment_plane_intersection(
+            main_p_expanded[:, sign_change_other[1]],
+            main_p_expanded[:, sign_change_other[1] + 1],
+            other_normal,
+            other_center,
+        )
+        seg_vert_main_0 = (sign_change_other[0], True)
+        seg_vert_main_1 = (sign_change_other[1], True)
+
+    elif np.sum(dot_prod_from_other[:-1] == 0) == 1:
+        # The first and last element represent the same point, thus include
+        # only one of them when counting the number of points in the plane
+        # of the other fracture.
+        hit = np.where(dot_prod_from_other[:-1] == 0)[0]
+        main_intersects_other_0 = main_p_expanded[:, hit[0]]
+        sign_change_full = np.where(np.abs(np.diff(dot_prod_from_other)) > 1)[0]
+        if sign_change_full.size == 0:
+            # This corresponds to a point contact between one polygon and the
+            # other (at least other plane, perhaps also other polygon)
+            # Simply ignore this for now.S
+            return None
+        main_intersects_other_1 = _segment_plane_intersection(
+            main_p_expanded[:, sign_change_full[0]],
+            main_p_expanded[:, sign_change_full[0] + 1],
+            other_normal,
+            other_center,
+        )
+        seg_vert_main_0 = (hit[0], False)
+        seg_vert_main_1 = (sign_change_full[0], True)
+
+    elif np.all(dot_prod_from_other[:-1] == 0):
+
+        isect = np.zeros((3, 0))
+        for so in range(poly_other.shape[1]):
+            tmp_isect = np.zeros((3, 0))
+            for sm in range(poly_main.shape[1]):
+                loc_isect = segments_3d(
+                    main_p_expanded[:, sm],
+                    main_p_expanded[:, sm + 1],
+                    other_p_expanded[:, so],
+                    other_p_expanded[:, so + 1],
                 )
-                seg_vert_main_0 = (hit[0], False)
-                seg_vert_main_1 = (sign_change_full[0], True)
-
-            elif np.all(dot_prod_from_other[:-1] == 0):
-
-                isect = np.zeros((3, 0))
-                for so in range(polys[o].shape[1]):
-                    tmp_isect = np.zeros((3, 0))
-                    for sm in range(polys[main].shape[1]):
-                        loc_isect = segments_3d(
-                            main_p_expanded[:, sm],
-                            main_p_expanded[:, sm + 1],
-                            other_p_expanded[:, so],
-                            other_p_expanded[:, so + 1],
-                        )
-                        if loc_isect is None:
-                            continue
-                        else:
-                            isect = np.hstack((isect, loc_isect))
-                            tmp_isect = np.hstack((tmp_isect, loc_isect))
-
-                    tmp_unique_isect, *rest = pp.utils.setmembership.unique_columns_tol(
-                        tmp_isect, tol=tol
-                    )
-
-                    if tmp_unique_isect.shape[1] > 1:
-                        isect_on_boundary_other = True
-
-                isect, *rest = pp.utils.setmembership.unique_columns_tol(isect, tol=tol)
-
-                seg_vert_main_0 = (0, "not implemented for shared planes")
-                seg_vert_main_1 = (0, "not implemented for shared planes")
-                if isect.shape[1] == 0:
-                    # The polygons share a plane, but no intersections
+                if loc_isect is None:
                     continue
-                elif isect.shape[1] == 1:
-                    # Point contact. Not really sure what to do with this, continue for now
-                    continue
-                elif isect.shape[1] == 2:
-                    main_intersects_other_0 = isect[:, 0]
-                    main_intersects_other_1 = isect[:, 1]
                 else:
-                    raise ValueError("There should be at most two intersections")
+                    isect = np.hstack((isect, loc_isect))
+                    tmp_isect = np.hstack((tmp_isect, loc_isect))
+
+            tmp_unique_isect, *rest = pp.utils.setmembership.unique_columns_tol(
+                tmp_isect, tol=tol
+            )
+
+            if tmp_unique_isect.shape[1] > 1:
+                isect_on_boundary_other = True
 
+        isect, *rest = pp.utils.setmembership.unique_columns_tol(isect, tol=tol)
+
+        seg_vert_main_0 = (0, "not implemented for shared planes")
+        seg_vert_main_1 = (0, "not implemented for shared planes")
+        if isect.shape[1] == 0:
+            # The polygons share a plane, but no intersections
+            return None
+        elif isect.shape[1] == 1:
+            # Point contact. Not really sure what to do with this, continue for now
+            return None
+        elif isect.shape[1] == 2:
+            main_intersects_other_0 = isect[:, 0]
+            main_intersects_other_1 = isect[:, 1]
+        else:
+            raise ValueError("There should be at most two intersections")
+
+    else:
+        # Both of the intersection points are vertexes.
+        # Check that there are only two points - if this assertion fails,
+        # there is a hanging node of the main polygon, which is in the
+        # plane of the other polygon. Extending to cover this case should
+        # be possible, but further treatment is unclear at the moment.
+        # Do not count the last point here, this is identical to the
+        # first one.
+        assert np.sum(dot_prod_from_other[:-1] == 0) == 2
+        hit = np.where(dot_prod_from_other[:-1] == 0)[0]
+        main_intersects_other_0 = main_p_expanded[:, hit[0]]
+        # Pick the last of the intersection points. This is valid also for
+        # multiple (>2) intersection points, but we keep the assertion for now.
+        main_intersects_other_1 = main_p_expanded[:, hit[-1]]
+
+        seg_vert_main_0 = (hit[0], False)
+        seg_vert_main_1 = (hit[1], False)
+
+        # The main polygon has an edge laying in the plane of the other polygon.
+        # If the two intersection points form a segment
+        # This will be registered as a boundary intersection, but only if
+        # the polygons (not only plane) intersect.
+        # The two points can either be one apart in the main polygon,
+        # or it can be the first and the penultimate point
+        # (in the latter case, the final point, which is identical to the
+        # first one, will also be in the plane, but this is disregarded
+        # by the [:-1] above)
+        if (
+            hit[0] + 1 == hit[-1]
+            or hit[0] == 0
+            and hit[-1] == (dot_prod_from_other.size - 2)
+        ):
+            isect_on_boundary_main = True
+
+    ###
+    # We now have the intersections between polygons and planes.
+    # To finalize the computation, we need to sort out how the intersection
+    # points are located relative to each other. Only if there is an overlap
+    # between the intersection points of the main and the other polygon
+    # is there a real intersection (contained within the polygons, not only)
+    # in their planes, but outside the features themselves.
+
+    # Vectors from the intersection points in the main fracture to the
+    # intersection point in the other fracture
+    main_0_other_0 = other_intersects_main_0 - main_intersects_other_0
+    main_0_other_1 = other_intersects_main_1 - main_intersects_other_0
+    main_1_other_0 = other_intersects_main_0 - main_intersects_other_1
+    main_1_other_1 = other_intersects_main_1 - main_intersects_other_1
+
+    # e_1 is positive if both points of the other fracture lie on the same side of the
+    # first intersection point of the main one
+    # Use a mod_sign here to avoid issues related to rounding errors
+    e_1 = _mod_sign(np.sum(main_0_other_0 * main_0_other_1))
+    # e_2 is positive if both points of the other fracture lie on the same side of the
+    # second intersection point of the main one
+    e_2 = _mod_sign(np.sum(main_1_other_0 * main_1_other_1))
+    # e_3 is positive if both points of the main fracture lie on the same side of the
+    # first intersection point of the other one
+    e_3 = _mod_sign(np.sum((-main_0_other_0) * (-main_1_other_0)))
+    # e_4 is positive if both points of the main fracture lie on the same side of the
+    # second intersection point of the other one
+    e_4 = _mod_sign(np.sum((-main_0_other_1) * (-main_1_other_1)))
+
+    # This is in essence an implementation of the flow chart in Figure 9 in Dong et al,
+    # However the inequality signs are changed a bit to make the logic clearer
+    if e_1 > 0 and e_2 > 0 and e_3 > 0 and e_4 > 0:
+        # The intersection points for the two fractures are separated.
+        # There is no intersection
+        return None
+    if (
+        sum([e_1 == 0, e_2 == 0]) == 1
+        and sum([e_1 > 0, e_2 > 0]) == 1
+        and sum([e_3 == 0, e_4 == 0]) == 1
+        and sum([e_3 > 0, e_4 > 0]) == 1
+    ):
+        # Contact in a single point
+        return None
+    if e_1 >= 0:
+        # The first point on the main fracture is at most marginally involved in
+        # the intersection (if e_1 == 0, two segments intersect)
+        if e_2 >= 0:
+            # The second point on the main fracture is at most marginally involved
+            # We know that e_3 and e_4 are negative (positive is covered above
+            # and a combination is not possible)
+            isect_pt_loc = [other_intersects_main_0, other_intersects_main_1]
+
+            # Main is intersected in its interior, append two empty lists
+            if e_1 == 0:
+                seg_vert_main.append(seg_vert_main_0)
             else:
-                # Both of the intersection points are vertexes.
-                # Check that there are only two points - if this assertion fails,
-                # there is a hanging node of the main polygon, which is in the
-                # plane of the other polygon. Extending to cover this case should
-                # be possible, but further treatment is unclear at the moment.
-                # Do not count the last point here, this is identical to the
-                # first one.
-                assert np.sum(dot_prod_from_other[:-1] == 0) == 2
-                hit = np.where(dot_prod_from_other[:-1] == 0)[0]
-                main_intersects_other_0 = main_p_expanded[:, hit[0]]
-                # Pick the last of the intersection points. This is valid also for
-                # multiple (>2) intersection points, but we keep the assertion for now.
-                main_intersects_other_1 = main_p_expanded[:, hit[-1]]
-
-                seg_vert_main_0 = (hit[0], False)
-                seg_vert_main_1 = (hit[1], False)
-
-                # The main polygon has an edge laying in the plane of the other polygon.
-                # If the two intersection points form a segment
-                # This will be registered as a boundary intersection, but only if
-                # the polygons (not only plane) intersect.
-                # The two points can either be one apart in the main polygon,
-                # or it can be the first and the penultimate point
-                # (in the latter case, the final point, which is identical to the
-                # first one, will also be in the plane, but this is disregarded
-                # by the [:-1] above)
-                if (
-                    hit[0] + 1 == hit[-1]
-                    or hit[0] == 0
-                    and hit[-1] == (dot_prod_from_other.size - 2)
-                ):
-                    isect_on_boundary_main = True
-
-            ###
-            # We now have the intersections between polygons and planes.
-            # To finalize the computation, we need to sort out how the intersection
-            # points are located relative to each other. Only if there is an overlap
-            # between the intersection points of the main and the other polygon
-            # is there a real intersection (contained within the polygons, not only)
-            # in their planes, but outside the features themselves.
-
-            # Vectors from the intersection points in the main fracture to the
-            # intersection point in the other fracture
-            main_0_other_0 = other_intersects_main_0 - main_intersects_other_0
-            main_0_other_1 = other_intersects_main_1 - main_intersects_other_0
-            main_1_other_0 = other_intersects_main_0 - main_intersects_other_1
-            main_1_other_1 = other_intersects_main_1 - main_intersects_other_1
-
-            # e_1 is positive if both points of the other fracture lie on the same side of the
-            # first intersection point of the main one
-            # Use a mod_sign here to avoid issues related to rounding errors
-            e_1 = mod_sign(np.sum(main_0_other_0 * main_0_other_1))
-            # e_2 is positive if both points of the other fracture lie on the same side of the
-            # second intersection point of the main one
-            e_2 = mod_sign(np.sum(main_1_other_0 * main_1_other_1))
-            # e_3 is positive if both points of the main fracture lie on the same side of the
-            # first intersection point of the other one
-            e_3 = mod_sign(np.sum((-main_0_other_0) * (-main_1_other_0)))
-            # e_4 is positive if both points of the main fracture lie on the same side of the
-            # second intersection point of the other one
-            e_4 = mod_sign(np.sum((-main_0_other_1) * (-main_1_other_1)))
-
-            # This is in essence an implementation of the flow chart in Figure 9 in Dong et al,
-            # However the inequality signs are changed a bit to make the logic clearer
-            if e_1 > 0 and e_2 > 0 and e_3 > 0 and e_4 > 0:
-                # The intersection points for the two fractures are separated.
-                # There is no intersection
-                continue
-            if (
-                sum([e_1 == 0, e_2 == 0]) == 1
-                and sum([e_1 > 0, e_2 > 0]) == 1
-                and sum([e_3 == 0, e_4 == 0]) == 1
-                and sum([e_3 > 0, e_4 > 0]) == 1
-            ):
-                # Contact in a single point
-                continue
-            if e_1 >= 0:
-                # The first point on the main fracture is at most marginally involved in
-                # the intersection (if e_1 == 0, two segments intersect)
-                if e_2 >= 0:
-                    # The second point on the main fracture is at most marginally involved
-                    # We know that e_3 and e_4 are negative (positive is covered above
-                    # and a combination is not possible)
-                    isect_pt_loc = [other_intersects_main_0, other_intersects_main_1]
-
-                    # Main is intersected in its interior, append two empty lists
-                    if e_1 == 0:
-                        segment_vertex_intersection[main].append(seg_vert_main_0)
-                    else:
-                        if isect_on_boundary_main:
-                            ind = seg_vert_main_0[0]
-                            if ind == 0:
-                                ind = num_main - 1
-                            segment_vertex_intersection[main].append((ind, True))
-                        else:
-                            segment_vertex_intersection[main].append([])
-                    if e_2 == 0:
-                        segment_vertex_intersection[main].append(seg_vert_main_1)
-                    else:
-                        if isect_on_boundary_main:
-                            ind = seg_vert_main_1[0]
-                            if not (ind == num_main - 1 and seg_vert_main_0[0] == 0):
-                                ind -= 1
-
-                            segment_vertex_intersection[main].append((ind, True))
-                        else:
-                            segment_vertex_intersection[main].append([])
-
-                    # Other is intersected on two segments
-                    segment_vertex_intersection[o].append(seg_vert_other_0)
-                    segment_vertex_intersection[o].append(seg_vert_other_1)
+                if isect_on_boundary_main:
+                    ind = seg_vert_main_0[0]
+                    if ind == 0:
+                        ind = num_main - 1
+                    seg_vert_main.append((ind, True))
                 else:
-                    # The second point on the main fracture is surrounded by points on
-                    # the other fracture. One of them will in turn be surrounded by the
-                    # points on the main fracture, this is the intersecting one.
-                    if e_3 <= 0:
-                        isect_pt_loc = [
-                            main_intersects_other_1,
-                            other_intersects_main_0,
-                        ]
-
-                        segment_vertex_intersection[main].append(seg_vert_main_1)
-                        if e_1 == 0:
-                            # The first point on the main fracture barely hits the other
-                            # fracture
-                            segment_vertex_intersection[main].append(seg_vert_main_0)
-                        else:
-                            if isect_on_boundary_main:
-                                # No intersection for the first point of main
-                                ind = seg_vert_main_0[0]
-                                segment_vertex_intersection[main].append((ind, True))
-                            else:
-                                segment_vertex_intersection[main].append([])
-
-                        # The second may hit, depending on e_4
-                        if e_4 == 0:
-                            segment_vertex_intersection[o].append(seg_vert_other_1)
-                        else:
-                            if isect_on_boundary_other:
-                                ind = seg_vert_other_1[0]
-                                if not (
-                                    ind == num_other - 1 and seg_vert_other_0[0] == 0
-                                ):
-                                    ind -= 1
-                                segment_vertex_intersection[o].append((ind, True))
-                            else:
-                                segment_vertex_intersection[o].append([])
-
-                        # The first point of other surely hits
-                        segment_vertex_intersection[o].append(seg_vert_other_0)
-
-                    elif e_4 <= 0:
-                        isect_pt_loc = [
-                            main_intersects_other_1,
-                            other_intersects_main_1,
-                        ]
-                        segment_vertex_intersection[main].append(seg_vert_main_1)
-
-                        if e_1 == 0:
-                            # The first point on the main fracture barely hits the other
-                            # fracture
-                            segment_vertex_intersection[main].append(seg_vert_main_0)
-                        else:
-                            # No intersection for the first point of main
-                            segment_vertex_intersection[main].append([])
-
-                        if e_3 == 0:
-                            segment_vertex_intersection[o].append(seg_vert_other_0)
-                        else:
-                            segment_vertex_intersection[o].append([])
-
-                        segment_vertex_intersection[o].append(seg_vert_other_1)
+                    seg_vert_main.append([])
+            if e_2 == 0:
+                seg_vert_main.append(seg_vert_main_1)
+            else:
+                if isect_on_boundary_main:
+                    ind = seg_vert_main_1[0]
+                    if not (ind == num_main - 1 and seg_vert_main_0[0] == 0):
+                        ind -= 1
 
-                    else:
-                        # We may eventually end up here for overlapping fractures
-                        assert False
-            elif e_2 >= 0:
-                # The first point on the main fracture is not involved in the intersection
-                # The case of e_1 also non-negative was covered above
-                if e_1 < 0:  # Equality is covered above
-                    # The first point on the main fracture is surrounded by points on
-                    # the other fracture. One of them will in turn be surrounded by the
-                    # points on the main fracture, this is the intersecting one.
-                    if e_3 <= 0:
-                        isect_pt_loc = [
-                            main_intersects_other_0,
-                            other_intersects_main_0,
-                        ]
-                        segment_vertex_intersection[main].append(seg_vert_main_0)
-                        segment_vertex_intersection[main].append([])
-
-                        segment_vertex_intersection[o].append([])
-                        segment_vertex_intersection[o].append(seg_vert_other_0)
-
-                    elif e_4 <= 0:
-                        isect_pt_loc = [
-                            main_intersects_other_0,
-                            other_intersects_main_1,
-                        ]
-                        segment_vertex_intersection[main].append(seg_vert_main_0)
-                        segment_vertex_intersection[main].append([])
-
-                        segment_vertex_intersection[o].append([])
-                        segment_vertex_intersection[o].append(seg_vert_other_1)
+                    seg_vert_main.append((ind, True))
+                else:
+                    seg_vert_main.append([])
 
+            # Other is intersected on two segments
+            seg_vert_other.append(seg_vert_other_0)
+            seg_vert_other.append(seg_vert_other_1)
+        else:
+            # The second point on the main fracture is surrounded by points on
+            # the other fracture. One of them will in turn be surrounded by the
+            # points on the main fracture, this is the intersecting one.
+            if e_3 <= 0:
+                isect_pt_loc = [
+                    main_intersects_other_1,
+                    other_intersects_main_0,
+                ]
+
+                seg_vert_main.append(seg_vert_main_1)
+                if e_1 == 0:
+                    # The first point on the main fracture barely hits the other
+                    # fracture
+                    seg_vert_main.append(seg_vert_main_0)
+                else:
+                    if isect_on_boundary_main:
+                        # No intersection for the first point of main
+                        ind = seg_vert_main_0[0]
+                        seg_vert_main.append((ind, True))
                     else:
-                        # We may eventually end up here for overlapping fractures
-                        assert False
-            elif e_1 < 0 and e_2 < 0:
-                # The points in on the main fracture are the intersection points
-                isect_pt_loc = [main_intersects_other_0, main_intersects_other_1]
-                segment_vertex_intersection[main].append(seg_vert_main_0)
-                segment_vertex_intersection[main].append(seg_vert_main_1)
-
-                if isect_on_boundary_other:
-                    ind_0 = seg_vert_other_0[0]
-                    ind_1 = seg_vert_other_1[0]
-                    if abs(ind_0 - ind_1) == 1:
-                        segment_vertex_intersection[o].append((min(ind_0, ind_1), True))
-                        segment_vertex_intersection[o].append((min(ind_0, ind_1), True))
+                        seg_vert_main.append([])
+
+                # The second may hit, depending on e_4
+                if e_4 == 0:
+                    seg_vert_other.append(seg_vert_other_1)
+                else:
+                    if isect_on_boundary_other:
+                        ind = seg_vert_other_1[0]
+                        if not (
+                            ind == num_other - 1 and seg_vert_other_0[0] == 0
+                        ):
+                            ind -= 1
+                        seg_vert_other.append((ind, True))
                     else:
-                        segment_vertex_intersection[o].append((num_other - 1, True))
-                        segment_vertex_intersection[o].append((num_other - 1, True))
+                        seg_vert_other.append([])
+
+                # The first point of other surely hits
+                seg_vert_other.append(seg_vert_other_0)
+
+            elif e_4 <= 0:
+                isect_pt_loc = [
+                    main_intersects_other_1,
+                    other_intersects_main_1,
+                ]
+                seg_vert_main.append(seg_vert_main_1)
+
+                if e_1 == 0:
+                    # The first point on the main fracture barely hits the other
+                    # fracture
+                    seg_vert_main.append(seg_vert_main_0)
+                else:
+                    # No intersection for the first point of main
+                    seg_vert_main.append([])
+
+                if e_3 == 0:
+                    seg_vert_other.append(seg_vert_other_0)
                 else:
-                    segment_vertex_intersection[o].append([])
-                    segment_vertex_intersection[o].append([])
+                    seg_vert_other.append([])
+
+                seg_vert_other.append(seg_vert_other_1)
+
             else:
-                # This should never happen
+                # We may eventually end up here for overlapping fractures
                 assert False
+    elif e_2 >= 0:
+        # The first point on the main fracture is not involved in the intersection
+        # The case of e_1 also non-negative was covered above
+        if e_1 < 0:  # Equality is covered above
+            # The first point on the main fracture is surrounded by points on
+            # the other fracture. One of them will in turn be surrounded by the
+            # points on the main fracture, this is the intersecting one.
+            if e_3 <= 0:
+                isect_pt_loc = [
+                    main_intersects_other_0,
+                    other_intersects_main_0,
+                ]
+                seg_vert_main.append(seg_vert_main_0)
+                seg_vert_main.append([])
+
+                seg_vert_other.append([])
+                seg_vert_other.append(seg_vert_other_0)
+
+            elif e_4 <= 0:
+                isect_pt_loc = [
+                    main_intersects_other_0,
+                    other_intersects_main_1,
+                ]
+                seg_vert_main.append(seg_vert_main_0)
+                seg_vert_main.append([])
+
+                seg_vert_other.append([])
+                seg_vert_other.append(seg_vert_other_1)
 
-            # Append data for this combination of polygons.
-            new_pt.append(np.array(isect_pt_loc).T)
-            num_new = len(isect_pt_loc)
-            isect_pt[main].append(new_pt_ind + np.arange(num_new))
-            isect_pt[o].append(new_pt_ind + np.arange(num_new))
-            new_pt_ind += num_new
-            is_bound_isect[main].append(isect_on_boundary_main)
-            is_bound_isect[o].append(isect_on_boundary_other)
-            polygon_pairs.append((main, o))
-
-    # Cleanup and return. Puh!
-    if len(new_pt) > 0:
-        new_pt = np.hstack([v for v in new_pt])
-        for i in range(isect_pt.size):
-            if len(isect_pt[i]) > 0:
-                isect_pt[i] = np.hstack([v for v in isect_pt[i]])
             else:
-                isect_pt[i] = np.empty(0)
+                # We may eventually end up here for overlapping fractures
+                assert False
+    elif e_1 < 0 and e_2 < 0:
+        # The points in on the main fracture are the intersection points
+        isect_pt_loc = [main_intersects_other_0, main_intersects_other_1]
+        seg_vert_main.append(seg_vert_main_0)
+        seg_vert_main.append(seg_vert_main_1)
+
+        if isect_on_boundary_other:
+            ind_0 = seg_vert_other_0[0]
+            ind_1 = seg_vert_other_1[0]
+            if abs(ind_0 - ind_1) == 1:
+                seg_vert_other.append((min(ind_0, ind_1), True))
+                seg_vert_other.append((min(ind_0, ind_1), True))
+            else:
+                seg_vert_other.append((num_other - 1, True))
+                seg_vert_other.append((num_other - 1, True))
+        else:
+            seg_vert_other.append([])
+            seg_vert_other.append([])
+    else:
+        # This should never happen
+        assert False
+
+    return (
+        isect_pt_loc,
+        seg_vert_main,
+        seg_vert_other,
+        isect_on_boundary_main,
+        isect_on_boundary_other,
+    )
+
+
+def _polygon_pair_intersection_chunk(items, tol):
+    # Helper function for parallel computation of polygon intersections.
+    return [_polygon_pair_intersection(*item, tol) for item in items]
+
+
+def _polygon_center(p):
+    # Compute the mean coordinate of a set of points
+    return p.mean(axis=1).reshape((-1, 1))
+
+
+def _normalize(v):
+    # Normalize a vector
+    nrm = np.sqrt(np.sum(v ** 2, axis=0))
+    return v / nrm
+
 
+def _mod_sign(v, tol=1e-8):
+    # Modified signum function: The value is 0 if it is very close to zero.
+    if isinstance(v, np.ndarray):
+        sgn = np.sign(v)
+        sgn[np.abs(v) < tol] = 0
+        return sgn
     else:
-        new_pt = np.empty((3, 0))
-        for i in range(isect_pt.size):
-            isect_pt[i] = np.empty(0)
+        if abs(v) < tol:
+            return 0
+        elif v < 0:
+            return -1
+        else:
+            return 1
 
-    return new_pt, isect_pt, is_bound_isect, polygon_pairs, segment_vertex_intersection
+
+def _segment_plane_intersection(start, end, normal, center):
+    # Find a point p on the segment between start and end, so that the vector
+    # p - center is perpendicular to normal
+
+    # Vector along the segment
+    dx = end - start
+    dot_prod = np.sum(normal.ravel() * dx)
+    assert np.abs(dot_prod) > 1e-6
+    t = -np.sum((start - center.ravel()) * normal.ravel()) / dot_prod
+
+    assert t >= 0 and t <= 1
+    return start + t * dx
+
+
+def _vector_pointset_point(a, b, tol=1e-4):
+    # Create a set of non-zero vectors from a point in the plane spanned by
+    # a, to all points in b
+    found = None
+    # Loop over all points in a, search for a point that is sufficiently
+    # far away from b. Mainly this involves finding a point in a which is
+    # not in b
+    for i in range(a.shape[1]):
+        dist = np.sqrt(np.sum((b - a[:, i].reshape((-1, 1))) ** 2, axis=0))
+        if np.min(dist) > tol:
+            found = i
+            break
+    if found is None:
+        # All points in a are also in b. We could probably use some other
+        # point in a, but this seems so strange that we will rather
+        # raise an error, with the expectation that this should never happen.
+        raise ValueError("Coinciding polygons")
+
+    return b - a[:, found].reshape((-1, 1))
+
+
+def _polygon_planes_crossed(polys, pairs, normals, tol):
+    """ Vectorized test of whether the polygons in pairs cross each others planes.
+
+    The test is conservative: A pair is discarded only if all vertexes of one of
+    the polygons lie clearly on the same side of the plane of the other polygon,
+    with a margin that covers the tolerances of the exact test in
+    _polygon_pair_intersection() and deviations from planarity of the polygons.
+
+    Parameters:
+        polys (list of np.array): Polygons.
+        pairs (np.array, 2 x n): Candidate pairs of polygons.
+        normals (np.array, 3 x num_polys): Unit normal vectors of the polygons in
+            pairs.
+        tol (double): Geometric tolerance.
+
+    Returns:
+        np.array of booleans, size n: True if the pair should be considered further.
+
+    """
+    if pairs.shape[1] == 0:
+        return np.zeros(0, dtype=np.bool)
+
+    num_vert = np.array([p.shape[1] for p in polys])
+    vert_start = np.hstack((0, np.cumsum(num_vert)))
+    all_pts = np.hstack(polys)
+    centers = np.add.reduceat(all_pts, vert_start[:-1], axis=1) / num_vert
+
+    # Deviation of the polygons from their planes, and their size
+    vert_poly = np.repeat(np.arange(len(polys)), num_vert)
+    dist_own = np.abs(
+        np.sum((all_pts - centers[:, vert_poly]) * normals[:, vert_poly], axis=0)
+    )
+    non_planarity = np.maximum.reduceat(dist_own, vert_start[:-1])
+    diameter = 2 * np.maximum.reduceat(
+        np.linalg.norm(all_pts - centers[:, vert_poly], axis=0), vert_start[:-1]
+    )
+
+    def one_side(plane, points):
+        # For pairs of polygons, check if all vertexes of the polygons points lie on
+        # the same side of the plane of the polygons plane.
+        ind = pp.utils.mcolon.mcolon(vert_start[points], vert_start[points + 1])
+        pair_ind = np.repeat(np.arange(points.size), num_vert[points])
+        plane_ind = plane[pair_ind]
+        dist = np.sum(
+            (all_pts[:, ind] - centers[:, plane_ind]) * normals[:, plane_ind], axis=0
+        )
+        start = np.hstack((0, np.cumsum(num_vert[points])[:-1]))
+        # The exact test uses a relative tolerance of 1e-8 on distances normalized
+        # by the distance between vertexes, which is bounded by the sum of the
+        # diameters.
+        margin = (
+            2 * (1e-8 * (diameter[plane] + diameter[points]) + non_planarity[plane])
+            + tol
+        )
+        return np.logical_or(
+            np.minimum.reduceat(dist, start) > margin,
+            np.maximum.reduceat(dist, start) < -margin,
+        )
+
+    return np.logical_not(
+        np.logical_or(one_side(pairs[0], pairs[1]), one_side(pairs[1], pairs[0]))
+    )
 
 
 def triangulations(p_1, p_2, t_1, t_2):
@@ -1191,15 +1302,18 @@ def split_intersecting_segments_2d(p, e, tol=1e-4):
     The connections are defined by their start and endpoints, and can also
     have tags assigned. If so, the tags are preserved as connections are split.
 
-    IMPLEMENTATION NOTE: This is a re-implementation of the old function
-    remove_edge_crossings, based on a much faster algorithm. The two functions
-    will coexist for a while.
+    IMPLEMENTATION NOTE: All steps are vectorized over the segments. Candidate
+    pairs of segments are found by binning the bounding boxes of the segments in
+    a uniform Cartesian grid, pairs that clearly do not cross are removed by a
+    coarse test on all pairs simultaneously, and the intersection points of the
+    remaining pairs are computed in one go. Only pairs of parallel segments are
+    treated one by one, by segments_2d().
 
     Parameters:
         p (np.ndarray, 2 x n_pt): Coordinates of points to be processed
         e (np.ndarray, n x n_con): Connections between lines. n >= 2, row
             0 and 1 are index of start and endpoints, additional rows are tags
-        tol (double, optional, default=1e-8): Tolerance used for comparing
+        tol (double, optional, default=1e-4): Tolerance used for comparing
             equal points.
 
     Returns:
@@ -1207,195 +1321,183 @@ def split_intersecting_segments_2d(p, e, tol=1e-4):
         np.ndarray, (n x n_edges), array of new edges. Non-intersecting.
 
     """
-    # Find the bounding box
-    x_min, x_max, y_min, y_max = _axis_aligned_bounding_box_2d(p, e)
-    # Identify fractures with overlapping bounding boxes
-    pairs = _identify_overlapping_rectangles(x_min, x_max, y_min, y_max)
-
-    # Identify all fractures that are the first (by index) of a potentially
-    # crossing pair. A better way to group the fractures may be feasible,
-    # but this has not been investigated.
-    start_inds = np.unique(pairs[0])
-
     num_lines = e.shape[1]
 
-    # Data structure for storage of intersection points. For each fracture,
-    # we have an array that will contain the index of the intersections.
-    isect_pt = np.empty(num_lines, dtype=np.object)
-    for i in range(isect_pt.size):
-        isect_pt[i] = np.empty(0, dtype=np.int)
-
-    # Array of new points, found in the intersection of old ones.
-    new_pts = []
-    # The new points will be appended to the old ones, thus their index
-    # must be adjusted.
-    new_ind = p.shape[1]
-
-    # Loop through all candidate pairs of intersecting fractures, check if
-    # they do intersect. If so, store the point, and for each crossing fracture
-    # take note of the index of the cross point.
-    for _, line_ind in enumerate(start_inds):
-        # First fracture in the candidate pair
-        main = line_ind
-        # Find all other fractures that is in a pair with the main as the first one.
-        hit = np.where(pairs[0] == main)
-        # Sort the other points; this makes debugging simpler if nothing else.
-        other = np.sort(pairs[1, hit][0])
-
-        # We will first do a coarse sorting, to rule out fractures that are clearly
-        # not intersecting, and then do a finer search for an intersection below.
-
-        # Utility function to pull out one or several points from an array based
-        # on index
-        def pt(p, ind):
-            a = p[:, ind]
-            if ind.size == 1:
-                return a.reshape((-1, 1))
-            else:
-                return a
-
-        # Obtain start and endpoint of the main and other fractures
-        start_main = pt(p, e[0, main])
-        end_main = pt(p, e[1, main])
-        start_other = pt(p, e[0, other])
-        end_other = pt(p, e[1, other])
-
-        # Utility function to normalize the fracture length
-        def normalize(v):
-            nrm = np.sqrt(np.sum(v ** 2, axis=0))
-
-            # If the norm of the vector is essentially zero, do not normalize the vector
-            hit = nrm < tol
-            nrm[hit] = 1
-            return v / nrm
-
-        def dist(a, b):
-            return np.sqrt(np.sum((a - b) ** 2))
-
-        # Vectors along the main fracture, and from the start of the main
-        # to the start and end of the other fractures. All normalized.
-        # If the other edges share start or endpoint with the main one, normalization
-        # of the distance vector will make the vector nans. In this case, we
-        # use another point along the other line, this works equally well for the
-        # coarse identification (based on cross products).
-        # If the segments are overlapping, there will still be issues with nans,
-        # but these are dealt with below.
-        main_vec = normalize(end_main - start_main)
-        if dist(start_other, start_main) > 1e-4:
-            main_other_start = normalize(start_other - start_main)
-        else:
-            main_other_start = normalize(0.5 * (start_other + end_other) - start_main)
-        if dist(end_other, start_main) > 1e-4:
-            main_other_end = normalize(end_other - start_main)
-        else:
-            # Values 0.3 and 0.7 are quite random here.
-            main_other_end = normalize(0.3 * start_other + 0.7 * end_other - start_main)
-
-        # Modified signum function: The value is 0 if it is very close to zero.
-        def mod_sign(v, tol):
-            sgn = np.sign(v)
-            sgn[np.abs(v) < tol] = 0
-            return sgn
-
-        # Take the cross product between the vector along the main line, and the
-        # vectors to the start and end of the other lines, respectively.
-        start_cross = mod_sign(
-            main_vec[0] * main_other_start[1] - main_vec[1] * main_other_start[0], tol
-        )
-        end_cross = mod_sign(
-            main_vec[0] * main_other_end[1] - main_vec[1] * main_other_end[0], tol
-        )
-
-        # If the start and endpoint of the other fracture are clearly on the
-        # same side of the main one, these are not crossing.
-        # For completely ovrelapping edges, the normalization will leave the
-        # vectors nan. There may be better ways of dealing with this, but we simply
-        # run the intersection finder in this case.
-        relevant = np.where(
-            np.logical_or(
-                (start_cross * end_cross < 1),
-                np.any(np.isnan(main_other_start + main_other_end), axis=0),
-            )
-        )[0]
+    # Find the bounding box
+    x_min, x_max, y_min, y_max = _axis_aligned_bounding_box_2d(p, e)
+    # Identify fractures with overlapping bounding boxes. The search in 3d is
+    # reused, with all boxes in the same plane.
+    zero = np.zeros(num_lines)
+    pairs = _identify_overlapping_boxes_3d(x_min, x_max, y_min, y_max, zero, zero)
 
-        # Loop over all relevant (possibly crossing) fractures, look closer
-        # for an intersection.
-        for ri in relevant:
-            ipt = segments_2d(
-                start_main, end_main, pt(start_other, ri), pt(end_other, ri), tol
-            )
-            # Add the intersection point, if any.
-            # If two intersection points are found, that is the edges are overlapping
-            # both points are added.
-            if ipt is not None:
-                num_isect = ipt.shape[1]
-                # Add indices of the new points to the main and other edge
-                isect_pt[main] = np.append(
-                    isect_pt[main], new_ind + np.arange(num_isect)
-                )
-                isect_pt[other[ri]] = np.append(
-                    isect_pt[other[ri]], new_ind + np.arange(num_isect)
-                )
-                new_ind += num_isect
+    # Coarse sorting, to rule out pairs that are clearly not intersecting
+    pairs = pairs[:, _segment_pairs_may_cross_2d(p, e, pairs, tol)]
 
-                # Add the one or two intertion points
-                if num_isect == 1:
-                    new_pts.append(ipt.squeeze())
-                else:
-                    # It turned out the transport was needed to get the code to work
-                    new_pts.append(ipt.squeeze().T)
+    # Intersection points, and the index of the pair they belong to
+    new_pts, pair_ind = _segment_pairs_intersection_2d(p, e, pairs, tol)
 
     # If we have found no intersection points, we can safely return the incoming
     # points and edges.
-    if len(new_pts) == 0:
+    if new_pts.shape[1] == 0:
         return p, e
+
     # If intersection points are found, the intersecting lines must be split into
     # shorter segments.
-    else:
-        # The full set of points, both original and newly found intersection points
-        all_pt = np.hstack((p, np.vstack([i for i in new_pts]).T))
-        # Remove duplicates in the point set.
-        # NOTE: The tolerance used here is a bit sensitive, if set too loose, this
-        # may merge non-intersecting fractures.
-        unique_all_pt, _, ib = pp.utils.setmembership.unique_columns_tol(all_pt, tol)
-        # Data structure for storing the split edges.
-        new_edge = np.empty((e.shape[0], 0))
-
-        # Loop over all lines, split it into non-overlapping segments.
-        for ei in range(num_lines):
-            # Find indices of all points involved in this fracture.
-            # Map them to the unique point set, and uniquify
-            inds = np.unique(ib[np.hstack((e[:2, ei], isect_pt[ei]))])
-            num_branches = inds.size - 1
-            # Get the coordinates themselves.
-            loc_pts = pt(unique_all_pt, inds)
-            # Specifically get the start point: Pick one of the points of the
-            # original edge, e[0, ei], which is known to be at an end of the edge.
-            # map to the unique indices
-            loc_start = pt(unique_all_pt, ib[e[0, ei]])
-            # Measure the distance of the points from the start. This can be used
-            # to sort the points along the line
-            dist = np.sum((loc_pts - loc_start) ** 2, axis=0)
-            order = np.argsort(dist)
-            new_inds = inds[order]
-            # All new segments share the tags of the old one.
-            loc_tags = e[2:, ei].reshape((-1, 1)) * np.ones(num_branches)
-            # Define the new segments, in terms of the unique points
-            loc_edge = np.vstack((new_inds[:-1], new_inds[1:], loc_tags))
-
-            # Add to the global list of segments
-            new_edge = np.hstack((new_edge, loc_edge))
-
-        # Finally, uniquify edges. This operation is necessary for overlapping edges.
-        # Operate on sorted point indices per edge
-        new_edge[:2] = np.sort(new_edge[:2], axis=0)
-        # Uniquify.
-        _, edge_map, _ = pp.utils.setmembership.unique_columns_tol(
-            new_edge[:2].astype(np.int), tol
+
+    # The full set of points, both original and newly found intersection points
+    all_pt = np.hstack((p, new_pts))
+    # Remove duplicates in the point set.
+    # NOTE: The tolerance used here is a bit sensitive, if set too loose, this
+    # may merge non-intersecting fractures.
+    unique_all_pt, _, ib = pp.utils.setmembership.unique_columns_tol(all_pt, tol)
+    num_pts = unique_all_pt.shape[1]
+
+    # Find all points on each line: The endpoints, and the intersection points
+    # with other lines. Map them to the unique point set, and uniquify.
+    new_ind = p.shape[1] + np.arange(new_pts.shape[1])
+    line = np.hstack(
+        (np.tile(np.arange(num_lines), 2), pairs[0, pair_ind], pairs[1, pair_ind])
+    )
+    pt_ind = ib[np.hstack((e[0], e[1], new_ind, new_ind))]
+    _, first = np.unique(line * num_pts + pt_ind, return_index=True)
+    line = line[first]
+    pt_ind = pt_ind[first]
+
+    # Sort the points along the lines by the distance from the start point of the
+    # line, e[0], which is known to be at an end of the line.
+    loc_start = unique_all_pt[:, ib[e[0, line]]]
+    dist = np.sum((unique_all_pt[:, pt_ind] - loc_start) ** 2, axis=0)
+    order = np.lexsort((dist, line))
+    line = line[order]
+    pt_ind = pt_ind[order]
+
+    # Consecutive points along a line define the new segments. All new segments
+    # share the tags of the old one.
+    same_line = line[1:] == line[:-1]
+    new_edge = np.vstack(
+        (pt_ind[:-1][same_line], pt_ind[1:][same_line], e[2:, line[1:][same_line]])
+    )
+
+    # Finally, uniquify edges. This operation is necessary for overlapping edges.
+    # Operate on sorted point indices per edge
+    new_edge[:2] = np.sort(new_edge[:2], axis=0)
+    # Uniquify.
+    _, edge_map, _ = pp.utils.setmembership.unique_columns_tol(
+        new_edge[:2].astype(np.int), tol
+    )
+    new_edge = new_edge[:, edge_map]
+
+    return unique_all_pt, new_edge.astype(np.int)
+
+
+def _segment_pairs_may_cross_2d(p, e, pairs, tol):
+    """ Coarse test of whether pairs of segments in 2d may cross.
+
+    A pair is ruled out if the start and endpoint of the second segment are
+    clearly on the same side of the first segment.
+
+    Parameters:
+        p (np.ndarray, 2 x n_pt): Coordinates of the points.
+        e (np.ndarray, n x n_con): Connections between the points.
+        pairs (np.ndarray, 2 x n_pairs): Pairs of segments to be tested.
+        tol (double): Tolerance for points on the line of the first segment.
+
+    Returns:
+        np.ndarray of bools, size n_pairs: True if the segments may cross.
+
+    """
+    start_main = p[:, e[0, pairs[0]]]
+
+    # Utility function to normalize vectors. If the norm of a vector is
+    # essentially zero, the vector is not normalized.
+    def normalize(v):
+        nrm = np.sqrt(np.sum(v ** 2, axis=0))
+        nrm[nrm < tol] = 1
+        return v / nrm
+
+    # Vectors along the main segment, and from the start of the main segment to
+    # the start and end of the other segment. If the other segment shares a
+    # point with the start of the main one, the corresponding vector is
+    # essentially zero, and the pair is kept.
+    main_vec = normalize(p[:, e[1, pairs[0]]] - start_main)
+    main_other_start = normalize(p[:, e[0, pairs[1]]] - start_main)
+    main_other_end = normalize(p[:, e[1, pairs[1]]] - start_main)
+
+    # Take the cross product between the vector along the main line, and the
+    # vectors to the start and end of the other lines, respectively.
+    start_cross = _mod_sign(
+        main_vec[0] * main_other_start[1] - main_vec[1] * main_other_start[0], tol
+    )
+    end_cross = _mod_sign(
+        main_vec[0] * main_other_end[1] - main_vec[1] * main_other_end[0], tol
+    )
+    return start_cross * end_cross < 1
+
+
+def _segment_pairs_intersection_2d(p, e, pairs, tol):
+    """ Compute the intersections between pairs of segments in 2d.
+
+    This is a vectorized version of segments_2d(), which is still used for pairs
+    of parallel segments.
+
+    Parameters:
+        p (np.ndarray, 2 x n_pt): Coordinates of the points.
+        e (np.ndarray, n x n_con): Connections between the points.
+        pairs (np.ndarray, 2 x n_pairs): Pairs of segments.
+        tol (double): Geometric tolerance.
+
+    Returns:
+        np.ndarray, 2 x n_isect: Intersection points. Overlapping segments give
+            two points, the ends of the overlap, in the order of segments_2d().
+        np.ndarray of ints, n_isect: Index of the pair of each intersection
+            point. The points are sorted according to this index.
+
+    """
+    start_1 = p[:, e[0, pairs[0]]].astype(np.float)
+    end_1 = p[:, e[1, pairs[0]]].astype(np.float)
+    start_2 = p[:, e[0, pairs[1]]].astype(np.float)
+    end_2 = p[:, e[1, pairs[1]]].astype(np.float)
+
+    # See segments_2d() for the derivation
+    d_1 = end_1 - start_1
+    d_2 = end_2 - start_2
+    d_s = start_2 - start_1
+    length_1 = np.sqrt(np.sum(d_1 * d_1, axis=0))
+    length_2 = np.sqrt(np.sum(d_2 * d_2, axis=0))
+
+    discr = d_1[0] * (-d_2[1]) - d_1[1] * (-d_2[0])
+    parallel = np.abs(discr) < tol * length_1 * length_2
+
+    # Non-parallel segments: Solve the linear systems by Cramer's rule
+    crossing = np.where(np.logical_not(parallel))[0]
+    t_1 = (
+        d_s[0, crossing] * (-d_2[1, crossing]) - d_s[1, crossing] * (-d_2[0, crossing])
+    ) / discr[crossing]
+    t_2 = (
+        d_1[0, crossing] * d_s[1, crossing] - d_1[1, crossing] * d_s[0, crossing]
+    ) / discr[crossing]
+    # The intersection lies on both segments if both t_1 and t_2 are on the
+    # unit interval, with some tolerance.
+    hit = np.logical_and.reduce(
+        (t_1 >= -tol, t_1 <= 1 + tol, t_2 >= -tol, t_2 <= 1 + tol)
+    )
+    pts = [start_1[:, crossing[hit]] + t_1[hit] * d_1[:, crossing[hit]]]
+    pair_ind = [crossing[hit]]
+
+    # Parallel segments may overlap, use the full test
+    for pi in np.where(parallel)[0]:
+        ipt = segments_2d(
+            start_1[:, pi], end_1[:, pi], start_2[:, pi], end_2[:, pi], tol
         )
-        new_edge = new_edge[:, edge_map]
+        if ipt is not None:
+            pts.append(ipt)
+            pair_ind.append(pi * np.ones(ipt.shape[1], dtype=np.int))
 
-        return unique_all_pt, new_edge.astype(np.int)
+    pts = np.hstack(pts)
+    pair_ind = np.hstack(pair_ind)
+    # Sort by pair; a stable sort preserves the order of points from the same pair
+    order = np.argsort(pair_ind, kind="stable")
+    return pts[:, order], pair_ind[order]
 
 
 def _axis_aligned_bounding_box_2d(p, e):
@@ -1453,211 +1555,145 @@ def _axis_aligned_bounding_box_3d(polys):
 
     polys = list(polys)
 
-    num_poly = len(polys)
+    if len(polys) == 0:
+        return tuple(np.empty(0) for _ in range(6))
 
-    x_min = np.empty(num_poly)
-    x_max = np.empty_like(x_min)
-    y_min = np.empty_like(x_min)
-    y_max = np.empty_like(x_min)
-    z_min = np.empty_like(x_min)
-    z_max = np.empty_like(x_min)
+    # Compute the minimum and maximum coordinates of all polygons in one go
+    num_vert = np.array([p.shape[1] for p in polys])
+    start = np.hstack((0, np.cumsum(num_vert)[:-1]))
+    pts = np.hstack(polys)
+    min_coord = np.minimum.reduceat(pts, start, axis=1)
+    max_coord = np.maximum.reduceat(pts, start, axis=1)
 
-    for ind, p in enumerate(polys):
-        x_min[ind] = np.min(p[0])
-        x_max[ind] = np.max(p[0])
-        y_min[ind] = np.min(p[1])
-        y_max[ind] = np.max(p[1])
-        z_min[ind] = np.min(p[2])
-        z_max[ind] = np.max(p[2])
+    x_min, y_min, z_min = min_coord
+    x_max, y_max, z_max = max_coord
 
     return x_min, x_max, y_min, y_max, z_min, z_max
 
 
-def _identify_overlapping_intervals(left, right):
-    """ Based on a set of start and end coordinates for intervals, identify pairs of
-    overlapping intervals.
-
-    Parameters:
-        left (np.array): Minimum coordinates of the intervals.
-        right (np.array): Maximum coordinates of the intervals.
+def _identify_overlapping_boxes_3d(x_min, x_max, y_min, y_max, z_min, z_max):
+    """ Identify pairs of overlapping axis-aligned boxes in 3d.
 
-        For all items, left <= right (but equality is allowed).
-
-    Returns:
-        np.array, 2 x num_overlaps: Each column contains a pair of overlapping
-            intervals, refering to their placement in left and right. The pairs
-            are sorted so that the lowest index is in the first column.
-
-    """
-    # There can be no overlaps if there is less than two intervals
-    if left.size < 2:
-        return np.empty((2, 0))
-
-    # Sort the coordinates
-    sort_ind_left = np.argsort(left)
-    sort_ind_right = np.argsort(right)
-
-    # pointers to the next start and end point of an interval
-    next_right = 0
-    next_left = 0
-
-    # List of pairs we have found
-    pairs = []
-    # List of intervals we are currently in. All intervals will join and leave this set.
-    active = []
-
-    num_lines = left.size
-
-    # Loop through the line, add and remove intervals as we come across them.
-    while True:
-        # Check if the next start (left) point is before the next endpoint,
-        # But only if there are more left points available.
-        # Less or equal is critical here, or else cases where a point interval
-        # is combined with the start of another interval may not be discovered.
-        if (
-            next_left < num_lines
-            and left[sort_ind_left[next_left]] <= right[sort_ind_right[next_right]]
-        ):
-            # We have started a new interval. This will be paired with
-            # all active intervals
-            for a in active:
-                pairs.append([a, sort_ind_left[next_left]])
-            # Also join the new intervals to the active set.
-            active.append(sort_ind_left[next_left])
-            # Increase the index
-            next_left += 1
-        else:
-            # We have reached the end of the interval - remove it from the
-            # active ones.
-            active.remove(sort_ind_right[next_right])
-            next_right += 1
-            # Check if we have come to the end
-            if next_right == num_lines:
-                break
-
-    if len(pairs) == 0:
-        return np.empty((2, 0))
-    else:
-        pairs = np.asarray(pairs).T
-        # First sort the pairs themselves
-        pairs.sort(axis=0)
-        # Next, sort the columns so that the first row is non-decreasing
-        sort_ind = np.argsort(pairs[0])
-        pairs = pairs[:, sort_ind]
-        return pairs
-
-
-def _identify_overlapping_rectangles(xmin, xmax, ymin, ymax, tol=1e-8):
-    """ Based on a set of start and end coordinates for bounding boxes, identify pairs of
-    overlapping rectangles.
-
-    The algorithm was found in 'A fast method for fracture intersection detection
-    in discrete fracture networks' by Dong et al, omputers and Geotechniques 2018.
+    The boxes are sorted into the bins of a uniform Cartesian grid (spatial
+    hashing), with bin size given by the typical size of the boxes. Only boxes that
+    share a bin are compared. The cost is thus roughly proportional to the number
+    of boxes plus the number of overlaps, in contrast to sweep algorithms along a
+    single axis, which may compare all boxes with all others.
 
     Parameters:
-        xmin (np.array): Minimum coordinates of the rectangle on the first axis.
-        xmax (np.array): Maximum coordinates of the rectangle on the first axis.
-        ymin (np.array): Minimum coordinates of the rectangle on the second axis.
-        ymax (np.array): Maximum coordinates of the rectangle on the second axis.
+        x_min (np.array): Minimum coordinates of the boxes on the first axis.
+        x_max (np.array): Maximum coordinates of the boxes on the first axis.
+        y_min (np.array): Minimum coordinates of the boxes on the second axis.
+        y_max (np.array): Maximum coordinates of the boxes on the second axis.
+        z_min (np.array): Minimum coordinates of the boxes on the third axis.
+        z_max (np.array): Maximum coordinates of the boxes on the third axis.
 
-        For all items, xmin <= xmax (but equality is allowed), correspondingly for
-        the y-coordinates
+        Boxes that touch are considered overlapping.
 
     Returns:
         np.array, 2 x num_overlaps: Each column contains a pair of overlapping
-            intervals, refering to their placement in left and right. The pairs
-            are sorted so that the lowest index is in the first column.
+            boxes. The pairs are sorted so that the lowest index is in the first
+            row, and the columns are sorted lexicographically.
 
     """
-    # There can be no overlaps if there is less than two rectangles
-    if xmin.size < 2:
-        return np.empty((2, 0))
-
-    # Sort the coordinates
-    sort_ind_min = np.argsort(xmin)
-    sort_ind_max = np.argsort(xmax)
-
-    # pointers to the next start and end point of an interval
-    next_min = 0
-    next_max = 0
-
-    # List of pairs we have found
-    pairs = []
-    # List of intervals we are currently in. All intervals will join and leave this set.
-    active = []
-
-    num_lines = xmax.size
-
-    # Pass along the x-axis, identify the start and end of rectangles as we go.
-    # The idea is then for each new interval to check which of the active intervals
-    # also have overlap along the y-axis. These will be identified as pairs.
-    while True:
-        # Check if the next start (xmin) point is before the next endpoint,
-        # but only if there are more left points available.
-        # Less or equal is critical here, or else cases where a point interval
-        # is combined with the start of another interval may not be discovered.
-        if (
-            next_min < num_lines
-            and xmin[sort_ind_min[next_min]] <= xmax[sort_ind_max[next_max]]
-        ):
-            # Find active rectangles where the y-interval is also overlapping
-            between = np.where(
-                np.logical_and(
-                    ymax[sort_ind_min[next_min]] >= ymin[active],
-                    ymin[sort_ind_min[next_min]] <= ymax[active],
-                )
-            )[0]
-            # For all identified overlaps, add the new pairs
-            for a in between:
-                pairs.append([active[a], sort_ind_min[next_min]])
-            # Add this to the active rectangles, and increase the index
-            active.append(sort_ind_min[next_min])
-            next_min += 1
-        else:
-            # We are leaving a rectangle.
-            active.remove(sort_ind_max[next_max])
-            next_max += 1
-            # Check if we have come to the end
-            if next_max == num_lines:
-                break
-
-    if len(pairs) == 0:
-        return np.empty((2, 0))
-    else:
-        pairs = np.asarray(pairs).T
-        # First sort the pairs themselves
-        pairs.sort(axis=0)
-        # Next, sort the columns so that the first row is non-decreasing
-        sort_ind = np.argsort(pairs[0])
-        pairs = pairs[:, sort_ind]
-        return pairs
+    num_boxes = x_min.size
+    if num_boxes < 2:
+        return np.empty((2, 0), dtype=np.int)
+
+    lower = np.vstack((x_min, y_min, z_min))
+    upper = np.vstack((x_max, y_max, z_max))
+
+    # Bin size: The median size of the boxes, but avoid more bins than boxes
+    origin = lower.min(axis=1).reshape((-1, 1))
+    domain_size = upper.max(axis=1) - origin.ravel()
+    bin_size = np.maximum(
+        np.median(upper - lower, axis=1), domain_size / np.cbrt(num_boxes)
+    )
+    bin_size[bin_size <= 0] = 1
+    bin_size = bin_size.reshape((-1, 1))
+
+    # Range of bins covered by each box. Boxes that touch will share a bin.
+    ind_lower = np.floor((lower - origin) / bin_size).astype(np.int64)
+    ind_upper = np.floor((upper - origin) / bin_size).astype(np.int64)
+    num_bins = ind_upper.max(axis=1) + 1
+
+    # Expand the boxes to all bins they cover
+    num_covered = ind_upper - ind_lower + 1
+    num_box_bins = np.prod(num_covered, axis=0)
+    box = np.repeat(np.arange(num_boxes), num_box_bins)
+    offset = np.arange(box.size) - np.repeat(
+        np.cumsum(num_box_bins) - num_box_bins, num_box_bins
+    )
+    nx = num_covered[0, box]
+    ny = num_covered[1, box]
+    ix = ind_lower[0, box] + offset % nx
+    iy = ind_lower[1, box] + (offset // nx) % ny
+    iz = ind_lower[2, box] + offset // (nx * ny)
+    bin_ind = ix + num_bins[0] * (iy + num_bins[1] * iz)
+
+    # Sort by bins, and find all pairs of boxes within each bin
+    order = np.argsort(bin_ind, kind="stable")
+    bin_ind = bin_ind[order]
+    box = box[order]
+    new_bin = np.hstack((True, bin_ind[1:] != bin_ind[:-1]))
+    bin_start = np.where(new_bin)[0]
+    bin_count = np.diff(np.hstack((bin_start, bin_ind.size)))
+    # Position of each item in its bin, and the number of later items in the bin
+    pos_in_bin = np.arange(bin_ind.size) - np.repeat(bin_start, bin_count)
+    num_later = np.repeat(bin_count, bin_count) - pos_in_bin - 1
+
+    first = np.repeat(np.arange(bin_ind.size), num_later)
+    second = (
+        first
+        + 1
+        + np.arange(first.size)
+        - np.repeat(np.cumsum(num_later) - num_later, num_later)
+    )
+    pairs = np.sort(np.vstack((box[first], box[second])), axis=0)
+
+    # Boxes may share several bins, uniquify
+    pairs = np.unique(pairs[0] * num_boxes + pairs[1])
+    pairs = np.vstack((pairs // num_boxes, pairs % num_boxes))
+
+    # Finally check for overlap in all directions
+    overlap = np.all(
+        np.logical_and(
+            lower[:, pairs[0]] <= upper[:, pairs[1]],
+            lower[:, pairs[1]] <= upper[:, pairs[0]],
+        ),
+        axis=0,
+    )
+    # The pairs are lexicographically sorted by np.unique
+    return pairs[:, overlap]
 
 
-def _intersect_pairs(p1, p2):
-    """ For two lists containing pair of indices, find the intersection.
+def _map_in_process_pool(fn, items, num_workers, *args):
+    """ Apply a function to chunks of a list of items in a pool of processes.
 
     Parameters:
-        p1 (np.array, 2 x n): Each column contains a pair of indices.
-        p2 (np.array, 2 x m): Each column contains a pair of indices.
+        fn (callable): Function to be called as fn(chunk, *args), where chunk is a
+            list of items. It should return a list of results, one per item. The
+            function must be picklable.
+        items (list): Items to be processed.
+        num_workers (int): Number of processes.
+        *args: Further arguments to fn.
 
     Returns:
-        np.array, (2 x k, k <= min(n, m)): Each column contains a pair of
-            indices that are found in both p1 and p2. The array is sorted so
-            that items in the first row is less or equal to the second row.
-            The columns are sorted according to the numbers in the first row.
+        list: Results for all items, in the order of the items.
 
     """
-    # Special treatment of empty lists
-    if p1.size == 0 or p2.size == 0:
-        return np.empty((2, 0))
-    else:
-        # Do the intersection
-        _, ind = pp.utils.setmembership.ismember_rows(p1, p2)
-        pairs = p2[:, ind]
-
-        # First sort the pairs themselves
-        pairs.sort(axis=0)
-        # Next, sort the columns so that the first row is non-decreasing
-        sort_ind = np.argsort(pairs[0])
-        pairs = pairs[:, sort_ind]
-        return pairs
+    # Avoid plain fork, see pp.utils.parallel
+    context = process_pool_context()
+
+    # A few chunks per worker to balance the load
+    num_chunks = min(len(items), 4 * num_workers)
+    bounds = np.linspace(0, len(items), num_chunks + 1).astype(np.int)
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as executor:
+        futures = [
+            executor.submit(fn, items[bounds[i] : bounds[i + 1]], *args)
+            for i in range(num_chunks)
+        ]
+        results = []
+        for future in futures:
+            results += future.result()
+    return results
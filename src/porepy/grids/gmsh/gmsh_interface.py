@@ -2,6 +2,9 @@
 
 import numpy as np
 import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # meshio has changed the name of the module taking care of gmsh import.
 # Ensure compatibility with both versions with a try-except
@@ -578,7 +581,7 @@ class GmshGridBucketWriter(object):
 # ------------------ End of GmshGridBucketWriter------------------------------
 
 
-def run_gmsh(in_file, out_file, dims, **kwargs):
+def run_gmsh(in_file, out_file, dims, timeout=None, num_threads=None, **kwargs):
     """
     Convenience function to run gmsh.
 
@@ -589,14 +592,95 @@ def run_gmsh(in_file, out_file, dims, **kwargs):
             the geometry dimensions, gmsh will grid all lower-dimensional
             objcets described in in_file (e.g. all surfaces embeded in a 3D
             geometry).
+        timeout (float, optional): Time, in seconds, after which gmsh is
+            terminated. By default, there is no limit.
+        num_threads (int, optional): Number of threads used by gmsh. By
+            default, the gmsh setting is used.
         **kwargs: Options passed on to gmsh. See gmsh documentation for
             possible values.
 
     Returns:
-        double: Status of the generation, as returned by os.system. 0 means the
+        int: Status of the generation, as returned by gmsh. 0 means the
             simulation completed successfully, >0 signifies problems.
 
+    Raises:
+        subprocess.TimeoutExpired if gmsh did not finish within the timeout.
+
+    """
+    cmd = _gmsh_command(in_file, out_file, dims, num_threads, **kwargs)
+    return subprocess.run(cmd, timeout=timeout).returncode
+
+
+def run_gmsh_parallel(
+    jobs, max_workers=None, timeout=None, num_threads=1, keep_going=False, **kwargs
+):
+    """
+    Run several gmsh processes concurrently.
+
+    Each job is run in a separate temporary working directory, so that any
+    auxiliary files written by gmsh do not collide.
+
+    Parameters:
+        jobs (list of tuple): Each item gives the in_file, out_file and dims of a
+            job, see run_gmsh(). An optional fourth item is a dictionary of
+            options for gmsh for this job, which updates those in kwargs.
+        max_workers (int, optional): Maximum number of gmsh processes running at
+            the same time. Defaults to the value num_processors in the PorePy
+            config file, or the number of cores, divided by num_threads, so that
+            the total number of gmsh threads does not exceed the number of
+            processors.
+        timeout (float, optional): Time, in seconds, after which a gmsh process is
+            terminated. By default, there is no limit.
+        num_threads (int, optional): Number of threads used by each gmsh process.
+            Defaults to 1.
+        keep_going (bool, optional): If True, a job which is terminated by the
+            timeout is reported with status None, instead of raising an error
+            when all jobs are finished. Defaults to False.
+        **kwargs: Options passed on to gmsh for all jobs.
+
+    Returns:
+        list of int: Status of each job, in the order of the jobs, see run_gmsh().
+
+    Raises:
+        subprocess.TimeoutExpired if a job did not finish within the timeout,
+            unless keep_going is True.
+
     """
+    if max_workers is None:
+        try:
+            num_processors = read_config.read()["num_processors"]
+        except (ImportError, KeyError):
+            num_processors = os.cpu_count() or 1
+        max_workers = max(1, num_processors // max(num_threads or 1, 1))
+
+    def run(job):
+        in_file, out_file, dims = job[:3]
+        opts = dict(kwargs)
+        if len(job) > 3:
+            opts.update(job[3])
+        cmd = _gmsh_command(
+            os.path.abspath(in_file),
+            os.path.abspath(out_file),
+            dims,
+            num_threads,
+            **opts,
+        )
+        with tempfile.TemporaryDirectory(prefix="porepy_gmsh_") as work_dir:
+            try:
+                return subprocess.run(cmd, timeout=timeout, cwd=work_dir).returncode
+            except subprocess.TimeoutExpired:
+                if keep_going:
+                    return None
+                raise
+
+    # The work is done by the gmsh processes, threads suffice to manage them
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        futures = [pool.submit(run, job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def _gmsh_command(in_file, out_file, dims, num_threads=None, **kwargs):
+    # Command line for a call to gmsh, as a list of arguments
     if not os.path.isfile(in_file):
         raise FileNotFoundError("file " + in_file + " not found")
 
@@ -604,18 +688,12 @@ def run_gmsh(in_file, out_file, dims, **kwargs):
     config = read_config.read()
     path_to_gmsh = config["gmsh_path"]
 
-    opts = " "
+    cmd = [path_to_gmsh, "-2" if dims == 2 else "-3", in_file, "-o", out_file]
+    if num_threads is not None:
+        cmd += ["-nt", str(num_threads)]
     for key, val in kwargs.items():
         # Gmsh keywords are specified with prefix '-'
         if key[0] != "-":
             key = "-" + key
-        opts += key + " " + str(val) + " "
-
-    if dims == 2:
-        cmd = path_to_gmsh + " -2 " + in_file + " -o " + out_file + opts
-    else:
-        cmd = path_to_gmsh + " -3 " + in_file + " -o " + out_file + opts
-
-    status = os.system(cmd)
-
-    return status
+        cmd += [key, str(val)]
+    return cmd
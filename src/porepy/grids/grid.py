@@ -12,11 +12,11 @@ Acknowledgements:
 """
 from __future__ import division
 import numpy as np
-import itertools
 from scipy import sparse as sps
 from typing import List, Union, Dict
 
 import porepy as pp
+from porepy.grids.spatial_index import SpatialIndex
 from porepy.utils import matrix_compression, mcolon, tags
 
 
@@ -73,8 +73,19 @@ class Grid(object):
             num_cells
         cell_volumes (np.ndarray): Volumes of all cells
 
+        ---
+        Connectivity maps derived from the topology, such as cell_nodes() and
+        cell_connection_map(), are computed on first use and stored in the grid.
+        The stored maps are discarded when nodes, face_nodes or cell_faces are
+        reassigned, or when the index arrays of face_nodes or cell_faces are
+        replaced. If face_nodes or cell_faces are modified in place, element by
+        element, clear_connectivity_cache() must be called.
+
     """
 
+    # Attributes which, when reassigned, invalidate the stored connectivity maps
+    _topology_attributes = ("nodes", "face_nodes", "cell_faces")
+
     def __init__(
         self,
         dim: int,
@@ -128,6 +139,49 @@ class Grid(object):
             self.tags = tags
             self._check_tags()
 
+    def __setattr__(self, name, value) -> None:
+        if name in Grid._topology_attributes:
+            self.clear_connectivity_cache()
+        super().__setattr__(name, value)
+
+    def __getstate__(self) -> Dict:
+        # The connectivity maps are cheap to recompute compared to the cost of
+        # pickling them, e.g. when grids are sent to worker processes.
+        state = self.__dict__.copy()
+        state.pop("_connectivity_cache", None)
+        return state
+
+    def clear_connectivity_cache(self) -> None:
+        """ Discard the stored connectivity maps, see class documentation.
+        """
+        self.__dict__.pop("_connectivity_cache", None)
+
+    def _connectivity(self, name: str, compute, is_valid=None):
+        """ Get a connectivity map, compute it if it is not stored, or if the
+        topology has changed since it was computed. Further validity checks of a
+        stored map can be provided by is_valid.
+        """
+        # Identify the topology by the arrays of the sparse matrices. Comparison is
+        # by identity, so the test is cheap. Keeping references to the arrays
+        # guarantees that a new array is not mistaken for an old one.
+        topology = (
+            self.face_nodes.indices,
+            self.face_nodes.indptr,
+            self.face_nodes.data,
+            self.cell_faces.indices,
+            self.cell_faces.indptr,
+            self.cell_faces.data,
+        )
+        cache = self.__dict__.get("_connectivity_cache")
+        if cache is None or any(
+            a is not b for a, b in zip(cache["topology"], topology)
+        ):
+            cache = {"topology": topology}
+            self.__dict__["_connectivity_cache"] = cache
+        if name not in cache or (is_valid is not None and not is_valid(cache[name])):
+            cache[name] = compute()
+        return cache[name]
+
     def copy(self):
         """
         Create a deep copy of the grid.
@@ -558,11 +612,17 @@ class Grid(object):
         """
         Obtain mapping between cells and nodes.
 
+        The map is computed on the first call, and stored for later calls, see
+        the class documentation. It should not be modified in place.
+
         Returns:
             sps.csc_matrix, size num_nodes x num_cells: Value 1 indicates a
                 connection between cell and node.
 
         """
+        return self._connectivity("cell_nodes", self._compute_cell_nodes)
+
+    def _compute_cell_nodes(self) -> sps.csc_matrix:
         # Local version of cell-face map, using absolute value to avoid
         # artifacts from +- in the original version.
         cf_loc = sps.csc_matrix(
@@ -583,7 +643,10 @@ class Grid(object):
             np.ndarray, size num_cells: Number of nodes per cell.
 
         """
-        return self.cell_nodes().sum(axis=0).A.ravel("F")
+        return self._connectivity(
+            "num_cell_nodes",
+            lambda: np.diff(self.cell_nodes().tocsc().indptr),
+        ).copy()
 
     def get_internal_nodes(self) -> np.ndarray:
         """
@@ -688,24 +751,23 @@ class Grid(object):
         if self.dim == 0:
             return np.zeros(1)
 
-        def comb(n):
-            return np.fromiter(
-                itertools.chain.from_iterable(itertools.combinations(n, 2)), n.dtype
-            ).reshape((2, -1), order="F")
-
-        def diam(n):
-            return np.amax(
-                np.linalg.norm(self.nodes[:, n[0, :]] - self.nodes[:, n[1, :]], axis=0)
-            )
-
         if cn is None:
             cn = self.cell_nodes()
-        return np.array(
-            [
-                diam(comb(cn.indices[cn.indptr[c] : cn.indptr[c + 1]]))
-                for c in np.arange(self.num_cells)
-            ]
-        )
+        cn = cn.tocsc()
+        num_nodes = np.diff(cn.indptr)
+
+        # Maximum distance between pairs of nodes of the cells. Cells with the same
+        # number of nodes are treated together.
+        diams = np.zeros(self.num_cells)
+        for nn in np.unique(num_nodes):
+            cells = np.where(num_nodes == nn)[0]
+            nodes = cn.indices[cn.indptr[cells].reshape((-1, 1)) + np.arange(nn)]
+            first, second = np.triu_indices(nn, k=1)
+            dist = np.linalg.norm(
+                self.nodes[:, nodes[:, first]] - self.nodes[:, nodes[:, second]], axis=0
+            )
+            diams[cells] = np.amax(dist, axis=1)
+        return diams
 
     def cell_face_as_dense(self) -> np.ndarray:
         """
@@ -716,37 +778,44 @@ class Grid(object):
         that column refers to cell indices. The value -1 signifies a boundary.
         The normal vector of the face points from the first to the second row.
 
+        The array is computed on the first call, and stored for later calls, see
+        the class documentation. It is read-only.
+
         Returns:
             np.ndarray, 2 x num_faces: Array representation of face-cell
                 relations
         """
-        n = self.cell_faces.tocsr()
-        d = np.diff(n.indptr)
-        rows = matrix_compression.rldecode(np.arange(d.size), d)
-        # Increase the data by one to distinguish cell indices from boundary
-        # cells
-        data = n.indices + 1
-        cols = ((n.data + 1) / 2).astype("i")
-        neighs = sps.coo_matrix((data, (rows, cols))).todense()
-        # Subtract 1 to get back to real cell indices
-        neighs -= 1
-        neighs = neighs.transpose().A.astype("int")
-        # Finally, we need to switch order of rows to get normal vectors
-        # pointing from first to second row.
-        return neighs[::-1]
+        return self._connectivity("cell_face_as_dense", self._compute_cell_face_dense)
+
+    def _compute_cell_face_dense(self) -> np.ndarray:
+        n = self.cell_faces.tocoo()
+        neighs = -np.ones((2, self.num_faces), dtype=np.int)
+        # A face has sign -1 for the cell in the second row, and +1 for the cell in
+        # the first row, so that normal vectors point from the first to the second
+        # row.
+        neighs[(1 - n.data.astype(np.int)) // 2, n.row] = n.col
+        neighs.setflags(write=False)
+        return neighs
 
     def cell_connection_map(self) -> sps.csr_matrix:
         """
         Get a matrix representation of cell-cell connections, as defined by
         two cells sharing a face.
 
+        The map is computed on the first call, and stored for later calls, see
+        the class documentation. It should not be modified in place.
+
         Returns:
             scipy.sparse.csr_matrix, size num_cells * num_cells: Boolean
                 matrix, element (i,j) is true if cells i and j share a face.
                 The matrix is thus symmetric.
-                
+
         """
+        return self._connectivity(
+            "cell_connection_map", self._compute_cell_connection_map
+        )
 
+    def _compute_cell_connection_map(self) -> sps.csr_matrix:
         # Create a copy of the cell-face relation, so that we can modify it at
         # will
         cell_faces = self.cell_faces.copy()
@@ -800,6 +869,23 @@ class Grid(object):
         """
         return np.amin(self.nodes, axis=1), np.amax(self.nodes, axis=1)
 
+    def spatial_index(self) -> "pp.grids.spatial_index.SpatialIndex":
+        """ Get a spatial index of the cells, used for point location.
+
+        The index is constructed on the first call, and stored for later calls, see
+        the class documentation. It is constructed anew if the geometry of the grid
+        has been recomputed. The parts of the index are built when first needed.
+
+        Returns:
+            pp.grids.spatial_index.SpatialIndex: Spatial index of the cells.
+
+        """
+        return self._connectivity(
+            "spatial_index",
+            lambda: SpatialIndex(self),
+            is_valid=lambda index: index.is_valid(self),
+        )
+
     def closest_cell(self, p: np.ndarray, return_distance: bool = False) -> np.ndarray:
         """ For a set of points, find closest cell by cell center.
 
@@ -817,27 +903,59 @@ class Grid(object):
             np.ndarray of ints: For each point, index of the cell with center
                 closest to the point.
         """
-        p = np.atleast_2d(p)
-        if p.shape[0] < 3:
-            z = np.zeros((3 - p.shape[0], p.shape[1]))
-            p = np.vstack((p, z))
-
-        def min_dist(pts):
-            c = self.cell_centers
-            d = np.sum(np.power(c - pts, 2), axis=0)
-            min_id = np.argmin(d)
-            return min_id, np.sqrt(d[min_id])
-
-        ci = np.empty(p.shape[1], dtype=np.int)
-        di = np.empty(p.shape[1])
-        for i in range(p.shape[1]):
-            ci[i], di[i] = min_dist(p[:, i].reshape((3, -1)))
+        p = self._pad_points(p)
+        ci, di = self.spatial_index().closest_cell(p)
 
         if return_distance:
             return ci, di
         else:
             return ci
 
+    def locate_points(self, p: np.ndarray, tol: float = 1e-10) -> np.ndarray:
+        """ For a set of points, find the cells containing the points.
+
+        For dim < 3, no checks are made if the point is in the plane / line
+        of the grid. See SpatialIndex.locate_points() for further details.
+
+        Parameters:
+            p (np.ndarray, 3xn): Point coordinates. If p.shape[0] < 3,
+                additional points will be treated as zeros.
+            tol (float, optional): Tolerance, relative to the cell size, for points
+                on the boundary of a cell. Defaults to 1e-10.
+
+        Returns:
+            np.ndarray of ints: For each point, index of a cell containing the
+                point. The value -1 signifies that the point is outside the grid.
+
+        """
+        return self.spatial_index().locate_points(self._pad_points(p), tol)
+
+    def cells_within_radius(self, p: np.ndarray, radius: float) -> List[np.ndarray]:
+        """ For a set of points, find cells with center within a given distance.
+
+        Parameters:
+            p (np.ndarray, 3xn): Point coordinates. If p.shape[0] < 3,
+                additional points will be treated as zeros.
+            radius (float): Search radius.
+
+        Returns:
+            list of np.ndarray: For each point, indices of the cells with center
+                within the radius.
+
+        """
+        return self.spatial_index().cells_within_radius(self._pad_points(p), radius)
+
+    @staticmethod
+    def _pad_points(p: np.ndarray) -> np.ndarray:
+        # A 1d array is a single point
+        p = np.asarray(p)
+        if p.ndim == 1:
+            p = p.reshape((-1, 1))
+        if p.shape[0] < 3:
+            z = np.zeros((3 - p.shape[0], p.shape[1]))
+            p = np.vstack((p, z))
+        return p
+
     def initiate_face_tags(self) -> None:
         keys = tags.standard_face_tags()
         values = [np.zeros(self.num_faces, dtype=bool) for _ in keys]
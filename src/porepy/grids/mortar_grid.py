@@ -39,8 +39,18 @@ class MortarGrid(object):
         name (list): Information on the formation of the grid, such as the
             constructor, computations of geometry etc.
 
+    The projection matrices, e.g. master_to_mortar_int() and mortar_to_slave_avg(),
+    are computed on first use and stored in the mortar grid, for each value of nd.
+    The returned matrices are shared between calls, and should not be modified in
+    place. The stored projections are discarded when the mappings are changed by
+    update_mortar(), update_slave() or update_master(), or when the mappings
+    between the master, slave and mortar grids are reassigned.
+
     """
 
+    # Attributes which, when reassigned, invalidate the stored projections
+    _mapping_attributes = ("_master_to_mortar_int", "_slave_to_mortar_int")
+
     def __init__(self, dim, side_grids, face_cells, name="", face_duplicate_ind=None):
         """Initialize the mortar grid
 
@@ -142,6 +152,17 @@ class MortarGrid(object):
         identity = [[sps.identity(num_cells)]] * self.num_sides()
         self._slave_to_mortar_int = sps.bmat(identity, format="csc")
 
+    def __setattr__(self, name, value):
+        if name in MortarGrid._mapping_attributes:
+            self.clear_projection_cache()
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        # The projections are recomputed on demand, there is no need to store them.
+        state = self.__dict__.copy()
+        state.pop("_projection_cache", None)
+        return state
+
     def __repr__(self):
         """
         Implementation of __repr__
@@ -299,6 +320,24 @@ class MortarGrid(object):
 
     ## Methods to construct projection matrices
 
+    def clear_projection_cache(self):
+        """ Discard the stored projection matrices, see class documentation.
+        """
+        self.__dict__.pop("_projection_cache", None)
+
+    def _projection(self, name, nd, compute):
+        """ Get a projection matrix, compute it if it is not stored.
+
+        The scalar projection is computed by compute(), and expanded to a vector
+        quantity if nd > 1. Both are stored.
+        """
+        cache = self.__dict__.setdefault("_projection_cache", {})
+        key = (name, nd)
+        if key not in cache:
+            scalar = compute() if nd == 1 else self._projection(name, 1, compute)
+            cache[key] = self._convert_to_vector_variable(scalar, nd)
+        return cache[key]
+
     def master_to_mortar_int(self, nd=1):
         """ Project values from faces of master to the mortar, by summing quantities
         from the master side.
@@ -318,7 +357,9 @@ class MortarGrid(object):
                 Size: g_master.num_faces x mortar_grid.num_cells.
 
         """
-        return self._convert_to_vector_variable(self._master_to_mortar_int, nd)
+        return self._projection(
+            "master_to_mortar_int", nd, lambda: self._master_to_mortar_int
+        )
 
     def slave_to_mortar_int(self, nd=1):
         """ Project values from cells on the slave side to the mortar, by
@@ -339,7 +380,9 @@ class MortarGrid(object):
                 Size: g_slave.num_cells x mortar_grid.num_cells.
 
         """
-        return self._convert_to_vector_variable(self._slave_to_mortar_int, nd)
+        return self._projection(
+            "slave_to_mortar_int", nd, lambda: self._slave_to_mortar_int
+        )
 
     def master_to_mortar_avg(self, nd=1):
         """ Project values from faces of master to the mortar, by averaging quantities
@@ -361,10 +404,11 @@ class MortarGrid(object):
                 Size: g_master.num_faces x mortar_grid.num_cells.
 
         """
-        row_sum = self._master_to_mortar_int.sum(axis=1).A.ravel()
-        return self._convert_to_vector_variable(
-            sps.diags(1.0 / row_sum) * self._master_to_mortar_int, nd
-        )
+        def compute():
+            row_sum = self._master_to_mortar_int.sum(axis=1).A.ravel()
+            return sps.diags(1.0 / row_sum) * self._master_to_mortar_int
+
+        return self._projection("master_to_mortar_avg", nd, compute)
 
     def slave_to_mortar_avg(self, nd=1):
         """ Project values from cells at the slave to the mortar, by averaging
@@ -386,10 +430,11 @@ class MortarGrid(object):
                 Size: g_slave.num_cells x mortar_grid.num_cells.
 
         """
-        row_sum = self._slave_to_mortar_int.sum(axis=1).A.ravel()
-        return self._convert_to_vector_variable(
-            sps.diags(1.0 / row_sum) * self._slave_to_mortar_int, nd
-        )
+        def compute():
+            row_sum = self._slave_to_mortar_int.sum(axis=1).A.ravel()
+            return sps.diags(1.0 / row_sum) * self._slave_to_mortar_int
+
+        return self._projection("slave_to_mortar_avg", nd, compute)
 
     # IMPLEMENTATION NOTE: The reverse projections, from mortar to master/slave are
     # found by taking transposes, and switching average and integration (since we are
@@ -414,7 +459,9 @@ class MortarGrid(object):
                 Size: mortar_grid.num_cells x g_master.num_faces.
 
         """
-        return self._convert_to_vector_variable(self.master_to_mortar_avg().T, nd)
+        return self._projection(
+            "mortar_to_master_int", nd, lambda: self.master_to_mortar_avg().T
+        )
 
     def mortar_to_slave_int(self, nd=1):
         """ Project values from the mortar to cells at the slave, by summing quantities
@@ -435,7 +482,9 @@ class MortarGrid(object):
                 Size: mortar_grid.num_cells x g_slave_num_faces.
 
         """
-        return self._convert_to_vector_variable(self.slave_to_mortar_avg().T, nd)
+        return self._projection(
+            "mortar_to_slave_int", nd, lambda: self.slave_to_mortar_avg().T
+        )
 
     def mortar_to_master_avg(self, nd=1):
         """ Project values from the mortar to faces of master, by averaging
@@ -457,7 +506,9 @@ class MortarGrid(object):
                 Size: mortar_grid.num_cells x g_master.num_faces.
 
         """
-        return self._convert_to_vector_variable(self.master_to_mortar_int().T, nd)
+        return self._projection(
+            "mortar_to_master_avg", nd, lambda: self.master_to_mortar_int().T
+        )
 
     def mortar_to_slave_avg(self, nd=1):
         """ Project values from the mortar to slave, by averaging quantities from the
@@ -479,7 +530,9 @@ class MortarGrid(object):
                 Size: mortar_grid.num_cells x g_slave.num_faces.
 
         """
-        return self._convert_to_vector_variable(self.slave_to_mortar_int().T, nd)
+        return self._projection(
+            "mortar_to_slave_avg", nd, lambda: self.slave_to_mortar_int().T
+        )
 
     def _convert_to_vector_variable(self, matrix, nd):
         """ Convert the scalar projection to a vector quantity. If the prescribed
@@ -0,0 +1,249 @@
+"""
+Spatial index of the cells of a grid, used for point location.
+
+The index is constructed, and stored, by Grid.spatial_index(); it is normally accessed
+through the methods Grid.closest_cell(), Grid.locate_points() and
+Grid.cells_within_radius().
+
+The index consists of two parts, both built on first use:
+    * A KD-tree of the cell centers, used for nearest cell and radius queries.
+    * A hierarchy of bounding spheres of the cells: The cells are grouped into levels
+      of similar size, and each level is represented by a KD-tree of the cell
+      centers, together with the maximum radius of the cells in the level. The
+      cells which may contain a point are found by radius queries in each level,
+      the candidates are then filtered with the bounding box of the cells, and
+      finally by an exact point-in-cell test. Grouping the cells by size prevents
+      a few large cells from increasing the number of candidates for all points.
+
+"""
+import weakref
+from typing import List, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import porepy as pp
+from porepy.utils import mcolon
+
+
+class SpatialIndex:
+    """ Spatial index of the cells of a grid, see module documentation.
+
+    The index refers to the geometry of the grid at the time of construction, and
+    should be constructed anew if the geometry changes; Grid.spatial_index() takes
+    care of this.
+
+    The index is stored in the grid, and holds only a weak reference to the grid,
+    so that the two do not form a reference cycle.
+
+    """
+
+    def __init__(self, g: "pp.Grid") -> None:
+        """
+        Parameters:
+            g (pp.Grid): Grid to be indexed. The geometry must be computed.
+
+        """
+        self._grid = weakref.ref(g)
+        # Arrays which define the index, used to check that it is up to date
+        self._geometry = _geometry(g)
+
+        self._center_tree = None
+        self._levels = None
+        self._radius = None
+        self._bounding_boxes = None
+
+    @property
+    def g(self) -> "pp.Grid":
+        """ pp.Grid: The indexed grid.
+        """
+        g = self._grid()
+        if g is None:
+            raise ValueError("The indexed grid no longer exists")
+        return g
+
+    def is_valid(self, g: "pp.Grid") -> bool:
+        """ Check if the index is up to date with the geometry of a grid.
+        """
+        return g is self._grid() and all(
+            a is b for a, b in zip(self._geometry, _geometry(g))
+        )
+
+    def closest_cell(self, p: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Find the cell with center closest to a set of points.
+
+        Parameters:
+            p (np.ndarray, 3 x n): Point coordinates.
+
+        Returns:
+            np.ndarray of ints, size n: Index of the closest cell.
+            np.ndarray, size n: Distance to the cell center.
+
+        """
+        dist, ci = self._centers().query(p.T)
+        return ci.astype(np.int), dist
+
+    def cells_within_radius(self, p: np.ndarray, radius: float) -> List[np.ndarray]:
+        """ Find cells with center within a given distance of a set of points.
+
+        Parameters:
+            p (np.ndarray, 3 x n): Point coordinates.
+            radius (float): Search radius.
+
+        Returns:
+            list of np.ndarray: For each point, sorted indices of the cells with
+                center within the radius.
+
+        """
+        ind = self._centers().query_ball_point(p.T, radius)
+        return [np.sort(np.array(i, dtype=np.int)) for i in ind]
+
+    def locate_points(self, p: np.ndarray, tol: float = 1e-10) -> np.ndarray:
+        """ Find the cells containing a set of points.
+
+        The point-in-cell test is exact for convex cells; for non-convex cells, the
+        points are tested against the half spaces defined by the faces of the cell.
+
+        For grids of dimension less than three, the distance from the points to the
+        plane (or line) of the cell is not considered.
+
+        Parameters:
+            p (np.ndarray, 3 x n): Point coordinates.
+            tol (float, optional): Tolerance, relative to the size of the cells,
+                for points on the boundary of a cell. Defaults to 1e-10.
+
+        Returns:
+            np.ndarray of ints, size n: Index of a cell containing the point. If the
+                point is on the boundary between cells, the lowest cell index is
+                returned. The value -1 signifies that the point is outside the
+                grid.
+
+        """
+        g = self.g
+        num_pts = p.shape[1]
+        cells = -np.ones(num_pts, dtype=np.int)
+        if num_pts == 0 or g.num_cells == 0:
+            return cells
+
+        if g.dim == 0:
+            # Point grids: The point must coincide with the cell center
+            ci, dist = self.closest_cell(p)
+            hit = dist <= tol * max(1, np.abs(g.cell_centers).max())
+            cells[hit] = ci[hit]
+            return cells
+
+        # Candidate cells, from the bounding spheres
+        pt_ind, cell_ind = self._candidates(p, tol)
+
+        # Filter by bounding boxes
+        bb_min, bb_max, scale = self._boxes()
+        eps = tol * scale[cell_ind]
+        inside = np.logical_and(
+            np.all(p[:, pt_ind] >= bb_min[:, cell_ind] - eps, axis=0),
+            np.all(p[:, pt_ind] <= bb_max[:, cell_ind] + eps, axis=0),
+        )
+        pt_ind, cell_ind = pt_ind[inside], cell_ind[inside]
+
+        # Exact test: The point should be on the inner side of all faces of the cell
+        inside = self._inside_cells(p, pt_ind, cell_ind, tol)
+        pt_ind, cell_ind = pt_ind[inside], cell_ind[inside]
+
+        # If several cells contain a point, use the one with the lowest index
+        order = np.lexsort((cell_ind, pt_ind))
+        pt_ind, cell_ind = pt_ind[order], cell_ind[order]
+        first = np.ones(pt_ind.size, dtype=np.bool)
+        first[1:] = pt_ind[1:] != pt_ind[:-1]
+        cells[pt_ind[first]] = cell_ind[first]
+        return cells
+
+    def _centers(self) -> cKDTree:
+        if self._center_tree is None:
+            self._center_tree = cKDTree(self.g.cell_centers.T)
+        return self._center_tree
+
+    def _boxes(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Bounding boxes of the cells, and a length scale of each cell
+        if self._bounding_boxes is None:
+            g = self.g
+            cn = g.cell_nodes().tocsc()
+            nodes = g.nodes[:, cn.indices]
+            start = cn.indptr[:-1]
+            bb_min = np.minimum.reduceat(nodes, start, axis=1)
+            bb_max = np.maximum.reduceat(nodes, start, axis=1)
+            scale = np.max(bb_max - bb_min, axis=0)
+            self._bounding_boxes = (bb_min, bb_max, scale)
+        return self._bounding_boxes
+
+    def _sphere_levels(self) -> List[Tuple[np.ndarray, cKDTree, float]]:
+        if self._levels is None:
+            g = self.g
+            cn = g.cell_nodes().tocsc()
+            cells = np.repeat(np.arange(g.num_cells), np.diff(cn.indptr))
+            dist = np.linalg.norm(
+                g.nodes[:, cn.indices] - g.cell_centers[:, cells], axis=0
+            )
+            # Radius of the bounding sphere, centered at the cell center
+            radius = np.maximum.reduceat(dist, cn.indptr[:-1])
+
+            # Group cells with radius within a factor two
+            r_min = max(radius.min(), 1e-12 * radius.max(), np.finfo(float).tiny)
+            level = np.floor(np.log2(np.maximum(radius, r_min) / r_min))
+            self._levels = []
+            for lev in np.unique(level):
+                ci = np.where(level == lev)[0]
+                tree = cKDTree(g.cell_centers[:, ci].T)
+                self._levels.append((ci, tree, radius[ci].max()))
+            self._radius = radius
+        return self._levels
+
+    def _candidates(self, p: np.ndarray, tol: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Pairs of point and cell indices, where the point is within the bounding
+        # sphere of the cell.
+        pt_ind = []
+        cell_ind = []
+        for ci, tree, r in self._sphere_levels():
+            found = tree.query_ball_point(p.T, r * (1 + tol))
+            num_found = np.array([len(f) for f in found], dtype=np.int)
+            if num_found.sum() == 0:
+                continue
+            pt_ind.append(np.repeat(np.arange(p.shape[1]), num_found))
+            cell_ind.append(ci[np.hstack([f for f in found if len(f) > 0])])
+        if len(pt_ind) == 0:
+            return np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int)
+        pt_ind = np.hstack(pt_ind).astype(np.int)
+        cell_ind = np.hstack(cell_ind).astype(np.int)
+
+        # Remove pairs outside the bounding sphere of the individual cells
+        dist = np.linalg.norm(p[:, pt_ind] - self.g.cell_centers[:, cell_ind], axis=0)
+        keep = dist <= self._radius[cell_ind] * (1 + tol)
+        return pt_ind[keep], cell_ind[keep]
+
+    def _inside_cells(
+        self, p: np.ndarray, pt_ind: np.ndarray, cell_ind: np.ndarray, tol: float
+    ) -> np.ndarray:
+        # For each pair of point and cell, check if the point is on the inner side
+        # of all the faces of the cell.
+        if pt_ind.size == 0:
+            return np.zeros(0, dtype=np.bool)
+        g = self.g
+        cf = g.cell_faces.tocsc()
+        num_faces = np.diff(cf.indptr)[cell_ind]
+
+        # Expand to one item per pair and face of the cell
+        ind = mcolon.mcolon(cf.indptr[cell_ind], cf.indptr[cell_ind + 1])
+        faces = cf.indices[ind]
+        sgn = cf.data[ind]
+        pts = np.repeat(pt_ind, num_faces)
+
+        normals = g.face_normals[:, faces] / g.face_areas[faces]
+        dist = sgn * np.sum((p[:, pts] - g.face_centers[:, faces]) * normals, axis=0)
+
+        _, _, scale = self._boxes()
+        start = np.hstack((0, np.cumsum(num_faces)[:-1]))
+        max_dist = np.maximum.reduceat(dist, start)
+        return max_dist <= tol * scale[cell_ind]
+
+
+def _geometry(g: "pp.Grid") -> Tuple:
+    attributes = ["nodes", "cell_centers", "face_centers", "face_normals"]
+    return tuple(getattr(g, attr, None) for attr in attributes)
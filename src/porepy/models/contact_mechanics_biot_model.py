@@ -14,8 +14,6 @@ import numpy as np
 import porepy as pp
 import logging
 import time
-import scipy.sparse as sps
-import scipy.sparse.linalg as spla
 
 import porepy.models.contact_mechanics_model as contact_model
 from porepy.utils.derived_discretizations import implicit_euler as IE_discretizations
@@ -48,6 +46,10 @@ class ContactMechanicsBiot(contact_model.ContactMechanics):
         # temperature. See assign_discretizations
         self.subtract_fracture_pressure = True
 
+        # The Biot model has used fewer restart cycles of the iterative linear
+        # solver than the contact mechanics model
+        self.gmres_maxiter = 10
+
     def bc_type_mechanics(self, g):
         # Use parent class method for mechanics
         return super().bc_type(g)
@@ -383,7 +385,31 @@ class ContactMechanicsBiot(contact_model.ContactMechanics):
             vector_variable=self.displacement_variable,
             scalar_variable=self.scalar_variable,
         )
-        biot.discretize(g, d)
+        cache = self.discretization_cache()
+        if cache is None:
+            biot.discretize(g, d)
+        else:
+            cache.discretize(biot, g, d)
+
+    def update_discretization_biot(self, cells):
+        """
+        Update the Biot discretization after the permeability or stiffness have
+        changed in some cells of the matrix grid, e.g. in damage or permeability
+        update models. Only the stencils affected by the changed cells are
+        recomputed; this is much cheaper than a new call to self.discretize_biot().
+
+        Parameters:
+            cells (np.ndarray): Index of the cells with changed parameters.
+        """
+        g = self._nd_grid()
+        d = self.gb.node_props(g)
+        biot = pp.Biot(
+            mechanics_keyword=self.mechanics_parameter_key,
+            flow_keyword=self.scalar_parameter_key,
+            vector_variable=self.displacement_variable,
+            scalar_variable=self.scalar_variable,
+        )
+        biot.update_discretization(g, d, cells)
 
     def initial_condition(self):
         """
@@ -416,7 +442,9 @@ class ContactMechanicsBiot(contact_model.ContactMechanics):
         """ Discretize all terms
         """
         if not hasattr(self, "assembler"):
-            self.assembler = pp.Assembler(self.gb)
+            self.assembler = pp.Assembler(
+                self.gb, discretization_cache=self.discretization_cache()
+            )
 
         g_max = self.gb.grids_of_dimension(self.Nd)[0]
 
@@ -448,7 +476,8 @@ class ContactMechanicsBiot(contact_model.ContactMechanics):
         """
         self.set_parameters()
         # The following is expensive, as it includes Biot. Consider making a custom  method
-        # discretizing only the term you need!
+        # discretizing only the term you need! If the parameters of the matrix grid
+        # are changed in a few cells, use self.update_discretization_biot().
         # self.discretize()
 
     def before_newton_iteration(self):
@@ -475,83 +504,3 @@ class ContactMechanicsBiot(contact_model.ContactMechanics):
 
     def after_newton_divergence(self):
         raise ValueError("Newton iterations did not converge")
-
-    def initialize_linear_solver(self):
-
-        solver = self.params.get("linear_solver", "direct")
-
-        if solver == "direct":
-            """ In theory, it should be possible to instruct SuperLU to reuse the
-            symbolic factorization from one iteration to the next. However, it seems
-            the scipy wrapper around SuperLU has not implemented the necessary
-            functionality, as discussed in
-
-                https://github.com/scipy/scipy/issues/8227
-
-            We will therefore pass here, and pay the price of long computation times.
-            """
-            self.linear_solver = "direct"
-
-        elif solver == "pyamg":
-            self.linear_solver = solver
-            import pyamg
-
-            assembler = self.assembler
-
-            A, _ = assembler.assemble_matrix_rhs()
-
-            g = self.gb.grids_of_dimension(self.Nd)[0]
-            mechanics_dof = assembler.dof_ind(g, self.displacement_variable)
-
-            pyamg_solver = pyamg.smoothed_aggregation_solver(
-                A[mechanics_dof][:, mechanics_dof]
-            )
-            self.mechanics_precond = pyamg_solver.aspreconditioner(cycle="W")
-
-        else:
-            raise ValueError("unknown linear solver " + solver)
-
-    def assemble_and_solve_linear_system(self, tol):
-
-        A, b = self.assembler.assemble_matrix_rhs()
-        logger.debug("Max element in A {0:.2e}".format(np.max(np.abs(A))))
-        logger.debug(
-            "Max {0:.2e} and min {1:.2e} A sum.".format(
-                np.max(np.sum(np.abs(A), axis=1)), np.min(np.sum(np.abs(A), axis=1))
-            )
-        )
-        if self.linear_solver == "direct":
-            return spla.spsolve(A, b)
-        elif self.linear_solver == "pyamg":
-            print("pyamg")
-            g = self.gb.grids_of_dimension(self.Nd)[0]
-            assembler = self.assembler
-            mechanics_dof = assembler.full_dof(g, self.displacement_variable)
-            mortar_dof = np.setdiff1d(np.arange(b.size), mechanics_dof)
-
-            A_el_m = A[mechanics_dof, :][:, mortar_dof]
-            A_m_el = A[mortar_dof, :][:, mechanics_dof]
-            A_m_m = A[mortar_dof, :][:, mortar_dof]
-
-            # Also create a factorization of the mortar variable.
-            # This is relatively cheap, so why not
-            A_m_m_solve = sps.linalg.factorized(A_m_m)
-
-            def precond_schur(r):
-                # Mortar residual
-                rm = r[mortar_dof]
-                # Residual for the elasticity is the local one, plus the mapping of the mortar residual
-                r_el = r[mechanics_dof] - A_el_m * A_m_m_solve(rm)
-                # Solve, using specified solver
-                du = self.mechanics_precond(r_el)
-                # Map back to mortar residual
-                dm = A_m_m_solve(rm - A_m_el * du)
-                x = np.zeros_like(r)
-                x[mechanics_dof] = du
-                x[mortar_dof] = dm
-                return x
-
-            M = sps.linalg.LinearOperator(A.shape, precond_schur)
-            x, info = sps.linalg.gmres(A, b, M=M, restart=100, maxiter=10, tol=tol)
-
-            return x
@@ -10,12 +10,12 @@ undergo major changes (or be deleted).
 
 """
 import numpy as np
-import scipy.sparse as sps
 import scipy.sparse.linalg as spla
 import logging
 import time
 
 import porepy as pp
+from porepy.numerics.linalg import block_preconditioners, direct_solvers
 import porepy.models.abstract_model
 
 # Module-wide logger
@@ -63,6 +63,9 @@ class ContactMechanics(porepy.models.abstract_model.AbstractModel):
         # Terms of the equations
         self.friction_coupling_term = "fracture_force_balance"
 
+        # Maximum number of restart cycles of the iterative linear solver
+        self.gmres_maxiter = 1000
+
         # Solver parameters
         if params is None:
             self.params = {}
@@ -434,13 +437,31 @@ class ContactMechanics(porepy.models.abstract_model.AbstractModel):
         """ Discretize all terms
         """
 
-        self.assembler = pp.Assembler(self.gb)
+        self.assembler = pp.Assembler(
+            self.gb, discretization_cache=self.discretization_cache()
+        )
 
         tic = time.time()
         logger.info("Discretize")
         self.assembler.discretize()
         logger.info("Done. Elapsed time {}".format(time.time() - tic))
 
+    def discretization_cache(self):
+        """ Cache for the discretization matrices, given by the parameter
+        discretization_cache, either as a pp.DiscretizationCache or as the name of
+        the cache folder. Useful for parameter sweeps, where the same grids are
+        discretized with the same parameters in many runs.
+
+        Returns:
+            pp.DiscretizationCache, or None if no cache is given.
+
+        """
+        cache = self.params.get("discretization_cache", None)
+        if isinstance(cache, str):
+            cache = pp.DiscretizationCache(cache)
+            self.params["discretization_cache"] = cache
+        return cache
+
     def before_newton_loop(self):
         """ Will be run before entering a Newton loop. Discretize time-dependent quantities etc.
         """
@@ -567,41 +588,45 @@ class ContactMechanics(porepy.models.abstract_model.AbstractModel):
         solver = self.params.get("linear_solver", "direct")
 
         if solver == "direct":
-            """ In theory, it should be possible to instruct SuperLU to reuse the
-            symbolic factorization from one iteration to the next. However, it seems
-            the scipy wrapper around SuperLU has not implemented the necessary
-            functionality, as discussed in
-
-                https://github.com/scipy/scipy/issues/8227
-
-            We will therefore pass here, and pay the price of long computation times.
-
+            """ The scipy wrapper around SuperLU does not expose the symbolic
+            factorization, see https://github.com/scipy/scipy/issues/8227. The direct
+            solvers in pp.numerics.linalg.direct_solvers instead keep the factorization
+            and the fill-reducing ordering between the solves, and refactorize only
+            when the matrix has changed. The backend is chosen by the parameter
+            direct_solver.
             """
             self.linear_solver = "direct"
-
-        elif solver == "pyamg":
-            self.linear_solver = solver
-            import pyamg
-
-            assembler = self.assembler
-
-            tic_assemble = time.time()
-            A, _ = assembler.assemble_matrix_rhs()
-            logger.info(
-                f"Done initial assembly. Elapsed time {time.time() - tic_assemble}:"
+            self.direct_solver = direct_solvers.create_direct_solver(
+                self.params.get("direct_solver", "superlu")
             )
 
-            g = self.gb.grids_of_dimension(self.Nd)[0]
-            mechanics_dof = assembler.dof_ind(g, self.displacement_variable)
-
-            tic_pyamg = time.time()
-            pyamg_solver = pyamg.smoothed_aggregation_solver(
-                A[mechanics_dof][:, mechanics_dof]
-            )
-            self.mechanics_precond = pyamg_solver.aspreconditioner(cycle="W")
-            logger.debug(
-                f"AMG solver initialized. Elapsed time: {time.time() - tic_pyamg}"
+        elif solver in ["pyamg", "gmres"]:
+            """ GMRES, preconditioned by a block preconditioner from
+            pp.numerics.linalg.block_preconditioners. The preconditioner can be given
+            by the parameter preconditioner. For pyamg, the default is used: All
+            variables but the displacement in the matrix are eliminated by a Schur
+            complement, using a direct solver, while the elasticity block is
+            approximated by AMG. The AMG hierarchy is recomputed after
+            preconditioner_max_reuse (default 10) updates of the matrix values.
+            """
+            self.linear_solver = "gmres"
+            self.dof_layout = block_preconditioners.DofLayout.from_assembler(
+                self.assembler
             )
+            if "preconditioner" in self.params:
+                self.preconditioner = self.params["preconditioner"]
+            elif solver == "pyamg":
+                amg = block_preconditioners.AMGBlockSolver(
+                    cycle="W", max_reuse=self.params.get("preconditioner_max_reuse", 10)
+                )
+                self.preconditioner = block_preconditioners.SchurComplement(
+                    first=self.dof_layout.complement(self.displacement_variable),
+                    second=self.displacement_variable,
+                    first_solver=block_preconditioners.DirectBlockSolver(),
+                    schur_solver=amg,
+                )
+            else:
+                raise ValueError("GMRES needs the parameter preconditioner")
 
         else:
             raise ValueError(f"Unknown linear solver {solver}")
@@ -611,39 +636,20 @@ class ContactMechanics(porepy.models.abstract_model.AbstractModel):
 
     def assemble_and_solve_linear_system(self, tol):
 
-        A, b = self.assembler.assemble_matrix_rhs()
+        # The sparsity pattern of the system matrix is usually the same for all
+        # iterations, thus only the values of the matrix are updated.
+        A, b = self.assembler.assemble_matrix_rhs(reuse_sparsity_pattern=True)
         logger.debug(f"Max element in A {np.max(np.abs(A)):.2e}")
         logger.debug(
             f"Max {np.max(np.sum(np.abs(A), axis=1)):.2e} and min {np.min(np.sum(np.abs(A), axis=1)):.2e} A sum."
         )
         if self.linear_solver == "direct":
-            return spla.spsolve(A, b)
-        elif self.linear_solver == "pyamg":
-            g = self.gb.grids_of_dimension(self.Nd)[0]
-            assembler = self.assembler
-            mechanics_dof = assembler.dof_ind(g, self.displacement_variable)
-            mortar_dof = np.setdiff1d(np.arange(b.size), mechanics_dof)
-
-            A_el_m = A[mechanics_dof, :][:, mortar_dof]
-            A_m_el = A[mortar_dof, :][:, mechanics_dof]
-            A_m_m = A[mortar_dof, :][:, mortar_dof]
-
-            # Also create a factorization of the mortar variable. This is relatively cheap, so why not
-            A_m_m_solve = sps.linalg.factorized(A_m_m)
-
-            def precond_schur(r):
-                # Mortar residual
-                rm = r[mortar_dof]
-                # Residual for the elasticity is the local one, plus the mapping of the mortar residual
-                r_el = r[mechanics_dof] - A_el_m * A_m_m_solve(rm)
-                # Solve, using specified solver
-                du = self.mechanics_precond(r_el)
-                # Map back to mortar residual
-                dm = A_m_m_solve(rm - A_m_el * du)
-                x = np.zeros_like(r)
-                x[mechanics_dof] = du
-                x[mortar_dof] = dm
-                return x
+            return self.direct_solver.solve(A, b)
+        elif self.linear_solver == "gmres":
+            # Only the blocks with modified values are set up anew
+            tic = time.time()
+            self.preconditioner.setup(A, self.dof_layout)
+            logger.debug(f"Preconditioner set up. Elapsed time {time.time() - tic}")
 
             residuals = []
 
@@ -653,9 +659,15 @@ class ContactMechanics(porepy.models.abstract_model.AbstractModel):
                 )
                 residuals.append(r)
 
-            M = sps.linalg.LinearOperator(A.shape, precond_schur)
+            M = self.preconditioner.as_linear_operator()
             sol, info = spla.gmres(
-                A, b, M=M, restart=100, maxiter=1000, tol=tol, callback=callback
+                A,
+                b,
+                M=M,
+                restart=100,
+                maxiter=self.gmres_maxiter,
+                tol=tol,
+                callback=callback,
             )
             logger.info(f"Completed a total of {len(residuals)} iterations.")
             return sol
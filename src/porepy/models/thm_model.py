@@ -425,7 +425,9 @@ class THM(parent_model.ContactMechanicsBiot):
         """ Discretize all terms
         """
         if not hasattr(self, "assembler"):
-            self.assembler = pp.Assembler(self.gb)
+            self.assembler = pp.Assembler(
+                self.gb, discretization_cache=self.discretization_cache()
+            )
 
         tic = time.time()
         logger.info("Discretize")
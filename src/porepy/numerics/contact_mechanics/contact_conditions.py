@@ -224,117 +224,28 @@ class ColoumbContact:
         # non-penetration to sliding.
         sliding_bc = np.logical_and(sliding_criterion, non_zero_tangential_traction)
 
-        # Structures for storing the computed coefficients.
-        displacement_weight = []  # Multiplies displacement jump
-        traction_weight = []  # Multiplies the normal forces
-        rhs = np.array([])  # Goes to the right hand side.
-
-        # Zero vectors of the size of the tangential space and the full space,
-        # respectively. These are needed to complement the discretization
-        # coefficients to be determined below.
-        zer = np.array([0] * (self.dim - 1))
-        zer1 = np.array([0] * (self.dim))
-        zer1[-1] = 1
-
-        # Loop over all mortar cells, discretize according to the current state of
-        # the contact
-        # The loop computes three parameters:
-        # L will eventually multiply the displacement jump, and be associated with
-        #   the coefficient in a Robin boundary condition (using the terminology of
-        #   the mpsa implementation)
-        # r is the right hand side term
-        # IS: Comment about the traction weight?
-
-        for i in range(num_cells):
-            if sliding_bc[i] & penetration_bc[i]:  # in contact and sliding
-                # This is Eq (31) in Berge et al, including the regularization
-                # described in (32) and onwards. The expressions are somewhat complex,
-                # and are therefore moved to subfunctions.
-                loc_displacement_tangential, r, v = self._sliding_coefficients(
-                    contact_force_tangential[:, i],
-                    displacement_jump_tangential[:, i],
-                    friction_bound[i],
-                    c_num_tangential[i],
-                )
-
-                # There is no interaction between displacement jumps in normal and
-                # tangential direction
-                L = np.hstack((loc_displacement_tangential, np.atleast_2d(zer).T))
-                loc_displacement_weight = np.vstack((L, zer1))
-                # Right hand side is computed from (24-25). In the normal
-                # direction, zero displacement is enforced.
-                # This assumes that the original distance, g, between the fracture
-                # walls is zero.
-                r = np.vstack((r + friction_bound[i] * v, 0))
-                # Unit contribution from tangential force
-                loc_traction_weight = np.eye(self.dim)
-                # Zero weight on normal force
-                loc_traction_weight[-1, -1] = 0
-                # Contribution from normal force
-                # NOTE: The sign is different from Berge (31); the paper is wrong
-                loc_traction_weight[:-1, -1] = -friction_coefficient[i] * v.ravel()
-
-            elif ~sliding_bc[i] & penetration_bc[i]:  # In contact and sticking
-                # Weight for contact force computed according to (30) in Berge.
-                # NOTE: There is a sign error in the paper, the coefficient for the
-                # normal contact force should have a minus in front of it
-                loc_traction_tangential = (
-                    -friction_coefficient[i]  # The minus sign is correct
-                    * displacement_jump_tangential[:, i].ravel("F")
-                    / friction_bound[i]
-                )
-                # Unit coefficient for all displacement jumps
-                loc_displacement_weight = np.eye(self.dim)
-
-                # Tangential traction dependent on normal one
-                loc_traction_weight = np.zeros((self.dim, self.dim))
-                loc_traction_weight[:-1, -1] = loc_traction_tangential
-
-                # The right hand side is the previous tangential jump, and zero
-                # in the normal direction.
-                r = np.hstack((displacement_jump_tangential[:, i], 0)).T
-
-            elif ~penetration_bc[i]:  # not in contact
-                # This is a free boundary, no conditions on displacement
-                loc_displacement_weight = np.zeros((self.dim, self.dim))
-
-                # Free boundary conditions on the forces.
-                loc_traction_weight = np.eye(self.dim)
-                r = np.zeros(self.dim)
-
-            else:  # should never happen
-                raise AssertionError("Should not get here")
-
-            # Depending on the state of the system, the weights in the tangential direction may
-            # become huge or tiny compared to the other equations. This will
-            # impede convergence of an iterative solver for the linearized
-            # system. As a partial remedy, rescale the condition to become
-            # closer to unity.
-            w_diag = np.diag(loc_displacement_weight) + np.diag(loc_traction_weight)
-            W_inv = np.diag(1 / w_diag)
-            loc_displacement_weight = W_inv.dot(loc_displacement_weight)
-            loc_traction_weight = W_inv.dot(loc_traction_weight)
-            r = r.ravel() / w_diag
-
-            # Append to the list of global coefficients.
-            displacement_weight.append(loc_displacement_weight)
-            traction_weight.append(loc_traction_weight)
-            rhs = np.hstack((rhs, r))
-
-        num_blocks = len(traction_weight)
-        data_traction = np.array(traction_weight).ravel(order="C")
-
-        data_displacement = np.array(displacement_weight).ravel(order="C")
+        displacement_weight, traction_weight, rhs = self._coefficients(
+            penetration_bc,
+            sliding_bc,
+            contact_force_tangential,
+            displacement_jump_tangential,
+            friction_bound,
+            friction_coefficient,
+            c_num_tangential,
+        )
+
+        data_traction = traction_weight.ravel(order="C")
+        data_displacement = displacement_weight.ravel(order="C")
 
         data_l[pp.DISCRETIZATION_MATRICES][self.keyword][
             self.traction_discretization
         ] = pp.utils.sparse_mat.csr_matrix_from_blocks(
-            data_traction, self.dim, num_blocks
+            data_traction, self.dim, num_cells
         )
         data_l[pp.DISCRETIZATION_MATRICES][self.keyword][
             self.displacement_discretization
         ] = pp.utils.sparse_mat.csr_matrix_from_blocks(
-            data_displacement, self.dim, num_blocks
+            data_displacement, self.dim, num_cells
         )
         data_l[pp.DISCRETIZATION_MATRICES][self.keyword][self.rhs_discretization] = rhs
 
@@ -356,6 +267,112 @@ class ColoumbContact:
 
         return traction_coefficient, displacement_coefficient, rhs
 
+    def _coefficients(
+        self,
+        penetration_bc,
+        sliding_bc,
+        contact_force_tangential,
+        displacement_jump_tangential,
+        friction_bound,
+        friction_coefficient,
+        c_num_tangential,
+    ):
+        """ Compute the coefficients of the linearized contact conditions for all
+        cells, according to the state of the contact.
+
+        Arguments:
+            penetration_bc (np.array of bool, num_cells): Cells in contact.
+            sliding_bc (np.array of bool, num_cells): Cells that are sliding.
+            contact_force_tangential (np.array, nd-1 x num_cells): Tangential forces.
+            displacement_jump_tangential (np.array, nd-1 x num_cells): Tangential
+                displacement jumps.
+            friction_bound (np.array, num_cells): Friction bound.
+            friction_coefficient (np.array, num_cells): Friction coefficient.
+            c_num_tangential (np.array, num_cells): Numerical parameter.
+
+        Returns:
+            np.array, num_cells x nd x nd: Weight of the displacement jump.
+            np.array, num_cells x nd x nd: Weight of the contact force.
+            np.array, num_cells * nd: Right hand side.
+
+        """
+        num_cells = friction_bound.size
+
+        # The coefficients are computed for all cells at once, according to the
+        # state of the contact. For each cell, the displacement weight (eventually
+        # multiplying the displacement jump, and associated with the coefficient in
+        # a Robin boundary condition using the terminology of the mpsa
+        # implementation) and the traction weight are dim x dim blocks, stacked
+        # along the first axis. The right hand side has dim elements per cell.
+        displacement_weight = np.zeros((num_cells, self.dim, self.dim))
+        traction_weight = np.zeros((num_cells, self.dim, self.dim))
+        rhs = np.zeros((num_cells, self.dim))
+
+        # Index of the tangential components
+        tang = np.arange(self.dim - 1)
+
+        # In contact and sliding
+        sliding = np.where(np.logical_and(sliding_bc, penetration_bc))[0]
+        # This is Eq (31) in Berge et al, including the regularization
+        # described in (32) and onwards. The expressions are somewhat complex,
+        # and are therefore moved to a subfunction.
+        loc_displacement_tangential, r, v = self._sliding_coefficients(
+            contact_force_tangential[:, sliding],
+            displacement_jump_tangential[:, sliding],
+            friction_bound[sliding],
+            c_num_tangential[sliding],
+        )
+        # There is no interaction between displacement jumps in normal and
+        # tangential direction
+        displacement_weight[sliding, :-1, :-1] = loc_displacement_tangential
+        displacement_weight[sliding, -1, -1] = 1
+        # Right hand side is computed from (24-25). In the normal
+        # direction, zero displacement is enforced.
+        # This assumes that the original distance, g, between the fracture
+        # walls is zero.
+        rhs[sliding, :-1] = r + friction_bound[sliding, np.newaxis] * v
+        # Unit contribution from tangential force, zero weight on normal force
+        traction_weight[sliding[:, np.newaxis], tang, tang] = 1
+        # Contribution from normal force
+        # NOTE: The sign is different from Berge (31); the paper is wrong
+        traction_weight[sliding, :-1, -1] = (
+            -friction_coefficient[sliding, np.newaxis] * v
+        )
+
+        # In contact and sticking
+        sticking = np.logical_and(np.logical_not(sliding_bc), penetration_bc)
+        # Weight for contact force computed according to (30) in Berge.
+        # NOTE: There is a sign error in the paper, the coefficient for the
+        # normal contact force should have a minus in front of it
+        traction_weight[sticking, :-1, -1] = (
+            -friction_coefficient[sticking]  # The minus sign is correct
+            * displacement_jump_tangential[:, sticking]
+            / friction_bound[sticking]
+        ).T
+        # Unit coefficient for all displacement jumps
+        displacement_weight[sticking] = np.eye(self.dim)
+        # The right hand side is the previous tangential jump, and zero
+        # in the normal direction.
+        rhs[sticking, :-1] = displacement_jump_tangential[:, sticking].T
+
+        # Not in contact. This is a free boundary, no conditions on displacement,
+        # and free boundary conditions on the forces.
+        traction_weight[np.logical_not(penetration_bc)] = np.eye(self.dim)
+
+        # Depending on the state of the system, the weights in the tangential direction may
+        # become huge or tiny compared to the other equations. This will
+        # impede convergence of an iterative solver for the linearized
+        # system. As a partial remedy, rescale the condition to become
+        # closer to unity.
+        w_diag = np.diagonal(displacement_weight, axis1=1, axis2=2) + np.diagonal(
+            traction_weight, axis1=1, axis2=2
+        )
+        displacement_weight /= w_diag[:, :, np.newaxis]
+        traction_weight /= w_diag[:, :, np.newaxis]
+        rhs = (rhs / w_diag).ravel(order="C")
+
+        return displacement_weight, traction_weight, rhs
+
     # Active and inactive boundary faces
     def _sliding(self, Tt, ut, bf, ct):
         """ Find faces where the frictional bound is exceeded, that is, the face is
@@ -405,86 +422,91 @@ class ColoumbContact:
     ## Below here are different help function for calculating the Newton step
     #####
 
-    def _e(self, Tt, cut, bf):
-        # Compute part of (32) in Berge et al.
-        return bf / self._l2(-Tt + cut)
-
-    def _Q(self, Tt, cut, bf):
-        # Implementation of the term Q involved in the calculation of (32) in Berge
-        # et al.
-        # This is the regularized Q
-        numerator = -Tt.dot((-Tt + cut).T)
-
-        # Regularization to avoid issues during the iterations to avoid dividing by
-        # zero if the faces are not in contact durign iterations.
-        denominator = max(bf, self._l2(-Tt)) * self._l2(-Tt + cut)
-
-        return numerator / denominator
-
-    def _M(self, Tt, cut, bf):
-        """ Compute the coefficient M used in Eq. (32) in Berge et al.
-        """
-        Id = np.eye(Tt.shape[0])
-        # M = e * (I - Q)
-        return self._e(Tt, cut, bf) * (Id - self._Q(Tt, cut, bf))
-
-    def _hf(self, Tt, cut, bf):
-        # This is the product e * Q * (-Tt + cut), used in computation of r in (32)
-        return self._e(Tt, cut, bf) * self._Q(Tt, cut, bf).dot(-Tt + cut)
-
     def _sliding_coefficients(self, Tt, ut, bf, c):
         """
         Compute the regularized versions of coefficients L, v and r, defined in
         Eq. (32) and section 3.2.1 in Berge et al.
 
+        The coefficients are computed for a set of mortar cells at once.
+
         Arguments:
-            Tt: Tangential forces. np array, two or three elements
+            Tt: Tangential forces. np array, (nd - 1) x num_cells.
             ut: Tangential displacement. Same size as Tt
-            bf: Friction bound for this mortar cell.
-            c: Numerical parameter
+            bf: Friction bound for the mortar cells, size num_cells.
+            c: Numerical parameter, size num_cells.
+
+        Returns:
+            np.array, num_cells x (nd - 1) x (nd - 1): The coefficient L for each
+                cell.
+            np.array, num_cells x (nd - 1): The coefficient r.
+            np.array, num_cells x (nd - 1): The coefficient v.
 
         """
-        if Tt.ndim <= 1:
-            Tt = np.atleast_2d(Tt).T
-            ut = np.atleast_2d(ut).T
+        # Work with cells along the first axis
+        Tt = np.atleast_2d(Tt.T)
+        ut = np.atleast_2d(ut.T)
+        num_cells, nd_t = Tt.shape
 
-        cut = c * ut
-        # Identity matrix
-        Id = np.eye(Tt.shape[0])
+        Id = np.eye(nd_t)
+
+        L = np.zeros((num_cells, nd_t, nd_t))
+        r = np.zeros((num_cells, nd_t))
+        v = np.zeros((num_cells, nd_t))
+
+        cut = c[:, np.newaxis] * ut
+        # The vector -Tt + cut, and its norm, appears in most of the terms below
+        diff = -Tt + cut
+        l2_diff = self._l2(diff.T)
 
         # Shortcut if the friction coefficient is effectively zero.
         # Numerical tolerance here is likely somewhat arbitrary.
-        if bf <= 1e-3:
-            return (
-                0 * Id,
-                bf * np.ones((Id.shape[0], 1)),
-                (-Tt + cut) / self._l2(-Tt + cut),
-            )
+        zero_friction = bf <= 1e-3
+        r[zero_friction] = bf[zero_friction, np.newaxis]
+        v[zero_friction] = diff[zero_friction] / l2_diff[zero_friction, np.newaxis]
 
-        # Compute the coefficient M
-        coeff_M = self._M(Tt, cut, bf)
+        # The remaining cells, with non-zero friction
+        fric = np.logical_not(zero_friction)
+        Tt, diff, l2_diff = Tt[fric], diff[fric], l2_diff[fric]
+        bf, c = bf[fric], c[fric]
+        l2_Tt = self._l2(Tt.T)
+
+        # Part of (32) in Berge et al.
+        e = bf / l2_diff
+
+        # Implementation of the term Q involved in the calculation of (32) in Berge
+        # et al. This is the regularized Q, the regularization is needed to avoid
+        # dividing by zero if the faces are not in contact durign iterations.
+        Q = -Tt[:, :, np.newaxis] * diff[:, np.newaxis, :]
+        Q /= (np.maximum(bf, l2_Tt) * l2_diff)[:, np.newaxis, np.newaxis]
+
+        # The coefficient M = e * (I - Q) used in Eq. (32) in Berge et al.
+        coeff_M = e[:, np.newaxis, np.newaxis] * (Id - Q)
 
         # Regularization during the iterations requires computations of parameters
         # alpha, beta, delta
-        alpha = -Tt.T.dot(-Tt + cut) / (self._l2(-Tt) * self._l2(-Tt + cut))
+        alpha = np.sum(-Tt * diff, axis=1) / (l2_Tt * l2_diff)
 
         # Parameter delta.
         # NOTE: The denominator bf is correct. The definition given in Berge is wrong.
-        delta = min(self._l2(-Tt) / bf, 1)
+        delta = np.minimum(l2_Tt / bf, 1)
 
-        if alpha < 0:
-            beta = 1 / (1 - alpha * delta)
-        else:
-            beta = 1
+        beta = np.ones(alpha.size)
+        neg_alpha = alpha < 0
+        beta[neg_alpha] = 1 / (1 - alpha[neg_alpha] * delta[neg_alpha])
 
         # The expression (I - beta * M)^-1
         # NOTE: In the definition of \tilde{L} in Berge, the inverse on the inner
         # paranthesis is missing.
-        IdM_inv = np.linalg.inv(Id - beta * coeff_M)
+        IdM_inv = np.linalg.inv(Id - beta[:, np.newaxis, np.newaxis] * coeff_M)
+
+        # This is the product e * Q * (-Tt + cut), used in computation of r in (32)
+        hf = e[:, np.newaxis] * np.einsum("ijk,ik->ij", Q, diff)
 
-        v = IdM_inv.dot(-Tt + cut) / self._l2(-Tt + cut)
+        L[fric] = c[:, np.newaxis, np.newaxis] * (IdM_inv - Id)
+        r[fric] = -np.einsum("ijk,ik->ij", IdM_inv, hf)
+        v[fric] = np.einsum("ijk,ik->ij", IdM_inv, diff) / l2_diff[:, np.newaxis]
 
-        return c * (IdM_inv - Id), -IdM_inv.dot(self._hf(Tt, cut, bf)), v
+        return L, r, v
 
     def _l2(self, x):
         x = np.atleast_2d(x)
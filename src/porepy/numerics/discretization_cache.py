@@ -0,0 +1,447 @@
+"""
+Persistent on-disk cache of discretization matrices.
+
+Discretizations such as Mpfa, Mpsa and Biot are expensive, and in parameter sweeps
+or calibration studies, the same grids are frequently discretized with the same
+parameters over and over again; only source terms and boundary values differ between
+the runs. The DiscretizationCache stores the matrices computed by a discretization on
+disk, with a key computed from
+    * the discretization class and its keywords,
+    * the topology and geometry of the grid,
+    * the parameters in data[pp.PARAMETERS] for the keywords of the discretization,
+      including the boundary condition types, but excluding parameters which are
+      known not to enter the discretization matrices, such as bc_values and source.
+When a discretization is requested with a key already in the cache, the matrices are
+read from disk and placed in data[pp.DISCRETIZATION_MATRICES], as if they were
+computed. By default, the matrices are stored uncompressed, and memory mapped when
+read back, so that a hit costs little more than hashing the input. Compressed storage
+is also available.
+
+The cache is bounded by a size budget; when exceeded, the least recently used entries
+are evicted. Entries are written to a temporary folder, which is renamed when
+complete, thus several processes can share a cache folder.
+
+The cache is used by passing it to the Assembler, which then routes the
+discretizations on the grids through the cache, or directly:
+    cache = pp.DiscretizationCache("discretization_cache", max_size=1e10)
+    cache.discretize(pp.Mpfa("flow"), g, data)
+
+Only discretizations whose output is fully determined by the grid and the parameters
+(and scalar entries in the data dictionary) can be cached; discretizations which
+depend on the state, such as contact conditions, can not. By default, the cache is
+limited to the finite volume discretizations Tpfa, Mpfa, Mpsa and Biot (including
+subclasses); other discretizations are computed as usual. The same holds if a
+parameter can not be hashed.
+
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sps
+
+import porepy as pp
+
+logger = logging.getLogger(__name__)
+
+# Version of the storage format, and of the computation of keys. Bump to invalidate
+# existing caches.
+_CACHE_VERSION = 2
+
+
+class _Unhashable(Exception):
+    pass
+
+
+class DiscretizationCache:
+    """ Persistent cache of discretization matrices, see module documentation.
+
+    Attributes:
+        folder (str): Folder where the cache is stored.
+        max_size (float): Size budget of the cache, in bytes.
+        compress (bool): Whether matrices are stored compressed.
+        discretizations (tuple of classes): Discretization classes to be cached.
+        ignore_parameters (set of str): Parameters that are not used in the cache
+            keys.
+        num_hits (int): Number of discretizations read from the cache.
+        num_misses (int): Number of discretizations computed and stored.
+
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        max_size: float = 1e10,
+        compress: bool = False,
+        ignore_parameters: Optional[List[str]] = None,
+        discretizations: Optional[Tuple[type, ...]] = None,
+    ) -> None:
+        """
+        Parameters:
+            folder (str): Folder where the cache is stored. Created if it does not
+                exist.
+            max_size (float, optional): Size budget of the cache, in bytes.
+                Defaults to 1e10.
+            compress (bool, optional): Whether to store the matrices compressed.
+                Compressed matrices can not be memory mapped, and are read into
+                memory on a hit. Defaults to False.
+            ignore_parameters (list of str, optional): Further parameters to be
+                ignored in the cache keys, in addition to bc_values and source, and
+                the bookkeeping of partial discretizations (active_cells,
+                active_faces). Only parameters that do not influence the
+                discretization matrices should be ignored.
+            discretizations (tuple of classes, optional): Discretization classes to
+                be cached. Defaults to Tpfa, Mpfa, Mpsa and Biot.
+
+        """
+        self.folder = folder
+        self.max_size = max_size
+        self.compress = compress
+        self.ignore_parameters = {
+            "bc_values",
+            "source",
+            "active_cells",
+            "active_faces",
+        }
+        if ignore_parameters is not None:
+            self.ignore_parameters.update(ignore_parameters)
+        if discretizations is None:
+            discretizations = (pp.Tpfa, pp.Mpfa, pp.Mpsa, pp.Biot)
+        self.discretizations = discretizations
+
+        self.num_hits = 0
+        self.num_misses = 0
+
+        os.makedirs(folder, exist_ok=True)
+
+    def __repr__(self) -> str:
+        s = (
+            f"Discretization cache in folder {self.folder}, with size budget "
+            f"{self.max_size:.2e} bytes.\n"
+            f"{self.num_hits} hits and {self.num_misses} misses."
+        )
+        return s
+
+    def discretize(self, discr, g: pp.Grid, data: Dict) -> None:
+        """ Discretize on a grid, using cached matrices if available.
+
+        Parameters:
+            discr: Discretization object, with a method discretize(g, data).
+            g (pp.Grid): Grid to be discretized.
+            data (dict): Data dictionary of the grid.
+
+        """
+        parameters = data.get(pp.PARAMETERS, {})
+        if not isinstance(discr, self.discretizations) or any(
+            parameters.get(kw, {}).get("update_discretization", False)
+            for kw in _keywords(discr)
+        ):
+            # Partial updates modify existing matrices, and are not cached, neither
+            # are discretizations not known to be determined by the parameters.
+            discr.discretize(g, data)
+            return
+
+        try:
+            key = self.key(discr, g, data)
+        except _Unhashable as e:
+            logger.debug(f"Discretization of {discr} is not cached: {e}")
+            discr.discretize(g, data)
+            return
+
+        entry = os.path.join(self.folder, key)
+        if os.path.isdir(entry):
+            try:
+                self._load(entry, data)
+            except (OSError, ValueError, KeyError) as e:
+                # A corrupt or incomplete entry. Discretize, and overwrite it.
+                logger.warning(f"Could not read cache entry {entry}: {e}")
+            else:
+                self.num_hits += 1
+                # Mark the entry as recently used
+                os.utime(entry)
+                return
+
+        self.num_misses += 1
+        # Keep references to the matrices before the discretization, to identify
+        # those computed by the discretization.
+        matrices_before = self._matrices(data)
+        discr.discretize(g, data)
+
+        # Store all matrices that are new or replaced by the discretization
+        matrices = [
+            (kw, name, mat)
+            for kw, mat_dict in data.get(pp.DISCRETIZATION_MATRICES, {}).items()
+            for name, mat in mat_dict.items()
+            if matrices_before.get((kw, name)) is not mat
+        ]
+        try:
+            self._store(entry, matrices)
+        except _Unhashable as e:
+            logger.debug(f"Discretization of {discr} is not cached: {e}")
+            return
+        self.evict()
+
+    def key(self, discr, g: pp.Grid, data: Dict) -> str:
+        """ Compute the cache key of a discretization.
+
+        Parameters:
+            discr: Discretization object.
+            g (pp.Grid): Grid to be discretized.
+            data (dict): Data dictionary of the grid.
+
+        Returns:
+            str: Hex digest identifying the discretization.
+
+        Raises:
+            _Unhashable: If the parameters contain objects which can not be hashed.
+
+        """
+        h = hashlib.sha256()
+        discr_type = type(discr)
+        h.update(
+            f"{_CACHE_VERSION} {discr_type.__module__}.{discr_type.__name__}".encode()
+        )
+
+        keywords = _keywords(discr)
+        h.update(repr(keywords).encode())
+
+        _hash_grid(h, g)
+
+        # Parameters of all keywords of the discretization
+        parameters = data.get(pp.PARAMETERS, {})
+        for kw in keywords:
+            param = parameters.get(kw, {})
+            h.update(f"parameters {kw}".encode())
+            for name in sorted(param.keys()):
+                if name in self.ignore_parameters:
+                    continue
+                h.update(name.encode())
+                _hash_object(h, param[name], set())
+
+        # Scalar options given directly in the data dictionary, such as
+        # deviation_from_plane_tol.
+        for name in sorted(k for k in data.keys() if isinstance(k, str)):
+            value = data[name]
+            if isinstance(value, (bool, int, float, str)):
+                h.update(f"{name} {value!r}".encode())
+
+        return h.hexdigest()
+
+    def size(self) -> int:
+        """ Total size of the cache, in bytes.
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self) -> None:
+        """ Remove the least recently used entries until the cache is within its
+        size budget.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self) -> None:
+        """ Remove all entries in the cache.
+        """
+        for path, _, _ in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        # Path, time of last use and size of all complete entries
+        entries = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+                )
+                entries.append((path, os.path.getmtime(path), size))
+            except OSError:
+                # The entry was removed by another process
+                continue
+        return entries
+
+    def _matrices(self, data: Dict) -> Dict[Tuple[str, str], Any]:
+        return {
+            (kw, name): mat
+            for kw, mat_dict in data.get(pp.DISCRETIZATION_MATRICES, {}).items()
+            for name, mat in mat_dict.items()
+        }
+
+    def _store(self, entry: str, matrices: List[Tuple[str, str, Any]]) -> None:
+        meta = []
+        tmp = tempfile.mkdtemp(prefix=".tmp_", dir=self.folder)
+        try:
+            for i, (kw, name, mat) in enumerate(matrices):
+                if sps.issparse(mat):
+                    fmt = mat.getformat()
+                    if fmt not in ["csr", "csc"]:
+                        mat = mat.tocsr()
+                        fmt = "csr"
+                    arrays = {
+                        "data": mat.data,
+                        "indices": mat.indices,
+                        "indptr": mat.indptr,
+                    }
+                    shape = list(mat.shape)
+                elif isinstance(mat, np.ndarray):
+                    fmt = "array"
+                    arrays = {"data": mat}
+                    shape = list(mat.shape)
+                else:
+                    raise _Unhashable(f"matrix {name} of type {type(mat)}")
+
+                if self.compress:
+                    np.savez_compressed(os.path.join(tmp, f"{i}.npz"), **arrays)
+                else:
+                    for array_name, array in arrays.items():
+                        np.save(os.path.join(tmp, f"{i}_{array_name}.npy"), array)
+                meta.append(
+                    {"keyword": kw, "name": name, "format": fmt, "shape": shape}
+                )
+
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"compress": self.compress, "matrices": meta}, f)
+
+            # Rename the complete entry. If another process stored the same entry in
+            # the meantime, keep that one.
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def _load(self, entry: str, data: Dict) -> None:
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+
+        matrices = []
+        for i, m in enumerate(meta["matrices"]):
+            if meta["compress"]:
+                with np.load(os.path.join(entry, f"{i}.npz")) as arrays:
+                    arrays = dict(arrays)
+            else:
+                # Copy-on-write memory maps: The matrices can be modified in memory
+                # without affecting the cache.
+                if m["format"] == "array":
+                    names = ["data"]
+                else:
+                    names = ["data", "indices", "indptr"]
+                arrays = {
+                    name: np.load(
+                        os.path.join(entry, f"{i}_{name}.npy"), mmap_mode="c"
+                    )
+                    for name in names
+                }
+
+            shape = tuple(m["shape"])
+            if m["format"] == "array":
+                mat = arrays["data"]
+            elif m["format"] == "csr":
+                mat = sps.csr_matrix(
+                    (arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape
+                )
+            else:
+                mat = sps.csc_matrix(
+                    (arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape
+                )
+            matrices.append((m["keyword"], m["name"], mat))
+
+        # Only modify the data dictionary when all matrices are read
+        matrix_dictionary = data.setdefault(pp.DISCRETIZATION_MATRICES, {})
+        for kw, name, mat in matrices:
+            matrix_dictionary.setdefault(kw, {})[name] = mat
+
+
+def _keywords(discr) -> List[str]:
+    """ Keywords used by a discretization to access parameters. These are given by
+    the attribute keyword, and attributes on the form *_keyword (e.g. the flow and
+    mechanics keywords of Biot).
+    """
+    keywords = []
+    for attr in sorted(vars(discr)):
+        value = getattr(discr, attr)
+        is_keyword = attr == "keyword" or attr.endswith("_keyword")
+        if is_keyword and isinstance(value, str) and len(value) > 0:
+            if value not in keywords:
+                keywords.append(value)
+    return keywords
+
+
+def _hash_grid(h, g: pp.Grid) -> None:
+    h.update(f"grid {type(g).__name__} {g.dim}".encode())
+    for attr in [
+        "nodes",
+        "face_nodes",
+        "cell_faces",
+        "face_centers",
+        "face_normals",
+        "face_areas",
+        "cell_centers",
+        "cell_volumes",
+    ]:
+        if hasattr(g, attr):
+            h.update(attr.encode())
+            _hash_object(h, getattr(g, attr), set())
+    _hash_object(h, g.tags, set())
+
+
+def _hash_object(h, obj: Any, visited: set) -> None:
+    """ Update a hash with the value of an object. Supports scalars, strings,
+    numpy arrays, sparse matrices, containers of these, and objects whose attributes
+    are of these types (such as boundary conditions and tensors).
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        h.update(f"{type(obj).__name__} {obj!r}".encode())
+    elif isinstance(obj, (np.ndarray, np.generic)):
+        arr = np.ascontiguousarray(obj)
+        if arr.dtype == object:
+            raise _Unhashable("numpy array of objects")
+        h.update(f"array {arr.dtype.str} {arr.shape}".encode())
+        h.update(arr.tobytes())
+    elif sps.issparse(obj):
+        mat = obj.tocsr()
+        mat.sort_indices()
+        h.update(f"sparse {mat.shape}".encode())
+        for arr in [mat.indptr, mat.indices, mat.data]:
+            _hash_object(h, arr, visited)
+    elif isinstance(obj, dict):
+        h.update(f"dict {len(obj)}".encode())
+        for k in sorted(obj.keys(), key=str):
+            h.update(str(k).encode())
+            _hash_object(h, obj[k], visited)
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__} {len(obj)}".encode())
+        for item in obj:
+            _hash_object(h, item, visited)
+    elif isinstance(obj, pp.Grid):
+        _hash_grid(h, obj)
+    elif isinstance(obj, (pp.SecondOrderTensor, pp.FourthOrderTensor)):
+        # Tensors are hashed by their cell-wise matrices, which do not depend on
+        # whether the tensor is stored compactly or has been expanded.
+        h.update(f"tensor {type(obj).__name__}".encode())
+        _hash_object(h, obj._matrices(), visited)
+    elif hasattr(obj, "__dict__") and not callable(obj):
+        # Objects such as boundary conditions and tensors are hashed by their
+        # attributes. Guard against cyclic references.
+        if id(obj) in visited:
+            raise _Unhashable("cyclic reference")
+        visited.add(id(obj))
+        h.update(f"object {type(obj).__module__}.{type(obj).__name__}".encode())
+        _hash_object(h, vars(obj), visited)
+        visited.discard(id(obj))
+    else:
+        raise _Unhashable(f"parameter of type {type(obj)}")
@@ -66,10 +66,6 @@ class RT0(pp.numerics.vem.dual_elliptic.DualElliptic):
         # Retrieve the permeability
         k = parameter_dictionary["second_order_tensor"]
 
-        faces, cells, sign = sps.find(g.cell_faces)
-        index = np.argsort(cells)
-        faces, sign = faces[index], sign[index]
-
         # Map the domain to a reference geometry (i.e. equivalent to compute
         # surface coordinates in 1d and 2d)
         deviation_from_plane_tol = data.get("deviation_from_plane_tol", 1e-5)
@@ -86,16 +82,6 @@ class RT0(pp.numerics.vem.dual_elliptic.DualElliptic):
                 k.values = np.delete(k.values, (remove_dim), axis=0)
                 k.values = np.delete(k.values, (remove_dim), axis=1)
 
-        # Allocate the data to store matrix entries, that's the most efficient
-        # way to create a sparse matrix.
-        size = np.power(g.dim + 1, 2) * g.num_cells
-        I = np.empty(size, dtype=np.int)
-        J = np.empty(size, dtype=np.int)
-        dataIJ = np.empty(size)
-        idx = 0
-
-        nodes, _, _ = sps.find(g.face_nodes)
-
         size_HB = g.dim * (g.dim + 1)
         HB = np.zeros((size_HB, size_HB))
         for it in np.arange(0, size_HB, g.dim):
@@ -103,35 +89,27 @@ class RT0(pp.numerics.vem.dual_elliptic.DualElliptic):
         HB += HB.T
         HB /= g.dim * g.dim * (g.dim + 1) * (g.dim + 2)
 
-        for c in np.arange(g.num_cells):
-            # For the current cell retrieve its faces
-            loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-            faces_loc = faces[loc]
-
+        # Compute the H_div-mass local matrices for groups of cells with the same
+        # number of faces
+        faces, local_mass = [], []
+        for cells, faces_loc, sign in self._cells_by_num_faces(g):
             # find the opposite node id for each face
-            node = RT0.opposite_side_node(g.face_nodes, nodes, faces_loc)
-            coord_loc = node_coords[:, node]
+            node = RT0._opposite_side_nodes(g, faces_loc)
+            coord_loc = node_coords[:, node].transpose((1, 0, 2))
 
-            # Compute the H_div-mass local matrix
-            A = RT0.massHdiv(
-                k.values[0 : g.dim, 0 : g.dim, c],
-                g.cell_volumes[c],
+            A = RT0._mass_hdiv_cells(
+                k.values[0 : g.dim, 0 : g.dim, cells].transpose((2, 0, 1)),
+                g.cell_volumes[cells],
                 coord_loc,
-                sign[loc],
+                sign,
                 g.dim,
                 HB,
             )
-
-            # Save values for Hdiv-mass local matrix in the global structure
-            cols = np.tile(faces_loc, (faces_loc.size, 1))
-            loc_idx = slice(idx, idx + cols.size)
-            I[loc_idx] = cols.T.ravel()
-            J[loc_idx] = cols.ravel()
-            dataIJ[loc_idx] = A.ravel()
-            idx += cols.size
+            faces.append(faces_loc)
+            local_mass.append(A)
 
         # Construct the global matrices
-        mass = sps.coo_matrix((dataIJ, (I, J)))
+        mass = self._assemble_local_matrices(g, faces, local_mass)
         div = -g.cell_faces.T
 
         matrix_dictionary["mass"] = mass
@@ -165,10 +143,6 @@ class RT0(pp.numerics.vem.dual_elliptic.DualElliptic):
         if g.dim == 0:
             return np.zeros(3).reshape((3, 1))
 
-        faces, cells, sign = sps.find(g.cell_faces)
-        index = np.argsort(cells)
-        faces, sign = faces[index], sign[index]
-
         # Map the domain to a reference geometry (i.e. equivalent to compute
         # surface coordinates in 1d and 2d)
         deviation_from_plane_tol = data.get("deviation_from_plane_tol", 1e-5)
@@ -176,30 +150,23 @@ class RT0(pp.numerics.vem.dual_elliptic.DualElliptic):
             g, deviation_from_plane_tol
         )
 
-        nodes, _, _ = sps.find(g.face_nodes)
-
         P0u = np.zeros((3, g.num_cells))
 
-        for c in np.arange(g.num_cells):
-            loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-            faces_loc = faces[loc]
-
+        for cells, faces_loc, _ in self._cells_by_num_faces(g):
             # find the opposite node id for each face
-            node = RT0.opposite_side_node(g.face_nodes, nodes, faces_loc)
+            node = RT0._opposite_side_nodes(g, faces_loc)
 
             # extract the coordinates
-            center = np.tile(c_centers[:, c], (node.size, 1)).T
-            delta_c = center - node_coords[:, node]
+            delta_c = c_centers[:, cells, np.newaxis] - node_coords[:, node]
             delta_f = f_centers[:, faces_loc] - node_coords[:, node]
             normals = f_normals[:, faces_loc]
 
-            Pi = delta_c / np.einsum("ij,ij->j", delta_f, normals)
+            Pi = delta_c / np.einsum("icf,icf->cf", delta_f, normals)
 
-            # extract the velocity for the current cell
-            P0u[dim, c] = np.dot(Pi, u[faces_loc])
-            P0u[:, c] = np.dot(R.T, P0u[:, c])
+            # extract the velocity for the cells
+            P0u[np.ix_(dim, cells)] = np.einsum("icf,cf->ic", Pi, u[faces_loc])
 
-        return P0u
+        return np.dot(R.T, P0u)
 
     @staticmethod
     def massHdiv(K, c_volume, coord, sign, dim, HB):
@@ -233,6 +200,67 @@ class RT0(pp.numerics.vem.dual_elliptic.DualElliptic):
 
         return np.dot(C.T, np.dot(N.T, np.dot(HB, np.dot(inv_K, np.dot(N, C)))))
 
+    @staticmethod
+    def _mass_hdiv_cells(K, c_volumes, coord, sign, dim, HB):
+        """ Compute the local mass Hdiv matrices for a set of cells, see massHdiv.
+
+        Parameters
+        ----------
+        K : ndarray (num_cells, g.dim, g.dim)
+            Permeability of the cells.
+        c_volumes : array (num_cells)
+            Cell volumes.
+        coord : ndarray (num_cells, g.dim, num_faces_of_cell)
+            Coordinates of the node opposite to each face of the cells.
+        sign : ndarray (num_cells, num_faces_of_cell)
+            +1 or -1 if the normal is inward or outward to the cell.
+
+        Return
+        ------
+        out: ndarray (num_cells, num_faces_of_cell, num_faces_of_cell)
+            Local mass Hdiv matrices.
+        """
+        # Allow short variable names in this function
+        # pylint: disable=invalid-name
+        inv_K = np.linalg.inv(K) / c_volumes.reshape((-1, 1, 1))
+
+        # N[c, a * dim + i, b] = coord[c, i, a] - coord[c, i, b]
+        coord = coord[:, 0:dim, :]
+        N = coord.transpose((0, 2, 1))[:, :, :, np.newaxis] - coord[:, np.newaxis]
+
+        # Apply the block diagonal inverse permeability, and then HB
+        shape = (K.shape[0], dim * (dim + 1), dim + 1)
+        inv_K_N = np.einsum("cij,cajb->caib", inv_K, N).reshape(shape)
+        N = N.reshape(shape)
+        A = np.matmul(N.transpose((0, 2, 1)), np.einsum("pq,cqb->cpb", HB, inv_K_N))
+
+        return sign[:, :, np.newaxis] * A * sign[:, np.newaxis, :]
+
+    @staticmethod
+    def _opposite_side_nodes(g, faces):
+        """
+        For the faces of a set of simplex cells, return the node on the opposite
+        side of each face, see opposite_side_node.
+
+        Each node of a simplex is shared by all faces but the opposite one, thus
+        the opposite node is found from sums of node indices.
+
+        Parameters:
+        ----------
+        g: grid, or a subclass, with simplex cells.
+        faces: ndarray (num_cells, num_faces_of_cell) face ids of the cells.
+
+        Return:
+        -------
+        opposite_node: ndarray (num_cells, num_faces_of_cell) id of the node at the
+            opposite side of each face
+
+        """
+        face_node_sum = g.face_nodes.T.astype(np.int) * np.arange(g.num_nodes)
+        loc_sum = face_node_sum[faces]
+        cell_node_sum = np.sum(loc_sum, axis=1) // g.dim
+        return cell_node_sum.reshape((-1, 1)) - loc_sum
+
     @staticmethod
     def opposite_side_node(face_nodes, nodes, faces_loc):
         """
@@ -266,6 +266,13 @@ class Biot(Mpsa):
                     options.
                 mpsa_eta, mpfa_eta (double): Location of continuity point in MPSA and MPFA.
                     Defaults to 1/3 for simplex grids, 0 otherwise.
+                max_memory (int): Threshold for the estimated peak memory of the
+                    mechanics discretization. If exceeded, the grid is split into
+                    partitions which are discretized separately. Defaults to 1e9.
+                num_workers (int): Number of processes used to discretize the
+                    partitions of the grid. Defaults to 1 (serial discretization).
+                    max_memory and num_workers are read from the mechanics
+                    parameters.
 
         The discretization is stored in the data dictionary, in the form of
         several matrices representing different coupling terms. For details,
@@ -342,6 +349,37 @@ class Biot(Mpsa):
 
         return A_biot
 
+    def update_discretization(self, g: pp.Grid, data: Dict, cells: np.ndarray) -> None:
+        """ Update an existing discretization after the constitutive laws have
+        changed in a set of cells.
+
+        The flow discretization is updated by Mpfa.update_discretization(), and the
+        mechanics and coupling terms by a partial MPSA discretization in the
+        interaction regions of the changed cells. The new face and cell rows are
+        inserted in the matrices stored in data[pp.DISCRETIZATION_MATRICES]. The
+        result equals that of a full discretization with the updated parameters.
+
+        Parameters:
+            g (pp.Grid): Grid, with geometry fields computed.
+            data (dict): Data dictionary, see self.discretize(). The parameters
+                should already be updated, and the matrix dictionaries should
+                contain a discretization of the grid.
+            cells (np.ndarray): Index of cells where the permeability or the
+                stiffness changed.
+
+        """
+        pp.Mpfa(self.flow_keyword).update_discretization(g, data, cells)
+        self._discretize_compr(g, data)
+
+        nodes = fvutils.nodes_for_parameter_update(g, cells)
+        self._discretize_specified_nodes(
+            g,
+            data,
+            data[pp.PARAMETERS][self.mechanics_keyword],
+            nodes,
+            self._discretize_mech,
+        )
+
     def _discretize_flow(self, g: pp.Grid, data: Dict) -> None:
 
         # Discretiztaion using MPFA
@@ -393,6 +431,7 @@ class Biot(Mpsa):
         alpha: float = parameter_dictionary["biot_alpha"]
 
         max_memory: int = parameter_dictionary.get("max_memory", 1e9)
+        num_workers: int = parameter_dictionary.get("num_workers", 1)
 
         # Whether to update an existing discretization, or construct a new one.
         # If True, either specified_cells, _faces or _nodes should also be given, or
@@ -437,27 +476,29 @@ class Biot(Mpsa):
         active_bound_displacement_face = sps.csr_matrix((nf * nd, nf * nd))
         active_bound_displacement_pressure = sps.csr_matrix((nf * nd, nc))
 
+        # Faces that have had their discretization computed
+        face_covered = np.zeros(nf, dtype=np.bool)
+
         # Loop over all partition regions, construct local problems, and transfer
-        # discretization to the entire active grid
+        # discretization to the entire active grid. The local problems may be
+        # discretized in parallel, but the results are transferred in serial.
         for (
             reg_i,
-            (sub_g, faces_in_subgrid, cells_in_subgrid, l2g_cells, l2g_faces),
-        ) in enumerate(self._subproblems(active_grid, max_memory)):
-
-            tic = time()
-            # Copy stiffness tensor, and restrict to local cells
-            loc_c: pp.FourthOrderTensor = self._constit_for_subgrid(
-                active_constit, l2g_cells
-            )
-
-            # Boundary conditions are slightly more complex. Find local faces
-            # that are on the global boundary.
-            # Then transfer boundary condition on those faces.
-            loc_bnd: pp.BoundaryConditionVectorial = self._bc_for_subgrid(
-                active_bound, sub_g, l2g_faces
+            ((faces_in_subgrid, cells_in_subgrid, l2g_cells, l2g_faces), loc_discr),
+        ) in enumerate(
+            fvutils.discretize_subproblems(
+                self._local_discretization,
+                self._local_subproblems(
+                    active_grid, active_constit, active_bound, max_memory
+                ),
+                num_workers,
+                alpha=alpha,
+                eta=eta,
+                inverter=inverter,
             )
+        ):
+            tic = time()
 
-            # Discretization of sub-problem
             (
                 loc_stress,
                 loc_bound_stress,
@@ -468,16 +509,20 @@ class Biot(Mpsa):
                 loc_bound_displacement_cell,
                 loc_bound_displacement_face,
                 loc_bound_displacement_pressure,
-            ) = self._local_discretization(
-                sub_g, loc_c, loc_bnd, alpha, eta=eta, inverter=inverter
-            )
+            ) = loc_discr
 
             # Eliminate contribution from faces already discretized (the dual grids /
             # interaction regions may be structured so that some faces have previously
-            # been partially discretized even if it has not been their turn until now)
+            # been partially discretized even if it has not been their turn until now).
+            # Faces on the border between partitions are fully discretized in both
+            # partitions; keep only the first of these.
             eliminate_face = np.where(
-                np.logical_not(np.in1d(l2g_faces, faces_in_subgrid))
+                np.logical_or(
+                    np.logical_not(np.in1d(l2g_faces, faces_in_subgrid)),
+                    face_covered[l2g_faces],
+                )
             )[0]
+            face_covered[faces_in_subgrid] = True
             self._remove_nonlocal_contribution(
                 eliminate_face,
                 g.dim,
@@ -600,31 +645,25 @@ class Biot(Mpsa):
             # The faces to be updated are given by active_faces
             update_face_ind = pp.fvutils.expand_indices_nd(active_faces, g.dim)
 
-            matrices_m[self.stress_matrix_key][update_face_ind] = stress[
-                update_face_ind
-            ]
-            matrices_m[self.bound_stress_matrix_key][update_face_ind] = bound_stress[
-                update_face_ind
-            ]
-            matrices_f[self.div_u_matrix_key][update_cell_ind] = div_u[update_cell_ind]
-            matrices_f[self.bound_div_u_matrix_key][update_cell_ind] = bound_div_u[
-                update_cell_ind
-            ]
-            matrices_m[self.grad_p_matrix_key][update_face_ind] = grad_p[
-                update_face_ind
-            ]
-            matrices_f[self.stabilization_matrix_key][update_cell_ind] = stabilization[
-                update_cell_ind
-            ]
-            matrices_m[self.bound_displacment_cell_matrix_key][
-                update_face_ind
-            ] = bound_displacement_cell[update_face_ind]
-            matrices_m[self.bound_displacment_face_matrix_key][
-                update_face_ind
-            ] = bound_displacement_face[update_face_ind]
-            matrices_m[self.bound_pressure_matrix_key][
-                update_face_ind
-            ] = bound_displacement_pressure[update_face_ind]
+            for key, mat in [
+                (self.stress_matrix_key, stress),
+                (self.bound_stress_matrix_key, bound_stress),
+                (self.grad_p_matrix_key, grad_p),
+                (self.bound_displacment_cell_matrix_key, bound_displacement_cell),
+                (self.bound_displacment_face_matrix_key, bound_displacement_face),
+                (self.bound_pressure_matrix_key, bound_displacement_pressure),
+            ]:
+                matrices_m[key] = fvutils.update_matrix_rows(
+                    matrices_m[key], mat, update_face_ind
+                )
+            for key, mat in [
+                (self.div_u_matrix_key, div_u),
+                (self.bound_div_u_matrix_key, bound_div_u),
+                (self.stabilization_matrix_key, stabilization),
+            ]:
+                matrices_f[key] = fvutils.update_matrix_rows(
+                    matrices_f[key], mat, update_cell_ind
+                )
         else:
             matrices_m[self.stress_matrix_key] = stress
             matrices_m[self.bound_stress_matrix_key] = bound_stress
@@ -2,14 +2,22 @@
 Various FV specific utility functions.
 """
 from __future__ import division
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 import numpy as np
 import scipy.sparse as sps
-from typing import Tuple
+from typing import Any, Callable, Deque, Generator, Iterable, Tuple
 
 import porepy as pp
-from porepy.utils import matrix_compression, mcolon
+from porepy.utils import matrix_compression, mcolon, sparse_mat
+from porepy.utils.parallel import process_pool_context
 from porepy.grids.grid_bucket import GridBucket
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 
 class SubcellTopology(object):
     """
@@ -254,17 +262,25 @@ def invert_diagonal_blocks(mat, s, method=None):
     """
     Invert block diagonal matrix.
 
-    Three implementations are available, either pure numpy, or a speedup using
-    numba or cython. If none is specified, the function will try to use numba,
-    then cython. The python option will only be invoked if explicitly asked
-    for; it will be very slow for general problems.
+    Several implementations are available: A pure python loop over the blocks, a
+    batched numpy version, a numba-accelerated loop (serial or parallel), and a
+    cython version. If none is specified, the function will try to use numba, and
+    fall back on the batched numpy version if numba is not available. The python
+    option will only be invoked if explicitly asked for; it will be very slow for
+    general problems.
+
+    The batched version groups the blocks according to their size, and inverts
+    each group by a single call to np.linalg.inv on a stacked array. The numba
+    kernels are compiled on first use, and cached on disk so that the compilation
+    is not repeated in later sessions.
 
     Parameters
     ----------
     mat: sps.csr matrix to be inverted.
     s: block size. Must be int64 for the numba acceleration to work
-    method: Choice of method. Either numba (default), cython or 'python'.
-        Defaults to None, in which case first numba, then cython is tried.
+    method: Choice of method. Either 'numba', 'numba_parallel', 'batched',
+        'cython' or 'python'. Defaults to None, in which case first numba, then
+        the batched version is tried.
 
     Returns
     -------
@@ -276,174 +292,310 @@ def invert_diagonal_blocks(mat, s, method=None):
         cython being available on the system.
 
     """
+    inv_vals = _invert_diagonal_block_values(mat, s, method)
+    ia = block_diag_matrix(inv_vals, s)
+    return ia
 
-    def invert_diagonal_blocks_python(a, sz):
-        """
-        Invert block diagonal matrix using pure python code.
 
-        The implementation is slow for large matrices, consider to use the
-        numba-accelerated method invert_invert_diagagonal_blocks_numba instead
+def invert_permuted_diagonal_blocks(mat, row_perm, col_perm, s, method=None):
+    """
+    Invert a matrix which is block diagonal after a permutation of rows and columns.
 
-        Parameters
-        ----------
-        A sps.crs-matrix, to be inverted
-        sz - size of the individual blocks
+    The matrix mat[row_perm][:, col_perm] should be block diagonal, with block
+    sizes given by s. The permutations are applied as index arrays, rather than as
+    products with permutation matrices, and the inverse is mapped back to the
+    original ordering by reindexing the block values. This avoids the construction
+    of the permutation matrices, and of intermediate permuted copies of the inverse.
 
-        Returns
-        -------
-        inv_a inverse matrix
-        """
-        v = np.zeros(np.sum(np.square(sz)))
-        p1 = 0
-        p2 = 0
-        for b in range(sz.size):
-            n = sz[b]
-            n2 = n * n
-            i = p1 + np.arange(n + 1)
-            # Picking out the sub-matrices here takes a lot of time.
-            v[p2 + np.arange(n2)] = np.linalg.inv(
-                a[i[0] : i[-1], i[0] : i[-1]].A
-            ).ravel()
-            p1 = p1 + n
-            p2 = p2 + n2
-        return v
-
-    def invert_diagonal_blocks_cython(a, size):
-        """ Invert block diagonal matrix using code wrapped with cython.
-        """
+    Parameters
+    ----------
+    mat: sps.csr matrix to be inverted.
+    row_perm: np.ndarray, row i of the block diagonal matrix is row row_perm[i] of
+        mat.
+    col_perm: np.ndarray, column j of the block diagonal matrix is column
+        col_perm[j] of mat.
+    s: block size.
+    method: Choice of block inverter, see invert_diagonal_blocks.
+
+    Returns
+    -------
+    sps.csr matrix: The inverse of mat, in the original ordering.
+
+    """
+    mat = mat.tocsr()
+    # Inverse of the column permutation, used to renumber the columns of mat
+    inv_col_perm = np.empty(col_perm.size, dtype=np.int64)
+    inv_col_perm[col_perm] = np.arange(col_perm.size)
+
+    # Permute rows by fancy indexing, and columns by renumbering the indices
+    blk = mat[row_perm]
+    blk = sps.csr_matrix(
+        (blk.data, inv_col_perm[blk.indices], blk.indptr), shape=blk.shape
+    )
+    inv_vals = _invert_diagonal_block_values(blk, s, method)
+    del blk
+
+    # The inverse of the block matrix maps from permuted rows to permuted columns.
+    # Row i of the block inverse is therefore row col_perm[i] of the inverse of mat,
+    # and column j of the block inverse is column row_perm[j].
+    num_rows_blk = matrix_compression.rldecode(s, s)
+    indptr = np.zeros(col_perm.size + 1, dtype=np.int64)
+    indptr[col_perm + 1] = num_rows_blk
+    indptr = np.cumsum(indptr)
+
+    # Start of the block inverse rows in inv_vals, and the first column in the
+    # block of each row.
+    row_starts_blk = np.hstack((0, np.cumsum(num_rows_blk[:-1])))
+    first_col_blk = matrix_compression.rldecode(np.hstack((0, np.cumsum(s[:-1]))), s)
+
+    # Order the rows of the block inverse according to their row in the inverse
+    row_order = inv_col_perm
+    data_ind = mcolon.mcolon(
+        row_starts_blk[row_order], row_starts_blk[row_order] + num_rows_blk[row_order]
+    )
+    col_ind = mcolon.mcolon(
+        first_col_blk[row_order], first_col_blk[row_order] + num_rows_blk[row_order]
+    )
+    return sps.csr_matrix(
+        (inv_vals[data_ind], row_perm[col_ind], indptr),
+        shape=(col_perm.size, row_perm.size),
+    )
+
+
+def _invert_diagonal_block_values(mat, s, method):
+    """ Invert a block diagonal matrix, and return the values of the inverse blocks
+    as a flat array, with the blocks stored row-wise. See invert_diagonal_blocks for
+    the available methods.
+    """
+    if method == "numba" or method == "numba_parallel" or method is None:
         try:
-            import porepy.numerics.fv.cythoninvert as cythoninvert
-        except:
-            raise ImportError(
-                """Compiled Cython module not available. Is cython installed?"""
+            inv_vals = _invert_diagonal_blocks_numba(
+                mat, s, parallel=method == "numba_parallel"
             )
+        except ImportError as e:
+            if method is not None:
+                raise e
+            # Numba is not available, fall back on the batched version
+            inv_vals = _invert_diagonal_blocks_batched(mat, s)
+    elif method == "batched":
+        inv_vals = _invert_diagonal_blocks_batched(mat, s)
+    elif method == "cython":
+        inv_vals = _invert_diagonal_blocks_cython(mat, s)
+    elif method == "python":
+        inv_vals = _invert_diagonal_blocks_python(mat, s)
+    else:
+        raise ValueError("Unknown block inverter " + str(method))
+    return inv_vals
 
-        a.sorted_indices()
-        ptr = a.indptr
-        indices = a.indices
-        dat = a.data
 
-        v = cythoninvert.inv_python(ptr, indices, dat, size)
-        return v
+def _invert_diagonal_blocks_python(a, sz):
+    """
+    Invert block diagonal matrix using pure python code.
 
-    def invert_diagonal_blocks_numba(a, size):
-        """
-        Invert block diagonal matrix by invoking numba acceleration of a simple
-        for-loop based algorithm.
+    The implementation is slow for large matrices, consider to use the
+    numba-accelerated method invert_invert_diagagonal_blocks_numba instead
 
-        This approach should be more efficient than the related method
-        invert_diagonal_blocks_python for larger problems.
+    Parameters
+    ----------
+    A sps.crs-matrix, to be inverted
+    sz - size of the individual blocks
 
-        Parameters
-        ----------
-        a : sps.csr matrix
-        size : Size of individual blocks
+    Returns
+    -------
+    inv_a inverse matrix
+    """
+    v = np.zeros(np.sum(np.square(sz)))
+    p1 = 0
+    p2 = 0
+    for b in range(sz.size):
+        n = sz[b]
+        n2 = n * n
+        i = p1 + np.arange(n + 1)
+        # Picking out the sub-matrices here takes a lot of time.
+        v[p2 + np.arange(n2)] = np.linalg.inv(
+            a[i[0] : i[-1], i[0] : i[-1]].A
+        ).ravel()
+        p1 = p1 + n
+        p2 = p2 + n2
+    return v
+
+
+def _invert_diagonal_blocks_batched(a, sz):
+    """
+    Invert block diagonal matrix by grouping blocks of equal size, and invert
+    each group with a single call to np.linalg.inv on a stacked array.
 
-        Returns
-        -------
-        ia: inverse of a
-        """
-        try:
-            import numba
-        except:
-            raise ImportError("Numba not available on the system")
-
-        # Sort matrix storage before pulling indices and data
-        a.sorted_indices()
-        ptr = a.indptr
-        indices = a.indices
-        dat = a.data
-
-        # Just in time compilation
-        @numba.jit("f8[:](i4[:],i4[:],f8[:],i8[:])", nopython=True, nogil=False)
-        def inv_python(indptr, ind, data, sz):
-            """
-            Invert block matrices by explicitly forming local matrices. The code
-            in itself is not efficient, but it is hopefully well suited for
-            speeding up with numba.
-
-            It may be possible to restruct the code to further help numba,
-            this has not been investigated.
-
-            The computation can easily be parallelized, consider this later.
-            """
-
-            # Index of where the rows start for each block.
-            # block_row_starts_ind = np.hstack((np.array([0]),
-            #                                   np.cumsum(sz[:-1])))
-            block_row_starts_ind = np.zeros(sz.size, dtype=np.int32)
-            block_row_starts_ind[1:] = np.cumsum(sz[:-1])
-
-            # Number of columns per row. Will change from one column to the
-            # next
-            num_cols_per_row = indptr[1:] - indptr[0:-1]
-            # Index to where the columns start for each row (NOT blocks)
-            # row_cols_start_ind = np.hstack((np.zeros(1),
-            #                                 np.cumsum(num_cols_per_row)))
-            row_cols_start_ind = np.zeros(num_cols_per_row.size + 1, dtype=np.int32)
-            row_cols_start_ind[1:] = np.cumsum(num_cols_per_row)
-
-            # Index to where the (full) data starts. Needed, since the
-            # inverse matrix will generally be full
-            # full_block_starts_ind = np.hstack((np.array([0]),
-            #                                    np.cumsum(np.square(sz))))
-            full_block_starts_ind = np.zeros(sz.size + 1, dtype=np.int32)
-            full_block_starts_ind[1:] = np.cumsum(np.square(sz))
-            # Structure to store the solution
-            inv_vals = np.zeros(np.sum(np.square(sz)))
-
-            # Loop over all blocks
-            for iter1 in range(sz.size):
-                n = sz[iter1]
-                loc_mat = np.zeros((n, n))
-                # Fill in non-zero elements in local matrix
-                for iter2 in range(n):  # Local rows
-                    global_row = block_row_starts_ind[iter1] + iter2
-                    data_counter = row_cols_start_ind[global_row]
-
-                    # Loop over local columns. Getting the number of columns
-                    #  for each row is a bit involved
-                    for _ in range(
-                        num_cols_per_row[iter2 + block_row_starts_ind[iter1]]
-                    ):
-                        loc_col = ind[data_counter] - block_row_starts_ind[iter1]
-                        loc_mat[iter2, loc_col] = data[data_counter]
-                        data_counter += 1
-
-                # Compute inverse. np.linalg.inv is supported by numba (May
-                # 2016), it is not clear if this is the best option. To be
-                # revised
-                inv_mat = np.ravel(np.linalg.inv(loc_mat))
-
-                loc_ind = np.arange(
-                    full_block_starts_ind[iter1], full_block_starts_ind[iter1 + 1]
-                )
-                inv_vals[loc_ind] = inv_mat
-                # Update fields
-            return inv_vals
+    Parameters
+    ----------
+    a : sps.csr matrix
+    sz : Size of individual blocks
 
-        v = inv_python(ptr, indices, dat, size)
-        return v
+    Returns
+    -------
+    ia: inverse of a, as a flat array of block values
+    """
+    a = a.tocsr(copy=True)
+    a.sum_duplicates()
 
-    # Variable to check if we have tried and failed with numba
-    try_cython = False
-    if method == "numba" or method is None:
-        try:
-            inv_vals = invert_diagonal_blocks_numba(mat, s)
-        except:
-            # This went wrong, fall back on cython
-            try_cython = True
-    # Variable to check if we should fall back on python
-    if method == "cython" or try_cython:
-        try:
-            inv_vals = invert_diagonal_blocks_cython(mat, s)
-        except ImportError as e:
-            raise e
-    elif method == "python":
-        inv_vals = invert_diagonal_blocks_python(mat, s)
+    # Start of the blocks in the row (and column) numbering, and in the array
+    # of values of the inverse matrix.
+    block_starts = np.hstack((0, np.cumsum(sz)))
+    full_block_starts = np.hstack((0, np.cumsum(np.square(sz))))
 
-    ia = block_diag_matrix(inv_vals, s)
-    return ia
+    # Block, and local row and column index, of all matrix elements
+    rows = matrix_compression.rldecode(np.arange(a.shape[0]), np.diff(a.indptr))
+    block = matrix_compression.rldecode(np.arange(sz.size), sz)[rows]
+    loc_rows = rows - block_starts[block]
+    loc_cols = a.indices - block_starts[block]
+    elem_size = sz[block]
+
+    inv_vals = np.zeros(full_block_starts[-1])
+
+    for n in np.unique(sz):
+        blocks_of_size = np.where(sz == n)[0]
+        # Index of the blocks in the stacked array
+        stack_ind = np.zeros(sz.size, dtype=np.int)
+        stack_ind[blocks_of_size] = np.arange(blocks_of_size.size)
+
+        elem = np.where(elem_size == n)[0]
+        stacked = np.zeros((blocks_of_size.size, n, n))
+        stacked[stack_ind[block[elem]], loc_rows[elem], loc_cols[elem]] = a.data[
+            elem
+        ]
+
+        # Blocks are stored row-wise in the inverse matrix
+        ind = full_block_starts[blocks_of_size].reshape((-1, 1)) + np.arange(n * n)
+        inv_vals[ind.ravel()] = np.linalg.inv(stacked).ravel()
+
+    return inv_vals
+
+
+def _invert_diagonal_blocks_cython(a, size):
+    """ Invert block diagonal matrix using code wrapped with cython.
+    """
+    try:
+        import porepy.numerics.fv.cythoninvert as cythoninvert
+    except:
+        raise ImportError(
+            """Compiled Cython module not available. Is cython installed?"""
+        )
+
+    a.sorted_indices()
+    ptr = a.indptr
+    indices = a.indices
+    dat = a.data
+
+    v = cythoninvert.inv_python(ptr, indices, dat, size)
+    return v
+
+
+def _invert_diagonal_blocks_numba(a, size, parallel=False):
+    """
+    Invert block diagonal matrix by invoking numba acceleration of a simple
+    for-loop based algorithm.
+
+    This approach should be more efficient than the related method
+    invert_diagonal_blocks_python for larger problems.
+
+    Parameters
+    ----------
+    a : sps.csr matrix
+    size : Size of individual blocks
+    parallel : If True, the loop over blocks is parallelized with numba.prange
+
+    Returns
+    -------
+    ia: inverse of a
+    """
+    if numba is None:
+        raise ImportError("Numba not available on the system")
+
+    size = size.astype(np.int64)
+    # Index of where the rows start for each block, and where the (full) data
+    # starts in the inverse matrix.
+    block_row_starts_ind = np.hstack((0, np.cumsum(size[:-1]))).astype(np.int64)
+    full_block_starts_ind = np.hstack((0, np.cumsum(np.square(size)))).astype(
+        np.int64
+    )
+
+    if parallel:
+        kernel = _invert_diagonal_blocks_numba_parallel
+    else:
+        kernel = _invert_diagonal_blocks_numba_serial
+
+    return kernel(
+        a.indptr,
+        a.indices,
+        a.data,
+        size,
+        block_row_starts_ind,
+        full_block_starts_ind,
+    )
+
+
+if numba is not None:
+    # The numba kernels are defined on module level, so that they are compiled only
+    # once per process, and can be cached on disk. The signatures are not given, so
+    # compilation is done at the first call.
+
+    @numba.njit(cache=True)
+    def _invert_block_numba(
+        indptr, ind, data, n, block_row_start, full_block_start, inv_vals
+    ):
+        """
+        Invert a single block by explicitly forming the local matrix, and store
+        the values in inv_vals.
+        """
+        loc_mat = np.zeros((n, n))
+        # Fill in non-zero elements in local matrix
+        for loc_row in range(n):
+            global_row = block_row_start + loc_row
+            for data_counter in range(indptr[global_row], indptr[global_row + 1]):
+                loc_col = ind[data_counter] - block_row_start
+                loc_mat[loc_row, loc_col] = data[data_counter]
+
+        inv_mat = np.ravel(np.linalg.inv(loc_mat))
+        for i in range(n * n):
+            inv_vals[full_block_start + i] = inv_mat[i]
+
+    @numba.njit(cache=True)
+    def _invert_diagonal_blocks_numba_serial(
+        indptr, ind, data, sz, block_row_starts_ind, full_block_starts_ind
+    ):
+        """ Invert all blocks, one after another.
+        """
+        inv_vals = np.zeros(full_block_starts_ind[-1])
+        for iter1 in range(sz.size):
+            _invert_block_numba(
+                indptr,
+                ind,
+                data,
+                sz[iter1],
+                block_row_starts_ind[iter1],
+                full_block_starts_ind[iter1],
+                inv_vals,
+            )
+        return inv_vals
+
+    @numba.njit(cache=True, parallel=True)
+    def _invert_diagonal_blocks_numba_parallel(
+        indptr, ind, data, sz, block_row_starts_ind, full_block_starts_ind
+    ):
+        """ Invert all blocks, using a parallel loop. The blocks are independent,
+        and write to separate parts of inv_vals.
+        """
+        inv_vals = np.zeros(full_block_starts_ind[-1])
+        for iter1 in numba.prange(sz.size):
+            _invert_block_numba(
+                indptr,
+                ind,
+                data,
+                sz[iter1],
+                block_row_starts_ind[iter1],
+                full_block_starts_ind[iter1],
+                inv_vals,
+            )
+        return inv_vals
 
 
 def block_diag_matrix(vals, sz):
@@ -1305,6 +1457,66 @@ def cell_ind_for_partial_update(
     return cell_ind.astype("int"), face_ind.astype("int")
 
 
+def nodes_for_parameter_update(g: pp.Grid, cells: np.ndarray) -> np.ndarray:
+    """ Obtain the nodes which define the stencil to be updated after a change of
+    parameters (e.g. permeability or stiffness) in a set of cells.
+
+    The sub-face discretizations in an interaction region depend on the parameters
+    of all cells sharing the node of the region. Changed parameters in a cell thus
+    change the discretization of all faces and cells that share a node with the
+    cell. To update the face and cell quantities exactly, the returned nodes are
+    those of all cells sharing a node with the specified cells. Used with the nodes
+    option of cell_ind_for_partial_update(), the active faces will then include all
+    faces with a modified discretization, and the subgrid will contain the full
+    interaction regions of these faces.
+
+    Parameters:
+        g (pp.Grid): Grid to be discretized.
+        cells (np.ndarray): Index of cells with changed parameters. Boolean masks
+            are also accepted.
+
+    Returns:
+        np.ndarray: Index of nodes, sorted, to be passed as specified_nodes.
+
+    """
+    cn = g.cell_nodes()
+
+    changed_cells = np.zeros(g.num_cells, dtype=np.bool)
+    changed_cells[cells] = True
+
+    # Nodes of the changed cells, cells sharing these nodes, and finally the nodes
+    # of these cells.
+    changed_nodes = (cn * changed_cells) > 0
+    affected_cells = (cn.transpose() * changed_nodes) > 0
+    return np.where((cn * affected_cells) > 0)[0]
+
+
+def update_matrix_rows(
+    mat: sps.spmatrix, new_mat: sps.spmatrix, rows: np.ndarray
+) -> sps.csr_matrix:
+    """ Replace rows of a discretization matrix with those of an updated matrix.
+
+    This is a faster alternative to mat[rows] = new_mat[rows], which for large
+    matrices is expensive in scipy.sparse. If mat is a csr matrix, it is modified in
+    place.
+
+    Parameters:
+        mat (sps.spmatrix): Matrix to be updated.
+        new_mat (sps.spmatrix): Matrix of the same shape as mat, with the updated
+            rows.
+        rows (np.ndarray): Index of rows to be replaced.
+
+    Returns:
+        sps.csr_matrix: The updated matrix.
+
+    """
+    mat = mat.tocsr()
+    rows = np.unique(rows)
+    if rows.size > 0:
+        sparse_mat.merge_matrices(mat, new_mat.tocsr()[rows], rows)
+    return mat
+
+
 def map_subgrid_to_grid(
     g: pp.Grid, loc_faces: np.ndarray, loc_cells: np.ndarray, is_vector: bool
 ) -> Tuple[np.ndarray, np.ndarray]:
@@ -1359,6 +1571,65 @@ def map_subgrid_to_grid(
     return face_map, cell_map
 
 
+def discretize_subproblems(
+    local_discr: Callable,
+    subproblems: Iterable[Tuple[Tuple, Any]],
+    num_workers: int = 1,
+    **kwargs
+) -> Generator[Tuple[Any, Any], None, None]:
+    """ Apply a local discretization to a sequence of subproblems, possibly in
+    parallel.
+
+    The subproblems are typically generated by splitting a grid into partitions to
+    limit the memory consumption of the discretization, see for instance
+    Mpsa._subproblems(). The local discretizations are independent, and can therefore
+    be computed in a pool of processes. The results are returned in the same order as
+    the subproblems, so that the caller can transfer them to the global matrices as
+    if the discretization had been done in serial.
+
+    To limit the memory consumption, at most num_workers subproblems are submitted
+    to the pool at any time. Note that the peak memory need will still be roughly
+    num_workers times that of a single subproblem.
+
+    Parameters:
+        local_discr (callable): Function that performs the local discretization. If
+            num_workers > 1, the function must be picklable, e.g. a bound method of a
+            discretization object.
+        subproblems (iterable): Each item is a tuple of (i) a tuple of positional
+            arguments to local_discr, and (ii) information on the subproblem which is
+            not needed by the local discretization, but passed on to the caller.
+        num_workers (int, optional): Number of processes used for the local
+            discretizations. If 1 (default) or less, the discretization is done in
+            serial in the calling process.
+        **kwargs: Keyword arguments passed to all calls to local_discr.
+
+    Yields:
+        Any: Information on the subproblem, as provided by subproblems.
+        Any: Return value of local_discr for this subproblem.
+
+    """
+    if num_workers is None or num_workers <= 1:
+        for args, info in subproblems:
+            yield info, local_discr(*args, **kwargs)
+        return
+
+    # Avoid plain fork, which may deadlock if threads have been started
+    context = process_pool_context()
+
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as executor:
+        pending: Deque[Tuple[Any, Future]] = deque()
+        for args, info in subproblems:
+            pending.append((info, executor.submit(local_discr, *args, **kwargs)))
+            # Wait for the oldest subproblem before submitting more work.
+            if len(pending) >= num_workers:
+                info, future = pending.popleft()
+                yield info, future.result()
+
+        while len(pending) > 0:
+            info, future = pending.popleft()
+            yield info, future.result()
+
+
 def compute_darcy_flux(
     gb,
     keyword="flow",
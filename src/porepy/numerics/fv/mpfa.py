@@ -64,7 +64,14 @@ class Mpfa(FVElliptic):
             reconstruction_eta: (float/np.ndarray) Optional. Range [0, 1]. Location of
                 pressure reconstruction point at faces. If not given, mpfa_eta is used.
             mpfa_inverter (str): Optional. Inverter to apply for local problems.
-                Can take values 'numba' (default), 'cython' or 'python'.
+                Can take values 'numba' (default), 'numba_parallel', 'batched',
+                'cython' or 'python'.
+            max_memory (double): Optional. Threshold for the estimated peak memory
+                of the discretization. If exceeded, the grid is split into
+                partitions that are discretized separately. Defaults to None, in
+                which case the full grid is discretized in one go.
+            num_workers (int): Optional. Number of processes used to discretize the
+                partitions of the grid, see max_memory. Defaults to 1.
 
         matrix_dictionary will be updated with the following entries:
             flux: sps.csc_matrix (g.num_faces, g.num_cells)
@@ -98,6 +105,8 @@ class Mpfa(FVElliptic):
         eta = parameter_dictionary.get("mpfa_eta", None)
         eta_reconstruction = parameter_dictionary.get("reconstruction_eta", None)
         inverter = parameter_dictionary.get("mpfa_inverter", None)
+        max_memory = parameter_dictionary.get("max_memory", None)
+        num_workers = parameter_dictionary.get("num_workers", 1)
 
         if not vector_source:
             trm, bound_flux, bp_cell, bp_face = self.mpfa(
@@ -109,6 +118,8 @@ class Mpfa(FVElliptic):
                 eta=eta,
                 eta_reconstruction=eta_reconstruction,
                 inverter=inverter,
+                max_memory=max_memory,
+                num_workers=num_workers,
             )
         else:
             trm, bound_flux, bp_cell, bp_face, div_vec_source = self.mpfa(
@@ -120,6 +131,8 @@ class Mpfa(FVElliptic):
                 eta=eta,
                 eta_reconstruction=eta_reconstruction,
                 inverter=inverter,
+                max_memory=max_memory,
+                num_workers=num_workers,
             )
 
             matrix_dictionary[self.div_vector_source_key] = div_vec_source
@@ -129,6 +142,82 @@ class Mpfa(FVElliptic):
         matrix_dictionary[self.bound_pressure_cell_matrix_key] = bp_cell
         matrix_dictionary[self.bound_pressure_face_matrix_key] = bp_face
 
+    def update_discretization(self, g, data, cells):
+        """ Update an existing discretization after the permeability has changed in
+        a set of cells.
+
+        Only the faces in the interaction regions of the changed cells are
+        rediscretized, and the new rows are inserted in the matrices stored in
+        data[pp.DISCRETIZATION_MATRICES][self.keyword]. The result equals that of a
+        full discretization with the updated permeability.
+
+        Contrary to partial_discr(), the boundary conditions (including Robin
+        conditions) and the remaining parameters are the same as in discretize().
+
+        Parameters:
+            g (pp.Grid): Grid, with geometry fields computed.
+            data (dict): Data dictionary, see discretize(). The permeability in the
+                parameter dictionary should already be updated, and the matrix
+                dictionary should contain a discretization of the grid.
+            cells (np.ndarray): Index of cells where the permeability changed.
+
+        """
+        deviation_from_plane_tol = data.get("deviation_from_plane_tol", 1e-5)
+
+        parameter_dictionary = data[pp.PARAMETERS][self.keyword]
+        matrix_dictionary = data[pp.DISCRETIZATION_MATRICES][self.keyword]
+        k = parameter_dictionary["second_order_tensor"]
+        bnd = parameter_dictionary["bc"]
+
+        vector_source = parameter_dictionary.get("mpfa_vector_source", False)
+
+        # Find the computational stencil. All faces with a changed discretization
+        # are active, and the subgrid contains their full interaction regions.
+        nodes = fvutils.nodes_for_parameter_update(g, cells)
+        loc_cells, active_faces = fvutils.cell_ind_for_partial_update(g, nodes=nodes)
+
+        sub_g, l2g_faces, _ = pp.partition.extract_subgrid(g, loc_cells)
+        l2g_cells = sub_g.parent_cell_ind
+
+        loc_k = k.restrict(l2g_cells)
+        loc_bnd = self._bc_for_subgrid(bnd, sub_g, l2g_faces)
+
+        loc_discr = self._local_discr(
+            sub_g,
+            loc_k,
+            loc_bnd,
+            deviation_from_plane_tol,
+            vector_source=vector_source,
+            eta=parameter_dictionary.get("mpfa_eta", fvutils.determine_eta(g)),
+            eta_reconstruction=parameter_dictionary.get("reconstruction_eta", None),
+            inverter=parameter_dictionary.get("mpfa_inverter", None),
+        )
+
+        keys = [
+            self.flux_matrix_key,
+            self.bound_flux_matrix_key,
+            self.bound_pressure_cell_matrix_key,
+            self.bound_pressure_face_matrix_key,
+        ]
+        col_maps = [l2g_cells, l2g_faces, l2g_cells, l2g_faces]
+        if vector_source:
+            keys.append(self.div_vector_source_key)
+            col_maps.append(fvutils.expand_indices_nd(l2g_cells, g.dim))
+
+        # Local rows of the active faces, and their global indices
+        keep_ind = np.where(np.in1d(l2g_faces, active_faces))[0]
+        rows = l2g_faces[keep_ind]
+
+        for key, loc_mat, col_map in zip(keys, loc_discr, col_maps):
+            loc_mat = loc_mat.tocsr()[keep_ind].tocoo()
+            glob_mat = sps.coo_matrix(
+                (loc_mat.data, (rows[loc_mat.row], col_map[loc_mat.col])),
+                shape=matrix_dictionary[key].shape,
+            )
+            matrix_dictionary[key] = fvutils.update_matrix_rows(
+                matrix_dictionary[key], glob_mat, rows
+            )
+
     def mpfa(
         self,
         g,
@@ -140,6 +229,7 @@ class Mpfa(FVElliptic):
         eta_reconstruction=None,
         inverter=None,
         max_memory=None,
+        num_workers=1,
         **kwargs
     ):
         """
@@ -174,11 +264,17 @@ class Mpfa(FVElliptic):
                 eta=0 will be enforced.
             eta_reconstruction Location of pressure reconstruction point on faces.
             inverter (string) Block inverter to be used, either numba (default),
-                cython or python. See fvutils.invert_diagonal_blocks for details.
+                numba_parallel, batched, cython or python. See
+                fvutils.invert_diagonal_blocks for details.
             max_memory (double): Threshold for peak memory during discretization.
                 If the **estimated** memory need is larger than the provided
-                threshold, the discretization will be split into an appropriate
-                number of sub-calculations, using mpfa_partial().
+                threshold, the grid will be split into an appropriate number of
+                partitions, which are discretized separately. The local
+                discretizations are then transferred to the global matrices.
+            num_workers (int): Number of processes used to discretize the
+                partitions of the grid, see max_memory. Defaults to 1, that is,
+                serial discretization. Note that the peak memory need scales with
+                the number of workers.
 
         Returns:
             scipy.sparse.csr_matrix (shape num_faces, num_cells): flux
@@ -229,9 +325,10 @@ class Mpfa(FVElliptic):
             bp = bp_cell * x + bp_face * bound_vals
         """
 
-        if max_memory is None:
+        if max_memory is None or g.dim < 2:
             # For the moment nothing to do here, just call main mpfa method for the
-            # entire grid.
+            # entire grid. In 0d and 1d, the discretization is cheap, and there is
+            # no need to partition the grid.
             # TODO: We may want to estimate the memory need, and give a warning if
             # this seems excessive
 
@@ -258,78 +355,46 @@ class Mpfa(FVElliptic):
                     inverter=inverter,
                 )
         else:
-            # Estimate number of partitions necessary based on prescribed memory
-            # usage
-            peak_mem = self._estimate_peak_memory(g)
-            num_part = np.ceil(peak_mem / max_memory)
-
-            # Let partitioning module apply the best available method
-            part = pp.partition.partition(g, num_part)
-
-            # Empty fields for flux and bound_flux. Will be expanded as we go.
-            # Implementation note: It should be relatively straightforward to
-            # estimate the memory need of flux (face_nodes -> node_cells ->
-            # unique).
-            flux = sps.csr_matrix(g.num_faces, g.num_cells)
-            bound_flux = sps.csr_matrix(g.num_faces, g.num_faces)
-            bound_pressure_cell = sps.csr_matrix(g.num_faces, g.num_cells)
-            bound_pressure_face = sps.csr_matrix(g.num_faces, g.num_faces)
-
-            cn = g.cell_nodes()
-
-            face_covered = np.zeros(g.num_faces, dtype=np.bool)
-
-            for p in range(part.max()):
-                # Cells in this partitioning
-                cell_ind = np.argwhere(part == p).ravel("F")
-                # To discretize with as little overlap as possible, we use the
-                # keyword nodes to specify the update stencil. Find nodes of the
-                # local cells.
-                active_cells = np.zeros(g.num_cells, dtype=np.bool)
-                active_cells[cell_ind] = 1
-                active_nodes = np.squeeze(np.where((cn * active_cells) > 0))
-
-                # Perform local discretization.
-                if not vector_source:
-                    loc_flux, loc_bound_flux, loc_bp_cell, loc_bp_face, loc_faces = self.partial_discr(
-                        g,
-                        k,
-                        bnd,
-                        deviation_from_plane_tol,
-                        vector_source=vector_source,
-                        eta=eta,
-                        eta_reconstruction=eta_reconstruction,
-                        inverter=inverter,
-                        nodes=active_nodes,
-                    )
-                else:
-                    div_vector_source = sps.csr_matrix(g.num_faces, g.num_cells * g.dim)
-                    loc_flux, loc_bound_flux, loc_bp_cell, loc_bp_face, loc_div_vector_source, loc_faces = self.partial_discr(
-                        g,
-                        k,
-                        bnd,
-                        deviation_from_plane_tol,
-                        vector_source=vector_source,
-                        eta=eta,
-                        eta_reconstruction=eta_reconstruction,
-                        inverter=inverter,
-                        nodes=active_nodes,
-                    )
-                    loc_div_vector_source[face_covered, :] *= 0
-                    div_vector_source += loc_div_vector_source
-
-                # Eliminate contribution from faces already covered
-                loc_flux[face_covered, :] *= 0
-                loc_bound_flux[face_covered, :] *= 0
-                loc_bp_cell[face_covered, :] *= 0
-                loc_bp_face[face_covered, :] *= 0
-
-                face_covered[loc_faces] = 1
-
-                flux += loc_flux
-                bound_flux += loc_bound_flux
-                bound_pressure_cell += loc_bp_cell
-                bound_pressure_face += loc_bp_face
+            # Split the grid into partitions, discretize these separately (possibly
+            # in parallel), and transfer the local discretizations to the global
+            # matrices.
+            if not vector_source:
+                (
+                    flux,
+                    bound_flux,
+                    bound_pressure_cell,
+                    bound_pressure_face,
+                ) = self._partitioned_discr(
+                    g,
+                    k,
+                    bnd,
+                    max_memory,
+                    num_workers,
+                    deviation_from_plane_tol=deviation_from_plane_tol,
+                    vector_source=vector_source,
+                    eta=eta,
+                    eta_reconstruction=eta_reconstruction,
+                    inverter=inverter,
+                )
+            else:
+                (
+                    flux,
+                    bound_flux,
+                    bound_pressure_cell,
+                    bound_pressure_face,
+                    div_vector_source,
+                ) = self._partitioned_discr(
+                    g,
+                    k,
+                    bnd,
+                    max_memory,
+                    num_workers,
+                    deviation_from_plane_tol=deviation_from_plane_tol,
+                    vector_source=vector_source,
+                    eta=eta,
+                    eta_reconstruction=eta_reconstruction,
+                    inverter=inverter,
+                )
 
         if not vector_source:
             return flux, bound_flux, bound_pressure_cell, bound_pressure_face
@@ -386,7 +451,8 @@ class Mpfa(FVElliptic):
                 eta=0 will be enforced.
             eta_reconstruction Location of pressure reconstruction point on faces.
             inverter (string) Block inverter to be used, either numba (default),
-                cython or python. See fvutils.invert_diagonal_blocks for details.
+                numba_parallel, batched, cython or python. See
+                fvutils.invert_diagonal_blocks for details.
             cells (np.array, int, optional): Index of cells on which to base the
                 subgrid computation. Defaults to None.
             faces (np.array, int, optional): Index of faces on which to base the
@@ -423,8 +489,7 @@ class Mpfa(FVElliptic):
 
         # Local parameter fields
         # Copy permeability field, and restrict to local cells
-        loc_k = k.copy()
-        loc_k.values = loc_k.values[::, ::, l2g_cells]
+        loc_k = k.restrict(l2g_cells)
 
         glob_bound_face = g.get_all_boundary_faces()
 
@@ -519,6 +584,164 @@ class Mpfa(FVElliptic):
                 active_faces,
             )
 
+    def _partitioned_discr(
+        self, g, k, bnd, max_memory, num_workers=1, vector_source=False, **kwargs
+    ):
+        """ Discretize a grid by splitting it into partitions, discretizing each
+        partition separately, and collecting the local discretizations.
+
+        The number of partitions is determined from the estimated memory need of the
+        discretization. Each partition is extended with an overlap of cells, so
+        that all faces that have all their nodes in the partition get a complete
+        discretization stencil. Faces on the border between partitions are
+        discretized more than once; only the first discretization is kept.
+
+        The local discretizations are collected as global row and column indices,
+        and the global matrices are constructed once all partitions are done.
+
+        Parameters:
+            g (pp.Grid): grid to be discretized
+            k (pp.Second_order_tensor): permeability tensor.
+            bnd (pp.BoundaryCondition): class for boundary values.
+            max_memory (double): Threshold for the estimated peak memory of each
+                local discretization.
+            num_workers (int, optional): Number of processes used for the local
+                discretizations. Defaults to 1.
+            vector_source (boolean, optional): Whether to discretize vector
+                sources. Defaults to False.
+            **kwargs: Passed on to _local_discr().
+
+        Returns:
+            Same as mpfa().
+
+        """
+        nf = g.num_faces
+        nc = g.num_cells
+
+        # Indices and values of the global matrices, collected partition by
+        # partition. The second index is the number of columns.
+        shapes = [(nf, nc), (nf, nf), (nf, nc), (nf, nf)]
+        if vector_source:
+            shapes.append((nf, nc * g.dim))
+        rows = [[] for _ in shapes]
+        cols = [[] for _ in shapes]
+        vals = [[] for _ in shapes]
+
+        # Faces that have had their discretization computed
+        face_covered = np.zeros(nf, dtype=np.bool)
+
+        for (active_faces, l2g_cells, l2g_faces), loc_discr in (
+            fvutils.discretize_subproblems(
+                self._local_discr,
+                self._subproblems(g, k, bnd, max_memory),
+                num_workers,
+                vector_source=vector_source,
+                **kwargs
+            )
+        ):
+            # Local faces to be transferred to the global matrices: Those that are
+            # active in this partition, and not discretized in a previous one.
+            keep = np.logical_and(
+                np.in1d(l2g_faces, active_faces),
+                np.logical_not(face_covered[l2g_faces]),
+            )
+            face_covered[l2g_faces[keep]] = True
+            keep_ind = np.where(keep)[0]
+
+            # Column maps for the cell and face based matrices, and for the vector
+            # sources.
+            col_maps = [l2g_cells, l2g_faces, l2g_cells, l2g_faces]
+            if vector_source:
+                col_maps.append(fvutils.expand_indices_nd(l2g_cells, g.dim))
+
+            for i, (loc_mat, col_map) in enumerate(zip(loc_discr, col_maps)):
+                loc_mat = loc_mat.tocsr()[keep_ind].tocoo()
+                rows[i].append(l2g_faces[keep_ind[loc_mat.row]])
+                cols[i].append(col_map[loc_mat.col])
+                vals[i].append(loc_mat.data)
+
+        return tuple(
+            sps.coo_matrix(
+                (np.hstack(vals[i]), (np.hstack(rows[i]), np.hstack(cols[i]))),
+                shape=shapes[i],
+            ).tocsr()
+            for i in range(len(shapes))
+        )
+
+    def _subproblems(self, g, k, bnd, max_memory):
+        """ Split the grid into partitions, and set up the local problems.
+
+        For each partition, the grid, permeability and boundary condition of the
+        local problem are yielded, together with information needed to transfer the
+        local discretization to the global grid, see
+        pp.fvutils.discretize_subproblems().
+
+        """
+        # Estimate number of partitions necessary based on prescribed memory
+        # usage
+        peak_mem = self._estimate_peak_memory(g)
+        num_part = np.ceil(peak_mem / max_memory).astype(np.int)
+
+        # Let partitioning module apply the best available method
+        part = pp.partition.partition(g, num_part)
+
+        cn = g.cell_nodes()
+
+        for p in np.unique(part):
+            # Cells in this partitioning
+            cell_ind = np.argwhere(part == p).ravel("F")
+            # To discretize with as little overlap as possible, we use the
+            # keyword nodes to specify the update stencil. Find nodes of the
+            # local cells.
+            active_cells = np.zeros(g.num_cells, dtype=np.bool)
+            active_cells[cell_ind] = 1
+            active_nodes = np.squeeze(np.where((cn * active_cells) > 0))
+
+            # Find computational stencil, based on the nodes in this partition
+            loc_cells, active_faces = fvutils.cell_ind_for_partial_update(
+                g, nodes=active_nodes
+            )
+
+            # Extract subgrid, together with mappings between local and global
+            # cells
+            sub_g, l2g_faces, _ = pp.partition.extract_subgrid(g, loc_cells)
+            l2g_cells = sub_g.parent_cell_ind
+
+            # Copy permeability field, and restrict to local cells
+            loc_k = k.restrict(l2g_cells)
+
+            loc_bnd = self._bc_for_subgrid(bnd, sub_g, l2g_faces)
+
+            yield (sub_g, loc_k, loc_bnd), (active_faces, l2g_cells, l2g_faces)
+
+    def _bc_for_subgrid(self, bc, sub_g, face_map):
+        """ Obtain a representation of a boundary condition for a subgrid of
+        the original grid.
+
+        Faces on the boundary of the subgrid that are not on the boundary of the
+        original grid are assigned Neumann conditions.
+
+        Parameters:
+            bc (pp.BoundaryCondition): Boundary condition on the original grid.
+            sub_g (pp.Grid): Grid for which the new condition applies. Is
+                assumed to be a subgrid of the grid to initialize this object.
+            face_map (np.ndarray): Index of faces of the original grid from
+                which the new conditions should be picked.
+
+        Returns:
+            BoundaryCondition: New bc object, aimed at a smaller grid.
+
+        """
+        sub_bc = pp.BoundaryCondition(sub_g)
+        sub_bc.is_dir = bc.is_dir[face_map]
+        sub_bc.is_rob = bc.is_rob[face_map]
+        sub_bc.is_neu[np.logical_or(sub_bc.is_dir, sub_bc.is_rob)] = False
+        sub_bc.is_internal = bc.is_internal[face_map]
+
+        sub_bc.robin_weight = bc.robin_weight[face_map]
+        sub_bc.basis = bc.basis[face_map]
+        return sub_bc
+
     def _local_discr(
         self,
         g,
@@ -884,26 +1107,21 @@ class Mpfa(FVElliptic):
         # implemented in SubcellTopology (which treats one cell at a time). For
         # efficient inversion (below), it is desirable to get the system over to a
         # block-diagonal structure, with one block centered around each vertex.
-        # Obtain the necessary mappings.
-        rows2blk_diag, cols2blk_diag, size_of_blocks = self._block_diagonal_structure(
+        # Obtain the necessary permutations.
+        row_perm, col_perm, size_of_blocks = self._block_diagonal_structure(
             sub_cell_index,
             cell_node_blocks,
             subcell_topology.nno_unique,
             bound_exclusion,
         )
 
-        # Re-organize system into a block-diagonal form
-        grad = rows2blk_diag * grad_eqs * cols2blk_diag
-
-        del grad_eqs
-        # Invert the system, and map back to the original form
-        igrad = (
-            cols2blk_diag
-            * fvutils.invert_diagonal_blocks(grad, size_of_blocks, method=inverter)
-            * rows2blk_diag
+        # Invert the system on block-diagonal form, and map back to the original
+        # ordering. The permutations are applied as index arrays.
+        igrad = fvutils.invert_permuted_diagonal_blocks(
+            grad_eqs, row_perm, col_perm, size_of_blocks, method=inverter
         )
 
-        del grad, cols2blk_diag, rows2blk_diag
+        del grad_eqs, row_perm, col_perm
 
         # Technical note: The elements in igrad are organized as follows:
         # The fields subcell_topology.cno and .nno will together identify Nd
@@ -1147,19 +1365,22 @@ class Mpfa(FVElliptic):
         Rough estimate of peak memory need
         """
         nd = g.dim
-        num_cell_nodes = g.cell_nodes().toarray().sum(axis=1)
+        # Number of cells sharing each node. Avoid converting the connectivity
+        # matrices to dense format, this would defeat the purpose of the estimate.
+        num_cell_nodes = g.cell_nodes().sum(axis=1).A.ravel()
 
         # Number of unknowns around a vertex: nd per cell that share the vertex for
         # pressure gradients, and one per cell (cell center pressure)
         num_grad_unknowns = nd * num_cell_nodes
 
         # The most expensive field is the storage of igrad, which is block diagonal
-        # with num_grad_unknowns sized blocks
-        igrad_size = num_grad_unknowns.sum()
+        # with num_grad_unknowns sized blocks. The number of elements is the square
+        # of the local system size.
+        igrad_size = np.power(num_grad_unknowns, 2).sum()
 
         # The discretization of Darcy's law will require nd (that is, a gradient)
         # per sub-face.
-        num_sub_face = g.face_nodes.toarray().sum()
+        num_sub_face = g.face_nodes.nnz
         darcy_size = nd * num_sub_face
 
         # Balancing of fluxes will require 2*nd (gradient on both sides) fields per
@@ -1178,7 +1399,7 @@ class Mpfa(FVElliptic):
     def _block_diagonal_structure(
         self, sub_cell_index, cell_node_blocks, nno, bound_exclusion
     ):
-        """ Define matrices to turn linear system into block-diagonal form
+        """ Define permutations to turn linear system into block-diagonal form
         Parameters
         ----------
         sub_cell_index
@@ -1188,8 +1409,10 @@ class Mpfa(FVElliptic):
         exclude_neumann mapping to remove rows associated with pressure boundary
         Returns
         -------
-        rows2blk_diag transform rows of linear system to block-diagonal form
-        cols2blk_diag transform columns of linear system to block-diagonal form
+        row_perm row i of the block-diagonal system is row row_perm[i] of the
+            linear system
+        col_perm column j of the block-diagonal system is column col_perm[j] of the
+            linear system
         size_of_blocks number of equations in each block
         """
 
@@ -1206,23 +1429,14 @@ class Mpfa(FVElliptic):
         sorted_nodes_rows = node_occ[sorted_ind]
         # Size of block systems
         size_of_blocks = np.bincount(sorted_nodes_rows.astype("int64"))
-        rows2blk_diag = sps.coo_matrix(
-            (np.ones(sorted_nodes_rows.size), (np.arange(sorted_ind.size), sorted_ind))
-        ).tocsr()
 
         # cell_node_blocks[1] contains the node numbers associated with each
         # sub-cell gradient (and so column of the local linear systems). A sort
         # of these will give a block-diagonal structure
         sorted_nodes_cols = np.argsort(cell_node_blocks[1])
         subcind_nodes = sub_cell_index[::, sorted_nodes_cols].ravel("F")
-        cols2blk_diag = sps.coo_matrix(
-            (
-                np.ones(sub_cell_index.size),
-                (subcind_nodes, np.arange(sub_cell_index.size)),
-            )
-        ).tocsr()
 
-        return rows2blk_diag, cols2blk_diag, size_of_blocks
+        return sorted_ind, subcind_nodes, size_of_blocks
 
     def _create_bound_rhs(
         self,
@@ -13,7 +13,7 @@ import scipy.sparse as sps
 import logging
 import porepy as pp
 from time import time
-from typing import Dict, Tuple, Any, Generator
+from typing import Any, Callable, Dict, Generator, Tuple
 
 
 # Module-wide logger
@@ -152,6 +152,13 @@ class Mpsa:
                 value. If a float is given this value is set to all subfaces, except the
                 boundary (where, 0 is used). If eta is a np.ndarray its size should
                 equal SubcellTopology(g).num_subfno.
+            max_memory: (int) Optional. Threshold for the estimated peak memory of the
+                discretization. If exceeded, the grid is split into partitions which
+                are discretized one by one. Defaults to 1e9.
+            num_workers: (int) Optional. Number of processes used to discretize the
+                partitions of the grid (see max_memory). Note that the peak memory
+                need scales with the number of workers. Defaults to 1, that is, the
+                partitions are discretized in serial.
 
         matrix_dictionary will be updated with the following entries:
             stress: sps.csc_matrix (g.dim * g.num_faces, g.dim * g.num_cells)
@@ -184,6 +191,7 @@ class Mpsa:
 
         inverter: str = parameter_dictionary.get("inverter", None)
         max_memory: int = parameter_dictionary.get("max_memory", 1e9)
+        num_workers: int = parameter_dictionary.get("num_workers", 1)
 
         # Whether to update an existing discretization, or construct a new one.
         # If True, either specified_cells, _faces or _nodes should also be given, or
@@ -224,41 +232,48 @@ class Mpsa:
         active_bound_displacement_cell = sps.csr_matrix((nf * nd, nc * nd))
         active_bound_displacement_face = sps.csr_matrix((nf * nd, nf * nd))
 
+        # Faces that have had their discretization computed
+        face_covered = np.zeros(nf, dtype=np.bool)
+
         # Loop over all partition regions, construct local problems, and transfer
-        # discretization to the entire active grid
-        for reg_i, (sub_g, faces_in_subgrid, _, l2g_cells, l2g_faces) in enumerate(
-            self._subproblems(active_grid, max_memory)
+        # discretization to the entire active grid. The local problems may be
+        # discretized in parallel, but the results are transferred in serial.
+        for (
+            reg_i,
+            ((faces_in_subgrid, _, l2g_cells, l2g_faces), loc_discr),
+        ) in enumerate(
+            pp.fvutils.discretize_subproblems(
+                self._stress_disrcetization,
+                self._local_subproblems(
+                    active_grid, active_constit, active_bound, max_memory
+                ),
+                num_workers,
+                eta=eta,
+                inverter=inverter,
+                hf_eta=hf_eta,
+            )
         ):
             tic = time()
 
-            # Copy stiffness tensor, and restrict to local cells
-            loc_c: pp.FourthOrderTensor = self._constit_for_subgrid(
-                active_constit, l2g_cells
-            )
-
-            # Boundary conditions are slightly more complex. Find local faces
-            # that are on the global boundary.
-            # Then transfer boundary condition on those faces.
-            loc_bnd: pp.BoundaryConditionVectorial = self._bc_for_subgrid(
-                active_bound, sub_g, l2g_faces
-            )
-
-            # Discretization of sub-problem
             (
                 loc_stress,
                 loc_bound_stress,
                 loc_bound_displacement_cell,
                 loc_bound_displacement_face,
-            ) = self._stress_disrcetization(
-                sub_g, loc_c, loc_bnd, eta=eta, inverter=inverter, hf_eta=hf_eta
-            )
+            ) = loc_discr
 
             # Eliminate contribution from faces already discretized (the dual grids /
             # interaction regions may be structured so that some faces have previously
-            # been partially discretized even if it has not been their turn until now)
+            # been partially discretized even if it has not been their turn until now).
+            # Faces on the border between partitions are fully discretized in both
+            # partitions; keep only the first of these.
             eliminate_face = np.where(
-                np.logical_not(np.in1d(l2g_faces, faces_in_subgrid))
+                np.logical_or(
+                    np.logical_not(np.in1d(l2g_faces, faces_in_subgrid)),
+                    face_covered[l2g_faces],
+                )
             )[0]
+            face_covered[faces_in_subgrid] = True
             self._remove_nonlocal_contribution(
                 eliminate_face,
                 g.dim,
@@ -315,18 +330,15 @@ class Mpsa:
 
         if update:
             update_ind = pp.fvutils.expand_indices_nd(active_faces, g.dim)
-            matrix_dictionary[self.stress_matrix_key][update_ind] = stress_glob[
-                update_ind
-            ]
-            matrix_dictionary[self.bound_stress_matrix_key][
-                update_ind
-            ] = bound_stress_glob[update_ind]
-            matrix_dictionary[self.bound_displacment_cell_matrix_key][
-                update_ind
-            ] = bound_displacement_cell_glob[update_ind]
-            matrix_dictionary[self.bound_displacment_face_matrix_key][
-                update_ind
-            ] = bound_displacement_face_glob[update_ind]
+            for key, mat in [
+                (self.stress_matrix_key, stress_glob),
+                (self.bound_stress_matrix_key, bound_stress_glob),
+                (self.bound_displacment_cell_matrix_key, bound_displacement_cell_glob),
+                (self.bound_displacment_face_matrix_key, bound_displacement_face_glob),
+            ]:
+                matrix_dictionary[key] = pp.fvutils.update_matrix_rows(
+                    matrix_dictionary[key], mat, update_ind
+                )
         else:
             matrix_dictionary[self.stress_matrix_key] = stress_glob
             matrix_dictionary[self.bound_stress_matrix_key] = bound_stress_glob
@@ -337,6 +349,61 @@ class Mpsa:
                 self.bound_displacment_face_matrix_key
             ] = bound_displacement_face_glob
 
+    def update_discretization(self, g: pp.Grid, data: Dict, cells: np.ndarray) -> None:
+        """ Update an existing discretization after the constitutive law has changed
+        in a set of cells.
+
+        Only the faces in the interaction regions of the changed cells are
+        rediscretized, and the new rows are inserted in the matrices stored in
+        data[pp.DISCRETIZATION_MATRICES][self.keyword]. The result equals that of a
+        full discretization with the updated parameters.
+
+        Parameters:
+            g (pp.Grid): Grid, with geometry fields computed.
+            data (dict): Data dictionary. The fourth order tensor in the parameter
+                dictionary should already be updated, and the matrix dictionary
+                should contain a discretization of the grid.
+            cells (np.ndarray): Index of cells where the constitutive law changed.
+
+        """
+        nodes = pp.fvutils.nodes_for_parameter_update(g, cells)
+        self._discretize_specified_nodes(
+            g, data, data[pp.PARAMETERS][self.keyword], nodes, self.discretize
+        )
+
+    def _discretize_specified_nodes(
+        self,
+        g: pp.Grid,
+        data: Dict,
+        parameter_dictionary: Dict[str, Any],
+        nodes: np.ndarray,
+        discretize: Callable[[pp.Grid, Dict], None],
+    ) -> None:
+        """ Update the discretization in the stencil of a set of nodes.
+
+        The parameters controlling partial discretization are temporarily set in
+        the parameter dictionary, and reset when the discretization is done.
+        """
+        partial_keys = [
+            "update_discretization",
+            "specified_cells",
+            "specified_faces",
+            "specified_nodes",
+        ]
+        stored = {
+            key: parameter_dictionary.pop(key)
+            for key in partial_keys
+            if key in parameter_dictionary
+        }
+        parameter_dictionary["update_discretization"] = True
+        parameter_dictionary["specified_nodes"] = nodes
+        try:
+            discretize(g, data)
+        finally:
+            for key in partial_keys:
+                parameter_dictionary.pop(key, None)
+            parameter_dictionary.update(stored)
+
     def assemble_matrix_rhs(
         self, g: pp.Grid, data: Dict
     ) -> Tuple[sps.spmatrix, np.ndarray]:
@@ -1132,6 +1199,42 @@ class Mpsa:
 
             yield sub_g, loc_faces, cells_in_partition, l2g_cells, l2g_faces
 
+    def _local_subproblems(
+        self,
+        active_grid: pp.Grid,
+        active_constit: pp.FourthOrderTensor,
+        active_bound: pp.BoundaryConditionVectorial,
+        max_memory: int,
+    ) -> Generator[Any, None, None]:
+        """ Set up the local problems defined by the partitioning in _subproblems().
+
+        For each partition, the grid, stiffness tensor and boundary condition of the
+        local problem are yielded, together with information needed to transfer the
+        local discretization to the active grid. The local problems contain all
+        information needed for the discretization, and can therefore be sent to
+        other processes, see pp.fvutils.discretize_subproblems().
+
+        """
+        for sub_g, faces_in_subgrid, cells_in_subgrid, l2g_cells, l2g_faces in (
+            self._subproblems(active_grid, max_memory)
+        ):
+            # Copy stiffness tensor, and restrict to local cells
+            loc_c: pp.FourthOrderTensor = self._constit_for_subgrid(
+                active_constit, l2g_cells
+            )
+
+            # Boundary conditions are slightly more complex. Find local faces
+            # that are on the global boundary.
+            # Then transfer boundary condition on those faces.
+            loc_bnd: pp.BoundaryConditionVectorial = self._bc_for_subgrid(
+                active_bound, sub_g, l2g_faces
+            )
+
+            yield (
+                (sub_g, loc_c, loc_bnd),
+                (faces_in_subgrid, cells_in_subgrid, l2g_cells, l2g_faces),
+            )
+
     def _estimate_peak_memory_mpsa(self, g: pp.Grid) -> int:
         """ Rough estimate of peak memory need for mpsa discretization.
         """
@@ -1277,8 +1380,8 @@ class Mpsa:
         # We do not know how constit is used outside the discretization,
         # so create deep copies to avoid overwriting. Not really sure if this is
         # necessary
-        csym = 0 * constit.copy().values
         casym = constit.copy().values
+        csym = np.zeros_like(casym)
 
         # The copy constructor for the stiffness matrix will represent all
         # dimensions as 3d. If dim==2, delete the redundant rows and columns
@@ -1480,17 +1583,14 @@ class Mpsa:
         nd: int,
         inverter: str,
     ) -> sps.spmatrix:
-        # Mappings to convert linear system to block diagonal form
-        rows2blk_diag, cols2blk_diag, size_of_blocks = self._block_diagonal_structure(
+        # Permutations to convert linear system to block diagonal form
+        row_perm, col_perm, size_of_blocks = self._block_diagonal_structure(
             sub_cell_index, cell_node_blocks, nno_unique, bound_exclusion, nd
         )
 
-        grad = rows2blk_diag * grad_eqs * cols2blk_diag
         # Compute inverse gradient operator, and map back again
-        igrad = (
-            cols2blk_diag
-            * pp.fvutils.invert_diagonal_blocks(grad, size_of_blocks, method=inverter)
-            * rows2blk_diag
+        igrad = pp.fvutils.invert_permuted_diagonal_blocks(
+            grad_eqs, row_perm, col_perm, size_of_blocks, method=inverter
         )
         logger.debug("max igrad: " + str(np.max(np.abs(igrad))))
         return igrad
@@ -1502,9 +1602,9 @@ class Mpsa:
         nno: np.ndarray,
         bound_exclusion: pp.fvutils.ExcludeBoundaries,
         nd: int,
-    ) -> Tuple[sps.spmatrix, sps.spmatrix, np.ndarray]:
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Define matrices to turn linear system into block-diagonal form.
+        Define permutations to turn linear system into block-diagonal form.
 
         Parameters
         ----------
@@ -1516,8 +1616,10 @@ class Mpsa:
 
         Returns
         -------
-        rows2blk_diag transform rows of linear system to block-diagonal form
-        cols2blk_diag transform columns of linear system to block-diagonal form
+        row_perm row i of the block-diagonal system is row row_perm[i] of the
+            linear system
+        col_perm column j of the block-diagonal system is column col_perm[j] of the
+            linear system
         size_of_blocks number of equations in each block
         """
 
@@ -1535,9 +1637,6 @@ class Mpsa:
         node_occ = np.hstack((nno_stress, nno_neu, nno_rob, nno_displacement))
 
         sorted_ind = np.argsort(node_occ, kind="mergesort")
-        rows2blk_diag = sps.coo_matrix(
-            (np.ones(sorted_ind.size), (np.arange(sorted_ind.size), sorted_ind))
-        ).tocsr()
         # Size of block systems
         sorted_nodes_rows = node_occ[sorted_ind]
         size_of_blocks = np.bincount(sorted_nodes_rows.astype("int64"))
@@ -1547,13 +1646,7 @@ class Mpsa:
         # of these will give a block-diagonal structure
         sorted_nodes_cols = np.argsort(cell_node_blocks[1], kind="mergesort")
         subcind_nodes = sub_cell_index[::, sorted_nodes_cols].ravel("F")
-        cols2blk_diag = sps.coo_matrix(
-            (
-                np.ones(sub_cell_index.size),
-                (subcind_nodes, np.arange(sub_cell_index.size)),
-            )
-        ).tocsr()
-        return rows2blk_diag, cols2blk_diag, size_of_blocks
+        return sorted_ind, subcind_nodes, size_of_blocks
 
     def _unique_hooks_law(
         self,
@@ -1900,11 +1993,7 @@ class Mpsa:
     def _constit_for_subgrid(
         self, constit: pp.FourthOrderTensor, loc_cells: np.ndarray
     ) -> pp.FourthOrderTensor:
-        # Copy stiffness tensor, and restrict to local cells
-        loc_c = constit.copy()
-        loc_c.values = loc_c.values[::, ::, loc_cells]
-        # Also restrict the lambda and mu fields; we will copy the stiffness
-        # tensors later.
-        loc_c.lmbda = loc_c.lmbda[loc_cells]
-        loc_c.mu = loc_c.mu[loc_cells]
-        return loc_c
+        # Copy stiffness tensor, and restrict to local cells. The restriction is
+        # done on the Lame parameters, thus the stiffness matrices are only formed
+        # for the local cells.
+        return constit.copy().restrict(loc_cells)
@@ -101,7 +101,7 @@ class Tpfa(FVElliptic):
         n = g.face_normals[:, fi]
         # Switch signs where relevant
         n *= sgn
-        perm = k.values[::, ::, ci]
+        perm = k.restrict(ci).values
 
         # Distance from face center to cell center
         fc_cc = g.face_centers[::, fi] - g.cell_centers[::, ci]
@@ -123,6 +123,10 @@ class Upwind:
         weighted with the face area, at each face.
         Note: if not specified the inflow boundary conditions are no-flow, while
         the outflow boundary conditions are open.
+        Note: the sparsity pattern of the matrix only depends on the grid, with
+        explicit zeros for faces without flux. If the data dictionary already
+        contains an upwind matrix of the grid, its data array is refilled in
+        place.
 
         The name of data in the input dictionary (data) are:
         darcy_flux : array (g.num_faces)
@@ -179,15 +183,18 @@ class Upwind:
 
         has_bc = not (bc is None or bc_val is None)
 
+        # The face-cell structure of the grid, and the sparsity pattern of the
+        # discretization matrix, are computed once and stored in the grid. Only
+        # the upwind directions are computed here.
+        topology = g._connectivity("upwind_topology", lambda: _UpwindTopology(g))
+        faces, cells = topology.faces, topology.cells
+
         # Compute the face flux respect to the real direction of the normals
-        indices = g.cell_faces.indices
-        flow_faces = g.cell_faces.copy()
-        flow_faces.data *= darcy_flux[indices]
+        flux = topology.sgn * darcy_flux[faces]
 
-        # Retrieve the faces boundary and their numeration in the flow_faces
-        # We need to impose no-flow for the inflow faces without boundary
-        # condition
-        mask = np.unique(indices, return_index=True)[1]
+        # Retrieve the faces boundary, their numeration in the flux is given by
+        # topology.first. We need to impose no-flow for the inflow faces without
+        # boundary condition
         bc_neu = g.get_all_boundary_faces()
 
         if has_bc:
@@ -198,28 +205,37 @@ class Upwind:
             is_dir = np.logical_and(bc.is_dir, np.logical_not(bc.is_internal))
             bc_dir = np.where(is_dir)[0]
             bc_neu = np.setdiff1d(bc_neu, bc_dir, assume_unique=True)
-            bc_dir = mask[bc_dir]
+            bc_dir = topology.first[bc_dir]
 
             # Remove Dirichlet inflow
-            inflow = flow_faces.copy()
+            inflow = flux.copy()
 
-            inflow.data[bc_dir] = inflow.data[bc_dir].clip(max=0)
-            flow_faces.data[bc_dir] = flow_faces.data[bc_dir].clip(min=0)
+            inflow[bc_dir] = inflow[bc_dir].clip(max=0)
+            flux[bc_dir] = flux[bc_dir].clip(min=0)
 
         # Remove all Neumann
-        bc_neu = mask[bc_neu]
-        flow_faces.data[bc_neu] = 0
-
-        # Determine the outflow faces
-        if_faces = flow_faces.copy()
-        if_faces.data = np.sign(if_faces.data)
-
-        # Compute the inflow/outflow related to the cells of the problem
-        flow_faces.data = flow_faces.data.clip(min=0)
+        flux[topology.first[bc_neu]] = 0
+
+        # Upwind weights of the pairs of face-cell relations: The flux out of the
+        # cell of the second relation (column), with the sign of the flux out of
+        # the cell of the first relation (row).
+        out_flux = flux.clip(min=0)
+        pair_flux = np.sign(flux[topology.pair_row]) * out_flux[topology.pair_col]
+        values = np.bincount(
+            topology.pair_ind, weights=pair_flux, minlength=topology.nnz
+        )
 
-        flow_cells = if_faces.transpose() * flow_faces
-        flow_cells.tocsr()
-        flow_cells = flow_cells.astype(np.float)
+        # On rediscretization, the data array of the stored matrix is refilled in
+        # place. Entries of faces without flux are kept as explicit zeros, so that
+        # the sparsity pattern does not change.
+        flow_cells = matrix_dictionary.get(self.matrix_keyword)
+        if topology.has_pattern(flow_cells):
+            flow_cells.data[:] = values
+        else:
+            flow_cells = sps.csr_matrix(
+                (values, topology.indices.copy(), topology.indptr.copy()),
+                shape=(g.num_cells, g.num_cells),
+            )
 
         # Store disrcetization matrix
         matrix_dictionary[self.matrix_keyword] = flow_cells
@@ -242,9 +258,10 @@ class Upwind:
                 is_neu = np.where(bc.is_neu)[0]
                 bc_val_neu[is_neu] = bc_val[is_neu]
 
-            matrix_dictionary[self.rhs_keyword] = (
-                -inflow.transpose() * bc_val_dir
-                - np.abs(g.cell_faces.transpose()) * bc_val_neu
+            face_rhs = inflow * bc_val_dir[faces]
+            face_rhs += np.abs(topology.sgn) * bc_val_neu[faces]
+            matrix_dictionary[self.rhs_keyword] = -np.bincount(
+                cells, weights=face_rhs, minlength=g.num_cells
             )
 
     def cfl(self, g, data, d_name="darcy_flux"):
@@ -390,3 +407,66 @@ class Upwind:
         if_outflow_cells.tocsr()
 
         return if_outflow_cells
+
+
+class _UpwindTopology:
+    """ Face-cell structure of a grid used by the upwind discretization.
+
+    The upwind matrix has an entry for each pair of face-cell relations (in
+    g.cell_faces) that share a face, with row and column given by the cells of the
+    first and second relation. The pairs, and the sparsity pattern of the matrix,
+    only depend on the grid, and are computed here once.
+
+    Attributes:
+        faces, cells, sgn (np.ndarray): Faces, cells and signs of the face-cell
+            relations, in the order of g.cell_faces.data.
+        first (np.ndarray): For each face, the index of its first face-cell
+            relation.
+        pair_row, pair_col (np.ndarray): For each pair, the indices of the two
+            face-cell relations.
+        pair_ind (np.ndarray): For each pair, the index of its entry in the data
+            of the matrix. Pairs with the same cells share an entry.
+        indices, indptr (np.ndarray): Sparsity pattern of the matrix, csr format.
+        nnz (int): Number of entries in the matrix.
+
+    """
+
+    def __init__(self, g):
+        cf = g.cell_faces.tocsc()
+        self.faces = cf.indices
+        self.cells = np.repeat(np.arange(g.num_cells), np.diff(cf.indptr))
+        self.sgn = cf.data.astype(np.float)
+
+        # Sort the relations by faces, and pair each relation with all relations
+        # of the same face (including itself)
+        order = np.argsort(self.faces, kind="stable")
+        num_per_face = np.bincount(self.faces, minlength=g.num_faces)
+        face_start = np.hstack((0, np.cumsum(num_per_face)[:-1]))
+        self.first = np.zeros(g.num_faces, dtype=np.int)
+        self.first[num_per_face > 0] = order[face_start[num_per_face > 0]]
+
+        num_pairs = num_per_face[self.faces[order]]
+        self.pair_row = np.repeat(order, num_pairs)
+        lo = face_start[self.faces[order]]
+        self.pair_col = order[pp.utils.mcolon.mcolon(lo, lo + num_pairs)]
+
+        # Sparsity pattern. Entries are sorted by row, then column
+        num_cells = g.num_cells
+        key = self.cells[self.pair_row] * num_cells + self.cells[self.pair_col]
+        unique_key, self.pair_ind = np.unique(key, return_inverse=True)
+        rows = unique_key // num_cells
+        self.indices = unique_key % num_cells
+        self.indptr = np.hstack(
+            (0, np.cumsum(np.bincount(rows, minlength=num_cells)))
+        )
+        self.nnz = unique_key.size
+
+    def has_pattern(self, mat):
+        # Check if mat is a csr matrix with the sparsity pattern of the upwind matrix
+        return (
+            sps.isspmatrix_csr(mat)
+            and mat.nnz == self.nnz
+            and mat.shape == (self.indptr.size - 1,) * 2
+            and np.array_equal(mat.indptr, self.indptr)
+            and np.array_equal(mat.indices, self.indices)
+        )
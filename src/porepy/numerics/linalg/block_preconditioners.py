@@ -0,0 +1,559 @@
+"""
+Block preconditioners for the linear systems of mixed-dimensional problems.
+
+The linear systems assembled by pp.Assembler have a block structure defined by the
+variables in the GridBucket (displacement, pressure, temperature, mortar variables,
+contact tractions etc.). The preconditioners in this module are defined in terms of
+this structure:
+    * DofLayout gives the degrees of freedom of each variable, as found by the
+      Assembler. The dofs of a variable on all grids (or edges) are treated as one
+      field.
+    * Block solvers (DirectBlockSolver, AMGBlockSolver, ILUBlockSolver) give
+      approximate inverses of a single block.
+    * Composite preconditioners (FieldSplit, SchurComplement) split the system
+      according to the variables, and apply a preconditioner to each part. The
+      parts are in turn block solvers or composite preconditioners, thus
+      preconditioners can be nested.
+
+All preconditioners are set up by a call to setup(A, layout), and applied by
+solve(r) or, as a preconditioner for the Krylov solvers of scipy, by
+as_linear_operator(). The objects are intended to be kept across Newton iterations
+and time steps: The extraction of sub-matrices is computed once for a given
+sparsity pattern, and the block solvers are only set up anew when the values of
+the block have changed. Block solvers can also be told to reuse an outdated setup
+(e.g. an AMG hierarchy) for a number of updates of the matrix.
+
+Example, for a contact mechanics problem, where the mortar and contact variables
+are eliminated by a Schur complement, and the elasticity block is approximated by
+AMG:
+    layout = DofLayout.from_assembler(assembler)
+    precond = SchurComplement(
+        first=layout.complement("u"),
+        second="u",
+        first_solver=DirectBlockSolver(),
+        schur_solver=AMGBlockSolver(max_reuse=10),
+    )
+    precond.setup(A, layout)
+    x, info = scipy.sparse.linalg.gmres(A, b, M=precond.as_linear_operator())
+
+"""
+
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+
+from porepy.numerics.linalg import direct_solvers
+
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+# A field of a split is given by one or several variable names
+Field = Union[str, Iterable[str]]
+
+
+class DofLayout:
+    """ Degrees of freedom of the variables of a linear system.
+
+    Attributes:
+        num_dofs (int): Total number of degrees of freedom.
+
+    """
+
+    def __init__(self, dofs: Dict[str, np.ndarray]) -> None:
+        """
+        Parameters:
+            dofs (dict): For each variable name, the indices of its degrees of
+                freedom in the linear system.
+
+        """
+        self._dofs = {var: np.sort(ind) for var, ind in dofs.items()}
+        self.num_dofs = sum(ind.size for ind in self._dofs.values())
+
+    @classmethod
+    def from_assembler(cls, assembler) -> "DofLayout":
+        """ Construct the layout of the system assembled by an Assembler.
+
+        Variables with the same name on different grids or edges are collected in
+        a single field.
+
+        Parameters:
+            assembler (pp.Assembler): Assembler for the linear system.
+
+        Returns:
+            DofLayout: Layout of the system.
+
+        """
+        dofs: Dict[str, List[np.ndarray]] = {}
+        for grid, var in assembler.block_dof:
+            dofs.setdefault(var, []).append(assembler.dof_ind(grid, var))
+        return cls({var: np.hstack(ind) for var, ind in dofs.items()})
+
+    def __repr__(self) -> str:
+        s = f"Layout of a linear system with {self.num_dofs} dofs. Variables:\n"
+        for var, ind in self._dofs.items():
+            s += f"{var}: {ind.size} dofs\n"
+        return s
+
+    def variables(self) -> List[str]:
+        """ Get the names of the variables in the layout.
+        """
+        return list(self._dofs.keys())
+
+    def dofs(self, variables: Field) -> np.ndarray:
+        """ Get the degrees of freedom of one or several variables.
+
+        Parameters:
+            variables (str or list of str): Variable names.
+
+        Returns:
+            np.ndarray: Sorted indices of the dofs of the variables.
+
+        """
+        variables = _as_list(variables)
+        for var in variables:
+            if var not in self._dofs:
+                raise KeyError(f"Unknown variable {var}")
+        if len(variables) == 0:
+            return np.array([], dtype=np.int)
+        return np.sort(np.hstack([self._dofs[var] for var in variables]))
+
+    def complement(self, variables: Field) -> List[str]:
+        """ Get the variables of the layout not among the given variables.
+        """
+        variables = _as_list(variables)
+        return [var for var in self._dofs if var not in variables]
+
+    def restrict(self, variables: Field) -> "DofLayout":
+        """ Get the layout of the sub-system formed by a set of variables.
+
+        The dofs of the sub-system are numbered according to their order in the
+        full system.
+
+        Parameters:
+            variables (str or list of str): Variable names.
+
+        Returns:
+            DofLayout: Layout of the sub-system.
+
+        """
+        variables = _as_list(variables)
+        sub_dofs = self.dofs(variables)
+        return DofLayout(
+            {var: np.searchsorted(sub_dofs, self._dofs[var]) for var in variables}
+        )
+
+
+class Preconditioner:
+    """ Base class for preconditioners, that is, approximate inverses of a matrix.
+    """
+
+    def __init__(self) -> None:
+        self._shape = None
+
+    def setup(self, A: sps.spmatrix, layout: Optional[DofLayout] = None) -> None:
+        """ Set up the preconditioner for a matrix.
+
+        Parameters:
+            A (sps.spmatrix): Matrix to be preconditioned.
+            layout (DofLayout, optional): Layout of the variables of A. Needed for
+                preconditioners which split the system.
+
+        """
+        raise NotImplementedError
+
+    def solve(self, r: np.ndarray) -> np.ndarray:
+        """ Apply the preconditioner to a vector.
+        """
+        raise NotImplementedError
+
+    def as_linear_operator(self) -> spla.LinearOperator:
+        """ Represent the preconditioner as a LinearOperator, for use in scipy's
+        Krylov solvers. The preconditioner should be set up.
+        """
+        if self._shape is None:
+            raise ValueError("The preconditioner must be set up before use")
+        return spla.LinearOperator(self._shape, matvec=self.solve)
+
+
+class BlockSolver(Preconditioner):
+    """ Base class for approximate solvers of a single block.
+
+    The setup, e.g. a factorization or an AMG hierarchy, is only recomputed when
+    the matrix has changed. If max_reuse is positive, the setup of a matrix is
+    also used for that many later matrices with the same sparsity pattern and
+    modified values, before it is recomputed. This is useful for the slowly
+    changing matrices of Newton iterations.
+
+    Subclasses implement the methods _setup() and solve().
+
+    Attributes:
+        max_reuse (int): Number of times a setup can be reused for matrices with
+            modified values.
+        num_setup (int): Number of times the setup has been computed.
+
+    """
+
+    def __init__(self, max_reuse: int = 0) -> None:
+        super().__init__()
+        self.max_reuse = max_reuse
+        self.num_setup = 0
+        self._num_reuse = 0
+        self._indptr = None
+        self._indices = None
+        self._data = None
+
+    def setup(self, A: sps.spmatrix, layout: Optional[DofLayout] = None) -> None:
+        A = _canonical_csr(A)
+        same_pattern = (
+            self._indptr is not None
+            and self._shape == A.shape
+            and np.array_equal(self._indptr, A.indptr)
+            and np.array_equal(self._indices, A.indices)
+        )
+        if same_pattern:
+            if np.array_equal(self._data, A.data):
+                return
+            if self._num_reuse < self.max_reuse:
+                self._num_reuse += 1
+                return
+
+        self._setup(A)
+        self.num_setup += 1
+        self._num_reuse = 0
+        self._shape = A.shape
+        self._indptr = A.indptr.copy()
+        self._indices = A.indices.copy()
+        self._data = A.data.copy()
+
+    def _setup(self, A: sps.csr_matrix) -> None:
+        raise NotImplementedError
+
+
+class DirectBlockSolver(BlockSolver):
+    """ Exact solver of a block, by the direct solvers in
+    pp.numerics.linalg.direct_solvers. Intended for small blocks, such as mortar
+    and contact variables.
+    """
+
+    def __init__(self, solver: str = "superlu", max_reuse: int = 0, **kwargs) -> None:
+        """
+        Parameters:
+            solver (str, optional): Name of the direct solver backend, see
+                direct_solvers.create_direct_solver(). Defaults to superlu.
+            max_reuse (int, optional): See BlockSolver. Defaults to 0.
+            **kwargs: Passed to the constructor of the backend.
+
+        """
+        super().__init__(max_reuse)
+        self._solver = direct_solvers.create_direct_solver(solver, **kwargs)
+        self._factor = None
+
+    def _setup(self, A: sps.csr_matrix) -> None:
+        # The ordering is reused by the direct solver. Applying the preconditioner
+        # is only a forward and back substitution.
+        self._factor = self._solver.factorize(A)
+
+    def solve(self, r: np.ndarray) -> np.ndarray:
+        return self._factor(r)
+
+
+class AMGBlockSolver(BlockSolver):
+    """ Approximate solver of an elliptic block by a smoothed aggregation AMG
+    cycle from pyamg.
+    """
+
+    def __init__(
+        self,
+        null_space: Optional[np.ndarray] = None,
+        cycle: str = "V",
+        max_reuse: int = 0,
+        **kwargs,
+    ) -> None:
+        """
+        Parameters:
+            null_space (np.ndarray, optional): Near null space of the block, see
+                pyamg.smoothed_aggregation_solver. Defaults to constant vectors.
+                For elasticity, the rigid body modes should be provided.
+            cycle (str, optional): Type of cycle, see pyamg. Defaults to V.
+            max_reuse (int, optional): See BlockSolver. Defaults to 0.
+            **kwargs: Passed to pyamg.smoothed_aggregation_solver.
+
+        Raises:
+            ImportError: If pyamg is not available.
+
+        """
+        if pyamg is None:
+            raise ImportError("The AMG block solver requires the pyamg package")
+        super().__init__(max_reuse)
+        self._null_space = null_space
+        self._cycle = cycle
+        self._amg_kwargs = kwargs
+        self._M = None
+
+    def _setup(self, A: sps.csr_matrix) -> None:
+        ml = pyamg.smoothed_aggregation_solver(
+            A, B=self._null_space, **self._amg_kwargs
+        )
+        self._M = ml.aspreconditioner(cycle=self._cycle)
+
+    def solve(self, r: np.ndarray) -> np.ndarray:
+        return self._M.matvec(r)
+
+
+class ILUBlockSolver(BlockSolver):
+    """ Approximate solver of a block by an incomplete LU factorization, see
+    scipy.sparse.linalg.spilu.
+    """
+
+    def __init__(self, max_reuse: int = 0, **kwargs) -> None:
+        """
+        Parameters:
+            max_reuse (int, optional): See BlockSolver. Defaults to 0.
+            **kwargs: Passed to scipy.sparse.linalg.spilu, e.g. drop_tol and
+                fill_factor.
+
+        """
+        super().__init__(max_reuse)
+        self._ilu_kwargs = kwargs
+        self._ilu = None
+
+    def _setup(self, A: sps.csr_matrix) -> None:
+        self._ilu = spla.spilu(A.tocsc(), **self._ilu_kwargs)
+
+    def solve(self, r: np.ndarray) -> np.ndarray:
+        return self._ilu.solve(r)
+
+
+class FieldSplit(Preconditioner):
+    """ Field split preconditioner: The system is split into fields, which are
+    solved one by one with their own preconditioner.
+
+    With the additive method, this is a block Jacobi preconditioner. With the
+    multiplicative method, the off-diagonal blocks below the diagonal are included
+    (block Gauss-Seidel), so that the fields are solved in the given order, each
+    using the updated values of the previous fields.
+
+    """
+
+    def __init__(
+        self,
+        fields: List[Field],
+        solvers: List[Preconditioner],
+        method: str = "additive",
+    ) -> None:
+        """
+        Parameters:
+            fields (list): The fields of the split. Each field is one or several
+                variable names. Each variable in the layout should be in exactly one
+                field.
+            solvers (list of Preconditioner): Preconditioner for each field.
+            method (str, optional): Either additive or multiplicative. Defaults to
+                additive.
+
+        """
+        super().__init__()
+        if len(fields) != len(solvers):
+            raise ValueError("Need one solver per field")
+        if method not in ["additive", "multiplicative"]:
+            raise ValueError(f"Unknown field split method {method}")
+        self.fields = [_as_list(f) for f in fields]
+        self.solvers = solvers
+        self.method = method
+
+        self._layout = None
+
+    def setup(self, A: sps.spmatrix, layout: Optional[DofLayout] = None) -> None:
+        if layout is None:
+            raise ValueError("A field split needs the layout of the variables")
+        A = _canonical_csr(A)
+        if layout is not self._layout:
+            self._set_layout(layout)
+
+        for solver, extract, sub_layout in zip(
+            self.solvers, self._diagonal, self._sub_layouts
+        ):
+            solver.setup(extract(A), sub_layout)
+        self._lower_blocks = [extract(A) for extract in self._lower]
+        self._shape = A.shape
+
+    def _set_layout(self, layout: DofLayout) -> None:
+        self._dofs = [layout.dofs(field) for field in self.fields]
+        covered = np.zeros(layout.num_dofs, dtype=np.int)
+        for dofs in self._dofs:
+            covered[dofs] += 1
+        if np.any(covered != 1):
+            raise ValueError("The fields should cover each variable exactly once")
+
+        self._diagonal = [_SubmatrixExtractor(dofs, dofs) for dofs in self._dofs]
+        self._sub_layouts = [layout.restrict(field) for field in self.fields]
+        # Dofs of the previous fields, and the blocks coupling these to the field
+        self._previous = []
+        self._lower = []
+        if self.method == "multiplicative":
+            for i in range(1, len(self._dofs)):
+                previous = np.hstack(self._dofs[:i])
+                self._previous.append(previous)
+                self._lower.append(_SubmatrixExtractor(self._dofs[i], previous))
+        self._layout = layout
+
+    def solve(self, r: np.ndarray) -> np.ndarray:
+        x = np.zeros_like(r)
+        for i, (solver, dofs) in enumerate(zip(self.solvers, self._dofs)):
+            ri = r[dofs]
+            if self.method == "multiplicative" and i > 0:
+                ri = ri - self._lower_blocks[i - 1] * x[self._previous[i - 1]]
+            x[dofs] = solver.solve(ri)
+        return x
+
+
+class SchurComplement(Preconditioner):
+    """ Preconditioner based on the block LDU factorization of a system with two
+    fields, in which the first field is eliminated:
+
+        [A_00 A_01] = [I              0] [A_00  0] [I  A_00^-1 A_01]
+        [A_10 A_11]   [A_10 A_00^-1   I] [0     S] [0              I]
+
+    with the Schur complement S = A_11 - A_10 A_00^-1 A_01. The inverses of A_00 and S
+    are replaced by the given preconditioners, and S by an approximation which
+    preserves sparsity.
+
+    """
+
+    def __init__(
+        self,
+        first: Field,
+        second: Field,
+        first_solver: Preconditioner,
+        schur_solver: Preconditioner,
+        approximation: str = "none",
+    ) -> None:
+        """
+        Parameters:
+            first (str or list of str): Variables of the eliminated field.
+            second (str or list of str): Variables of the remaining field.
+            first_solver (Preconditioner): Preconditioner for A_00.
+            schur_solver (Preconditioner): Preconditioner for the approximated
+                Schur complement.
+            approximation (str, optional): Approximation of the Schur complement.
+                Either none, for which S is approximated by A_11, or diagonal, for
+                which A_00 is replaced by its diagonal in the Schur complement.
+                Defaults to none.
+
+        """
+        super().__init__()
+        if approximation not in ["none", "diagonal"]:
+            raise ValueError(f"Unknown Schur complement approximation {approximation}")
+        self.first = _as_list(first)
+        self.second = _as_list(second)
+        self.first_solver = first_solver
+        self.schur_solver = schur_solver
+        self.approximation = approximation
+
+        self._layout = None
+
+    def setup(self, A: sps.spmatrix, layout: Optional[DofLayout] = None) -> None:
+        if layout is None:
+            raise ValueError("A Schur complement needs the layout of the variables")
+        A = _canonical_csr(A)
+        if layout is not self._layout:
+            self._dofs_0 = layout.dofs(self.first)
+            self._dofs_1 = layout.dofs(self.second)
+            if self._dofs_0.size + self._dofs_1.size != layout.num_dofs or (
+                np.intersect1d(self._dofs_0, self._dofs_1).size > 0
+            ):
+                raise ValueError("The fields should cover each variable exactly once")
+            self._extract = {
+                (i, j): _SubmatrixExtractor(di, dj)
+                for i, di in enumerate([self._dofs_0, self._dofs_1])
+                for j, dj in enumerate([self._dofs_0, self._dofs_1])
+            }
+            self._sub_layouts = [
+                layout.restrict(self.first),
+                layout.restrict(self.second),
+            ]
+            self._layout = layout
+
+        A_00 = self._extract[(0, 0)](A)
+        self._A_01 = self._extract[(0, 1)](A)
+        self._A_10 = self._extract[(1, 0)](A)
+        S = self._extract[(1, 1)](A)
+        if self.approximation == "diagonal":
+            inv_diag = sps.dia_matrix((1 / A_00.diagonal(), 0), shape=A_00.shape)
+            S = (S - self._A_10 * inv_diag * self._A_01).tocsr()
+
+        self.first_solver.setup(A_00, self._sub_layouts[0])
+        self.schur_solver.setup(S, self._sub_layouts[1])
+        self._shape = A.shape
+
+    def solve(self, r: np.ndarray) -> np.ndarray:
+        r_0 = r[self._dofs_0]
+        y_0 = self.first_solver.solve(r_0)
+        x_1 = self.schur_solver.solve(r[self._dofs_1] - self._A_10 * y_0)
+        x_0 = self.first_solver.solve(r_0 - self._A_01 * x_1)
+
+        x = np.zeros_like(r)
+        x[self._dofs_0] = x_0
+        x[self._dofs_1] = x_1
+        return x
+
+
+class _SubmatrixExtractor:
+    """ Extract the sub-matrix A[rows][:, cols] of csr matrices.
+
+    The positions of the sub-matrix entries in the data of A are computed for the
+    first matrix, and reused as long as the sparsity pattern is unchanged, thus
+    later extractions only copy values.
+    """
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        self._rows = rows
+        self._cols = cols
+        self._indptr = None
+        self._indices = None
+
+    def __call__(self, A: sps.csr_matrix) -> sps.csr_matrix:
+        if not (
+            self._indptr is not None
+            and np.array_equal(self._indptr, A.indptr)
+            and np.array_equal(self._indices, A.indices)
+        ):
+            # Let the entries of the matrix be their (one-offset) position in the
+            # data array, and slice this matrix.
+            positions = sps.csr_matrix(
+                (np.arange(1, A.nnz + 1, dtype=np.float), A.indices, A.indptr),
+                shape=A.shape,
+            )
+            sub = positions[self._rows][:, self._cols].tocsr()
+            sub.sort_indices()
+            self._data_ind = sub.data.astype(np.int) - 1
+            self._sub_indices = sub.indices
+            self._sub_indptr = sub.indptr
+            self._indptr = A.indptr.copy()
+            self._indices = A.indices.copy()
+
+        return sps.csr_matrix(
+            (
+                A.data[self._data_ind],
+                self._sub_indices.copy(),
+                self._sub_indptr.copy(),
+            ),
+            shape=(self._rows.size, self._cols.size),
+        )
+
+
+def _canonical_csr(A: sps.spmatrix) -> sps.csr_matrix:
+    A = sps.csr_matrix(A)
+    if not A.has_canonical_format:
+        A = A.copy()
+        A.sum_duplicates()
+    return A
+
+
+def _as_list(variables: Field) -> List[str]:
+    if isinstance(variables, str):
+        return [variables]
+    return list(variables)
@@ -0,0 +1,288 @@
+"""
+Direct solvers for sequences of linear systems with a common sparsity pattern.
+
+In nonlinear and time-dependent simulations, the same linear system is typically
+solved many times, with matrices that share the sparsity pattern, and frequently
+also the values. The solvers in this module keep the factorization of the last
+matrix, together with the fill-reducing ordering computed for the sparsity pattern,
+and reuse as much as possible in later solves:
+    * If neither the sparsity pattern nor the values of the matrix have changed,
+      the factorization is reused, and only the triangular solves are done.
+    * If the values have changed, but not the sparsity pattern, the matrix is
+      refactorized numerically, reusing the stored ordering (and, if supported by
+      the backend, the symbolic factorization).
+    * If the sparsity pattern has changed, the factorization is computed from
+      scratch.
+
+New backends are added by subclassing DirectSolver, implementing the methods
+_analyze(), _factorize() and _solve(), and registering the class with
+register_direct_solver(). A solver is then constructed by its name with
+create_direct_solver(), which is also what the model classes use.
+
+"""
+import logging
+import warnings
+from typing import Callable, Dict, Type
+
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+
+try:
+    import scikits.umfpack as umfpack
+except ImportError:
+    umfpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class DirectSolver:
+    """ Base class for direct solvers which reuse factorizations.
+
+    The class keeps track of the sparsity pattern and values of the last factorized
+    matrix, and decides which parts of the factorization must be recomputed. The
+    actual factorization is left to subclasses.
+
+    Attributes:
+        num_analyze (int): Number of times the sparsity pattern has been analyzed.
+        num_factorize (int): Number of numerical factorizations.
+        num_solve (int): Number of solves.
+
+    """
+
+    def __init__(self) -> None:
+        self._indptr = None
+        self._indices = None
+        self._data = None
+        self._shape = None
+
+        self.num_analyze = 0
+        self.num_factorize = 0
+        self.num_solve = 0
+
+    def __repr__(self) -> str:
+        s = (
+            f"Direct solver of type {self.__class__.__name__}, which has done "
+            f"{self.num_analyze} analysis, {self.num_factorize} factorizations and "
+            f"{self.num_solve} solves."
+        )
+        return s
+
+    def solve(self, A: sps.spmatrix, b: np.ndarray) -> np.ndarray:
+        """ Solve the linear system A x = b, reusing the stored factorization if
+        possible.
+
+        Parameters:
+            A (sps.spmatrix): System matrix. Will be converted to csc format.
+            b (np.ndarray): Right hand side.
+
+        Returns:
+            np.ndarray: Solution of the linear system. If the matrix is singular, a
+                warning is issued, and an array of nans is returned, in line with
+                the behavior of scipy.sparse.linalg.spsolve.
+
+        """
+        solve = self.factorize(A)
+        self.num_solve += 1
+        return solve(b)
+
+    def factorize(self, A: sps.spmatrix) -> Callable[[np.ndarray], np.ndarray]:
+        """ Factorize A, reusing the stored ordering and factorization if possible.
+
+        The returned function only does the forward and back substitution, thus it
+        should be used for repeated solves with the same matrix. It is valid until
+        the solver is used with another matrix.
+
+        Parameters:
+            A (sps.spmatrix): System matrix. Will be converted to csc format.
+
+        Returns:
+            callable: Maps a right hand side to the solution of the linear system.
+                If the matrix is singular, a warning is issued, and the function
+                returns an array of nans, in line with the behavior of
+                scipy.sparse.linalg.spsolve.
+
+        """
+        A = sps.csc_matrix(A)
+        A.sum_duplicates()
+        A.sort_indices()
+
+        if not self._same_pattern(A):
+            self._analyze(A)
+            self.num_analyze += 1
+            self._indptr = A.indptr.copy()
+            self._indices = A.indices.copy()
+            self._shape = A.shape
+            self._data = None
+
+        if self._data is None or not np.array_equal(self._data, A.data):
+            try:
+                self._factorize(A)
+            except RuntimeError as e:
+                # Make sure the failed factorization is not reused
+                self._data = None
+                warnings.warn(
+                    "Factorization failed: " + str(e), spla.MatrixRankWarning
+                )
+                return lambda b: np.full(b.shape, np.nan)
+            self.num_factorize += 1
+            self._data = A.data.copy()
+
+        return self._solve
+
+    def reset(self) -> None:
+        """ Discard the stored factorization and ordering.
+        """
+        self._indptr = None
+        self._indices = None
+        self._data = None
+        self._shape = None
+
+    def _same_pattern(self, A: sps.csc_matrix) -> bool:
+        return (
+            self._indptr is not None
+            and self._shape == A.shape
+            and np.array_equal(self._indptr, A.indptr)
+            and np.array_equal(self._indices, A.indices)
+        )
+
+    def _analyze(self, A: sps.csc_matrix) -> None:
+        """ Compute the fill-reducing ordering, and if possible the symbolic
+        factorization, of the sparsity pattern of A.
+        """
+        raise NotImplementedError
+
+    def _factorize(self, A: sps.csc_matrix) -> None:
+        """ Compute the numerical factorization of A. The sparsity pattern of A is
+        the one passed to the last call to _analyze().
+
+        Raises:
+            RuntimeError: If the matrix is singular.
+
+        """
+        raise NotImplementedError
+
+    def _solve(self, b: np.ndarray) -> np.ndarray:
+        """ Solve with the last factorized matrix.
+        """
+        raise NotImplementedError
+
+
+class SuperLUSolver(DirectSolver):
+    """ Direct solver based on SuperLU, as wrapped in scipy.sparse.linalg.splu.
+
+    The scipy wrapper does not expose the symbolic factorization of SuperLU, see
+    https://github.com/scipy/scipy/issues/8227. Instead, the column ordering
+    computed at the first factorization of a sparsity pattern is stored, and later
+    factorizations are done on the matrix with columns permuted according to this
+    ordering, with the ordering of SuperLU switched off.
+
+    """
+
+    def __init__(self, permc_spec: str = "COLAMD", **kwargs) -> None:
+        """
+        Parameters:
+            permc_spec (str, optional): Column ordering used by SuperLU, see
+                scipy.sparse.linalg.splu. Defaults to COLAMD.
+            **kwargs: Further arguments passed to scipy.sparse.linalg.splu.
+
+        """
+        super().__init__()
+        self._permc_spec = permc_spec
+        self._splu_kwargs = kwargs
+        self._col_order = None
+        self._reorder = False
+        self._lu = None
+
+    def _analyze(self, A: sps.csc_matrix) -> None:
+        # SuperLU computes the column ordering as part of the factorization, thus
+        # the ordering is recovered from the first factorization.
+        self._col_order = None
+        self._lu = None
+
+    def _factorize(self, A: sps.csc_matrix) -> None:
+        self._lu = None
+        if self._col_order is None:
+            self._lu = spla.splu(A, permc_spec=self._permc_spec, **self._splu_kwargs)
+            # SuperLU factorizes A[:, col_order], with col_order the inverse of
+            # perm_c.
+            self._col_order = np.argsort(self._lu.perm_c)
+            self._reorder = False
+        else:
+            self._lu = spla.splu(
+                A[:, self._col_order], permc_spec="NATURAL", **self._splu_kwargs
+            )
+            self._reorder = True
+
+    def _solve(self, b: np.ndarray) -> np.ndarray:
+        y = self._lu.solve(b)
+        if not self._reorder:
+            return y
+        x = np.empty_like(y)
+        x[self._col_order] = y
+        return x
+
+
+class UmfpackSolver(DirectSolver):
+    """ Direct solver based on UMFPACK, as wrapped in scikits.umfpack.
+
+    UMFPACK separates the symbolic and numerical factorization, thus both the
+    ordering and the symbolic analysis are reused when the sparsity pattern is
+    unchanged.
+
+    """
+
+    def __init__(self) -> None:
+        if umfpack is None:
+            raise ImportError("The UMFPACK solver requires the scikits.umfpack package")
+        super().__init__()
+        self._context = None
+        self._A = None
+
+    def _analyze(self, A: sps.csc_matrix) -> None:
+        self._context = umfpack.UmfpackContext("di")
+        self._context.symbolic(A)
+
+    def _factorize(self, A: sps.csc_matrix) -> None:
+        self._context.numeric(A)
+        self._A = A
+
+    def _solve(self, b: np.ndarray) -> np.ndarray:
+        return self._context.solve(umfpack.UMFPACK_A, self._A, b, autoTranspose=True)
+
+
+# Available backends, identified by name
+_DIRECT_SOLVERS: Dict[str, Type[DirectSolver]] = {
+    "superlu": SuperLUSolver,
+    "umfpack": UmfpackSolver,
+}
+
+
+def register_direct_solver(name: str, solver: Type[DirectSolver]) -> None:
+    """ Make a direct solver backend available under a given name.
+
+    Parameters:
+        name (str): Name of the backend, as used in create_direct_solver().
+        solver (subclass of DirectSolver): The backend.
+
+    """
+    _DIRECT_SOLVERS[name] = solver
+
+
+def create_direct_solver(name: str = "superlu", **kwargs) -> DirectSolver:
+    """ Construct a direct solver backend by its name.
+
+    Parameters:
+        name (str, optional): Name of the backend. Defaults to superlu.
+        **kwargs: Passed to the constructor of the backend.
+
+    Returns:
+        DirectSolver: The solver.
+
+    Raises:
+        ValueError: If no backend is registered with the given name.
+
+    """
+    if name not in _DIRECT_SOLVERS:
+        raise ValueError(f"Unknown direct solver {name}")
+    return _DIRECT_SOLVERS[name](**kwargs)
@@ -4,9 +4,13 @@
 The module contains the Assembler class, which is responsible for assembly of
 system matrix and right hand side for a general multi-domain, multi-physics problem.
 """
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 import scipy.sparse as sps
 import porepy as pp
+from porepy.utils.parallel import process_pool_context
 
 
 class Assembler:
@@ -21,7 +25,7 @@ class Assembler:
 
     """
 
-    def __init__(self, gb, active_variables=None):
+    def __init__(self, gb, active_variables=None, discretization_cache=None):
         """ Construct an assembler for a given GridBucket on a given set of variables.
 
         Parameters:
@@ -34,6 +38,9 @@ class Assembler:
                 accordingly.
                 NOTE: For edge coupling terms where the edge variable is defined
                 as active, all involved node variables must also be active.
+            discretization_cache (pp.DiscretizationCache, optional): If provided,
+                discretizations on the nodes of the GridBucket are read from, and
+                stored in, this cache.
 
         Raises:
             ValueError: If an edge_coupling is defined with an active edge variable
@@ -49,8 +56,16 @@ class Assembler:
                 active_variables = [active_variables]
             self.active_variables = active_variables
 
+        self.discretization_cache = discretization_cache
+
         self._identify_dofs()
 
+        # Sparsity pattern of the global system matrix, see assemble_matrix_rhs
+        self._sparsity_pattern = None
+
+        # Wall clock time spent on the individual discretizations, see discretize()
+        self.discretization_timings = {}
+
     def discretization_key(self, row, col=None):
         if col is None or row == col:
             return row
@@ -100,7 +115,9 @@ class Assembler:
             # Coupling between edge and node
             return "_".join([term, key_1, key_2, key_3])
 
-    def assemble_matrix_rhs(self, matrix_format="csr", add_matrices=True):
+    def assemble_matrix_rhs(
+        self, matrix_format="csr", add_matrices=True, reuse_sparsity_pattern=False
+    ):
         """ Assemble the system matrix and right hand side for a general linear
         multi-physics problem, and return a block matrix and right hand side.
 
@@ -129,6 +146,16 @@ class Assembler:
             add_matrices (boolean, optional): If True, a single system matrix is added,
                 else, separate matrices for each variable and term are returned in a
                 dictionary.
+            reuse_sparsity_pattern (boolean, optional): Only considered if
+                add_matrices is True. If True, the sparsity pattern of the system
+                matrix, together with a map from the elements of the individual
+                blocks to the elements of the system matrix, is computed at the
+                first call and stored. In later calls, if the sparsity patterns of
+                all blocks are unchanged, only the data of the stored system matrix
+                is updated, in place. NOTE: The returned matrix is then the same
+                object for all calls, and is overwritten by later assembly. If the
+                sparsity pattern has changed, the stored pattern is recomputed.
+                Defaults to False.
 
         Returns:
             scipy sparse matrix, or dictionary of matrices: Discretization matrix,
@@ -162,11 +189,14 @@ class Assembler:
         # the matrix to a sps. block matrix.
         if add_matrices:
             size = np.sum(self.full_dof)
-            full_matrix = sps_matrix((size, size))
             full_rhs = np.zeros(size)
 
-            for mat in matrix.values():
-                full_matrix += sps.bmat(mat, matrix_format)
+            if reuse_sparsity_pattern:
+                full_matrix = self._assemble_by_sparsity_pattern(matrix, matrix_format)
+            else:
+                full_matrix = sps_matrix((size, size))
+                for mat in matrix.values():
+                    full_matrix += sps.bmat(mat, matrix_format)
 
             for vec in rhs.values():
                 full_rhs += np.concatenate(tuple(vec))
@@ -181,7 +211,137 @@ class Assembler:
 
             return matrix, rhs
 
-    def discretize(self, variable_filter=None, term_filter=None, grid=None):
+    def _assemble_by_sparsity_pattern(self, matrix, matrix_format):
+        """ Add the block matrices of all terms into a single system matrix, using
+        a stored sparsity pattern for the system matrix.
+
+        The sparsity pattern, and a map from the non-zero elements of the blocks to
+        the data of the system matrix, are computed if no pattern is stored, or if
+        the sparsity pattern of any of the blocks has changed since the pattern was
+        computed. Otherwise, only the data of the stored system matrix is updated.
+
+        Parameters:
+            matrix (dict): Block matrices for all terms, as computed by
+                self._operate_on_gb().
+            matrix_format (str): Format of the system matrix, either 'csr' or 'csc'.
+
+        Returns:
+            sps.spmatrix: System matrix.
+
+        """
+        if matrix_format != "csc":
+            matrix_format = "csr"
+
+        # Gather the blocks with non-zero elements. The blocks are converted to the
+        # format of the system matrix, so that indptr and indices identify the
+        # sparsity pattern.
+        block_keys = []
+        blocks = []
+        for key in sorted(matrix.keys()):
+            mat = matrix[key]
+            for ri in range(mat.shape[0]):
+                for ci in range(mat.shape[1]):
+                    if mat[ri, ci] is None or mat[ri, ci].nnz == 0:
+                        continue
+                    block_keys.append((key, ri, ci))
+                    blocks.append(mat[ri, ci].asformat(matrix_format))
+
+        size = np.sum(self.full_dof)
+        # Empty arrays are added to have something to concatenate
+        indptr = np.concatenate([b.indptr for b in blocks] + [np.zeros(0, dtype=int)])
+        indices = np.concatenate(
+            [b.indices for b in blocks] + [np.zeros(0, dtype=int)]
+        )
+        data = np.concatenate([b.data for b in blocks] + [np.zeros(0)])
+
+        pattern = self._sparsity_pattern
+        if (
+            pattern is None
+            or pattern["format"] != matrix_format
+            or pattern["matrix"].shape != (size, size)
+            or pattern["block_keys"] != block_keys
+            or not np.array_equal(pattern["indptr"], indptr)
+            or not np.array_equal(pattern["indices"], indices)
+        ):
+            pattern = self._compute_sparsity_pattern(
+                block_keys, blocks, matrix_format, size
+            )
+            pattern["indptr"] = indptr
+            pattern["indices"] = indices
+            self._sparsity_pattern = pattern
+
+        full_matrix = pattern["matrix"]
+        full_matrix.data[:] = np.bincount(
+            pattern["scatter"], weights=data, minlength=full_matrix.data.size
+        )
+        return full_matrix
+
+    def _compute_sparsity_pattern(self, block_keys, blocks, matrix_format, size):
+        """ Compute the sparsity pattern of the system matrix, and a map from the
+        non-zero elements of the blocks to the data of the system matrix.
+
+        Parameters:
+            block_keys (list of tuples): Term, block row and block column of the
+                non-empty blocks.
+            blocks (list of sps.spmatrix): The non-empty blocks, in format
+                matrix_format.
+            matrix_format (str): Format of the system matrix, either 'csr' or 'csc'.
+            size (int): Number of rows and columns in the system matrix.
+
+        Returns:
+            dict: With fields 'matrix' (system matrix with the computed sparsity
+                pattern), 'scatter' (index of the data of the system matrix for each
+                non-zero block element), 'block_keys' and 'format'.
+
+        """
+        block_start = np.hstack((0, np.cumsum(self.full_dof)))
+
+        # Major (row for csr, column for csc) and minor indices of all block elements
+        # in the numbering of the system matrix.
+        major = []
+        minor = []
+        for (_, ri, ci), block in zip(block_keys, blocks):
+            if matrix_format == "csc":
+                ri, ci = ci, ri
+            num_major = block.indptr.size - 1
+            # Blocks may have empty rows, thus rldecode cannot be used here
+            major.append(
+                block_start[ri] + np.repeat(np.arange(num_major), np.diff(block.indptr))
+            )
+            minor.append(block_start[ci] + block.indices)
+
+        major = np.concatenate(major + [np.zeros(0, dtype=int)]).astype(np.int64)
+        minor = np.concatenate(minor + [np.zeros(0, dtype=int)]).astype(np.int64)
+
+        # Unique, sorted elements of the system matrix, and the map from block
+        # elements to the system matrix.
+        elements, scatter = np.unique(major * size + minor, return_inverse=True)
+        indptr = np.hstack(
+            (0, np.cumsum(np.bincount(elements // size, minlength=size)))
+        )
+        indices = elements % size
+        data = np.zeros(elements.size)
+
+        if matrix_format == "csc":
+            full_matrix = sps.csc_matrix((data, indices, indptr), shape=(size, size))
+        else:
+            full_matrix = sps.csr_matrix((data, indices, indptr), shape=(size, size))
+
+        return {
+            "matrix": full_matrix,
+            "scatter": scatter,
+            "block_keys": block_keys,
+            "format": matrix_format,
+        }
+
+    def discretize(
+        self,
+        variable_filter=None,
+        term_filter=None,
+        grid=None,
+        num_workers=1,
+        pool="thread",
+    ):
         """ Run the discretization operation on discretizations specified in
         the mixed-dimensional grid.
 
@@ -229,15 +389,102 @@ class Assembler:
                 (default), all terms for all active variables are discretized.
             g (pp.Grid, optional): Grid in GridBucket. If specified, only this
                 grid will be considered.
+            num_workers (int, optional): Number of workers used for the
+                discretization. If 1 (default), the discretization is done in serial.
+            pool (str, optional): Type of worker pool, either 'thread' (default) or
+                'process'. See below.
+
+        Parallel discretization:
+            The discretizations on different grids are independent, and so are the
+            discretizations on different edges. The discretization is therefore done
+            in three stages: First all discretizations on the nodes, then the
+            discretizations internal to the edges, and finally the coupling
+            discretizations, which may depend on the discretization of the nodes.
+            Within each stage, the work is divided into items of one node or edge,
+            and the items are dispatched to a pool of workers. Discretizations on the
+            same node or edge are done in the specified order. Coupling
+            discretizations may also modify the data of the neighboring nodes (e.g.
+            contact conditions), thus the coupling stage is split further, according
+            to the GridBucket graph, so that edges sharing a node are not
+            discretized at the same time.
+
+            A thread pool is efficient for discretizations that spend most of their
+            time in compiled code (sparse linear algebra, numba etc.), and has no
+            restrictions on the discretizations. With a process pool, the data of
+            each node (including the grid) is pickled and sent to the worker, and the
+            computed discretization matrices are transferred back; other changes to
+            the data dictionary made by the discretization are lost. Discretization
+            objects must therefore be picklable, and only fill
+            data[pp.DISCRETIZATION_MATRICES]. The coupling discretizations read the
+            node data, and are always discretized in a thread pool.
+
+            The wall clock time spent on each discretization is stored in
+            self.discretization_timings, with keys (grid or edge, term key), where the
+            term key is the same as used in the assembly, see _variable_term_key().
 
         """
-        self._operate_on_gb(
+        if pool not in ["thread", "process"]:
+            raise ValueError("Unknown pool type " + str(pool))
+
+        tasks = self._operate_on_gb(
             "discretize",
             variable_filter=variable_filter,
             term_filter=term_filter,
             grid=grid,
         )
 
+        node_tasks, edge_tasks, coupling_tasks = tasks
+        stages = [(node_tasks, pool), (edge_tasks, "thread")]
+        if num_workers is not None and num_workers > 1:
+            # Coupling discretizations may modify the data of the neighboring nodes,
+            # thus edges that share a node must not be discretized at the same time.
+            for wave in self._split_by_shared_nodes(coupling_tasks):
+                stages.append((wave, "thread"))
+        else:
+            stages.append((coupling_tasks, "thread"))
+
+        self.discretization_timings = {}
+        for stage_tasks, stage_pool in stages:
+            # The nodes may be discretized in a process pool, the edges are always
+            # discretized in threads.
+            timings = _run_discretization_tasks(stage_tasks, num_workers, stage_pool)
+            for key, t in timings.items():
+                self.discretization_timings[key] = (
+                    self.discretization_timings.get(key, 0) + t
+                )
+
+    def _split_by_shared_nodes(self, tasks):
+        """ Split coupling discretization tasks into waves, so that no two edges in
+        a wave share a node of the GridBucket.
+
+        The waves are found by a greedy coloring of the edges of the graph: Each
+        edge is placed in the first wave that contains no edge with a node in common.
+        Tasks on the same edge are placed in the same wave, in their original order.
+
+        Parameters:
+            tasks (list): Discretization tasks, see _run_discretization_tasks().
+
+        Returns:
+            list of list: The tasks of each wave.
+
+        """
+        waves = []
+        wave_of_edge = {}
+        for task in tasks:
+            e = task[0]
+            if e not in wave_of_edge:
+                nodes = set(self.gb.nodes_of_edge(e))
+                for ind, (wave_nodes, _) in enumerate(waves):
+                    if not wave_nodes & nodes:
+                        break
+                else:
+                    ind = len(waves)
+                    waves.append((set(), []))
+                waves[ind][0].update(nodes)
+                wave_of_edge[e] = ind
+            waves[wave_of_edge[e]][1].append(task)
+        return [wave_tasks for _, wave_tasks in waves]
+
     def _operate_on_gb(self, operation, **kwargs):
         """ Helper method, loop over the GridBucket, identify nodes / edges
         variables and discretizations, and perform an operation on these.
@@ -285,28 +532,59 @@ class Assembler:
             target_grid = kwargs.get("grid", None)
             sps_matrix = None
 
+            # The discretization is split into work items for nodes, edges and
+            # coupling terms on the edges; these are collected below, and executed
+            # by the caller.
+            tasks = ([], [], [])
+
         else:
             # We will only reach this if someone has invoked this private method
             # from the outside.
             raise ValueError("Unknown gb operation " + str(operation))
 
+        if operation == "assemble":
+            node_tasks, edge_tasks, coupling_tasks = None, None, None
+        else:
+            node_tasks, edge_tasks, coupling_tasks = tasks
+
         self._operate_on_node(
-            operation, matrix, rhs, variable_filter, term_filter, target_grid
+            operation,
+            matrix,
+            rhs,
+            variable_filter,
+            term_filter,
+            target_grid,
+            node_tasks,
         )
 
-        self._operate_on_edge(operation, matrix, rhs, variable_filter, term_filter)
+        self._operate_on_edge(
+            operation, matrix, rhs, variable_filter, term_filter, edge_tasks
+        )
 
         self._operate_on_edge_coupling(
-            operation, matrix, rhs, variable_filter, term_filter, sps_matrix
+            operation,
+            matrix,
+            rhs,
+            variable_filter,
+            term_filter,
+            sps_matrix,
+            coupling_tasks,
         )
 
         if operation == "assemble":
             return matrix, rhs
         else:
-            return None
+            return tasks
 
     def _operate_on_node(
-        self, operation, matrix, rhs, variable_filter, term_filter, target_grid
+        self,
+        operation,
+        matrix,
+        rhs,
+        variable_filter,
+        term_filter,
+        target_grid,
+        tasks=None,
     ):
 
         # Loop over all grids, discretize (if necessary) and assemble. This
@@ -341,7 +619,21 @@ class Assembler:
                                     and variable_filter(col)
                                     and term_filter(term)
                                 ):
-                                    d.discretize(g, data)
+                                    key = self._variable_term_key(term, row, col)
+                                    if self.discretization_cache is None:
+                                        tasks.append(
+                                            (g, key, d.discretize, (g, data), data)
+                                        )
+                                    else:
+                                        tasks.append(
+                                            (
+                                                g,
+                                                key,
+                                                self.discretization_cache.discretize,
+                                                (d, g, data),
+                                                data,
+                                            )
+                                        )
                             elif operation == "assemble":
                                 # Assemble the matrix and right hand side. This will also
                                 # discretize if not done before.
@@ -361,7 +653,9 @@ class Assembler:
                                 # The right hand side vector is always initialized.
                                 rhs[var_key_name][ri] += loc_b
 
-    def _operate_on_edge(self, operation, matrix, rhs, variable_filter, term_filter):
+    def _operate_on_edge(
+        self, operation, matrix, rhs, variable_filter, term_filter, tasks=None
+    ):
         for e, data_edge in self.gb.edges():
 
             # Extract the active local variables for edge
@@ -391,7 +685,10 @@ class Assembler:
                                     and variable_filter(col)
                                     and term_filter(term)
                                 ):
-                                    d.discretize(data_edge)
+                                    key = self._variable_term_key(term, row, col)
+                                    tasks.append(
+                                        (e, key, d.discretize, (data_edge,), data_edge)
+                                    )
                             elif operation == "assemble":
                                 # Assemble the matrix and right hand side. This will also
                                 # discretize if not done before.
@@ -410,7 +707,14 @@ class Assembler:
                                 rhs[var_key_name][ri] += loc_b
 
     def _operate_on_edge_coupling(
-        self, operation, matrix, rhs, variable_filter, term_filter, sps_matrix
+        self,
+        operation,
+        matrix,
+        rhs,
+        variable_filter,
+        term_filter,
+        sps_matrix,
+        tasks=None,
     ):
         # Loop over all edges
         for e, data_edge in self.gb.edges():
@@ -505,8 +809,20 @@ class Assembler:
                             and variable_filter(slave_key)
                             and variable_filter(edge_key)
                         ):
-                            e_discr.discretize(
-                                g_master, g_slave, data_master, data_slave, data_edge
+                            tasks.append(
+                                (
+                                    e,
+                                    mat_key,
+                                    e_discr.discretize,
+                                    (
+                                        g_master,
+                                        g_slave,
+                                        data_master,
+                                        data_slave,
+                                        data_edge,
+                                    ),
+                                    data_edge,
+                                )
                             )
 
                     elif operation == "assemble":
@@ -555,7 +871,15 @@ class Assembler:
                     # The operation is a simplified version of the full option above.
                     if operation == "discretize":
                         if variable_filter(master_key) and variable_filter(edge_key):
-                            e_discr.discretize(g_master, data_master, data_edge)
+                            tasks.append(
+                                (
+                                    e,
+                                    mat_key,
+                                    e_discr.discretize,
+                                    (g_master, data_master, data_edge),
+                                    data_edge,
+                                )
+                            )
                     elif operation == "assemble":
 
                         loc_mat, _ = self._assign_matrix_vector(
@@ -579,7 +903,15 @@ class Assembler:
                     # The operation is a simplified version of the full option above.
                     if operation == "discretize":
                         if variable_filter(slave_key) and variable_filter(edge_key):
-                            e_discr.discretize(g_slave, data_slave, data_edge)
+                            tasks.append(
+                                (
+                                    e,
+                                    mat_key,
+                                    e_discr.discretize,
+                                    (g_slave, data_slave, data_edge),
+                                    data_edge,
+                                )
+                            )
                     elif operation == "assemble":
 
                         loc_mat, _ = self._assign_matrix_vector(
@@ -1202,3 +1534,82 @@ class Assembler:
             int: Number of unknowns. Size of solution vector.
         """
         return self.full_dof.sum()
+
+
+def _run_discretization_tasks(tasks, num_workers, pool):
+    """ Execute discretization tasks, possibly in parallel.
+
+    Parameters:
+        tasks (list): Each task is a tuple of (i) the node or edge which is
+            discretized, (ii) the term key of the discretization, (iii) the
+            discretization function, (iv) its arguments, (v) the data dictionary
+            where the discretization is stored.
+        num_workers (int): Number of workers. If 1 or less, the tasks are executed in
+            serial.
+        pool (str): Either 'thread' or 'process'.
+
+    Returns:
+        dict: Wall clock time spent on each task, with keys (node or edge, term key).
+
+    """
+    # Group the tasks by node or edge. Tasks within a group are executed in order,
+    # while groups are independent.
+    groups = {}
+    for task in tasks:
+        groups.setdefault(task[0], []).append(task)
+
+    if num_workers is None or num_workers <= 1 or len(groups) <= 1:
+        timings = {}
+        for group in groups.values():
+            timings.update(_run_task_group(group))
+        return timings
+
+    timings = {}
+    if pool == "thread":
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(_run_task_group, g) for g in groups.values()]
+            for future in futures:
+                timings.update(future.result())
+        return timings
+
+    # Process pool. Avoid plain fork, see pp.utils.parallel.
+    context = process_pool_context()
+
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as executor:
+        futures = []
+        for group in groups.values():
+            # All tasks in a group share the data dictionary. Strip the owner from
+            # the tasks (it is part of the arguments if needed), and submit the
+            # group as a single argument, so that the data is pickled only once.
+            data = group[0][4]
+            local_tasks = [(None, key, fn, args, d) for _, key, fn, args, d in group]
+            future = executor.submit(_run_task_group_in_process, local_tasks)
+            futures.append((group, data, future))
+
+        for group, data, future in futures:
+            group_timings, matrices = future.result()
+            matrix_dictionary = data.setdefault(pp.DISCRETIZATION_MATRICES, {})
+            for keyword, mats in matrices.items():
+                matrix_dictionary.setdefault(keyword, {}).update(mats)
+            owner = group[0][0]
+            for (_, key), t in group_timings.items():
+                timings[(owner, key)] = timings.get((owner, key), 0) + t
+    return timings
+
+
+def _run_task_group(tasks):
+    timings = {}
+    for owner, key, fn, args, _ in tasks:
+        tic = time.perf_counter()
+        fn(*args)
+        t = time.perf_counter() - tic
+        timings[(owner, key)] = timings.get((owner, key), 0) + t
+    return timings
+
+
+def _run_task_group_in_process(tasks):
+    # Executed in a worker process: Discretize, and return the discretization
+    # matrices, which are otherwise lost with the data dictionary of the worker.
+    timings = _run_task_group(tasks)
+    data = tasks[0][4]
+    return timings, data.get(pp.DISCRETIZATION_MATRICES, {})
@@ -0,0 +1,302 @@
+"""
+Time stepping of advective transport in a mixed-dimensional grid.
+
+The transport equation is discretized with the upwind scheme on the nodes of the
+GridBucket, and upwind coupling on the edges, see pp.Upwind and pp.UpwindCoupling.
+The coupling equations are algebraic: The mortar flux of the transported
+quantity equals the Darcy flux times the upstream value. The mortar variables
+are therefore eliminated, and the semi-discrete problem posed in the cells only:
+
+    M dc/dt + U c = r,
+
+with M the (diagonal) mass matrix, U the upwind operator including the transport
+between the grids, and r the contribution from boundary conditions. The operators
+are assembled once, and reused in all time steps, until the flux field changes.
+
+The concentration can be a vector, or an array with one column per transported
+component (e.g. a set of tracers advected by the same Darcy flux). All components
+are advanced in the same sparse matrix operations.
+
+Three time stepping schemes are available:
+    explicit: Forward Euler. The time step is split into substeps which satisfy
+        the CFL condition, see TransportSolver.cfl().
+    implicit: Backward Euler. No substeps are needed, the factorization of the
+        system matrix is reused for steps of equal size.
+    imex: The cells of the lower-dimensional grids, which have small volumes and
+        therefore a restrictive CFL condition, are treated implicitly, the
+        remaining cells explicitly. The substeps satisfy the CFL condition of the
+        explicit cells.
+
+Example:
+    solver = pp.TransportSolver(gb, keyword="transport", scheme="imex")
+    c = np.zeros((solver.num_dof(), num_tracers))
+    for step in range(num_steps):
+        c = solver.step(c, time_step)
+
+"""
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+
+import porepy as pp
+
+
+class TransportSolver:
+    """ Assemble and time step an advection problem on a GridBucket.
+
+    The parameters of the problem are read from the data dictionaries of the
+    GridBucket, under the given keyword, as for pp.Upwind (darcy_flux, bc,
+    bc_values), pp.MassMatrix (mass_weight) and pp.UpwindCoupling (darcy_flux on
+    the edges).
+
+    On discretization, the primary variables and discretizations used by the
+    solver are added to the data dictionaries, with the names given in the
+    constructor. Other variables and discretizations are left untouched, but are
+    not considered by the solver.
+
+    The factorizations of the implicit systems are stored for the most recently
+    used substep sizes, at most max_factorizations of them.
+
+    Attributes:
+        gb (pp.GridBucket): Mixed-dimensional grid.
+        keyword (str): Keyword of the transport parameters.
+        variable (str): Name of the concentration variable on the nodes.
+        mortar_variable (str): Name of the mortar flux variable on the edges.
+        scheme (str): Time stepping scheme, 'explicit', 'implicit' or 'imex'.
+        cfl_factor (float): Safety factor multiplied with the CFL time step.
+        max_factorizations (int): Number of stored factorizations.
+
+    """
+
+    def __init__(
+        self,
+        gb,
+        keyword="transport",
+        variable="tracer",
+        mortar_variable="mortar_tracer",
+        scheme="explicit",
+        cfl_factor=1.0,
+        max_factorizations=10,
+    ):
+        if scheme not in ("explicit", "implicit", "imex"):
+            raise ValueError("Unknown time stepping scheme " + str(scheme))
+
+        self.gb = gb
+        self.keyword = keyword
+        self.variable = variable
+        self.mortar_variable = mortar_variable
+        self.scheme = scheme
+        self.cfl_factor = cfl_factor
+        self.max_factorizations = max_factorizations
+
+        # The operators are assembled on first use, or by discretize()
+        self._discretized = False
+
+    def discretize(self):
+        """ Discretize and assemble the transport operators.
+
+        Should be called again if the parameters, e.g. the Darcy flux, change.
+        """
+        self._assign_discretizations()
+
+        variables = [self.variable, self.mortar_variable]
+        assembler = pp.Assembler(self.gb, active_variables=variables)
+        assembler.discretize()
+        A, b = assembler.assemble_matrix_rhs()
+
+        grids = [g for g, _ in self.gb]
+        cell_dof = np.hstack([assembler.dof_ind(g, self.variable) for g in grids])
+        edges = [e for e, _ in self.gb.edges()]
+        mortar_dof = np.hstack(
+            [assembler.dof_ind(e, self.mortar_variable) for e in edges]
+            + [np.zeros(0, dtype=np.int)]
+        )
+
+        # Eliminate the mortar variables. For upwind coupling, the mortar block is
+        # the negative identity, the general case is covered by a sparse solve.
+        A = A.tocsr()
+        A_cc = A[cell_dof][:, cell_dof]
+        self._rhs = b[cell_dof]
+        if mortar_dof.size > 0:
+            A_cm = A[cell_dof][:, mortar_dof]
+            A_mc = A[mortar_dof][:, cell_dof]
+            A_mm = A[mortar_dof][:, mortar_dof]
+            diag = A_mm.diagonal()
+            if (A_mm - sps.diags(diag)).count_nonzero() == 0:
+                A_mm_inv_mc = sps.diags(1 / diag) * A_mc
+                A_mm_inv_bm = b[mortar_dof] / diag
+            else:
+                A_mm = A_mm.tocsc()
+                A_mm_inv_mc = sps.csr_matrix(spla.spsolve(A_mm, A_mc.tocsc()))
+                A_mm_inv_bm = spla.spsolve(A_mm, b[mortar_dof])
+            A_cc = A_cc - A_cm * A_mm_inv_mc
+            self._rhs = self._rhs - A_cm * A_mm_inv_bm
+        self._upwind = A_cc.tocsr()
+
+        # Mass matrix, and the index of the cells of each grid in the concentration.
+        # The cells are ordered as the nodes in the GridBucket, as in cell_dof.
+        mass = []
+        self._dof_ind = {}
+        offset = 0
+        for g, d in self.gb:
+            pp.MassMatrix(self.keyword).discretize(g, d)
+            mass.append(d[pp.DISCRETIZATION_MATRICES][self.keyword]["mass"].diagonal())
+            self._dof_ind[g] = np.arange(offset, offset + g.num_cells)
+            offset += g.num_cells
+        self._mass = np.hstack(mass)
+
+        # Rows treated implicitly
+        if self.scheme == "explicit":
+            self._implicit = np.zeros(offset, dtype=np.bool)
+        elif self.scheme == "implicit":
+            self._implicit = np.ones(offset, dtype=np.bool)
+        else:
+            dim_max = self.gb.dim_max()
+            self._implicit = np.hstack(
+                [np.full(g.num_cells, g.dim < dim_max) for g, _ in self.gb]
+            )
+
+        # Blocks of the upwind operator and mass of the implicitly treated rows,
+        # coupled to the implicit and explicit rows, respectively.
+        implicit = self._implicit
+        upwind_implicit = self._upwind[implicit]
+        self._upwind_ii = upwind_implicit[:, implicit].tocsc()
+        self._upwind_ie = upwind_implicit[:, ~implicit].tocsr()
+        self._mass_implicit = self._mass[implicit]
+
+        # Factorizations of the implicit system, one per substep size, with the
+        # most recently used last
+        self._factorizations = OrderedDict()
+        self._discretized = True
+
+    def _assign_discretizations(self):
+        term = "advection"
+        upwind = pp.Upwind(self.keyword)
+        coupling = pp.UpwindCoupling(self.keyword)
+        for _, d in self.gb:
+            d.setdefault(pp.PRIMARY_VARIABLES, {})[self.variable] = {"cells": 1}
+            d.setdefault(pp.DISCRETIZATION, {})[self.variable] = {term: upwind}
+        for e, d in self.gb.edges():
+            g1, g2 = self.gb.nodes_of_edge(e)
+            d.setdefault(pp.PRIMARY_VARIABLES, {})[self.mortar_variable] = {"cells": 1}
+            d.setdefault(pp.COUPLING_DISCRETIZATION, {})[self.mortar_variable] = {
+                g1: (self.variable, term),
+                g2: (self.variable, term),
+                e: (self.mortar_variable, coupling),
+            }
+
+    def num_dof(self):
+        """ Number of cells in the GridBucket, that is, the length of the
+        concentration vector (or number of rows for several components).
+        """
+        return self.gb.num_cells()
+
+    def dof_ind(self, g):
+        """ Indices of the cells of a grid in the concentration vector.
+
+        Parameters:
+            g (pp.Grid): Grid in the GridBucket.
+
+        Returns:
+            np.ndarray: Index of the cells of g.
+
+        """
+        if not self._discretized:
+            self.discretize()
+        return self._dof_ind[g]
+
+    def cfl(self):
+        """ Largest stable time step of the explicitly treated cells.
+
+        For a forward Euler step of the upwind scheme, the solution is bounded by
+        the values at the previous time, provided the time step does not exceed
+        the mass of a cell divided by its outflow.
+
+        Returns:
+            float: The CFL time step, np.inf if no cells are treated explicitly,
+                or if there is no outflow from these cells.
+
+        """
+        if not self._discretized:
+            self.discretize()
+        outflow = self._upwind.diagonal()
+        explicit = np.logical_and(np.logical_not(self._implicit), outflow > 0)
+        if not np.any(explicit):
+            return np.inf
+        return np.min(self._mass[explicit] / outflow[explicit])
+
+    def num_substeps(self, dt):
+        """ Number of substeps needed to take a time step within the CFL condition.
+
+        Parameters:
+            dt (float): Time step.
+
+        Returns:
+            int: Number of substeps of equal size.
+
+        """
+        max_dt = self.cfl_factor * self.cfl()
+        if self.scheme == "implicit" or np.isinf(max_dt):
+            return 1
+        return max(int(np.ceil(dt / max_dt * (1 - 1e-12))), 1)
+
+    def step(self, c, dt, rhs=None):
+        """ Advance the concentration one time step.
+
+        Parameters:
+            c (np.ndarray): Concentration, size num_dof(), or num_dof() x number of
+                components.
+            dt (float): Time step. Split into substeps according to the CFL
+                condition for the explicit and imex schemes.
+            rhs (np.ndarray, optional): Right hand side, with the same shape as c
+                or size num_dof(). Defaults to the contribution from the boundary
+                conditions given in the data dictionaries, for all components.
+
+        Returns:
+            np.ndarray: Concentration at the next time, same shape as c.
+
+        """
+        if not self._discretized:
+            self.discretize()
+        if rhs is None:
+            rhs = self._rhs
+        if c.ndim == 2 and rhs.ndim == 1:
+            rhs = rhs[:, np.newaxis]
+
+        num_substeps = self.num_substeps(dt)
+        sub_dt = dt / num_substeps
+        for _ in range(num_substeps):
+            c = self._substep(c, sub_dt, rhs)
+        return c
+
+    def _substep(self, c, dt, rhs):
+        # Explicit update of all cells: c + dt M^-1 (r - U c)
+        weight = dt / self._mass
+        if c.ndim == 2:
+            weight = weight[:, np.newaxis]
+        c_new = c + weight * (rhs - self._upwind * c)
+        if not np.any(self._implicit):
+            return c_new
+
+        # Implicit rows: (M / dt + U) c_new = M / dt c + r. Explicit rows have been
+        # updated above, and enter the system on the right hand side.
+        implicit = self._implicit
+        solve = self._factorization(dt)
+        b = (self._mass_implicit / dt).reshape((-1,) + (1,) * (c.ndim - 1))
+        rhs_i = b * c[implicit] + rhs[implicit] - self._upwind_ie * c_new[~implicit]
+        c_new[implicit] = solve(rhs_i)
+        return c_new
+
+    def _factorization(self, dt):
+        # Least recently used cache of factorizations
+        if dt in self._factorizations:
+            self._factorizations.move_to_end(dt)
+            return self._factorizations[dt]
+
+        A = sps.diags(self._mass_implicit / dt) + self._upwind_ii
+        self._factorizations[dt] = spla.splu(A.tocsc()).solve
+        while len(self._factorizations) > max(self.max_factorizations, 1):
+            self._factorizations.popitem(last=False)
+        return self._factorizations[dt]
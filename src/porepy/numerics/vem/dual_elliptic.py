@@ -559,3 +559,65 @@ class DualElliptic(
         """
         # pylint: disable=invalid-name
         return solution_array[g.num_faces :]
+
+    @staticmethod
+    def _cells_by_num_faces(g):
+        """ Group the cells of a grid by their number of faces.
+
+        Grouping allows the local matrices of all cells in a group to be computed
+        as stacked dense arrays.
+
+        Parameters
+        ----------
+        g : grid, or a subclass.
+
+        Return
+        ------
+        list of tuples, one per group, with entries
+            cells : array (num_cells_in_group) Cells in the group.
+            faces : ndarray (num_cells_in_group, num_faces_of_cell) Faces of the
+                cells.
+            sign : ndarray (num_cells_in_group, num_faces_of_cell) Orientation
+                of the faces relative to the cells, as in g.cell_faces.
+
+        """
+        cell_faces = g.cell_faces.tocsc()
+        num_faces = np.diff(cell_faces.indptr)
+
+        groups = []
+        for nf in np.unique(num_faces):
+            cells = np.where(num_faces == nf)[0]
+            ind = cell_faces.indptr[cells].reshape((-1, 1)) + np.arange(nf)
+            groups.append((cells, cell_faces.indices[ind], cell_faces.data[ind]))
+        return groups
+
+    @staticmethod
+    def _assemble_local_matrices(g, faces, local_matrices):
+        """ Assemble local face matrices, computed for groups of cells, into a
+        global matrix.
+
+        Parameters
+        ----------
+        g : grid, or a subclass.
+        faces : list of ndarray (num_cells_in_group, num_faces_of_cell) Faces of
+            the cells in each group.
+        local_matrices : list of ndarray (num_cells_in_group, num_faces_of_cell,
+            num_faces_of_cell) Local matrices of the cells in each group.
+
+        Return
+        ------
+        sps.coo_matrix (g.num_faces, g.num_faces): The global matrix.
+
+        """
+        rows, cols, vals = [], [], []
+        for f, A in zip(faces, local_matrices):
+            rows.append(np.broadcast_to(f[:, :, np.newaxis], A.shape).ravel())
+            cols.append(np.broadcast_to(f[:, np.newaxis, :], A.shape).ravel())
+            vals.append(A.ravel())
+
+        if len(vals) == 0:
+            return sps.coo_matrix((g.num_faces, g.num_faces))
+        return sps.coo_matrix(
+            (np.hstack(vals), (np.hstack(rows), np.hstack(cols))),
+            shape=(g.num_faces, g.num_faces),
+        )
@@ -69,10 +69,6 @@ class MVEM(pp.numerics.vem.dual_elliptic.DualElliptic):
         # Retrieve the permeability
         k = parameter_dictionary["second_order_tensor"]
 
-        faces, cells, sign = sps.find(g.cell_faces)
-        index = np.argsort(cells)
-        faces, sign = faces[index], sign[index]
-
         # Map the domain to a reference geometry (i.e. equivalent to compute
         # surface coordinates in 1d and 2d)
         deviation_from_plane_tol = data.get("deviation_from_plane_tol", 1e-5)
@@ -96,41 +92,25 @@ class MVEM(pp.numerics.vem.dual_elliptic.DualElliptic):
         # Weight for the stabilization term
         weight = np.power(diams, 2 - g.dim)
 
-        # Allocate the data to store matrix entries, that's the most efficient
-        # way to create a sparse matrix.
-        size = np.sum(np.square(g.cell_faces.indptr[1:] - g.cell_faces.indptr[:-1]))
-        I = np.empty(size, dtype=np.int)
-        J = np.empty(size, dtype=np.int)
-        dataIJ = np.empty(size)
-        idx = 0
-
-        for c in np.arange(g.num_cells):
-            # For the current cell retrieve its faces
-            loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-            faces_loc = faces[loc]
-
-            # Compute the H_div-mass local matrix
-            A = self.massHdiv(
-                k.values[0 : g.dim, 0 : g.dim, c],
-                c_centers[:, c],
-                g.cell_volumes[c],
-                f_centers[:, faces_loc],
-                f_normals[:, faces_loc],
-                sign[loc],
-                diams[c],
-                weight[c],
+        # Compute the H_div-mass local matrices for groups of cells with the same
+        # number of faces
+        faces, local_mass = [], []
+        for cells, faces_loc, sign in self._cells_by_num_faces(g):
+            A = self._mass_hdiv_cells(
+                k.values[0 : g.dim, 0 : g.dim, cells].transpose((2, 0, 1)),
+                c_centers[:, cells],
+                g.cell_volumes[cells],
+                f_centers[:, faces_loc].transpose((1, 0, 2)),
+                f_normals[:, faces_loc].transpose((1, 0, 2)),
+                sign,
+                diams[cells],
+                weight[cells],
             )[0]
-
-            # Save values for Hdiv-mass local matrix in the global structure
-            cols = np.tile(faces_loc, (faces_loc.size, 1))
-            loc_idx = slice(idx, idx + cols.size)
-            I[loc_idx] = cols.T.ravel()
-            J[loc_idx] = cols.ravel()
-            dataIJ[loc_idx] = A.ravel()
-            idx += cols.size
+            faces.append(faces_loc)
+            local_mass.append(A)
 
         # Construct the global matrices
-        mass = sps.coo_matrix((dataIJ, (I, J)))
+        mass = self._assemble_local_matrices(g, faces, local_mass)
         div = -g.cell_faces.T
 
         matrix_dictionary["mass"] = mass
@@ -168,10 +148,6 @@ class MVEM(pp.numerics.vem.dual_elliptic.DualElliptic):
         # thus we assign a unit permeability to be passed to MVEM.massHdiv
         k = pp.SecondOrderTensor(kxx=np.ones(g.num_cells))
 
-        faces, cells, sign = sps.find(g.cell_faces)
-        index = np.argsort(cells)
-        faces, sign = faces[index], sign[index]
-
         # Map the domain to a reference geometry (i.e. equivalent to compute
         # surface coordinates in 1d and 2d)
         deviation_from_plane_tol = data.get("deviation_from_plane_tol", 1e-5)
@@ -186,25 +162,23 @@ class MVEM(pp.numerics.vem.dual_elliptic.DualElliptic):
 
         P0u = np.zeros((3, g.num_cells))
 
-        for c in np.arange(g.num_cells):
-            loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-            faces_loc = faces[loc]
-
-            Pi_s = self.massHdiv(
-                k.values[0 : g.dim, 0 : g.dim, c],
-                c_centers[:, c],
-                g.cell_volumes[c],
-                f_centers[:, faces_loc],
-                f_normals[:, faces_loc],
-                sign[loc],
-                diams[c],
+        for cells, faces_loc, sign in self._cells_by_num_faces(g):
+            Pi_s = self._mass_hdiv_cells(
+                k.values[0 : g.dim, 0 : g.dim, cells].transpose((2, 0, 1)),
+                c_centers[:, cells],
+                g.cell_volumes[cells],
+                f_centers[:, faces_loc].transpose((1, 0, 2)),
+                f_normals[:, faces_loc].transpose((1, 0, 2)),
+                sign,
+                diams[cells],
             )[1]
 
-            # extract the velocity for the current cell
-            P0u[dim, c] = np.dot(Pi_s, u[faces_loc]) / diams[c]
-            P0u[:, c] = np.dot(R.T, P0u[:, c])
+            # extract the velocity for the cells
+            P0u[np.ix_(dim, cells)] = (
+                np.einsum("cif,cf->ic", Pi_s, u[faces_loc]) / diams[cells]
+            )
 
-        return P0u
+        return np.dot(R.T, P0u)
 
     @staticmethod
     def massHdiv(K, c_center, c_volume, f_centers, normals, sign, diam, weight=0):
@@ -266,6 +240,70 @@ class MVEM(pp.numerics.vem.dual_elliptic.DualElliptic):
 
         return A, Pi_s
 
+    @staticmethod
+    def _mass_hdiv_cells(
+        K, c_centers, c_volumes, f_centers, normals, sign, diams, weights=None
+    ):
+        """ Compute the local mass Hdiv matrices for a set of cells with the same
+        number of faces, see massHdiv.
+
+        Parameters
+        ----------
+        K : ndarray (num_cells, g.dim, g.dim)
+            Permeability of the cells.
+        c_centers : ndarray (g.dim, num_cells)
+            Cell centers.
+        c_volumes : array (num_cells)
+            Cell volumes.
+        f_centers : ndarray (num_cells, g.dim, num_faces_of_cell)
+            Center of the faces of the cells.
+        normals : ndarray (num_cells, g.dim, num_faces_of_cell)
+            Normal of the faces of the cells weighted by the face areas.
+        sign : ndarray (num_cells, num_faces_of_cell)
+            +1 or -1 if the normal is inward or outward to the cell.
+        diams : array (num_cells)
+            Diameter of the cells.
+        weights : array (num_cells)
+            weight for the stabilization term. Optional, default = 0.
+
+        Return
+        ------
+        out: ndarray (num_cells, num_faces_of_cell, num_faces_of_cell)
+            Local mass Hdiv matrices.
+        Pi_s: ndarray (num_cells, g.dim, num_faces_of_cell)
+            Local projection operators.
+        """
+        # Allow short variable names in this function
+        # pylint: disable=invalid-name
+
+        num_faces = sign.shape[1]
+        scaling = diams.reshape((-1, 1, 1))
+
+        # local matrices D, G and F, with rows (or columns) for the gradients of
+        # the scaled monomials
+        D = np.einsum("cjf,cji->cfi", normals, K) / scaling
+        G = K * (c_volumes / np.square(diams)).reshape((-1, 1, 1))
+        F = (
+            sign[:, np.newaxis, :]
+            * (f_centers - c_centers.T[:, :, np.newaxis])
+            / scaling
+        )
+
+        assert np.allclose(G, np.matmul(F, D)), "G is not equal to F*D"
+
+        # local matrices Pi_s
+        Pi_s = np.linalg.solve(G, F)
+        I_Pi = np.eye(num_faces) - np.matmul(D, Pi_s)
+
+        # local Hdiv-mass matrices
+        A = np.matmul(Pi_s.transpose((0, 2, 1)), np.matmul(G, Pi_s))
+        if weights is not None:
+            inv_K_norm = np.abs(np.linalg.inv(K)).sum(axis=2).max(axis=1)
+            w = (weights * inv_K_norm).reshape((-1, 1, 1))
+            A += w * np.matmul(I_Pi.transpose((0, 2, 1)), I_Pi)
+
+        return A, Pi_s
+
     @staticmethod
     def check_conservation(g, u):
         """
@@ -275,14 +313,4 @@ class MVEM(pp.numerics.vem.dual_elliptic.DualElliptic):
         g: grid, or a subclass.
         u : array (g.num_faces) velocity at each face.
         """
-        faces, cells, sign = sps.find(g.cell_faces)
-        index = np.argsort(cells)
-        faces, sign = faces[index], sign[index]
-
-        conservation = np.empty(g.num_cells)
-        for c in np.arange(g.num_cells):
-            # For the current cell retrieve its faces
-            loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-            conservation[c] = np.sum(u[faces[loc]] * sign[loc])
-
-        return conservation
+        return g.cell_faces.T * u
@@ -5,7 +5,6 @@ Contains standard values (e.g. found in Wikipedia) for density, thermal properti
 Note that thermal expansion coefficients are linear (m/mK) for rocks, but
 volumetric (m^3/m^3K) for fluids.
 """
-import numpy as np
 import porepy as pp
 
 
@@ -59,7 +58,7 @@ class Water:
         return (
             0.0002115
             + 1.32 * 1e-6 * delta_theta
-            + 1.09 * 1e-8 * np.power(delta_theta, 2)
+            + 1.09 * 1e-8 * delta_theta ** 2
         )
 
     def density(self, theta=None):  # theta in CELSIUS
@@ -77,8 +76,8 @@ class Water:
         return (
             0.56
             + 0.002 * theta
-            - 1.01 * 1e-5 * np.power(theta, 2)
-            + 6.71 * 1e-9 * np.power(theta, 3)
+            - 1.01 * 1e-5 * theta ** 2
+            + 6.71 * 1e-9 * theta ** 3
         )
 
     def specific_heat_capacity(self, theta=None):  # theta in CELSIUS
@@ -93,7 +92,7 @@ class Water:
             theta = self.theta_ref
         theta = pp.CELSIUS_to_KELVIN(theta)
         mu_0 = 2.414 * 1e-5 * (pp.PASCAL * pp.SECOND)
-        return mu_0 * np.power(10, 247.8 / (theta - 140))
+        return mu_0 * 10 ** (247.8 / (theta - 140))
 
     def hydrostatic_pressure(self, depth, theta=None):
         rho = self.density(theta)
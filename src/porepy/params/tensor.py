@@ -17,6 +17,12 @@ class SecondOrderTensor(object):
     The permeability is always 3-dimensional (since the geometry is always 3D),
     however, 1D and 2D problems are accomodated by assigning unit values to kzz
     and kyy, and no cross terms.
+
+    Only the components given to the constructor are stored. The (3, 3, Nc)
+    matrix is formed the first time the attribute values is accessed, and is
+    thereafter kept, so that modifications of values are preserved. For
+    discretizations on parts of the grid, restrict() gives a tensor on a subset
+    of the cells without forming the full matrix.
     """
 
     def __init__(self, kxx, kyy=None, kzz=None, kxy=None, kxz=None, kyz=None):
@@ -36,8 +42,17 @@ class SecondOrderTensor(object):
         Raises:
             ValueError if the permeability is not positive definite.
        """
-        Nc = kxx.size
-        perm = np.zeros((3, 3, Nc))
+        # Components that are given, copied to decouple them from the input.
+        # Scalar components are expanded to one value per cell.
+        components = {"kxx": kxx, "kyy": kyy, "kzz": kzz}
+        components.update({"kxy": kxy, "kxz": kxz, "kyz": kyz})
+        nc = np.size(kxx)
+        self._components = {
+            key: np.broadcast_to(val, nc).astype(np.float)
+            for key, val in components.items()
+            if val is not None
+        }
+        self._values = None
 
         if np.any(kxx < 0):
             raise ValueError(
@@ -45,17 +60,17 @@ class SecondOrderTensor(object):
                 "components in x-direction"
             )
 
-        perm[0, 0, ::] = kxx
-
-        # Assign unit values to the diagonal, these are overwritten later if
-        # the specified data
-        perm[1, 1, ::] = 1
-        perm[2, 2, ::] = 1
-
         if kyy is None:
             kyy = kxx
+        if kzz is None:
+            kzz = kxx
         if kxy is None:
             kxy = 0 * kxx
+        if kxz is None:
+            kxz = 0 * kxx
+        if kyz is None:
+            kyz = 0 * kxx
+
         # Onsager's principle - tensor should be positive definite
         if np.any((kxx * kyy - kxy * kxy) < 0):
             raise ValueError(
@@ -63,20 +78,6 @@ class SecondOrderTensor(object):
                 "components in y-direction"
             )
 
-        perm[1, 0, ::] = kxy
-        perm[0, 1, ::] = kxy
-        perm[1, 1, ::] = kyy
-
-        if kyy is None:
-            kyy = kxx
-        if kzz is None:
-            kzz = kxx
-        if kxy is None:
-            kxy = 0 * kxx
-        if kxz is None:
-            kxz = 0 * kxx
-        if kyz is None:
-            kyz = 0 * kxx
         # Onsager's principle - tensor should be positive definite
         if np.any(
             (
@@ -91,13 +92,46 @@ class SecondOrderTensor(object):
                 "components in z-direction"
             )
 
-        perm[2, 0, ::] = kxz
-        perm[0, 2, ::] = kxz
-        perm[2, 1, ::] = kyz
-        perm[1, 2, ::] = kyz
-        perm[2, 2, ::] = kzz
+    @property
+    def values(self):
+        """ np.ndarray, (3, 3, Nc): Cell-wise permeability matrices.
 
-        self.values = perm
+        The matrices are formed from the stored components on first access.
+        """
+        if self._values is None:
+            # From now on, the matrices are the only representation of the tensor
+            self._values = self._matrices()
+            self._components = None
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self._components = None
+
+    def _matrices(self):
+        # The cell-wise matrices, without changing the representation of the tensor
+        if self._values is not None:
+            return self._values
+        comp = self._components
+        kxx = comp["kxx"]
+        perm = np.zeros((3, 3, kxx.size))
+
+        perm[0, 0, ::] = kxx
+        perm[1, 1, ::] = comp.get("kyy", kxx)
+        perm[2, 2, ::] = comp.get("kzz", kxx)
+        for (i, j), key in zip([(1, 0), (2, 0), (2, 1)], ["kxy", "kxz", "kyz"]):
+            if key in comp:
+                perm[i, j, ::] = comp[key]
+                perm[j, i, ::] = comp[key]
+        return perm
+
+    def _new(self, components, values):
+        # Create a tensor from its representation, without validation
+        k = SecondOrderTensor.__new__(SecondOrderTensor)
+        k._components = components
+        k._values = values
+        return k
 
     def copy(self):
         """
@@ -107,16 +141,26 @@ class SecondOrderTensor(object):
             SecondOrderTensor: New tensor with identical fields, but separate
                 arrays (in the memory sense).
         """
+        if self._values is not None:
+            return self._new(None, self._values.copy())
+        components = {key: val.copy() for key, val in self._components.items()}
+        return self._new(components, None)
 
-        kxx = self.values[0, 0, :].copy()
-        kxy = self.values[1, 0, :].copy()
-        kyy = self.values[1, 1, :].copy()
+    def restrict(self, cells):
+        """
+        Restrict the tensor to a subset of the cells.
 
-        kxz = self.values[2, 0, :].copy()
-        kyz = self.values[2, 1, :].copy()
-        kzz = self.values[2, 2, :].copy()
+        Parameters:
+            cells (np.ndarray): Indices of the cells to keep.
 
-        return SecondOrderTensor(kxx, kxy=kxy, kxz=kxz, kyy=kyy, kyz=kyz, kzz=kzz)
+        Returns:
+            SecondOrderTensor: New tensor on the given cells, with arrays separate
+                from this tensor.
+        """
+        if self._values is not None:
+            return self._new(None, self._values[::, ::, cells])
+        components = {key: val[cells] for key, val in self._components.items()}
+        return self._new(components, None)
 
     def rotate(self, R):
         """
@@ -146,6 +190,11 @@ class FourthOrderTensor(object):
     Primary usage for the class is for mpsa discretizations. Other applications
     have not been tested.
 
+    Only the Lame parameters are stored on construction. The cell-wise matrices
+    are formed the first time the attribute values is accessed, and are thereafter
+    kept. restrict() gives a tensor on a subset of the cells without forming the
+    matrices, as is done in the local problems of mpsa.
+
     Attributes:
         values - numpy.ndarray, dimensions (3^2, 3^2, nc), cell-wise
             representation of the stiffness matrix.
@@ -154,6 +203,47 @@ class FourthOrderTensor(object):
 
     """
 
+    # Basis for the contributions of mu, lmbda and phi is hard-coded
+    _mu_mat = np.array(
+        [
+            [2, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 1, 0, 1, 0, 0, 0, 0, 0],
+            [0, 0, 1, 0, 0, 0, 1, 0, 0],
+            [0, 1, 0, 1, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 2, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 1, 0, 1, 0],
+            [0, 0, 1, 0, 0, 0, 1, 0, 0],
+            [0, 0, 0, 0, 0, 1, 0, 1, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 2],
+        ]
+    )
+    _lmbda_mat = np.array(
+        [
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+        ]
+    )
+    _phi_mat = np.array(
+        [
+            [0, 1, 1, 1, 0, 1, 1, 1, 0],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [0, 1, 1, 1, 0, 1, 1, 1, 0],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [1, 0, 0, 0, 1, 0, 0, 0, 1],
+            [0, 1, 1, 1, 0, 1, 1, 1, 0],
+        ]
+    )
+
     def __init__(self, mu, lmbda, phi=None):
         """ Constructor for fourth order tensor on Lame-parameter form
 
@@ -176,8 +266,9 @@ class FourthOrderTensor(object):
         if mu.size != lmbda.size:
             raise ValueError("Mu and lmbda should have the same length")
 
+        # The default value for phi, None, represents zero
         if phi is None:
-            phi = 0 * mu  # Default value for phi is zero
+            pass
         elif not isinstance(phi, np.ndarray):
             raise ValueError("Phi should be a numpy array")
         elif not phi.ndim == 1:
@@ -185,58 +276,59 @@ class FourthOrderTensor(object):
         elif phi.size != lmbda.size:
             raise ValueError("Phi and Lmbda should have the same length")
 
-        # Save lmbda and mu, can be useful to have in some cases
+        # Save lmbda and mu, can be useful to have in some cases. The stiffness
+        # matrices are formed from these when needed.
         self.lmbda = lmbda
         self.mu = mu
+        self._phi = phi
+        self._values = None
 
-        # Basis for the contributions of mu, lmbda and phi is hard-coded
-        mu_mat = np.array(
-            [
-                [2, 0, 0, 0, 0, 0, 0, 0, 0],
-                [0, 1, 0, 1, 0, 0, 0, 0, 0],
-                [0, 0, 1, 0, 0, 0, 1, 0, 0],
-                [0, 1, 0, 1, 0, 0, 0, 0, 0],
-                [0, 0, 0, 0, 2, 0, 0, 0, 0],
-                [0, 0, 0, 0, 0, 1, 0, 1, 0],
-                [0, 0, 1, 0, 0, 0, 1, 0, 0],
-                [0, 0, 0, 0, 0, 1, 0, 1, 0],
-                [0, 0, 0, 0, 0, 0, 0, 0, 2],
-            ]
-        )
-        lmbda_mat = np.array(
-            [
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [0, 0, 0, 0, 0, 0, 0, 0, 0],
-                [0, 0, 0, 0, 0, 0, 0, 0, 0],
-                [0, 0, 0, 0, 0, 0, 0, 0, 0],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [0, 0, 0, 0, 0, 0, 0, 0, 0],
-                [0, 0, 0, 0, 0, 0, 0, 0, 0],
-                [0, 0, 0, 0, 0, 0, 0, 0, 0],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-            ]
-        )
-        phi_mat = np.array(
-            [
-                [0, 1, 1, 1, 0, 1, 1, 1, 0],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [0, 1, 1, 1, 0, 1, 1, 1, 0],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [1, 0, 0, 0, 1, 0, 0, 0, 1],
-                [0, 1, 1, 1, 0, 1, 1, 1, 0],
-            ]
-        )
+    @property
+    def values(self):
+        """ np.ndarray, (9, 9, nc): Cell-wise stiffness matrices.
 
+        The matrices are formed from the Lame parameters on first access.
+        """
+        if self._values is None:
+            self._values = self._matrices()
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+
+    def _matrices(self):
+        # The cell-wise matrices, computed if they are not stored
+        if self._values is not None:
+            return self._values
         # Expand dimensions to prepare for cell-wise representation
-        mu_mat = mu_mat[:, :, np.newaxis]
-        lmbda_mat = lmbda_mat[:, :, np.newaxis]
-        phi_mat = phi_mat[:, :, np.newaxis]
-
-        c = mu_mat * mu + lmbda_mat * lmbda + phi_mat * phi
-        self.values = c
+        c = (
+            self._mu_mat[:, :, np.newaxis] * self.mu
+            + self._lmbda_mat[:, :, np.newaxis] * self.lmbda
+        )
+        if self._phi is not None:
+            c = c + self._phi_mat[:, :, np.newaxis] * self._phi
+        return c
 
     def copy(self):
         return FourthOrderTensor(mu=self.mu, lmbda=self.lmbda)
+
+    def restrict(self, cells):
+        """ Restrict the tensor to a subset of the cells.
+
+        Parameters
+        ----------
+        cells (numpy.ndarray), indices of the cells to keep.
+
+        Returns
+        -------
+        FourthOrderTensor, new tensor on the given cells, with arrays separate
+            from this tensor.
+
+        """
+        c = FourthOrderTensor.__new__(FourthOrderTensor)
+        c.lmbda = self.lmbda[cells]
+        c.mu = self.mu[cells]
+        c._phi = None if self._phi is None else self._phi[cells]
+        c._values = None if self._values is None else self._values[::, ::, cells]
+        return c
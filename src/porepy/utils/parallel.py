@@ -0,0 +1,21 @@
+""" Utility functions for execution in process pools.
+"""
+import multiprocessing
+
+
+def process_pool_context():
+    """ Multiprocessing context for process pools.
+
+    Forking a process that has started threads (e.g. the numba_parallel block
+    inverter, or the thread pool of Assembler.discretize) may deadlock the child.
+    Plain fork is therefore avoided where possible: The forkserver start method is
+    used if available, otherwise spawn.
+
+    Returns:
+        multiprocessing.context.BaseContext: Context to be passed as mp_context to
+            concurrent.futures.ProcessPoolExecutor.
+
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
@@ -6,6 +6,7 @@ Created on Thu Feb 25 20:16:42 2016
 """
 from __future__ import division
 import numpy as np
+from scipy.spatial import cKDTree
 
 
 def unique_rows(data):
@@ -176,10 +177,8 @@ def unique_columns_tol(mat, tol=1e-8, exponent=2):
         return mat, np.array([], dtype=int), np.array([], dtype=int)
 
     # If the matrix is integers, and the tolerance less than 1/2, we can use
-    # the new unique function that ships with numpy 1.13. This comes with a
-    # significant speedup, in particular for large arrays (runtime has gone
-    # from hours to split-seconds - that is, the alternative implementation
-    # below is ineffecient).
+    # the new unique function that ships with numpy 1.13. This is faster than the
+    # tolerance based implementation below, in particular for large arrays.
     # If the current numpy version is older, an ugly hack is possible: Download
     # the file from the numpy repositories, and place it somewhere in
     # $PYHTONPATH, with the name 'numpy_113_unique'.
@@ -203,42 +202,106 @@ def unique_columns_tol(mat, tol=1e-8, exponent=2):
             except:
                 pass
 
-    def dist(p, pset):
-        " Helper function to compute distance "
-        if p.ndim == 1:
-            pt = p.reshape((-1, 1))
-        else:
-            pt = p
-
-        return np.power(
-            np.sum(np.power(np.abs(pt - pset), exponent), axis=0), 1 / exponent
+    (nd, l) = mat.shape
+    radius = tol * np.sqrt(nd)
+
+    # Columns are processed in order: A column is kept unless it is closer than
+    # the radius to a column that is kept already. Removed columns are mapped to
+    # the first such column.
+
+    # Find all pairs of columns within the radius. Use a KD-tree to only compare
+    # neighboring columns. The tree does not support exponents less than 1, in
+    # which case all columns are compared.
+    all_pairs = _close_column_pairs(mat, radius, exponent)
+    pairs = all_pairs
+
+    # Status of the columns: 1 is kept, -1 is removed, 0 is not yet decided
+    status = np.zeros(l, dtype=np.int)
+    # Columns with no close predecessors are kept
+    status[np.setdiff1d(np.arange(l), pairs[1])] = 1
+
+    # Resolve the remaining columns. In each round, columns close to a kept
+    # predecessor are removed, and columns where all close predecessors are removed
+    # are kept. Clusters of close columns are normally resolved in a few rounds;
+    # long chains of columns are resolved one by one.
+    max_rounds = 10
+    for _ in range(max_rounds):
+        pairs = pairs[:, status[pairs[1]] == 0]
+        if pairs.shape[1] == 0:
+            break
+        removed = pairs[1, status[pairs[0]] == 1]
+        status[removed] = -1
+
+        pairs = pairs[:, status[pairs[1]] == 0]
+        not_removed = np.bincount(
+            pairs[1], weights=status[pairs[0]] != -1, minlength=l
         )
+        undecided = np.zeros(l, dtype=np.bool)
+        undecided[pairs[1]] = True
+        status[np.logical_and(undecided, not_removed == 0)] = 1
+    else:
+        pairs = pairs[:, status[pairs[1]] == 0]
+        # Sort by the second column of the pairs
+        pairs = pairs[:, np.argsort(pairs[1], kind="stable")]
+        columns, start = np.unique(pairs[1], return_index=True)
+        end = np.hstack((start[1:], pairs.shape[1]))
+        for ci, si, ei in zip(columns, start, end):
+            if np.any(status[pairs[0, si:ei]] == 1):
+                status[ci] = -1
+            else:
+                status[ci] = 1
 
-    (nd, l) = mat.shape
+    keep = status == 1
+    new_2_old = np.argwhere(keep).ravel()
 
-    # By default, no columns are kept
-    keep = np.zeros(l, dtype=np.bool)
+    # Map from old points to the unique subspace. Removed points are mapped to
+    # the first kept point within the radius.
+    old_2_new = np.cumsum(keep) - 1
+    pairs = all_pairs[
+        :, np.logical_and(keep[all_pairs[0]], np.logical_not(keep[all_pairs[1]]))
+    ]
+    # Sort the pairs by the second and then the first column
+    order = np.lexsort((pairs[0], pairs[1]))
+    pairs = pairs[:, order]
+    _, first = np.unique(pairs[1], return_index=True)
+    old_2_new[pairs[1, first]] = old_2_new[pairs[0, first]]
 
-    # We will however keep the first point
-    keep[0] = True
-    keep_counter = 1
+    return mat[:, keep], new_2_old, old_2_new
 
-    # Map from old points to the unique subspace. Defaults to map to itself.
-    old_2_new = np.arange(l)
 
-    # Loop over all points, check if it is already represented in the kept list
-    for i in range(1, l):
-        proximate = np.argwhere(dist(mat[:, i], mat[:, keep]) < tol * np.sqrt(nd))
+def _close_column_pairs(mat, radius, exponent):
+    """ Find all pairs of columns in a matrix closer than a given distance.
 
-        if proximate.size > 0:
-            # We will not keep this point
-            old_2_new[i] = proximate[0]
-        else:
-            # We have found a new point
-            keep[i] = True
-            old_2_new[i] = keep_counter
-            keep_counter += 1
-    # Finally find which elements we kept
-    new_2_old = np.argwhere(keep).ravel()
+    Parameters:
+        mat (np.ndarray, nd x n_pts): Columns to be compared.
+        radius (double): Distance below which columns are considered close.
+        exponent (double): Exponent in the norm used in distance calculation.
 
-    return mat[:, keep], new_2_old, old_2_new
+    Returns:
+        np.ndarray, 2 x n_pairs: Pairs of close columns, with the lowest index in
+            the first row.
+
+    """
+
+    def dist(a, b):
+        " Helper function to compute distance "
+        return np.power(
+            np.sum(np.power(np.abs(a - b), exponent), axis=0), 1 / exponent
+        )
+
+    num_pts = mat.shape[1]
+    if exponent >= 1:
+        # The tree uses distance less than or equal to the radius, and may round
+        # differently from dist(). Search with a slightly larger radius, and
+        # filter below.
+        tree = cKDTree(mat.T)
+        pairs = tree.query_pairs(
+            radius * (1 + 1e-8), p=exponent, output_type="ndarray"
+        ).T
+    else:
+        first, second = np.triu_indices(num_pts, k=1)
+        pairs = np.vstack((first, second))
+    pairs = pairs.reshape((2, -1)).astype(np.int)
+
+    close = dist(mat[:, pairs[0]], mat[:, pairs[1]]) < radius
+    return np.sort(pairs[:, close], axis=0)
@@ -9,4 +9,6 @@ Modules:
     plot_grid: Python plotting of grids and grid buckets. Both the geometry and data can
         be shown. The latter is represented either by cell-wise color maps or cell- or
         face-wise arrows for vectors.
+    vtu_writer: Writing of vtu files directly from numpy arrays, possibly on a
+        background thread. Used as a backend for the exporter.
 """
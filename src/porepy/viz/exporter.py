@@ -6,24 +6,26 @@ associated data to the vtu format. For grid buckets with multiple grids, one
 vtu file is printed for each grid. For transient simulations with multiple
 time steps, a single pvd file takes care of the ordering of all printed vtu
 files.
+
+The files are written either by the vtk module, or directly from numpy arrays by
+the writer in porepy.viz.vtu_writer. The latter also allows for writing the files
+on a background thread.
 """
 
 import sys, os
 import numpy as np
-import scipy.sparse as sps
 import logging
 import warnings
 import porepy as pp
+from porepy.viz import vtu_writer
 
 try:
     import vtk
     import vtk.util.numpy_support as ns
 except ImportError:
-    warnings.warn("No vtk module loaded. Export with pp.Exporter will not work.")
-try:
-    import numba
-except ImportError:
-    warnings.warn("Numba not available. Export may be slow for large grids")
+    warnings.warn(
+        "No vtk module loaded. Export with pp.Exporter requires backend='numpy'."
+    )
 
 # Module-wide logger
 logger = logging.getLogger(__name__)
@@ -173,6 +175,18 @@ class Exporter:
             grid changes in time or not. The default is True.
         binary: export in binary format, default is True.
         simplicial: consider only simplicial elements (triangles and tetra)
+        backend: the writer of the vtu files, either "vtk" (default), which uses
+            the vtk module, or "numpy", which writes the files directly from the
+            numpy arrays, see porepy.viz.vtu_writer. The latter does not require
+            vtk, and writes the geometry of a fixed grid from a cache.
+        asynchronous: write the files on a background thread, so that the
+            computations can continue during the export. Only available for the
+            numpy backend. Call flush() to wait for the files to be written; this
+            is also done by write_pvd(). The default is False.
+        geometry_cache: folder in which the geometry of the grids, in the layout of
+            the vtu format, is stored for reuse by later exports of the same grids,
+            see porepy.viz.vtu_writer.VtuGeometry.from_grids(). By default, the
+            geometry is not stored.
 
         How to use:
         If you need to export a single grid:
@@ -202,7 +216,10 @@ class Exporter:
         is_mortar, mortar_side, cell_id
 
         Raises:
-        ImportError if the module vtk is not available
+        ImportError if the module vtk is not available, and the vtk backend is
+            used.
+        ValueError if the backend is unknown, or if asynchronous export is
+            requested for the vtk backend.
 
         """
 
@@ -212,13 +229,38 @@ class Exporter:
         self.fixed_grid = kwargs.get("fixed_grid", True)
         self.binary = kwargs.get("binary", True)
         self.simplicial = kwargs.get("simplicial", False)
+        self.backend = kwargs.get("backend", "vtk")
+        self.geometry_cache = kwargs.get("geometry_cache", None)
+        asynchronous = kwargs.get("asynchronous", False)
 
-        self.is_GridBucket = isinstance(self.gb, pp.GridBucket)
-        self.is_not_vtk = "vtk" not in sys.modules
+        if self.backend not in ("vtk", "numpy"):
+            raise ValueError("Unknown export backend " + str(self.backend))
+        if asynchronous and self.backend != "numpy":
+            raise ValueError("Asynchronous export requires the numpy backend")
+
+        self.is_not_vtk = self.backend == "vtk" and "vtk" not in sys.modules
 
         if self.is_not_vtk:
             raise ImportError("Could not load vtk module")
 
+        # Writer of files on a background thread
+        self._writer = vtu_writer.BackgroundWriter() if asynchronous else None
+
+        self._set_dims()
+
+        if self.fixed_grid:
+            self._update_gb_VTK()
+
+        # Counter for time step. Will be used to identify files of individual time step,
+        # unless this is overridden by optional parameters in write_vtk
+        self._time_step_counter = 0
+        # Storage for file name extensions for time steps
+        self._exported_time_step_file_names = []
+
+    # ------------------------------------------------------------------------------#
+
+    def _set_dims(self):
+        self.is_GridBucket = isinstance(self.gb, pp.GridBucket)
         if self.is_GridBucket:
             # Fixed-dimensional grids to be included in the export. We include
             # all but the 0-d grids
@@ -233,17 +275,6 @@ class Exporter:
         else:
             self.gb_VTK = None
 
-        self.has_numba = "numba" in sys.modules
-
-        if self.fixed_grid:
-            self._update_gb_VTK()
-
-        # Counter for time step. Will be used to identify files of individual time step,
-        # unless this is overridden by optional parameters in write_vtk
-        self._time_step_counter = 0
-        # Storage for file name extensions for time steps
-        self._exported_time_step_file_names = []
-
     # ------------------------------------------------------------------------------#
 
     def change_name(self, file_name):
@@ -295,10 +326,12 @@ class Exporter:
 
         if self.fixed_grid and grid is not None:
             raise ValueError("Inconsistency in exporter setting")
-        elif not self.fixed_grid and grid is not None:
-            self.gb = grid
-            self.is_GridBucket = isinstance(self.gb, pp.GridBucket)
-            self._update_gVTK()
+        elif not self.fixed_grid:
+            # The grid may have changed, either by a new grid, or in place
+            if grid is not None:
+                self.gb = grid
+                self._set_dims()
+            self._update_gb_VTK()
 
         # If the problem is time dependent, but no time step is set, we set one
         if time_dependent and time_step is not None:
@@ -339,6 +372,9 @@ class Exporter:
         if self.is_not_vtk:
             return
 
+        # Make sure the files in the collection are written
+        self.flush()
+
         if file_extension is None:
             file_extension = self._exported_time_step_file_names
 
@@ -367,6 +403,16 @@ class Exporter:
 
     # ------------------------------------------------------------------------------#
 
+    def flush(self):
+        """
+        Wait for the files of asynchronous export to be written. Errors during
+        writing are raised here, if not raised by an earlier call to write_vtk.
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    # ------------------------------------------------------------------------------#
+
     def _export_vtk_single(self, data, time_step, point_data):
         """
         Export a single grid (not grid bucket) to a vtu file.
@@ -378,6 +424,9 @@ class Exporter:
         # Provide an empty dict if data is None
         if data is None:
             data = dict()
+        elif self._writer is not None:
+            # The arrays may be modified before they are written
+            data = {n: np.array(v) for n, v in data.items()}
 
         fields = Fields()
         if len(data) > 0:
@@ -554,96 +603,76 @@ class Exporter:
 
     def _export_vtk_grid(self, gs, dim):
         """
-        Wrapper function to export grids of dimension dim. Calls the
-        appropriate dimension specific export function.
+        Export the geometrical data (point coordinates) and connectivity
+        information of grids of dimension dim. In 2d the cells are represented as
+        polygons, while in 3d as polyhedra (or tetrahedra, if simplicial).
+
+        The geometry is returned in the format of the backend: a VtuGeometry for
+        the numpy backend, or a vtkUnstructuredGrid for vtk.
         """
         if dim == 0:
             return
-        elif dim == 1:
-            return self._export_vtk_1d(gs)
-        elif dim == 2:
-            return self._export_vtk_2d(gs)
-        elif dim == 3:
-            return self._export_vtk_3d(gs)
-
-    # ------------------------------------------------------------------------------#
+        geometry = vtu_writer.VtuGeometry.from_grids(
+            gs, self.simplicial, self.geometry_cache
+        )
+        if self.backend == "numpy":
+            return geometry
+        if not hasattr(vtk.vtkCellArray(), "SetData"):
+            # Versions of vtk before 9 do not allow for construction from arrays
+            return self._export_vtk_grid_by_cells(geometry)
 
-    def _export_vtk_1d(self, gs):
-        """
-        Export the geometrical data (point coordinates) and connectivity
-        information from the 1d PorePy grids to vtk.
-        """
         gVTK = vtk.vtkUnstructuredGrid()
         ptsVTK = vtk.vtkPoints()
+        # The points are stored in single precision, as is the default in vtk
+        points = geometry.points.astype(np.float32)
+        ptsVTK.SetData(ns.numpy_to_vtk(points, deep=True))
+        gVTK.SetPoints(ptsVTK)
 
-        ptsId_global = 0
-        for g in gs:
-            cell_nodes = g.cell_nodes()
-            nodes, cells, _ = sps.find(cell_nodes)
-
-            for c in np.arange(g.num_cells):
-                loc = slice(cell_nodes.indptr[c], cell_nodes.indptr[c + 1])
-                ptsId = nodes[loc] + ptsId_global
-                fsVTK = vtk.vtkIdList()
-                [fsVTK.InsertNextId(p) for p in ptsId]
-                gVTK.InsertNextCell(vtk.VTK_LINE, fsVTK)
+        def id_array(a):
+            a = a.astype(ns.get_numpy_array_type(vtk.VTK_ID_TYPE))
+            return ns.numpy_to_vtkIdTypeArray(a, deep=True)
 
-            ptsId_global += g.num_nodes
-            [ptsVTK.InsertNextPoint(*node) for node in g.nodes.T]
+        def int64_array(a):
+            return ns.numpy_to_vtk(a, deep=True, array_type=vtk.VTK_TYPE_INT64)
 
-        gVTK.SetPoints(ptsVTK)
+        cellsVTK = vtk.vtkCellArray()
+        cellsVTK.SetData(
+            int64_array(np.hstack((0, geometry.offsets))),
+            int64_array(geometry.connectivity),
+        )
+        typesVTK = ns.numpy_to_vtk(
+            geometry.cell_types, deep=True, array_type=vtk.VTK_UNSIGNED_CHAR
+        )
+        if geometry.faces is None:
+            gVTK.SetCells(typesVTK, cellsVTK)
+        else:
+            # Polyhedral cells are defined by the number of faces, followed by the
+            # number of points and the points of each face
+            face_start = np.hstack((0, geometry.face_offsets[:-1]))
+            gVTK.SetCells(
+                typesVTK, cellsVTK, id_array(face_start), id_array(geometry.faces)
+            )
 
         return gVTK
 
     # ------------------------------------------------------------------------------#
 
-    def _export_vtk_2d(self, gs):
-        """
-        Export the geometrical data (point coordinates) and connectivity
-        information from the 2d PorePy grids to vtk.
-        """
+    def _export_vtk_grid_by_cells(self, geometry):
         gVTK = vtk.vtkUnstructuredGrid()
         ptsVTK = vtk.vtkPoints()
+        for node in geometry.points:
+            ptsVTK.InsertNextPoint(*node)
 
-        # Offset for the assignment of point indices. Needed to unify the counting of
-        # points for all grids in gs
-        ptsId_global = 0
-        for g in gs:
-            # Cell-face and face-node relations
-            faces_cells, _, _ = sps.find(g.cell_faces)
-            nodes_faces, _, _ = sps.find(g.face_nodes)
-
-            # For each cell, find its boundary edges, as a list of start and endpoints,
-            # sorted so that the edges form a closed loop around the cell
-            for c in np.arange(g.num_cells):
-                # Faces of this cell
-                loc_faces = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-                # Points of the faces
-                ptsId = np.array(
-                    [
-                        nodes_faces[g.face_nodes.indptr[f] : g.face_nodes.indptr[f + 1]]
-                        for f in faces_cells[loc_faces]
-                    ]
-                ).T
-                # Sort the points.
-                # Note that the indices assigned here also adjusts to the global point
-                # numbering
-                ptsId_paired = (
-                    pp.utils.sort_points.sort_point_pairs(ptsId)[0, :] + ptsId_global
-                )
-
-                # Create a list of Ids, add all point pairs.
-                fsVTK = vtk.vtkIdList()
-                for p in ptsId_paired:
-                    fsVTK.InsertNextId(p)
-                # Add a new polygon
-                gVTK.InsertNextCell(vtk.VTK_POLYGON, fsVTK)
-
-            # Adjust the offset with the number of nodes in this grid
-            ptsId_global += g.num_nodes
-            # Add the new nodes to the point list
-            for node in g.nodes.T:
-                ptsVTK.InsertNextPoint(*node)
+        for c in range(geometry.num_cells):
+            cell_type = int(geometry.cell_types[c])
+            if cell_type == vtu_writer.VTK_POLYHEDRON:
+                ptsId = geometry.cell_faces(c)
+            else:
+                ptsId = geometry.cell_points(c)
+            fsVTK = vtk.vtkIdList()
+            for p in ptsId:
+                fsVTK.InsertNextId(p)
+            gVTK.InsertNextCell(cell_type, fsVTK)
 
         gVTK.SetPoints(ptsVTK)
 
@@ -651,18 +680,11 @@ class Exporter:
 
     # ------------------------------------------------------------------------------#
 
-    def _export_vtk_3d(self, gs):
-        """
-        Export the geometrical data (point coordinates) and connectivity
-        information from the 3d PorePy grids to vtk.
-        """
-        # This functionality became rather complex, with possible use of numba.
-        # Decided to dump this to a separate file.
-        return self._define_gvtk_3d(gs)
-
-    # ------------------------------------------------------------------------------#
-
     def _write_vtk(self, fields, file_name, g_VTK):
+        if self.backend == "numpy":
+            self._write_vtu(fields, file_name, g_VTK)
+            return
+
         writer = vtk.vtkXMLUnstructuredGridWriter()
         writer.SetInputData(g_VTK)
         writer.SetFileName(file_name)
@@ -671,8 +693,10 @@ class Exporter:
             for field in fields:
                 if field.values is None:
                     continue
+                # No copy is needed, since the arrays are removed from the grid
+                # after writing
                 dataVTK = ns.numpy_to_vtk(
-                    field.values, deep=True, array_type=field.dtype()
+                    field.values, deep=False, array_type=field.dtype()
                 )
                 dataVTK.SetName(field.name)
                 dataVTK.SetNumberOfComponents(field.num_components)
@@ -695,6 +719,31 @@ class Exporter:
 
     # ------------------------------------------------------------------------------#
 
+    def _write_vtu(self, fields, file_name, geometry):
+        """
+        Write a vtu file with the numpy backend, possibly on the background thread.
+        """
+        cell_data, point_data = {}, {}
+        if fields is not None:
+            for field in fields:
+                if field.values is None:
+                    continue
+                values = field.values
+                if field.num_components > 1:
+                    values = values.reshape((-1, field.num_components))
+                if field.cell_data:
+                    cell_data[field.name] = values
+                elif field.point_data:
+                    point_data[field.name] = values
+
+        args = (file_name, geometry, cell_data, point_data, self.binary)
+        if self._writer is not None:
+            self._writer.submit(vtu_writer.write_vtu, *args)
+        else:
+            vtu_writer.write_vtu(*args)
+
+    # ------------------------------------------------------------------------------#
+
     def _update_gb_VTK(self):
         if self.is_GridBucket:
             for dim in self.dims:
@@ -754,237 +803,5 @@ class Exporter:
             time = str(time_step).zfill(padding)
             return file_name + str(dim) + "_" + time + extension
 
-    # ------------------------------------------------------------------------------#
-
-    def _define_gvtk_3d(self, gs):
-        # NOTE: we are assuming only one 3d grid
-        gVTK = vtk.vtkUnstructuredGrid()
-        ptsVTK = vtk.vtkPoints()
-
-        ptsId_global = 0
-        for g in gs:
-            faces_cells, cells, _ = sps.find(g.cell_faces)
-            nodes_faces, faces, _ = sps.find(g.face_nodes)
-
-            cptr = g.cell_faces.indptr
-            fptr = g.face_nodes.indptr
-            face_per_cell = np.diff(cptr)
-            nodes_per_face = np.diff(fptr)
-
-            # Total number of nodes to be written in the face-node relation
-            num_cell_nodes = np.array([nodes_per_face[i] for i in g.cell_faces.indices])
-
-            n = g.nodes
-            fc = g.face_centers
-            normal_vec = g.face_normals / g.face_areas
-
-            # Use numba if available, unless the problem is very small, in which
-            # case the pure python version probably is faster than combined compile
-            # and runtime for numba
-            # The number 1000 here is somewhat random.
-            if self.has_numba and g.num_cells > 1000:
-                logger.info("Construct 3d grid information using numba")
-                cell_nodes = _point_ind_numba(
-                    cptr,
-                    fptr,
-                    faces_cells,
-                    nodes_faces,
-                    n,
-                    fc,
-                    normal_vec,
-                    num_cell_nodes,
-                )
-            else:
-                logger.info("Construct 3d grid information using pure python")
-                cell_nodes = _point_ind(
-                    cptr,
-                    fptr,
-                    faces_cells,
-                    nodes_faces,
-                    n,
-                    fc,
-                    normal_vec,
-                    num_cell_nodes,
-                )
-            # implementation note: I did not even try feeding this to numba, my
-            # guess is that it will not like the vtk specific stuff.
-            node_counter = 0
-            face_counter = 0
-            for c in np.arange(g.num_cells):
-                if self.simplicial:
-                    loc = slice(g.cell_faces.indptr[c], g.cell_faces.indptr[c + 1])
-                    ptsId = np.array(
-                        [
-                            nodes_faces[
-                                g.face_nodes.indptr[f] : g.face_nodes.indptr[f + 1]
-                            ]
-                            for f in faces_cells[loc]
-                        ]
-                    ).T
-                    ptsId = np.unique(ptsId)
-                    fsVTK = vtk.vtkIdList()
-                    [fsVTK.InsertNextId(p) for p in ptsId]
-
-                    gVTK.InsertNextCell(vtk.VTK_TETRA, fsVTK)
-                else:
-                    fsVTK = vtk.vtkIdList()
-                    # Number faces that make up the cell
-                    fsVTK.InsertNextId(face_per_cell[c])
-                    for f in range(face_per_cell[c]):
-                        fi = g.cell_faces.indices[face_counter]
-                        fsVTK.InsertNextId(
-                            nodes_per_face[fi]
-                        )  # Number of points in face
-                        for ni in range(nodes_per_face[fi]):
-                            fsVTK.InsertNextId(cell_nodes[node_counter])
-                            node_counter += 1
-                        face_counter += 1
-
-                    gVTK.InsertNextCell(vtk.VTK_POLYHEDRON, fsVTK)
-
-            [ptsVTK.InsertNextPoint(*node) for node in g.nodes.T]
-
-        gVTK.SetPoints(ptsVTK)
-
-        return gVTK
-
-
-def _point_ind(
-    cell_ptr, face_ptr, face_cells, nodes_faces, nodes, fc, normals, num_cell_nodes
-):
-    cell_nodes = np.zeros(num_cell_nodes.sum(), dtype=np.int)
-    counter = 0
-    for ci in range(cell_ptr.size - 1):
-        loc_c = slice(cell_ptr[ci], cell_ptr[ci + 1])
-
-        for fi in face_cells[loc_c]:
-            loc_f = slice(face_ptr[fi], face_ptr[fi + 1])
-            ptsId = nodes_faces[loc_f]
-            num_p_loc = ptsId.size
-            nodes_loc = nodes[:, ptsId]
-            # Sort points. Cut-down version of
-            # sort_points.sort_points_plane() and subfunctions
-            reference = np.array([0.0, 0.0, 1])
-            angle = np.arccos(np.dot(normals[:, fi], reference))
-            vect = np.cross(normals[:, fi], reference)
-            # Cut-down version of cg.rot()
-            W = np.array(
-                [
-                    [0.0, -vect[2], vect[1]],
-                    [vect[2], 0.0, -vect[0]],
-                    [-vect[1], vect[0], 0.0],
-                ]
-            )
-            R = (
-                np.identity(3)
-                + np.sin(angle) * W
-                + (1.0 - np.cos(angle)) * np.linalg.matrix_power(W, 2)
-            )
-            # pts is now a npt x 3 matrix
-            pts = np.array([R.dot(nodes_loc[:, i]) for i in range(nodes_loc.shape[1])])
-            center = R.dot(fc[:, fi])
-            # Distance from projected points to center
-            delta = np.array([pts[i] - center for i in range(pts.shape[0])])[:, :2]
-            nrm = np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2)
-            delta = delta / nrm[:, np.newaxis]
-
-            argsort = np.argsort(np.arctan2(delta[:, 0], delta[:, 1]))
-            cell_nodes[counter : (counter + num_p_loc)] = ptsId[argsort]
-            counter += num_p_loc
-
-    return cell_nodes
-
-
-if "numba" in sys.modules:
-
-    @numba.jit(
-        "i4[:](i4[:],i4[:],i4[:],i4[:],f8[:,:],f8[:,:],f8[:,:],i4[:])",
-        nopython=True,
-        nogil=False,
-    )
-    def _point_ind_numba(
-        cell_ptr, face_ptr, faces_cells, nodes_faces, nodes, fc, normals, num_cell_nodes
-    ):
-        """ Implementation note: This turned out to be less than pretty, and quite
-        a bit more explicit than the corresponding pure python implementation.
-        The process was basically to circumvent whatever statements numba did not
-        like. Not sure about why this ended so, but there you go.
-        """
-        cell_nodes = np.zeros(num_cell_nodes.sum(), dtype=np.int32)
-        counter = 0
-        fc.astype(np.float64)
-        for ci in range(cell_ptr.size - 1):
-            loc_c = slice(cell_ptr[ci], cell_ptr[ci + 1])
-            for fi in faces_cells[loc_c]:
-                loc_f = np.arange(face_ptr[fi], face_ptr[fi + 1])
-                ptsId = nodes_faces[loc_f]
-                num_p_loc = ptsId.size
-                nodes_loc = np.zeros((3, num_p_loc))
-                for iter1 in range(num_p_loc):
-                    nodes_loc[:, iter1] = nodes[:, ptsId[iter1]]
-                #            # Sort points. Cut-down version of
-                #            # sort_points.sort_points_plane() and subfunctions
-                reference = np.array([0.0, 0.0, 1])
-                angle = np.arccos(np.dot(normals[:, fi], reference))
-                # Hand code cross product, not supported by current numba version
-                vect = np.array(
-                    [
-                        normals[1, fi] * reference[2] - normals[2, fi] * reference[1],
-                        normals[2, fi] * reference[0] - normals[0, fi] * reference[2],
-                        normals[0, fi] * reference[1] - normals[1, fi] * reference[0],
-                    ],
-                    dtype=np.float64,
-                )
-                ##            # Cut-down version of cg.rot()
-                W = np.array(
-                    [
-                        0.0,
-                        -vect[2],
-                        vect[1],
-                        vect[2],
-                        0.0,
-                        -vect[0],
-                        -vect[1],
-                        vect[0],
-                        0.0,
-                    ]
-                ).reshape((3, 3))
-                R = (
-                    np.identity(3)
-                    + np.sin(angle) * W.reshape((3, 3))
-                    + (
-                        (1.0 - np.cos(angle)) * np.linalg.matrix_power(W, 2).ravel()
-                    ).reshape((3, 3))
-                )
-                ##            # pts is now a npt x 3 matrix
-                num_p = nodes_loc.shape[1]
-                pts = np.zeros((3, num_p))
-                fc_loc = fc[:, fi]
-                center = np.zeros(3)
-                for i in range(3):
-                    center[i] = (
-                        R[i, 0] * fc_loc[0] + R[i, 1] * fc_loc[1] + R[i, 2] * fc_loc[2]
-                    )
-                for i in range(num_p):
-                    for j in range(3):
-                        pts[j, i] = (
-                            R[j, 0] * nodes_loc[0, i]
-                            + R[j, 1] * nodes_loc[1, i]
-                            + +R[j, 2] * nodes_loc[2, i]
-                        )
-                ##            # Distance from projected points to center
-                delta = 0 * pts
-                for i in range(num_p):
-                    delta[:, i] = pts[:, i] - center
-                nrm = np.sqrt(delta[0] ** 2 + delta[1] ** 2)
-                for i in range(num_p):
-                    delta[:, i] = delta[:, i] / nrm[i]
-                ##
-                argsort = np.argsort(np.arctan2(delta[0], delta[1]))
-                cell_nodes[counter : (counter + num_p_loc)] = ptsId[argsort]
-                counter += num_p_loc
-
-        return cell_nodes
-
 
 # ------------------------------------------------------------------------------#
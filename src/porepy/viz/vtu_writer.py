@@ -0,0 +1,574 @@
+"""
+Writer of vtu files directly from numpy arrays, without use of the vtk module.
+
+The module is the backend of pp.Exporter when this is initialized with
+backend="numpy", but it can also be used on its own:
+
+    geometry = VtuGeometry.from_grids([g])
+    write_vtu("solution.vtu", geometry, cell_data={"pressure": p})
+
+The files are written in the VTK XML format for unstructured grids. In binary mode,
+all arrays are stored raw in an appended data section, so that the field arrays are
+written straight from their memory buffers, without any copies or encoding. The
+geometry (points and cells) is placed first in the appended section, and is encoded
+only once for each VtuGeometry; for a grid which is fixed in time, writing a time
+step then amounts to writing the cached geometry block, followed by the field
+arrays. The geometry can also be stored on disk, see VtuGeometry.from_grids().
+
+Writing of many files, say, in a time loop, can be done on a background thread by
+the BackgroundWriter, so that the simulation can continue while the files are
+written to disk.
+
+"""
+import collections
+import concurrent.futures
+import hashlib
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+import scipy.sparse as sps
+
+import porepy as pp
+from porepy.utils import mcolon
+
+# Cell types of the VTK format
+VTK_LINE = 3
+VTK_POLYGON = 7
+VTK_TETRA = 10
+VTK_POLYHEDRON = 42
+
+# Names of the numpy types in the VTK format, identified by kind and item size
+_VTK_TYPES = {
+    ("f", 4): "Float32",
+    ("f", 8): "Float64",
+    ("i", 1): "Int8",
+    ("i", 2): "Int16",
+    ("i", 4): "Int32",
+    ("i", 8): "Int64",
+    ("u", 1): "UInt8",
+    ("u", 2): "UInt16",
+    ("u", 4): "UInt32",
+    ("u", 8): "UInt64",
+}
+
+
+class VtuGeometry:
+    """ Points and cells of an unstructured grid, in the layout of the vtu format.
+
+    The arrays should not be modified after construction, since the encoded version
+    of the geometry is cached.
+
+    Attributes:
+        points (np.ndarray, num_points x 3): Point coordinates.
+        connectivity (np.ndarray): Points of all cells, stacked.
+        offsets (np.ndarray, size num_cells): End of the points of each cell in
+            connectivity.
+        cell_types (np.ndarray of np.uint8, size num_cells): VTK type of the cells.
+        faces (np.ndarray, optional): Face streams of polyhedral cells: For each
+            cell, the number of faces, followed by the number of points and the
+            points of each face.
+        face_offsets (np.ndarray, optional, size num_cells): End of the face stream
+            of each cell in faces.
+
+    """
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        connectivity: np.ndarray,
+        offsets: np.ndarray,
+        cell_types: np.ndarray,
+        faces: Optional[np.ndarray] = None,
+        face_offsets: Optional[np.ndarray] = None,
+    ) -> None:
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.connectivity = np.ascontiguousarray(connectivity, dtype=np.int64)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        self.cell_types = np.ascontiguousarray(cell_types, dtype=np.uint8)
+        if faces is not None:
+            faces = np.ascontiguousarray(faces, dtype=np.int64)
+            face_offsets = np.ascontiguousarray(face_offsets, dtype=np.int64)
+        self.faces = faces
+        self.face_offsets = face_offsets
+
+        # Encoded geometry, one item for binary and ascii format
+        self._encoded: Dict[bool, Tuple[str, bytes]] = {}
+
+    @classmethod
+    def from_grids(
+        cls,
+        grids: List["pp.Grid"],
+        simplicial: bool = False,
+        cache_folder: Optional[str] = None,
+    ):
+        """ Construct the geometry of a set of grids of the same dimension.
+
+        The points of the grids are stacked, in the order of the grids. Cells in 1d
+        are represented as lines, in 2d as polygons, and in 3d as polyhedra.
+
+        The construction is vectorized over all cells. For very large grids, the
+        geometry can in addition be stored on disk, and read by later calls for
+        the same grids: The file name is a hash of the nodes and the topology of
+        the grids, so that a modified grid gives a new file.
+
+        Parameters:
+            grids (list of pp.Grid): Grids of dimension 1, 2 or 3. For 3d grids, the
+                geometry must be computed.
+            simplicial (bool, optional): Represent 3d cells as tetrahedra.
+                Defaults to False.
+            cache_folder (str, optional): Folder for storage of the geometry. If
+                not provided, the geometry is not stored.
+
+        Returns:
+            VtuGeometry: The geometry of the grids.
+
+        """
+        if cache_folder is not None:
+            file_name = os.path.join(
+                cache_folder, _geometry_key(grids, simplicial) + ".npz"
+            )
+            if os.path.isfile(file_name):
+                return cls.load(file_name)
+
+        dim = grids[0].dim
+        points, cells = [], []
+        num_points = 0
+        for g in grids:
+            if dim == 1:
+                cells.append(_cells_1d(g, num_points))
+            elif dim == 2:
+                cells.append(_cells_2d(g, num_points))
+            elif dim == 3 and simplicial:
+                cells.append(_cells_tetra(g, num_points))
+            elif dim == 3:
+                cells.append(_cells_3d(g, num_points))
+            else:
+                raise ValueError("Grids of dimension " + str(dim) + " not supported")
+            points.append(g.nodes.T)
+            num_points += g.num_nodes
+
+        connectivity = np.hstack([c[0] for c in cells])
+        num_cell_points = np.hstack([c[1] for c in cells])
+        cell_types = np.hstack([c[2] for c in cells])
+        faces, face_offsets = None, None
+        if dim == 3 and not simplicial:
+            faces = np.hstack([c[3] for c in cells])
+            face_offsets = np.cumsum(np.hstack([c[4] for c in cells]))
+
+        geometry = cls(
+            np.vstack(points),
+            connectivity,
+            np.cumsum(num_cell_points),
+            cell_types,
+            faces,
+            face_offsets,
+        )
+        if cache_folder is not None:
+            os.makedirs(cache_folder, exist_ok=True)
+            geometry.save(file_name)
+        return geometry
+
+    @classmethod
+    def load(cls, file_name: str):
+        """ Read a geometry stored by save().
+
+        Parameters:
+            file_name (str): Name of the file.
+
+        Returns:
+            VtuGeometry: The stored geometry.
+
+        """
+        with np.load(file_name) as data:
+            arrays = {key: data[key] for key in data.files}
+        return cls(**arrays)
+
+    def save(self, file_name: str) -> None:
+        """ Store the geometry in a numpy .npz file.
+
+        The file is first written under a temporary name, and then renamed, so that
+        processes which share the file never see a partly written file.
+
+        Parameters:
+            file_name (str): Name of the file, including the extension .npz.
+
+        """
+        arrays = {
+            "points": self.points,
+            "connectivity": self.connectivity,
+            "offsets": self.offsets,
+            "cell_types": self.cell_types,
+        }
+        if self.faces is not None:
+            arrays.update({"faces": self.faces, "face_offsets": self.face_offsets})
+        tmp_name = "%s.%d.tmp.npz" % (file_name, os.getpid())
+        np.savez(tmp_name, **arrays)
+        os.replace(tmp_name, file_name)
+
+    @property
+    def num_points(self) -> int:
+        return self.points.shape[0]
+
+    @property
+    def num_cells(self) -> int:
+        return self.cell_types.size
+
+    def cell_points(self, c: int) -> np.ndarray:
+        """ Points of a cell, as listed in connectivity.
+        """
+        start = self.offsets[c - 1] if c > 0 else 0
+        return self.connectivity[start : self.offsets[c]]
+
+    def cell_faces(self, c: int) -> np.ndarray:
+        """ Face stream of a polyhedral cell, see the class documentation.
+        """
+        start = self.face_offsets[c - 1] if c > 0 else 0
+        return self.faces[start : self.face_offsets[c]]
+
+    def encoded(self, binary: bool = True) -> Tuple[str, bytes]:
+        """ The geometry encoded in the vtu format.
+
+        The encoding is computed on the first call, and stored for later calls.
+
+        Parameters:
+            binary (bool, optional): If True (default), the arrays are placed in
+                the appended data section, else they are written inline as ascii.
+
+        Returns:
+            str: The Points and Cells elements of the xml file.
+            bytes: The appended data of the geometry; empty for ascii format.
+
+        """
+        if binary not in self._encoded:
+            arrays = [("Points", [(None, self.points)])]
+            cells = [
+                ("connectivity", self.connectivity),
+                ("offsets", self.offsets),
+                ("types", self.cell_types),
+            ]
+            if self.faces is not None:
+                cells += [("faces", self.faces), ("faceoffsets", self.face_offsets)]
+            arrays.append(("Cells", cells))
+
+            xml: List[str] = []
+            blob: List[bytes] = []
+            offset = 0
+            for element, items in arrays:
+                xml.append("<%s>\n" % element)
+                for name, values in items:
+                    xml.append(_data_array_tag(name, values, binary, offset))
+                    if binary:
+                        blob += [_size_header(values), memoryview(values).cast("B")]
+                        offset += 8 + values.nbytes
+                    else:
+                        xml.append(_ascii_values(values) + "</DataArray>\n")
+                xml.append("</%s>\n" % element)
+            self._encoded[binary] = ("".join(xml), b"".join(blob))
+        return self._encoded[binary]
+
+
+def write_vtu(
+    file_name: str,
+    geometry: VtuGeometry,
+    cell_data: Optional[Dict[str, np.ndarray]] = None,
+    point_data: Optional[Dict[str, np.ndarray]] = None,
+    binary: bool = True,
+) -> None:
+    """ Write a grid with associated data to a vtu file.
+
+    Parameters:
+        file_name (str): Name of the file, including extension.
+        geometry (VtuGeometry): Points and cells of the grid.
+        cell_data (dict, optional): Cell data, identified by name. Each array
+            has size num_cells for scalar data, or shape num_cells x num_components
+            for vectors.
+        point_data (dict, optional): Point data, see cell_data.
+        binary (bool, optional): If True (default), the data is written raw, else
+            as ascii.
+
+    """
+    data = [
+        ("PointData", _prepare_arrays(point_data, geometry.num_points)),
+        ("CellData", _prepare_arrays(cell_data, geometry.num_cells)),
+    ]
+    geometry_xml, geometry_blob = geometry.encoded(binary)
+
+    b = "LittleEndian" if sys.byteorder == "little" else "BigEndian"
+    header = (
+        '<?xml version="1.0"?>\n'
+        + '<VTKFile type="UnstructuredGrid" version="1.0" '
+        + 'byte_order="%s" header_type="UInt64">\n' % b
+        + "<UnstructuredGrid>\n"
+        + '<Piece NumberOfPoints="%d" NumberOfCells="%d">\n'
+        % (geometry.num_points, geometry.num_cells)
+    )
+
+    with open(file_name, "wb") as f:
+        f.write(header.encode())
+        # The data arrays are placed after the geometry in the appended section
+        offset = len(geometry_blob)
+        for element, arrays in data:
+            f.write(("<%s>\n" % element).encode())
+            for name, values in arrays:
+                f.write(_data_array_tag(name, values, binary, offset).encode())
+                if binary:
+                    offset += 8 + values.nbytes
+                else:
+                    f.write((_ascii_values(values) + "</DataArray>\n").encode())
+            f.write(("</%s>\n" % element).encode())
+        f.write(geometry_xml.encode())
+        f.write(b"</Piece>\n</UnstructuredGrid>\n")
+
+        if binary:
+            f.write(b'<AppendedData encoding="raw">\n_')
+            f.write(geometry_blob)
+            for _, arrays in data:
+                for _, values in arrays:
+                    f.write(_size_header(values))
+                    f.write(memoryview(values).cast("B"))
+            f.write(b"\n</AppendedData>\n")
+        f.write(b"</VTKFile>\n")
+
+
+class BackgroundWriter:
+    """ Execute writing of files on background threads.
+
+    The number of tasks waiting to be executed is bounded; when the bound is
+    reached, submission of a new task waits for the oldest one to finish. Errors
+    raised by the tasks are raised again by the first call to submit() or flush()
+    after the task has finished.
+
+    The arrays passed to a task should not be modified before the task is
+    finished, since they are written without copying.
+
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 4) -> None:
+        """
+        Parameters:
+            max_workers (int, optional): Number of threads. Defaults to 1.
+            max_pending (int, optional): Maximum number of unfinished tasks.
+                Defaults to 4.
+
+        """
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        self._max_pending = max(max_pending, 1)
+        self._pending: collections.deque = collections.deque()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> None:
+        """ Submit a task, that is, fn(*args, **kwargs), for execution.
+        """
+        # Report errors of finished tasks, and wait if too many are pending
+        while self._pending and (
+            self._pending[0].done() or len(self._pending) >= self._max_pending
+        ):
+            self._pending.popleft().result()
+        self._pending.append(self._executor.submit(fn, *args, **kwargs))
+
+    def flush(self) -> None:
+        """ Wait for all submitted tasks to finish.
+        """
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self) -> None:
+        """ Wait for all submitted tasks to finish, and stop the threads.
+        """
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+
+
+def _prepare_arrays(
+    data: Optional[Dict[str, np.ndarray]], num_items: int
+) -> List[Tuple[str, np.ndarray]]:
+    # Represent the arrays as contiguous 1d or 2d arrays with a type known by the
+    # vtu format. Copies are only made if this is necessary.
+    arrays: List[Tuple[str, np.ndarray]] = []
+    if data is None:
+        return arrays
+    for name, values in data.items():
+        values = np.asarray(values)
+        if values.dtype == np.bool_:
+            values = values.view(np.uint8)
+        elif not values.dtype.isnative:
+            values = values.astype(values.dtype.newbyteorder("="))
+        if (values.dtype.kind, values.dtype.itemsize) not in _VTK_TYPES:
+            raise ValueError("Field " + name + " has an unsupported data type")
+        if values.ndim > 2 or values.shape[0] != num_items:
+            raise ValueError("Field " + name + " has wrong dimension.")
+        arrays.append((name, np.ascontiguousarray(values)))
+    return arrays
+
+
+def _data_array_tag(
+    name: Optional[str], values: np.ndarray, binary: bool, offset: int
+) -> str:
+    tag = '<DataArray type="%s"' % _VTK_TYPES[
+        (values.dtype.kind, values.dtype.itemsize)
+    ]
+    if name is not None:
+        tag += " Name=%s" % quoteattr(name)
+    if values.ndim > 1:
+        tag += ' NumberOfComponents="%d"' % values.shape[1]
+    if binary:
+        return tag + ' format="appended" offset="%d"/>\n' % offset
+    return tag + ' format="ascii">\n'
+
+
+def _size_header(values: np.ndarray) -> bytes:
+    # Size, in bytes, of an array in the appended data
+    return np.array(values.nbytes, dtype=np.uint64).tobytes()
+
+
+def _ascii_values(values: np.ndarray) -> str:
+    fmt = "%.17g" if values.dtype.kind == "f" else "%d"
+    return " ".join(fmt % v for v in values.ravel()) + "\n"
+
+
+def _geometry_key(grids: List["pp.Grid"], simplicial: bool) -> str:
+    # Hash of the nodes and the topology of the grids, which identifies the geometry
+    key = hashlib.sha1(str((grids[0].dim, simplicial, len(grids))).encode())
+    for g in grids:
+        key.update(np.ascontiguousarray(g.nodes, dtype=np.float64))
+        for mat in [g.face_nodes, g.cell_faces]:
+            mat = mat.tocsc()
+            key.update(str(mat.shape).encode())
+            key.update(np.ascontiguousarray(mat.indptr, dtype=np.int64))
+            key.update(np.ascontiguousarray(mat.indices, dtype=np.int64))
+    return key.hexdigest()
+
+
+def _cells_1d(g: "pp.Grid", offset: int) -> Tuple[np.ndarray, ...]:
+    # Lines, given by the nodes of the cell in increasing order
+    nodes, cells, _ = sps.find(g.cell_nodes())
+    num_nodes = np.bincount(cells, minlength=g.num_cells)
+    types = np.full(g.num_cells, VTK_LINE, dtype=np.uint8)
+    return nodes + offset, num_nodes, types
+
+
+def _cells_2d(g: "pp.Grid", offset: int) -> Tuple[np.ndarray, ...]:
+    # Polygons. The nodes of a cell are found by following the chain of its faces,
+    # starting with the lowest node of the face with the lowest index, see
+    # pp.utils.sort_points.sort_point_pairs(). All cells are treated in parallel.
+    faces, cells, _ = sps.find(g.cell_faces)
+    face_nodes, _, _ = sps.find(g.face_nodes)
+    face_nodes = face_nodes.reshape((-1, 2))
+    start, end = face_nodes[faces, 0], face_nodes[faces, 1]
+
+    num_faces = np.bincount(cells, minlength=g.num_cells)
+    first = np.hstack((0, np.cumsum(num_faces)[:-1]))
+
+    # Pairs of a cell and one of its nodes, sorted, with the two faces of the cell
+    # which share the node
+    key = np.hstack((cells, cells)) * g.num_nodes + np.hstack((start, end))
+    face_ind = np.tile(np.arange(faces.size), 2)
+    order = np.argsort(key, kind="stable")
+    key, face_ind = key[order], face_ind[order]
+
+    nodes = np.zeros(faces.size, dtype=np.int64)
+    nodes[first] = start[first]
+    current_face = first.copy()
+    current_node = end[first]
+    for step in range(1, num_faces.max(initial=0)):
+        active = np.where(num_faces > step)[0]
+        node = current_node[active]
+        nodes[first[active] + step] = node
+
+        # Move on to the other face of the cell which has the current node
+        pos = np.searchsorted(key, active * g.num_nodes + node)
+        next_face = face_ind[pos]
+        hit = next_face == current_face[active]
+        next_face[hit] = face_ind[pos[hit] + 1]
+        current_node[active] = np.where(
+            start[next_face] == node, end[next_face], start[next_face]
+        )
+        current_face[active] = next_face
+
+    types = np.full(g.num_cells, VTK_POLYGON, dtype=np.uint8)
+    return nodes + offset, num_faces, types
+
+
+def _cells_tetra(g: "pp.Grid", offset: int) -> Tuple[np.ndarray, ...]:
+    # Tetrahedra, given by their nodes in increasing order
+    nodes, cells, _ = sps.find(g.cell_nodes())
+    num_nodes = np.bincount(cells, minlength=g.num_cells)
+    types = np.full(g.num_cells, VTK_TETRA, dtype=np.uint8)
+    return nodes + offset, num_nodes, types
+
+
+def _cells_3d(g: "pp.Grid", offset: int) -> Tuple[np.ndarray, ...]:
+    # Polyhedra. The points of the cells are the nodes in increasing order, the
+    # faces are listed with their nodes sorted counter-clockwise around the face
+    # normal vector.
+    nodes, cells, _ = sps.find(g.cell_nodes())
+    num_nodes = np.bincount(cells, minlength=g.num_cells)
+    types = np.full(g.num_cells, VTK_POLYHEDRON, dtype=np.uint8)
+
+    sorted_face_nodes = _sort_face_nodes(g)
+    face_ptr = g.face_nodes.indptr
+    nodes_per_face = np.diff(face_ptr)
+
+    faces, cells_of_face, _ = sps.find(g.cell_faces)
+    num_faces = np.bincount(cells_of_face, minlength=g.num_cells)
+    num_face_nodes = nodes_per_face[faces]
+
+    # Each cell is represented by the number of faces, followed by the number of
+    # nodes and the nodes of each face.
+    face_length = 1 + num_face_nodes
+    face_start = np.hstack((0, np.cumsum(face_length)[:-1])) + cells_of_face + 1
+    cell_length = 1 + np.bincount(
+        cells_of_face, weights=face_length, minlength=g.num_cells
+    ).astype(np.int64)
+    cell_start = np.hstack((0, np.cumsum(cell_length)[:-1]))
+
+    stream = np.zeros(cell_length.sum(), dtype=np.int64)
+    stream[cell_start] = num_faces
+    stream[face_start] = num_face_nodes
+    node_pos = mcolon.mcolon(face_start + 1, face_start + 1 + num_face_nodes)
+    stream[node_pos] = (
+        sorted_face_nodes[mcolon.mcolon(face_ptr[faces], face_ptr[faces + 1])] + offset
+    )
+
+    return nodes + offset, num_nodes, types, stream, cell_length
+
+
+def _sort_face_nodes(g: "pp.Grid") -> np.ndarray:
+    # Sort the nodes of all faces of a 3d grid counter-clockwise around the face
+    # normal vector. The faces are rotated to the xy-plane, and the nodes are
+    # sorted according to their angle relative to the face center.
+    nodes, faces, _ = sps.find(g.face_nodes)
+    normals = g.face_normals / g.face_areas
+
+    # Rotation matrices, by Rodrigues' formula, of the normal vectors to the z-axis.
+    # The rotation axis is normalized; for normals parallel to the z-axis, the axis
+    # is zero, and the rotation is the identity, as in pp.map_geometry.
+    angle = np.arccos(np.clip(normals[2], -1, 1))
+    vect = np.vstack((normals[1], -normals[0], np.zeros(g.num_faces)))
+    vect_norm = np.sqrt(vect[0] ** 2 + vect[1] ** 2)
+    parallel = np.isclose(vect_norm, 0)
+    vect[:, parallel] = 0
+    vect[:, ~parallel] /= vect_norm[~parallel]
+    angle[parallel] = 0
+    W = np.zeros((g.num_faces, 3, 3))
+    W[:, 0, 1], W[:, 0, 2] = -vect[2], vect[1]
+    W[:, 1, 0], W[:, 1, 2] = vect[2], -vect[0]
+    W[:, 2, 0], W[:, 2, 1] = -vect[1], vect[0]
+    R = (
+        np.identity(3)
+        + np.sin(angle)[:, np.newaxis, np.newaxis] * W
+        + (1.0 - np.cos(angle))[:, np.newaxis, np.newaxis] * np.matmul(W, W)
+    )
+
+    R_nodes = R[faces]
+    pts = np.einsum("nij,jn->in", R_nodes, g.nodes[:, nodes])
+    center = np.einsum("nij,jn->in", R_nodes, g.face_centers[:, faces])
+    delta = (pts - center)[:2]
+    delta = delta / np.sqrt(delta[0] ** 2 + delta[1] ** 2)
+
+    order = np.lexsort((np.arctan2(delta[0], delta[1]), faces))
+    return nodes[order]
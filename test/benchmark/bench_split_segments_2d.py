@@ -0,0 +1,388 @@
+#! /usr/bin/env python
+"""
+Benchmark of the splitting of intersecting segments in 2d, used for meshing of
+fracture networks in 2d.
+
+The vectorized pp.intersections.split_intersecting_segments_2d() is compared with
+the previous implementation, which found candidate pairs of segments by a sweep
+over their bounding boxes and looped over the pairs, on random networks of
+increasing size. For each network, it is verified that the two implementations
+give the same points and segments.
+
+Run as
+    python bench_split_segments_2d.py [max_num_segments]
+
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import porepy as pp
+
+
+def identify_overlapping_rectangles(xmin, xmax, ymin, ymax, tol=1e-8):
+    """ Based on a set of start and end coordinates for bounding boxes, identify
+    pairs of overlapping rectangles.
+
+    The algorithm was found in 'A fast method for fracture intersection detection
+    in discrete fracture networks' by Dong et al, omputers and Geotechniques 2018.
+
+    Parameters:
+        xmin (np.array): Minimum coordinates of the rectangle on the first axis.
+        xmax (np.array): Maximum coordinates of the rectangle on the first axis.
+        ymin (np.array): Minimum coordinates of the rectangle on the second axis.
+        ymax (np.array): Maximum coordinates of the rectangle on the second axis.
+
+        For all items, xmin <= xmax (but equality is allowed), correspondingly for
+        the y-coordinates
+
+    Returns:
+        np.array, 2 x num_overlaps: Each column contains a pair of overlapping
+            intervals, refering to their placement in left and right. The pairs
+            are sorted so that the lowest index is in the first column.
+
+    """
+    # There can be no overlaps if there is less than two rectangles
+    if xmin.size < 2:
+        return np.empty((2, 0))
+
+    # Sort the coordinates
+    sort_ind_min = np.argsort(xmin)
+    sort_ind_max = np.argsort(xmax)
+
+    # pointers to the next start and end point of an interval
+    next_min = 0
+    next_max = 0
+
+    # List of pairs we have found
+    pairs = []
+    # List of intervals we are currently in. All intervals will join and leave this set.
+    active = []
+
+    num_lines = xmax.size
+
+    # Pass along the x-axis, identify the start and end of rectangles as we go.
+    # The idea is then for each new interval to check which of the active intervals
+    # also have overlap along the y-axis. These will be identified as pairs.
+    while True:
+        # Check if the next start (xmin) point is before the next endpoint,
+        # but only if there are more left points available.
+        # Less or equal is critical here, or else cases where a point interval
+        # is combined with the start of another interval may not be discovered.
+        if (
+            next_min < num_lines
+            and xmin[sort_ind_min[next_min]] <= xmax[sort_ind_max[next_max]]
+        ):
+            # Find active rectangles where the y-interval is also overlapping
+            between = np.where(
+                np.logical_and(
+                    ymax[sort_ind_min[next_min]] >= ymin[active],
+                    ymin[sort_ind_min[next_min]] <= ymax[active],
+                )
+            )[0]
+            # For all identified overlaps, add the new pairs
+            for a in between:
+                pairs.append([active[a], sort_ind_min[next_min]])
+            # Add this to the active rectangles, and increase the index
+            active.append(sort_ind_min[next_min])
+            next_min += 1
+        else:
+            # We are leaving a rectangle.
+            active.remove(sort_ind_max[next_max])
+            next_max += 1
+            # Check if we have come to the end
+            if next_max == num_lines:
+                break
+
+    if len(pairs) == 0:
+        return np.empty((2, 0))
+    else:
+        pairs = np.asarray(pairs).T
+        # First sort the pairs themselves
+        pairs.sort(axis=0)
+        # Next, sort the columns so that the first row is non-decreasing
+        sort_ind = np.argsort(pairs[0])
+        pairs = pairs[:, sort_ind]
+        return pairs
+
+
+def split_intersecting_segments_2d_loop(p, e, tol=1e-4):
+    """ Process a set of points and connections between them so that the result
+    is an extended point set and new connections that do not intersect.
+
+    The function is written for gridding of fractured domains, but may be
+    of use in other cases as well. The geometry is assumed to be 2D.
+
+    The connections are defined by their start and endpoints, and can also
+    have tags assigned. If so, the tags are preserved as connections are split.
+
+    IMPLEMENTATION NOTE: This is a re-implementation of the old function
+    remove_edge_crossings, based on a much faster algorithm. The two functions
+    will coexist for a while.
+
+    Parameters:
+        p (np.ndarray, 2 x n_pt): Coordinates of points to be processed
+        e (np.ndarray, n x n_con): Connections between lines. n >= 2, row
+            0 and 1 are index of start and endpoints, additional rows are tags
+        tol (double, optional, default=1e-8): Tolerance used for comparing
+            equal points.
+
+    Returns:
+        np.ndarray, (2 x n_pt), array of points, possibly expanded.
+        np.ndarray, (n x n_edges), array of new edges. Non-intersecting.
+
+    """
+    # Find the bounding box
+    x_min, x_max, y_min, y_max = pp.intersections._axis_aligned_bounding_box_2d(p, e)
+    # Identify fractures with overlapping bounding boxes
+    pairs = identify_overlapping_rectangles(x_min, x_max, y_min, y_max)
+
+    # Identify all fractures that are the first (by index) of a potentially
+    # crossing pair. A better way to group the fractures may be feasible,
+    # but this has not been investigated.
+    start_inds = np.unique(pairs[0])
+
+    num_lines = e.shape[1]
+
+    # Data structure for storage of intersection points. For each fracture,
+    # we have an array that will contain the index of the intersections.
+    isect_pt = np.empty(num_lines, dtype=object)
+    for i in range(isect_pt.size):
+        isect_pt[i] = np.empty(0, dtype=np.int)
+
+    # Array of new points, found in the intersection of old ones.
+    new_pts = []
+    # The new points will be appended to the old ones, thus their index
+    # must be adjusted.
+    new_ind = p.shape[1]
+
+    # Loop through all candidate pairs of intersecting fractures, check if
+    # they do intersect. If so, store the point, and for each crossing fracture
+    # take note of the index of the cross point.
+    for _, line_ind in enumerate(start_inds):
+        # First fracture in the candidate pair
+        main = line_ind
+        # Find all other fractures that is in a pair with the main as the first one.
+        hit = np.where(pairs[0] == main)
+        # Sort the other points; this makes debugging simpler if nothing else.
+        other = np.sort(pairs[1, hit][0])
+
+        # We will first do a coarse sorting, to rule out fractures that are clearly
+        # not intersecting, and then do a finer search for an intersection below.
+
+        # Utility function to pull out one or several points from an array based
+        # on index
+        def pt(p, ind):
+            a = p[:, ind]
+            if ind.size == 1:
+                return a.reshape((-1, 1))
+            else:
+                return a
+
+        # Obtain start and endpoint of the main and other fractures
+        start_main = pt(p, e[0, main])
+        end_main = pt(p, e[1, main])
+        start_other = pt(p, e[0, other])
+        end_other = pt(p, e[1, other])
+
+        # Utility function to normalize the fracture length
+        def normalize(v):
+            nrm = np.sqrt(np.sum(v ** 2, axis=0))
+
+            # If the norm of the vector is essentially zero, do not normalize the vector
+            hit = nrm < tol
+            nrm[hit] = 1
+            return v / nrm
+
+        def dist(a, b):
+            return np.sqrt(np.sum((a - b) ** 2))
+
+        # Vectors along the main fracture, and from the start of the main
+        # to the start and end of the other fractures. All normalized.
+        # If the other edges share start or endpoint with the main one, normalization
+        # of the distance vector will make the vector nans. In this case, we
+        # use another point along the other line, this works equally well for the
+        # coarse identification (based on cross products).
+        # If the segments are overlapping, there will still be issues with nans,
+        # but these are dealt with below.
+        main_vec = normalize(end_main - start_main)
+        if dist(start_other, start_main) > 1e-4:
+            main_other_start = normalize(start_other - start_main)
+        else:
+            main_other_start = normalize(0.5 * (start_other + end_other) - start_main)
+        if dist(end_other, start_main) > 1e-4:
+            main_other_end = normalize(end_other - start_main)
+        else:
+            # Values 0.3 and 0.7 are quite random here.
+            main_other_end = normalize(0.3 * start_other + 0.7 * end_other - start_main)
+
+        # Modified signum function: The value is 0 if it is very close to zero.
+        def mod_sign(v, tol):
+            sgn = np.sign(v)
+            sgn[np.abs(v) < tol] = 0
+            return sgn
+
+        # Take the cross product between the vector along the main line, and the
+        # vectors to the start and end of the other lines, respectively.
+        start_cross = mod_sign(
+            main_vec[0] * main_other_start[1] - main_vec[1] * main_other_start[0], tol
+        )
+        end_cross = mod_sign(
+            main_vec[0] * main_other_end[1] - main_vec[1] * main_other_end[0], tol
+        )
+
+        # If the start and endpoint of the other fracture are clearly on the
+        # same side of the main one, these are not crossing.
+        # For completely ovrelapping edges, the normalization will leave the
+        # vectors nan. There may be better ways of dealing with this, but we simply
+        # run the intersection finder in this case.
+        relevant = np.where(
+            np.logical_or(
+                (start_cross * end_cross < 1),
+                np.any(np.isnan(main_other_start + main_other_end), axis=0),
+            )
+        )[0]
+
+        # Loop over all relevant (possibly crossing) fractures, look closer
+        # for an intersection.
+        for ri in relevant:
+            ipt = pp.intersections.segments_2d(
+                start_main, end_main, pt(start_other, ri), pt(end_other, ri), tol
+            )
+            # Add the intersection point, if any.
+            # If two intersection points are found, that is the edges are overlapping
+            # both points are added.
+            if ipt is not None:
+                num_isect = ipt.shape[1]
+                # Add indices of the new points to the main and other edge
+                isect_pt[main] = np.append(
+                    isect_pt[main], new_ind + np.arange(num_isect)
+                )
+                isect_pt[other[ri]] = np.append(
+                    isect_pt[other[ri]], new_ind + np.arange(num_isect)
+                )
+                new_ind += num_isect
+
+                # Add the one or two intertion points
+                if num_isect == 1:
+                    new_pts.append(ipt.squeeze())
+                else:
+                    # It turned out the transport was needed to get the code to work
+                    new_pts.append(ipt.squeeze().T)
+
+    # If we have found no intersection points, we can safely return the incoming
+    # points and edges.
+    if len(new_pts) == 0:
+        return p, e
+    # If intersection points are found, the intersecting lines must be split into
+    # shorter segments.
+    else:
+        # The full set of points, both original and newly found intersection points
+        all_pt = np.hstack((p, np.vstack([i for i in new_pts]).T))
+        # Remove duplicates in the point set.
+        # NOTE: The tolerance used here is a bit sensitive, if set too loose, this
+        # may merge non-intersecting fractures.
+        unique_all_pt, _, ib = pp.utils.setmembership.unique_columns_tol(all_pt, tol)
+        # Data structure for storing the split edges.
+        new_edge = np.empty((e.shape[0], 0))
+
+        # Loop over all lines, split it into non-overlapping segments.
+        for ei in range(num_lines):
+            # Find indices of all points involved in this fracture.
+            # Map them to the unique point set, and uniquify
+            inds = np.unique(ib[np.hstack((e[:2, ei], isect_pt[ei]))])
+            num_branches = inds.size - 1
+            # Get the coordinates themselves.
+            loc_pts = pt(unique_all_pt, inds)
+            # Specifically get the start point: Pick one of the points of the
+            # original edge, e[0, ei], which is known to be at an end of the edge.
+            # map to the unique indices
+            loc_start = pt(unique_all_pt, ib[e[0, ei]])
+            # Measure the distance of the points from the start. This can be used
+            # to sort the points along the line
+            dist = np.sum((loc_pts - loc_start) ** 2, axis=0)
+            order = np.argsort(dist)
+            new_inds = inds[order]
+            # All new segments share the tags of the old one.
+            loc_tags = e[2:, ei].reshape((-1, 1)) * np.ones(num_branches)
+            # Define the new segments, in terms of the unique points
+            loc_edge = np.vstack((new_inds[:-1], new_inds[1:], loc_tags))
+
+            # Add to the global list of segments
+            new_edge = np.hstack((new_edge, loc_edge))
+
+        # Finally, uniquify edges. This operation is necessary for overlapping edges.
+        # Operate on sorted point indices per edge
+        new_edge[:2] = np.sort(new_edge[:2], axis=0)
+        # Uniquify.
+        _, edge_map, _ = pp.utils.setmembership.unique_columns_tol(
+            new_edge[:2].astype(np.int), tol
+        )
+        new_edge = new_edge[:, edge_map]
+
+        return unique_all_pt, new_edge.astype(np.int)
+
+
+def random_network(num_segments, seed=0):
+    """ Random segments in the unit square, with length scaled so that each
+    segment has a few intersections on average. The segments have a tag.
+    """
+    np.random.seed(seed)
+    length = 3 / np.sqrt(num_segments)
+    start = np.random.rand(2, num_segments)
+    angle = np.pi * np.random.rand(num_segments)
+    end = start + length * np.vstack((np.cos(angle), np.sin(angle)))
+    p = np.hstack((start, end))
+    e = np.vstack(
+        (
+            np.arange(num_segments),
+            num_segments + np.arange(num_segments),
+            np.arange(num_segments) % 3,
+        )
+    )
+    return p, e
+
+
+def run(max_num_segments=8000, max_num_segments_loop=4000):
+    print(
+        "{:>10} {:>12} {:>12} {:>10}".format(
+            "segments", "loop", "vectorized", "speedup"
+        )
+    )
+    num_segments = 250
+    while num_segments <= max_num_segments:
+        p, e = random_network(num_segments)
+
+        tic = time.perf_counter()
+        p_new, e_new = pp.intersections.split_intersecting_segments_2d(p, e)
+        t_new = time.perf_counter() - tic
+
+        if num_segments <= max_num_segments_loop:
+            tic = time.perf_counter()
+            p_old, e_old = split_intersecting_segments_2d_loop(p, e)
+            t_old = time.perf_counter() - tic
+
+            if not (
+                p_new.shape == p_old.shape
+                and np.allclose(p_new, p_old)
+                and np.array_equal(e_new, e_old)
+            ):
+                raise ValueError("Implementations differ for the random network")
+            print(
+                "{:10d} {:12.3f} {:12.3f} {:10.1f}".format(
+                    num_segments, t_old, t_new, t_old / t_new
+                )
+            )
+        else:
+            print("{:10d} {:>12} {:12.3f}".format(num_segments, "-", t_new))
+
+        num_segments *= 2
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run(int(sys.argv[1]))
+    else:
+        run()
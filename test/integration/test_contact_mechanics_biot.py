@@ -7,10 +7,20 @@ test, please refer to test_contact_mechanics.
 """
 import numpy as np
 import unittest
+from unittest import mock
 
 import porepy as pp
 import porepy.models.contact_mechanics_biot_model as model
+import porepy.models.contact_mechanics_model as contact_model
 import test.common.contact_mechanics_examples
+from porepy.numerics.linalg import block_preconditioners
+
+try:
+    import pyamg
+
+    if_pyamg = True
+except ImportError:
+    if_pyamg = False
 
 
 class TestBiot(unittest.TestCase):
@@ -207,6 +217,53 @@ class TestContactMechanicsBiot(unittest.TestCase):
         self.assertTrue(np.all(np.isclose(fracture_pressure, -3.93090302e-06)))
 
 
+class TestLinearSolvers(unittest.TestCase):
+    def setup(self, linear_solver):
+        setup = SetupContactMechanicsBiot(
+            ux_south=0, uy_south=0, ux_north=0, uy_north=0.001
+        )
+        setup.mesh_args = [2, 2]
+        setup.simplex = False
+        setup.params["linear_solver"] = linear_solver
+        return setup
+
+    def _solve(self, setup):
+        with mock.patch.object(
+            contact_model.spla, "gmres", wraps=contact_model.spla.gmres
+        ) as gmres:
+            pp.run_time_dependent_model(setup, {"convergence_tol": 1e-6})
+
+        if setup.linear_solver == "gmres":
+            # The Biot model keeps its own limit on the GMRES restart cycles
+            self.assertTrue(gmres.called)
+            self.assertEqual(gmres.call_args[1]["maxiter"], 10)
+
+        return np.hstack([d[pp.STATE][setup.scalar_variable] for _, d in setup.gb])
+
+    def test_gmres(self):
+        known = self._solve(self.setup("direct"))
+
+        setup = self.setup("gmres")
+        setup.params["preconditioner"] = block_preconditioners.SchurComplement(
+            first=[
+                setup.scalar_variable,
+                setup.mortar_scalar_variable,
+                setup.mortar_displacement_variable,
+                setup.contact_traction_variable,
+            ],
+            second=setup.displacement_variable,
+            first_solver=block_preconditioners.DirectBlockSolver(),
+            schur_solver=block_preconditioners.DirectBlockSolver(),
+        )
+        self.assertTrue(np.allclose(self._solve(setup), known, rtol=1e-4, atol=1e-12))
+
+    @unittest.skipUnless(if_pyamg, "pyamg is not available")
+    def test_pyamg(self):
+        known = self._solve(self.setup("direct"))
+        pressure = self._solve(self.setup("pyamg"))
+        self.assertTrue(np.allclose(pressure, known, rtol=1e-4, atol=1e-12))
+
+
 class SetupContactMechanicsBiot(
     test.common.contact_mechanics_examples.ProblemDataTime, model.ContactMechanicsBiot
 ):
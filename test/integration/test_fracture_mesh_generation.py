@@ -838,6 +838,35 @@ class TestStructuredGrids(unittest.TestCase):
         gb = pp.meshing.cart_grid(f, np.array([8, 8, 8]))
 
 
+class TestMeshNetworks(unittest.TestCase):
+    def networks(self):
+        domain = {"xmin": -2, "xmax": 2, "ymin": -2, "ymax": 2, "zmin": -2, "zmax": 2}
+        f_1 = pp.Fracture(np.array([[-1, 1, 1, -1], [0, 0, 0, 0], [-1, -1, 1, 1]]))
+        f_2 = pp.Fracture(np.array([[0, 0, 0, 0], [-1, 1, 1, -1], [-1, -1, 1, 1]]))
+        return [
+            pp.FractureNetwork3d([f_1], domain=domain),
+            pp.FractureNetwork3d([f_1, f_2], domain=domain),
+        ]
+
+    def test_two_networks(self):
+        mesh_args = {"mesh_size_frac": 1, "mesh_size_bound": 1, "mesh_size_min": 0.2}
+        gbs = pp.fracs.fractures.mesh_networks(
+            self.networks(), mesh_args, num_workers=2
+        )
+        known = [network.mesh(mesh_args) for network in self.networks()]
+
+        self.assertEqual(len(gbs), 2)
+        for gb, gb_known in zip(gbs, known):
+            for dim in range(4):
+                grids = gb.grids_of_dimension(dim)
+                grids_known = gb_known.grids_of_dimension(dim)
+                self.assertEqual(len(grids), len(grids_known))
+                self.assertEqual(
+                    sum(g.num_cells for g in grids),
+                    sum(g.num_cells for g in grids_known),
+                )
+
+
 if __name__ == "__main__":
     TestStructuredGrids().test_tripple_x_intersection_3d()
     unittest.main()
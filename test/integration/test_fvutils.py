@@ -22,6 +22,9 @@ class TestFvutils(unittest.TestCase):
 
         self.assertTrue(np.allclose(iblock_ex, iblock_python.toarray()))
 
+        iblock_batched = fvutils.invert_diagonal_blocks(block, sz, method="batched")
+        self.assertTrue(np.allclose(iblock_ex, iblock_batched.toarray()))
+
         # Numba may or may not be available on the system, so surround test with
         # try. This may not be the most pythonic approach, but it works.
         try:
@@ -89,6 +92,9 @@ class TestFvutils(unittest.TestCase):
 
         self.assertTrue(np.allclose(iblock_ex, iblock_python.toarray()))
 
+        iblock_batched = fvutils.invert_diagonal_blocks(block, sz, method="batched")
+        self.assertTrue(np.allclose(iblock_ex, iblock_batched.toarray()))
+
         # Numba may or may not be available on the system, so surround test with
         # try. This may not be the most pythonic approach, but it works.
         try:
@@ -131,6 +137,75 @@ class TestFvutils(unittest.TestCase):
                 # may change in the future.
                 pass
 
+    def test_block_matrix_inverters_varying_block_sizes(self):
+        """
+        Invert a matrix with many blocks of different sizes, so that the batched
+        inverter must group the blocks. Compare all available inverters.
+        """
+        sz = np.array([3, 1, 2, 3, 1, 4, 2, 3], dtype="i8")
+        blocks = [
+            np.arange(1, n * n + 1).reshape((n, n)) ** 2 + 5 * n * np.eye(n)
+            for n in sz
+        ]
+        block = sps.block_diag(blocks, format="csr")
+        iblock_ex = np.linalg.inv(block.toarray())
+
+        for method in ["python", "batched", None]:
+            iblock = fvutils.invert_diagonal_blocks(block, sz, method=method)
+            self.assertTrue(np.allclose(iblock_ex, iblock.toarray()))
+
+        try:
+            import numba
+        except ImportError:
+            # Numba is not installed; see comments in the above tests
+            return
+        for method in ["numba", "numba_parallel"]:
+            iblock = fvutils.invert_diagonal_blocks(block, sz, method=method)
+            self.assertTrue(np.allclose(iblock_ex, iblock.toarray()))
+
+    def test_batched_inverter_does_not_modify_input(self):
+        # A csr matrix with a duplicate entry, and unsorted column indices
+        data = np.array([1.0, 2.0, 3.0, 1.0, 4.0])
+        indices = np.array([1, 0, 1, 0, 2])
+        indptr = np.array([0, 2, 4, 5])
+        block = sps.csr_matrix((data, indices, indptr), shape=(3, 3))
+        sz = np.array([2, 1])
+
+        iblock = fvutils.invert_diagonal_blocks(block, sz, method="batched")
+        known = np.linalg.inv(np.array([[2, 1, 0], [1, 3, 0], [0, 0, 4]]))
+        self.assertTrue(np.allclose(iblock.toarray(), known))
+
+        self.assertTrue(np.array_equal(block.data, data))
+        self.assertTrue(np.array_equal(block.indices, indices))
+        self.assertTrue(np.array_equal(block.indptr, indptr))
+
+    def test_permuted_block_matrix_inverter(self):
+        """
+        Invert a matrix which is block diagonal after a permutation of rows and
+        columns.
+        """
+        sz = np.array([3, 1, 2, 3, 1, 4, 2, 3], dtype="i8")
+        blocks = [
+            np.arange(1, n * n + 1).reshape((n, n)) ** 2 + 5 * n * np.eye(n)
+            for n in sz
+        ]
+        block = sps.block_diag(blocks, format="csr")
+
+        np.random.seed(0)
+        row_perm = np.random.permutation(sz.sum())
+        col_perm = np.random.permutation(sz.sum())
+        # The matrix in the original ordering: mat[row_perm][:, col_perm] = block
+        mat = sps.lil_matrix(block.shape)
+        mat[row_perm.reshape((-1, 1)), col_perm] = block.toarray()
+        mat = mat.tocsr()
+
+        imat_ex = np.linalg.inv(mat.toarray())
+        for method in ["python", "batched", None]:
+            imat = fvutils.invert_permuted_diagonal_blocks(
+                mat, row_perm, col_perm, sz, method=method
+            )
+            self.assertTrue(np.allclose(imat_ex, imat.toarray()))
+
     def test_compute_darcy_flux_mono_grid(self):
         g = pp.CartGrid([1, 1])
         flux = sps.csc_matrix((4, 1))
@@ -629,5 +629,95 @@ class PartialBiotMpsa(TestPartialMPSA):
         )
 
 
+class TestUpdateDiscretization(unittest.TestCase):
+    """ Update discretizations after changes in the parameters of a few cells, and
+    compare with a full rediscretization.
+    """
+
+    def grids(self):
+        g_2d = pp.StructuredTriangleGrid([4, 4])
+        g_3d = pp.CartGrid([3, 3, 3])
+        for g in [g_2d, g_3d]:
+            g.compute_geometry()
+        return [g_2d, g_3d]
+
+    def data(self, g, scaling):
+        bf = g.get_all_boundary_faces()
+        # Dirichlet conditions on the west boundary, Neumann elsewhere
+        west = bf[g.face_centers[0, bf] < 1e-10]
+        bnd_flow = pp.BoundaryCondition(g, west, ["dir"] * west.size)
+        bnd_mech = pp.BoundaryConditionVectorial(g, west, ["dir"] * west.size)
+
+        perm = pp.SecondOrderTensor(scaling)
+        stiffness = pp.FourthOrderTensor(scaling, scaling)
+
+        data = pp.initialize_default_data(
+            g,
+            {},
+            "mechanics",
+            {
+                "fourth_order_tensor": stiffness,
+                "bc": bnd_mech,
+                "biot_alpha": 1,
+                "inverter": "python",
+            },
+        )
+        data = pp.initialize_default_data(
+            g,
+            data,
+            "flow",
+            {"second_order_tensor": perm, "bc": bnd_flow, "mpfa_inverter": "python"},
+        )
+        return data
+
+    def compare_matrices(self, data_update, data_full):
+        for key, matrices in data_full[pp.DISCRETIZATION_MATRICES].items():
+            for name, mat in matrices.items():
+                updated = data_update[pp.DISCRETIZATION_MATRICES][key][name]
+                diff = updated - mat
+                self.assertTrue(np.allclose(diff.data, 0), msg=name)
+
+    def run_update(self, discr):
+        for g in self.grids():
+            scaling = np.ones(g.num_cells)
+            data_update = self.data(g, scaling)
+            discr.discretize(g, data_update)
+
+            # Change the parameters in two cells
+            cells = np.array([2, g.num_cells - 1])
+            scaling = scaling.copy()
+            scaling[cells] = 10
+            data_full = self.data(g, scaling)
+            discr.discretize(g, data_full)
+
+            for key in ["mechanics", "flow"]:
+                data_update[pp.PARAMETERS][key] = data_full[pp.PARAMETERS][key]
+            discr.update_discretization(g, data_update, cells)
+
+            self.compare_matrices(data_update, data_full)
+            # The parameters for partial discretization should not be left behind
+            self.assertFalse(
+                "update_discretization" in data_update[pp.PARAMETERS]["mechanics"]
+            )
+
+    def test_mpfa(self):
+        self.run_update(pp.Mpfa("flow"))
+
+    def test_mpsa(self):
+        self.run_update(pp.Mpsa("mechanics"))
+
+    def test_biot(self):
+        self.run_update(pp.Biot())
+
+    def test_update_matrix_rows(self):
+        A = sps.csr_matrix(np.arange(12).reshape((4, 3)))
+        B = sps.csr_matrix(-np.arange(12).reshape((4, 3)))
+        rows = np.array([3, 1])
+        A = pp.fvutils.update_matrix_rows(A, B, rows)
+        known = np.arange(12).reshape((4, 3))
+        known[rows] *= -1
+        self.assertTrue(np.allclose(A.toarray(), known))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,123 @@
+""" Tests of discretizations where the grid is split into partitions to limit the
+memory consumption, see the max_memory parameter of Mpfa, Mpsa and Biot.
+
+The partitioned discretizations, computed in serial or in parallel, should be
+identical to the discretization of the full grid.
+"""
+import unittest
+import numpy as np
+
+import porepy as pp
+
+
+class TestPartitionedMpfa(unittest.TestCase):
+    def setup(self, g, max_memory=None, num_workers=1, perm=None):
+        g.compute_geometry()
+
+        if perm is None:
+            perm = pp.SecondOrderTensor(1 + np.arange(g.num_cells) / g.num_cells)
+        bound_faces = g.get_all_boundary_faces()
+        cond = np.array(["dir"] * bound_faces.size)
+        cond[::3] = "neu"
+        cond[1::5] = "rob"
+        bc = pp.BoundaryCondition(g, bound_faces, list(cond))
+
+        specified_parameters = {
+            "second_order_tensor": perm,
+            "bc": bc,
+            "mpfa_vector_source": True,
+            "max_memory": max_memory,
+            "num_workers": num_workers,
+        }
+        data = pp.initialize_default_data(g, {}, "flow", specified_parameters)
+        pp.Mpfa("flow").discretize(g, data)
+        return data[pp.DISCRETIZATION_MATRICES]["flow"]
+
+    def _compare_matrices(self, matrices, matrices_known):
+        for key, mat in matrices_known.items():
+            diff = matrices[key] - mat
+            self.assertTrue(np.allclose(diff.data, 0))
+
+    def test_mpfa_partitioned_2d(self):
+        matrices_known = self.setup(pp.StructuredTriangleGrid([5, 4]))
+        matrices = self.setup(pp.StructuredTriangleGrid([5, 4]), max_memory=1e3)
+        self._compare_matrices(matrices, matrices_known)
+
+    def test_mpfa_partitioned_3d(self):
+        matrices_known = self.setup(pp.CartGrid([4, 3, 3]))
+        matrices = self.setup(pp.CartGrid([4, 3, 3]), max_memory=5e3)
+        self._compare_matrices(matrices, matrices_known)
+
+    def test_mpfa_partitioned_parallel(self):
+        matrices_known = self.setup(pp.CartGrid([4, 3, 3]))
+        matrices = self.setup(pp.CartGrid([4, 3, 3]), max_memory=5e3, num_workers=2)
+        self._compare_matrices(matrices, matrices_known)
+
+    def test_mpfa_partitioned_scalar_components(self):
+        # Scalar tensor components must be restricted to the partitions
+        def perm():
+            kxx = 1 + np.arange(20) / 20
+            return pp.SecondOrderTensor(kxx, kyy=2, kzz=1, kxy=0.1)
+
+        g = pp.CartGrid([5, 4])
+        matrices_known = self.setup(g, perm=perm())
+        matrices = self.setup(g, max_memory=1e3, perm=perm())
+        self._compare_matrices(matrices, matrices_known)
+
+
+class TestPartitionedMpsaBiot(unittest.TestCase):
+    def setup(self, max_memory=1e9, num_workers=1):
+        g = pp.CartGrid([4, 3, 3])
+        g.compute_geometry()
+
+        constit = pp.FourthOrderTensor(np.ones(g.num_cells), np.ones(g.num_cells))
+        bound_faces = g.get_all_boundary_faces()
+        bc = pp.BoundaryConditionVectorial(g, bound_faces, ["dir"] * bound_faces.size)
+
+        specified_parameters = {
+            "fourth_order_tensor": constit,
+            "bc": bc,
+            "biot_alpha": 1,
+            "max_memory": max_memory,
+            "num_workers": num_workers,
+        }
+        data = pp.initialize_default_data(g, {}, "mechanics", specified_parameters)
+        pp.initialize_default_data(g, data, "flow", {})
+        return g, data
+
+    def _compare_matrices(self, data, data_known):
+        for keyword, matrices in data_known[pp.DISCRETIZATION_MATRICES].items():
+            for key, mat in matrices.items():
+                diff = data[pp.DISCRETIZATION_MATRICES][keyword][key] - mat
+                self.assertTrue(np.allclose(diff.data, 0))
+
+    def test_mpsa_partitioned(self):
+        g, data_known = self.setup()
+        pp.Mpsa("mechanics").discretize(g, data_known)
+
+        g, data = self.setup(max_memory=1e5)
+        pp.Mpsa("mechanics").discretize(g, data)
+
+        self._compare_matrices(data, data_known)
+
+    def test_mpsa_partitioned_parallel(self):
+        g, data_known = self.setup()
+        pp.Mpsa("mechanics").discretize(g, data_known)
+
+        g, data = self.setup(max_memory=1e5, num_workers=2)
+        pp.Mpsa("mechanics").discretize(g, data)
+
+        self._compare_matrices(data, data_known)
+
+    def test_biot_partitioned_parallel(self):
+        g, data_known = self.setup()
+        pp.Biot().discretize(g, data_known)
+
+        g, data = self.setup(max_memory=1e5, num_workers=2)
+        pp.Biot().discretize(g, data)
+
+        self._compare_matrices(data, data_known)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import numpy as np
+import scipy.sparse as sps
+import unittest
+from unittest import mock
+
+from porepy.ad.forward_mode import initAdArrays
+from porepy.ad.fused_mode import Fused_ad_array, initFusedAdArrays
+from porepy.ad import fused_mode
+from porepy.ad import functions as af
+
+
+def _law(p, T, A):
+    # Expression of the type found in constitutive laws, with a matrix product
+    rho = 2 * af.exp(0.1 * (p - 1)) / (1 + 0.2 * (T - 0.5))
+    mu = 2 ** (0.1 * T) * p ** 0.5 - af.log(T) / 3
+    k = (p / 2) ** 3 / (1 - p / 3) ** 2
+    return A * (rho * k / mu) + rho * np.arange(p.val.size) - T * p + p ** T
+
+
+class FusedAdTest(unittest.TestCase):
+    def setUp(self):
+        self.p0 = np.array([1.0, 1.5, 2.0, 1.2])
+        self.T0 = np.array([1.0, 3.0, 2.0, 4.0])
+        self.A = sps.csr_matrix(
+            np.array([[1, -1, 0, 0], [0, 2, 0, 1], [0, 0, 0, 0], [1, 0, 3, 1]])
+        )
+
+    def test_compare_with_ad_array(self):
+        p, T = initAdArrays([self.p0, self.T0])
+        known = _law(p, T, self.A)
+        p, T = initFusedAdArrays([self.p0, self.T0])
+        f = _law(p, T, self.A)
+
+        self.assertTrue(isinstance(f, Fused_ad_array))
+        self.assertTrue(np.allclose(f.val, known.val))
+        self.assertTrue(np.allclose(f.jac.A, known.jac.A))
+
+    def test_jacobian_is_formed_on_demand(self):
+        p, T = initFusedAdArrays([self.p0, self.T0])
+        f = af.exp(p) * T - 3 * p
+        self.assertIsNone(f._jac)
+        self.assertEqual(len(f._terms), 2)
+
+        known = np.hstack(
+            (np.diag(np.exp(self.p0) * self.T0 - 3), np.diag(np.exp(self.p0)))
+        )
+        self.assertTrue(np.allclose(f.jac.A, known))
+
+    def test_pattern_is_reused(self):
+        def pattern(f):
+            return fused_mode._pattern([J for _, J in f._terms.values()])
+
+        # The base Jacobians are shared between initializations of variables of
+        # equal size, and so is the pattern of the Jacobian
+        p, T = initFusedAdArrays([self.p0, self.T0])
+        first = pattern(p * T)
+        p, T = initFusedAdArrays([2 * self.p0, self.T0])
+        self.assertIs(pattern(p * T), first)
+
+        # Base Jacobians from a matrix product are new objects, but the pattern is
+        # also reused when the structure is unchanged
+        second = pattern((self.A * p) * T)
+        self.assertIsNot(second, first)
+        self.assertIs(pattern((self.A * (2 * p)) * T), second)
+
+    def test_operands_are_not_modified(self):
+        p = initFusedAdArrays(self.p0.copy())
+        jac = p.jac.copy()
+        q = -(p * 2) + 1
+        q.jac
+        (1 - q).jac
+        self.assertTrue(np.allclose(p.val, self.p0))
+        self.assertTrue(np.allclose(p.jac.A, jac.A))
+        self.assertTrue(np.allclose(q.jac.A, -2 * np.eye(4)))
+
+    def test_constant(self):
+        a = Fused_ad_array(np.ones(3))
+        b = a * 2 + 1
+        self.assertTrue(np.allclose(b.val, 3))
+        self.assertEqual(b.jac, 0)
+
+    def test_right_multiplication_with_matrix(self):
+        p = initFusedAdArrays(self.p0)
+        self.assertRaises(ValueError, p.__mul__, self.A)
+
+    def test_ad_array_operand(self):
+        p = initFusedAdArrays(self.p0)
+        q = initAdArrays(self.p0)
+        for op in [
+            p.__add__,
+            p.__radd__,
+            p.__sub__,
+            p.__rsub__,
+            p.__mul__,
+            p.__rmul__,
+            p.__truediv__,
+            p.__rtruediv__,
+            p.__pow__,
+            p.__rpow__,
+        ]:
+            self.assertRaises(TypeError, op, q)
+
+    def test_caches_are_bounded(self):
+        with mock.patch.object(fused_mode, "_MAX_CACHE_SIZE", 2):
+            for n in range(1, 6):
+                p, T = initFusedAdArrays([np.ones(n), np.ones(n)])
+                (p * T).jac
+            self.assertEqual(len(fused_mode._variable_jacobians), 2)
+            self.assertEqual(len(fused_mode._patterns), 2)
+
+            # The most recently used items are kept
+            self.assertIn((5, 5), fused_mode._variable_jacobians)
+            p, T = initFusedAdArrays([np.ones(4), np.ones(4)])
+            pattern = fused_mode._pattern([J for _, J in (p * T)._terms.values()])
+            self.assertIn(pattern, fused_mode._patterns.values())
+
+    def test_initialization_of_single_variable(self):
+        p = initFusedAdArrays(self.p0)
+        known = initAdArrays(self.p0)
+        self.assertTrue(np.allclose(p.jac.A, known.jac.A))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -28,6 +28,9 @@ grid bucket data dictionaries. If this under some system changes, everything
 breaks.
 
 """
+import threading
+import time
+
 import numpy as np
 import scipy.sparse as sps
 import unittest
@@ -910,6 +913,149 @@ class TestAssembler(unittest.TestCase):
         )
         self.assertTrue(np.allclose(A_known, A_2_permuted.todense()))
 
+    def test_reuse_sparsity_pattern(self):
+        """ Assemble with a stored sparsity pattern, first with unchanged
+        pattern and modified values, then with a modified pattern.
+        """
+        gb = self.define_gb()
+        variable_name_1 = "var_1"
+        variable_name_2 = "var_2"
+        operator_1 = "operator_1"
+        operator_2 = "operator_2"
+        for g, d in gb:
+            d[pp.PRIMARY_VARIABLES] = {
+                variable_name_1: {"cells": 1},
+                variable_name_2: {"cells": 1},
+            }
+            d[pp.DISCRETIZATION] = {
+                variable_name_1: {operator_1: MockNodeDiscretization(1)},
+                variable_name_2: {operator_2: MockNodeDiscretization(2)},
+            }
+            if g.grid_num == 1:
+                g1 = g
+            else:
+                g2 = g
+
+        for e, d in gb.edges():
+            d[pp.PRIMARY_VARIABLES] = {variable_name_1: {"cells": 1}}
+            d[pp.COUPLING_DISCRETIZATION] = {
+                "coupling_discretization": {
+                    g1: (variable_name_1, operator_1),
+                    g2: (variable_name_1, operator_1),
+                    e: (variable_name_1, MockEdgeDiscretization(1, 2)),
+                }
+            }
+
+        general_assembler = pp.Assembler(gb)
+        for matrix_format in ["csr", "csc"]:
+            A_known, b_known = general_assembler.assemble_matrix_rhs(matrix_format)
+            A, b = general_assembler.assemble_matrix_rhs(
+                matrix_format, reuse_sparsity_pattern=True
+            )
+            self.assertTrue(np.allclose(A_known.todense(), A.todense()))
+            self.assertTrue(np.allclose(b_known, b))
+            self.assertEqual(A.format, matrix_format)
+
+            # Modify a value, the pattern is unchanged
+            gb.node_props(g1, pp.DISCRETIZATION)[variable_name_2][operator_2].value = 5
+            A_known, _ = general_assembler.assemble_matrix_rhs(matrix_format)
+            A_2, _ = general_assembler.assemble_matrix_rhs(
+                matrix_format, reuse_sparsity_pattern=True
+            )
+            self.assertTrue(A_2 is A)
+            self.assertTrue(np.allclose(A_known.todense(), A_2.todense()))
+
+            # Remove an element from the pattern
+            gb.node_props(g2, pp.DISCRETIZATION)[variable_name_2][operator_2].value = 0
+            A_known, _ = general_assembler.assemble_matrix_rhs(matrix_format)
+            A_3, _ = general_assembler.assemble_matrix_rhs(
+                matrix_format, reuse_sparsity_pattern=True
+            )
+            self.assertTrue(np.allclose(A_known.todense(), A_3.todense()))
+
+            gb.node_props(g1, pp.DISCRETIZATION)[variable_name_2][operator_2].value = 2
+            gb.node_props(g2, pp.DISCRETIZATION)[variable_name_2][operator_2].value = 2
+
+    def test_parallel_discretization(self):
+        """ Discretize a flow problem in a thread and a process pool, compare with
+        serial discretization.
+        """
+        f_1 = np.array([[1, 3], [2, 2]])
+        f_2 = np.array([[2, 2], [1, 3]])
+        gb = pp.meshing.cart_grid([f_1, f_2], [4, 4])
+
+        key = "flow"
+        for g, d in gb:
+            pp.initialize_default_data(g, d, key)
+            d[pp.PRIMARY_VARIABLES] = {"pressure": {"cells": 1}}
+            d[pp.DISCRETIZATION] = {"pressure": {"diffusion": pp.Tpfa(key)}}
+        for e, d in gb.edges():
+            mg = d["mortar_grid"]
+            pp.initialize_data(mg, d, key, {"normal_diffusivity": 1})
+            g_slave, g_master = gb.nodes_of_edge(e)
+            d[pp.PRIMARY_VARIABLES] = {"mortar_flux": {"cells": 1}}
+            d[pp.COUPLING_DISCRETIZATION] = {
+                "coupling": {
+                    g_slave: ("pressure", "diffusion"),
+                    g_master: ("pressure", "diffusion"),
+                    e: ("mortar_flux", pp.RobinCoupling(key, pp.Tpfa(key))),
+                }
+            }
+
+        assembler = pp.Assembler(gb)
+        assembler.discretize()
+        A_known, b_known = assembler.assemble_matrix_rhs()
+
+        for pool in ["thread", "process"]:
+            for _, d in gb:
+                d[pp.DISCRETIZATION_MATRICES][key] = {}
+            for _, d in gb.edges():
+                d[pp.DISCRETIZATION_MATRICES][key] = {}
+
+            assembler.discretize(num_workers=2, pool=pool)
+            A, b = assembler.assemble_matrix_rhs()
+            self.assertTrue(np.allclose(A_known.todense(), A.todense()))
+            self.assertTrue(np.allclose(b_known, b))
+
+            # One timing per node and edge
+            self.assertEqual(
+                len(assembler.discretization_timings),
+                gb.num_graph_nodes() + gb.num_graph_edges(),
+            )
+            g = gb.grids_of_dimension(2)[0]
+            self.assertTrue((g, "diffusion_pressure") in assembler.discretization_timings)
+
+        self.assertRaises(ValueError, assembler.discretize, pool="mpi")
+
+    def test_parallel_coupling_discretization_shared_nodes(self):
+        """ Coupling discretizations which modify the node data are never run at
+        the same time on edges that share a node.
+        """
+        f_1 = np.array([[1, 3], [2, 2]])
+        f_2 = np.array([[2, 2], [1, 3]])
+        gb = pp.meshing.cart_grid([f_1, f_2], [4, 4])
+
+        discr = MockCouplingModifiesNodeData()
+        for g, d in gb:
+            d[pp.PRIMARY_VARIABLES] = {"var": {"cells": 1}}
+            d[pp.DISCRETIZATION] = {"var": {"op": MockNodeDiscretization(1)}}
+            d["active"] = []
+        for e, d in gb.edges():
+            g_slave, g_master = gb.nodes_of_edge(e)
+            d[pp.PRIMARY_VARIABLES] = {"mortar_var": {"cells": 1}}
+            d[pp.COUPLING_DISCRETIZATION] = {
+                "coupling": {
+                    g_slave: ("var", "op"),
+                    g_master: ("var", "op"),
+                    e: ("mortar_var", discr),
+                }
+            }
+
+        assembler = pp.Assembler(gb)
+        assembler.discretize(num_workers=4)
+        self.assertEqual(discr.num_calls, gb.num_graph_edges())
+        self.assertFalse(discr.conflict)
+
     def test_two_variables_coupling_between_node_and_edge_mixed_dependencies(self):
         """ Two variables, coupling between the variables internal to each node.
         No coupling in the edge variable
@@ -1572,6 +1718,9 @@ class MockNodeDiscretization(object):
     def __init__(self, value):
         self.value = value
 
+    def discretize(self, g, data):
+        pass
+
     def assemble_matrix_rhs(self, g, data=None):
         return sps.coo_matrix(self.value), np.zeros(1)
 
@@ -1604,6 +1753,30 @@ class MockEdgeDiscretization(
         return cc + local_matrix, np.empty(3)
 
 
+class MockCouplingModifiesNodeData(
+    porepy.numerics.interface_laws.abstract_interface_law.AbstractInterfaceLaw
+):
+    # Coupling discretization which writes to the node data, and records whether
+    # a node is used by two discretizations at the same time.
+    def __init__(self):
+        super(MockCouplingModifiesNodeData, self).__init__("")
+        self.lock = threading.Lock()
+        self.num_calls = 0
+        self.conflict = False
+
+    def discretize(self, g_master, g_slave, data_master, data_slave, data_edge):
+        with self.lock:
+            self.num_calls += 1
+            for d in [data_master, data_slave]:
+                if len(d["active"]) > 0:
+                    self.conflict = True
+                d["active"].append(self)
+        time.sleep(0.02)
+        with self.lock:
+            data_master["active"].remove(self)
+            data_slave["active"].remove(self)
+
+
 class MockEdgeDiscretizationModifiesNode(
     porepy.numerics.interface_laws.abstract_interface_law.AbstractInterfaceLaw
 ):
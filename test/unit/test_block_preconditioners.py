@@ -0,0 +1,188 @@
+"""
+Tests of the block preconditioners for mixed-dimensional systems.
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import scipy.sparse as sps
+
+import porepy as pp
+from porepy.numerics.linalg import block_preconditioners as bp
+
+
+class TestBlockPreconditioners(unittest.TestCase):
+    def setup(self):
+        """ A system with three variables, with interleaved dofs.
+        """
+        np.random.seed(0)
+        n = 30
+        A = sps.random(n, n, density=0.2, format="csr") + 5 * sps.identity(n)
+        layout = bp.DofLayout(
+            {"u": np.arange(0, n, 3), "p": np.arange(1, n, 3), "m": np.arange(2, n, 3)}
+        )
+        return A.tocsr(), layout
+
+    def restrict_to_blocks(self, A, layout, fields, lower=False):
+        """ Remove the couplings between the fields, or only those above the
+        diagonal.
+        """
+        field_ind = np.zeros(layout.num_dofs, dtype=np.int)
+        for i, f in enumerate(fields):
+            field_ind[layout.dofs(f)] = i
+        A = A.tocoo()
+        if lower:
+            keep = field_ind[A.row] >= field_ind[A.col]
+        else:
+            keep = field_ind[A.row] == field_ind[A.col]
+        return sps.coo_matrix(
+            (A.data[keep], (A.row[keep], A.col[keep])), shape=A.shape
+        ).tocsr()
+
+    def test_layout(self):
+        _, layout = self.setup()
+        self.assertTrue(
+            np.all(layout.dofs(["p", "u"]) == np.sort(np.r_[0:30:3, 1:30:3]))
+        )
+        self.assertEqual(layout.complement("u"), ["p", "m"])
+
+        sub = layout.restrict(["u", "m"])
+        self.assertEqual(sub.num_dofs, 20)
+        self.assertTrue(np.all(sub.dofs("u") == np.arange(0, 20, 2)))
+        self.assertTrue(np.all(sub.dofs("m") == np.arange(1, 20, 2)))
+
+    def test_additive_field_split(self):
+        A, layout = self.setup()
+        fields = ["u", ["p", "m"]]
+        A = self.restrict_to_blocks(A, layout, fields)
+
+        precond = bp.FieldSplit(
+            fields, [bp.DirectBlockSolver(), bp.DirectBlockSolver()]
+        )
+        precond.setup(A, layout)
+        b = np.random.rand(A.shape[0])
+        self.assertTrue(np.allclose(A * precond.solve(b), b))
+
+    def test_multiplicative_field_split(self):
+        A, layout = self.setup()
+        fields = ["m", "u", "p"]
+        A = self.restrict_to_blocks(A, layout, fields, lower=True)
+
+        solvers = [bp.DirectBlockSolver() for _ in fields]
+        precond = bp.FieldSplit(fields, solvers, method="multiplicative")
+        precond.setup(A, layout)
+        b = np.random.rand(A.shape[0])
+        self.assertTrue(np.allclose(A * precond.solve(b), b))
+
+    def test_nested_schur_complement(self):
+        A, layout = self.setup()
+        # With a diagonal A_00, the diagonal approximation of the Schur complement
+        # is exact. The Schur complement is solved with a field split, which is
+        # exact if the coupling between u and p in S is removed.
+        A = A.tolil()
+        m = layout.dofs("m")
+        u = layout.dofs("u")
+        p = layout.dofs("p")
+        A[m.reshape((-1, 1)), m] = sps.diags(np.arange(1, m.size + 1))
+        A[u.reshape((-1, 1)), p] = 0
+        A[p.reshape((-1, 1)), u] = 0
+        A[m.reshape((-1, 1)), p] = 0
+        A[p.reshape((-1, 1)), m] = 0
+        A = A.tocsr()
+
+        precond = bp.SchurComplement(
+            first="m",
+            second=["u", "p"],
+            first_solver=bp.DirectBlockSolver(),
+            schur_solver=bp.FieldSplit(
+                ["u", "p"], [bp.DirectBlockSolver(), bp.DirectBlockSolver()]
+            ),
+            approximation="diagonal",
+        )
+        precond.setup(A, layout)
+        b = np.random.rand(A.shape[0])
+        self.assertTrue(np.allclose(A * precond.solve(b), b))
+
+    def test_gmres_schur_complement(self):
+        A, layout = self.setup()
+        precond = bp.SchurComplement(
+            first="m",
+            second=["u", "p"],
+            first_solver=bp.DirectBlockSolver(),
+            schur_solver=bp.ILUBlockSolver(),
+        )
+        precond.setup(A, layout)
+        b = np.random.rand(A.shape[0])
+        x, info = sps.linalg.gmres(A, b, M=precond.as_linear_operator(), tol=1e-10)
+        self.assertEqual(info, 0)
+        self.assertTrue(np.allclose(A * x, b))
+
+    def test_reuse_setup(self):
+        A, layout = self.setup()
+        solvers = [bp.ILUBlockSolver(), bp.ILUBlockSolver(max_reuse=1)]
+        precond = bp.FieldSplit(["u", ["p", "m"]], solvers)
+        precond.setup(A, layout)
+        # Unchanged matrix: No new setup
+        precond.setup(A.copy(), layout)
+        self.assertEqual(solvers[0].num_setup, 1)
+        self.assertEqual(solvers[1].num_setup, 1)
+
+        # Modified values: The second solver reuses its setup once
+        for _ in range(2):
+            A = A.copy()
+            A.data += 1
+            precond.setup(A, layout)
+        self.assertEqual(solvers[0].num_setup, 3)
+        self.assertEqual(solvers[1].num_setup, 2)
+
+    def test_direct_block_solver_factorizes_once(self):
+        A, _ = self.setup()
+        solver = bp.DirectBlockSolver()
+        solver.setup(A)
+        # Applying the solver only uses the stored factorization
+        with mock.patch.object(solver._solver, "solve") as solve:
+            for _ in range(3):
+                b = np.random.rand(A.shape[0])
+                self.assertTrue(np.allclose(A * solver.solve(b), b))
+            self.assertFalse(solve.called)
+        self.assertEqual(solver._solver.num_factorize, 1)
+
+    def test_extract_submatrix(self):
+        A, layout = self.setup()
+        rows = layout.dofs("u")
+        cols = layout.dofs(["p", "m"])
+        extract = bp._SubmatrixExtractor(rows, cols)
+        for _ in range(2):
+            sub = extract(A)
+            self.assertTrue(np.allclose(sub.toarray(), A[rows][:, cols].toarray()))
+            A = A.copy()
+            A.data *= 2
+
+    def test_invalid_fields(self):
+        A, layout = self.setup()
+        precond = bp.FieldSplit(["u", "p"], [bp.ILUBlockSolver(), bp.ILUBlockSolver()])
+        self.assertRaises(ValueError, precond.setup, A, layout)
+
+    def test_layout_from_assembler(self):
+        gb = pp.meshing.cart_grid([np.array([[1, 1], [0, 2]])], [2, 2])
+        for g, d in gb:
+            if g.dim == 2:
+                d[pp.PRIMARY_VARIABLES] = {"u": {"cells": 2}, "p": {"cells": 1}}
+            else:
+                d[pp.PRIMARY_VARIABLES] = {"p": {"cells": 1}}
+        for _, d in gb.edges():
+            d[pp.PRIMARY_VARIABLES] = {"m": {"cells": 1}}
+
+        assembler = pp.Assembler(gb)
+        layout = bp.DofLayout.from_assembler(assembler)
+        self.assertEqual(layout.num_dofs, assembler.num_dof())
+
+        g = gb.grids_of_dimension(2)[0]
+        self.assertTrue(np.all(layout.dofs("u") == assembler.dof_ind(g, "u")))
+        self.assertEqual(layout.dofs("p").size, g.num_cells + 2)
+        self.assertEqual(layout.dofs("m").size, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1002,5 +1002,216 @@ class ContactModel3d(ContactModel2d):
             self.mg = e["mortar_grid"]
 
 
+class TestVectorizedCoefficients(unittest.TestCase):
+    """ Compare the coefficients of ColoumbContact, computed for all cells at once,
+    with a cell by cell computation, for fractures with cells in all contact states.
+    """
+
+    def _discretize(self, gb, discr, friction, tangential_force, normal_force):
+        np.random.seed(42)
+        g_l = gb.grids_of_dimension(gb.dim_max() - 1)[0]
+        pp.contact_conditions.set_projections(gb)
+        for g, d in gb:
+            if g.dim == gb.dim_max():
+                g_h, d_h = g, d
+                ones = np.ones(g.num_cells)
+                constit = pp.FourthOrderTensor(ones, ones)
+                d[pp.PARAMETERS] = {"mechanics": {"fourth_order_tensor": constit}}
+            elif g is g_l:
+                d_l = d
+                traction = np.vstack((tangential_force, normal_force))
+                d[pp.PARAMETERS] = {"contact": {"friction_coefficient": friction}}
+                d[pp.DISCRETIZATION_MATRICES] = {"contact": {}}
+                d[pp.STATE] = {
+                    "previous_iterate": {"contact_traction": traction.ravel("F")}
+                }
+        for e, d_e in gb.edges():
+            if g_l in e:
+                # The displacement of the previous iterate is zero, thus the normal
+                # jump is zero, while the tangential jump relative to the previous
+                # time step is non-zero.
+                num_dofs = d_e["mortar_grid"].num_cells * gb.dim_max()
+                d_e[pp.STATE] = {
+                    "mortar_u": 1e-4 * np.random.rand(num_dofs),
+                    "previous_iterate": {"mortar_u": np.zeros(num_dofs)},
+                }
+                break
+
+        discr.discretize(g_h, g_l, d_h, d_l, d_e)
+        state = d_l[pp.STATE]["previous_iterate"]
+        return d_l[pp.DISCRETIZATION_MATRICES]["contact"], state
+
+    def _compare(self, gb, friction, tangential_force, normal_force):
+        dim = gb.dim_max()
+        discr = pp.ColoumbContact("contact", dim, pp.Mpsa("mechanics"))
+        known = PerCellColoumbContact("contact", dim, pp.Mpsa("mechanics"))
+        args = (friction, tangential_force, normal_force)
+        matrices, state = self._discretize(gb, discr, *args)
+        known_matrices, known_state = self._discretize(gb, known, *args)
+
+        # All contact states are represented
+        penetration, sliding = state["penetration"], state["sliding"]
+        self.assertTrue(np.any(np.logical_not(penetration)))
+        self.assertTrue(np.any(np.logical_and(penetration, sliding)))
+        self.assertTrue(np.any(np.logical_and(penetration, np.logical_not(sliding))))
+        self.assertTrue(np.all(penetration == known_state["penetration"]))
+        self.assertTrue(np.all(sliding == known_state["sliding"]))
+
+        for key in ["traction_discretization", "displacement_discretization"]:
+            diff = matrices[key] - known_matrices[key]
+            self.assertTrue(np.allclose(diff.data, 0, atol=1e-12))
+            self.assertEqual(matrices[key].shape, known_matrices[key].shape)
+        self.assertTrue(
+            np.allclose(
+                matrices["contact_rhs"],
+                known_matrices["contact_rhs"],
+                rtol=1e-10,
+                atol=1e-12,
+            )
+        )
+
+    def test_2d(self):
+        gb = pp.meshing.cart_grid([np.array([[0, 4], [1, 1]])], [4, 2])
+        # Open, sticking, sliding and sliding with zero friction
+        friction = np.array([0.5, 0.5, 0.5, 1e-4])
+        tangential_force = np.array([[1.0, 0.1, 2.0, -1.0]])
+        normal_force = np.array([0, -1.0, -1.0, -1.0])
+        self._compare(gb, friction, tangential_force, normal_force)
+
+    def test_3d(self):
+        # Meshing of fractured 3d domains requires robust_point_in_polyhedron. The
+        # coefficients are therefore compared directly for a set of contact states.
+        np.random.seed(0)
+        num_cells = 8
+        # Open, sticking, sliding and sliding with zero friction
+        penetration = np.array([0, 0, 1, 1, 1, 1, 1, 1], dtype=np.bool)
+        sliding = np.array([0, 1, 0, 0, 1, 1, 1, 1], dtype=np.bool)
+        tangential_force = np.random.rand(2, num_cells) - 0.5
+        tangential_jump = 1e-3 * (np.random.rand(2, num_cells) - 0.5)
+        friction_coefficient = 0.2 + np.random.rand(num_cells)
+        friction_bound = 0.1 + np.random.rand(num_cells)
+        friction_bound[-1] = 1e-4
+        c_num = 100 * (1 + np.random.rand(num_cells))
+        args = (
+            penetration,
+            sliding,
+            tangential_force,
+            tangential_jump,
+            friction_bound,
+            friction_coefficient,
+            c_num,
+        )
+
+        discr = pp.ColoumbContact("contact", 3, pp.Mpsa("mechanics"))
+        known = PerCellColoumbContact("contact", 3, pp.Mpsa("mechanics"))
+        coefficients = discr._coefficients(*args)
+        known_coefficients = known._coefficients(*args)
+        for c, known_c in zip(coefficients, known_coefficients):
+            self.assertEqual(c.shape, known_c.shape)
+            self.assertTrue(np.allclose(c, known_c, rtol=1e-10, atol=1e-12))
+
+        # The matrices are formed from the blocks of the coefficients
+        for c, known_c in zip(coefficients[:2], known_coefficients[:2]):
+            mat = pp.utils.sparse_mat.csr_matrix_from_blocks(c.ravel(), 3, num_cells)
+            known_mat = pp.utils.sparse_mat.csr_matrix_from_blocks(
+                known_c.ravel(), 3, num_cells
+            )
+            self.assertTrue(np.allclose((mat - known_mat).data, 0, atol=1e-12))
+
+
+class PerCellColoumbContact(pp.ColoumbContact):
+    """ ColoumbContact with the coefficients computed cell by cell, as in the
+    implementation before the computation was vectorized.
+    """
+
+    def _coefficients(
+        self,
+        penetration_bc,
+        sliding_bc,
+        contact_force_tangential,
+        displacement_jump_tangential,
+        friction_bound,
+        friction_coefficient,
+        c_num_tangential,
+    ):
+        displacement_weight = []
+        traction_weight = []
+        rhs = np.array([])
+
+        zer = np.array([0] * (self.dim - 1))
+        zer1 = np.array([0] * (self.dim))
+        zer1[-1] = 1
+
+        for i in range(friction_bound.size):
+            if sliding_bc[i] & penetration_bc[i]:
+                loc_displacement_tangential, r, v = self._cell_sliding_coefficients(
+                    contact_force_tangential[:, i],
+                    displacement_jump_tangential[:, i],
+                    friction_bound[i],
+                    c_num_tangential[i],
+                )
+                L = np.hstack((loc_displacement_tangential, np.atleast_2d(zer).T))
+                loc_displacement_weight = np.vstack((L, zer1))
+                r = np.vstack((r + friction_bound[i] * v, 0))
+                loc_traction_weight = np.eye(self.dim)
+                loc_traction_weight[-1, -1] = 0
+                loc_traction_weight[:-1, -1] = -friction_coefficient[i] * v.ravel()
+
+            elif ~sliding_bc[i] & penetration_bc[i]:
+                loc_traction_tangential = (
+                    -friction_coefficient[i]
+                    * displacement_jump_tangential[:, i].ravel("F")
+                    / friction_bound[i]
+                )
+                loc_displacement_weight = np.eye(self.dim)
+                loc_traction_weight = np.zeros((self.dim, self.dim))
+                loc_traction_weight[:-1, -1] = loc_traction_tangential
+                r = np.hstack((displacement_jump_tangential[:, i], 0)).T
+
+            else:
+                loc_displacement_weight = np.zeros((self.dim, self.dim))
+                loc_traction_weight = np.eye(self.dim)
+                r = np.zeros(self.dim)
+
+            w_diag = np.diag(loc_displacement_weight) + np.diag(loc_traction_weight)
+            W_inv = np.diag(1 / w_diag)
+            displacement_weight.append(W_inv.dot(loc_displacement_weight))
+            traction_weight.append(W_inv.dot(loc_traction_weight))
+            rhs = np.hstack((rhs, r.ravel() / w_diag))
+
+        return np.array(displacement_weight), np.array(traction_weight), rhs
+
+    def _cell_sliding_coefficients(self, Tt, ut, bf, c):
+        Tt = np.atleast_2d(Tt).T
+        ut = np.atleast_2d(ut).T
+        cut = c * ut
+        Id = np.eye(Tt.shape[0])
+
+        if bf <= 1e-3:
+            return (
+                0 * Id,
+                bf * np.ones((Id.shape[0], 1)),
+                (-Tt + cut) / self._l2(-Tt + cut),
+            )
+
+        e = bf / self._l2(-Tt + cut)
+        Q = -Tt.dot((-Tt + cut).T) / (
+            max(bf, self._l2(-Tt)) * self._l2(-Tt + cut)
+        )
+        coeff_M = e * (Id - Q)
+        hf = e * Q.dot(-Tt + cut)
+
+        alpha = -Tt.T.dot(-Tt + cut) / (self._l2(-Tt) * self._l2(-Tt + cut))
+        delta = min(self._l2(-Tt) / bf, 1)
+        if alpha < 0:
+            beta = 1 / (1 - alpha * delta)
+        else:
+            beta = 1
+
+        IdM_inv = np.linalg.inv(Id - beta * coeff_M)
+        v = IdM_inv.dot(-Tt + cut) / self._l2(-Tt + cut)
+        return c * (IdM_inv - Id), -IdM_inv.dot(hf), v
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests of the direct solvers which reuse factorizations.
+"""
+import unittest
+import warnings
+
+import numpy as np
+import scipy.sparse as sps
+
+from porepy.numerics.linalg import direct_solvers
+
+
+class TestSuperLUSolver(unittest.TestCase):
+    def matrix(self):
+        np.random.seed(0)
+        A = sps.random(50, 50, density=0.1, format="csr") + 5 * sps.identity(50)
+        return A.tocsr()
+
+    def test_reuse_factorization(self):
+        A = self.matrix()
+        solver = direct_solvers.create_direct_solver("superlu")
+
+        for _ in range(3):
+            b = np.random.rand(50)
+            x = solver.solve(A, b)
+            self.assertTrue(np.allclose(A * x, b))
+
+        # Only a single factorization is needed
+        self.assertEqual(solver.num_analyze, 1)
+        self.assertEqual(solver.num_factorize, 1)
+        self.assertEqual(solver.num_solve, 3)
+
+    def test_refactorize_modified_values(self):
+        A = self.matrix()
+        solver = direct_solvers.create_direct_solver("superlu")
+        b = np.random.rand(50)
+        solver.solve(A, b)
+
+        # Modify the values in place, the sparsity pattern is kept
+        A.data *= np.random.rand(A.data.size)
+        A = A + 5 * sps.identity(50)
+        x = solver.solve(A, b)
+        self.assertTrue(np.allclose(A * x, b))
+        self.assertEqual(solver.num_analyze, 1)
+        self.assertEqual(solver.num_factorize, 2)
+
+    def test_modified_pattern(self):
+        A = self.matrix()
+        solver = direct_solvers.create_direct_solver("superlu")
+        b = np.random.rand(50)
+        solver.solve(A, b)
+
+        A = A + sps.random(50, 50, density=0.05, format="csr")
+        x = solver.solve(A, b)
+        self.assertTrue(np.allclose(A * x, b))
+        self.assertEqual(solver.num_analyze, 2)
+        self.assertEqual(solver.num_factorize, 2)
+
+    def test_singular_matrix(self):
+        A = sps.csr_matrix(np.array([[1, 1], [1, 1]], dtype=np.float))
+        solver = direct_solvers.create_direct_solver("superlu")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            x = solver.solve(A, np.ones(2))
+        self.assertTrue(np.all(np.isnan(x)))
+
+    def test_unknown_solver(self):
+        self.assertRaises(ValueError, direct_solvers.create_direct_solver, "foo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Tests of the on-disk cache of discretization matrices.
+"""
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+import porepy as pp
+
+
+class TestDiscretizationCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def flow_data(self, g, perm=1, bc_values=0):
+        bf = g.get_all_boundary_faces()
+        bc = pp.BoundaryCondition(g, bf, ["dir"] * bf.size)
+        specified_parameters = {
+            "second_order_tensor": pp.SecondOrderTensor(
+                perm * np.ones(g.num_cells)
+            ),
+            "bc": bc,
+            "bc_values": bc_values * np.ones(g.num_faces),
+        }
+        return pp.initialize_default_data(g, {}, "flow", specified_parameters)
+
+    def grid(self):
+        g = pp.CartGrid([3, 4])
+        g.compute_geometry()
+        return g
+
+    def compare(self, data, known):
+        matrices = data[pp.DISCRETIZATION_MATRICES]
+        for kw, mat_dict in known[pp.DISCRETIZATION_MATRICES].items():
+            for name, mat in mat_dict.items():
+                diff = matrices[kw][name] - mat
+                self.assertTrue(np.allclose(diff.data, 0))
+
+    def test_hit_and_miss(self):
+        g = self.grid()
+        cache = pp.DiscretizationCache(self.folder)
+
+        known = self.flow_data(g)
+        pp.Mpfa("flow").discretize(g, known)
+
+        # First call computes the discretization, the second reads it
+        for num_misses in [1, 1]:
+            data = self.flow_data(g)
+            cache.discretize(pp.Mpfa("flow"), g, data)
+            self.compare(data, known)
+            self.assertEqual(cache.num_misses, num_misses)
+        self.assertEqual(cache.num_hits, 1)
+
+        # Changed boundary values do not affect the discretization
+        cache.discretize(pp.Mpfa("flow"), g, self.flow_data(g, bc_values=1))
+        self.assertEqual(cache.num_hits, 2)
+
+        # Changed permeability, boundary condition types and grid geometry do
+        data = self.flow_data(g, perm=2)
+        cache.discretize(pp.Mpfa("flow"), g, data)
+        self.assertEqual(cache.num_misses, 2)
+
+        data = self.flow_data(g)
+        data[pp.PARAMETERS]["flow"]["bc"].is_dir[0] = False
+        data[pp.PARAMETERS]["flow"]["bc"].is_neu[0] = True
+        cache.discretize(pp.Mpfa("flow"), g, data)
+        self.assertEqual(cache.num_misses, 3)
+
+        g.nodes[0, 0] -= 0.1
+        g.compute_geometry()
+        cache.discretize(pp.Mpfa("flow"), g, self.flow_data(g))
+        self.assertEqual(cache.num_misses, 4)
+
+        # A new cache object in the same folder, as in a new run
+        g = self.grid()
+        cache = pp.DiscretizationCache(self.folder, compress=True)
+        data = self.flow_data(g, perm=2)
+        cache.discretize(pp.Mpfa("flow"), g, data)
+        self.assertEqual(cache.num_hits, 1)
+
+    def test_key_independent_of_tensor_storage(self):
+        # A tensor with expanded cell-wise matrices gives the same key as a
+        # compactly stored tensor with the same values
+        g = self.grid()
+        cache = pp.DiscretizationCache(self.folder)
+        data = self.flow_data(g)
+        key = cache.key(pp.Mpfa("flow"), g, data)
+        data[pp.PARAMETERS]["flow"]["second_order_tensor"].values
+        self.assertEqual(cache.key(pp.Mpfa("flow"), g, data), key)
+
+        data = self.flow_data(g)
+        data[pp.PARAMETERS]["flow"]["fourth_order_tensor"] = pp.FourthOrderTensor(
+            np.ones(g.num_cells), np.ones(g.num_cells)
+        )
+        key = cache.key(pp.Mpfa("flow"), g, data)
+        data[pp.PARAMETERS]["flow"]["fourth_order_tensor"].values
+        self.assertEqual(cache.key(pp.Mpfa("flow"), g, data), key)
+
+    def test_compressed_storage(self):
+        g = self.grid()
+        cache = pp.DiscretizationCache(self.folder, compress=True)
+        known = self.flow_data(g)
+        pp.Tpfa("flow").discretize(g, known)
+        for _ in range(2):
+            data = self.flow_data(g)
+            cache.discretize(pp.Tpfa("flow"), g, data)
+            self.compare(data, known)
+        self.assertEqual(cache.num_hits, 1)
+
+    def test_biot(self):
+        g = self.grid()
+
+        def biot_data():
+            data = pp.initialize_default_data(
+                g,
+                {},
+                "mechanics",
+                {"biot_alpha": 1, "inverter": "python"},
+            )
+            return pp.initialize_default_data(g, data, "flow")
+
+        known = biot_data()
+        pp.Biot().discretize(g, known)
+
+        cache = pp.DiscretizationCache(self.folder)
+        for _ in range(2):
+            data = biot_data()
+            cache.discretize(pp.Biot(), g, data)
+            self.compare(data, known)
+        self.assertEqual(cache.num_hits, 1)
+        # Matrices for both keywords are stored
+        self.assertTrue("div_u" in data[pp.DISCRETIZATION_MATRICES]["flow"])
+        self.assertTrue("stress" in data[pp.DISCRETIZATION_MATRICES]["mechanics"])
+
+    def test_not_cached(self):
+        # Discretizations which are not known to depend only on the parameters
+        # are computed as usual.
+        g = self.grid()
+        cache = pp.DiscretizationCache(self.folder)
+        data = self.flow_data(g)
+        cache.discretize(pp.MassMatrix("flow"), g, data)
+        self.assertTrue("mass" in data[pp.DISCRETIZATION_MATRICES]["flow"])
+        self.assertEqual(cache.num_misses, 0)
+        self.assertEqual(len(os.listdir(self.folder)), 0)
+
+    def test_eviction(self):
+        g = self.grid()
+        cache = pp.DiscretizationCache(self.folder)
+        cache.discretize(pp.Mpfa("flow"), g, self.flow_data(g))
+        size = cache.size()
+        self.assertTrue(size > 0)
+
+        # Date back the first entry, so that the order of use does not depend on
+        # the resolution of the file system timestamps
+        (entry,) = os.listdir(self.folder)
+        last_use = time.time() - 100
+        os.utime(os.path.join(self.folder, entry), (last_use, last_use))
+
+        # Room for a single entry: The least recently used entry is evicted
+        cache.max_size = 1.5 * size
+        cache.discretize(pp.Mpfa("flow"), g, self.flow_data(g, perm=2))
+        self.assertEqual(len(os.listdir(self.folder)), 1)
+        cache.discretize(pp.Mpfa("flow"), g, self.flow_data(g, perm=2))
+        self.assertEqual(cache.num_hits, 1)
+
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+
+    def test_assembler(self):
+        gb = pp.meshing.cart_grid([], [3, 3])
+        for g, d in gb:
+            d.update(self.flow_data(g))
+            d[pp.PRIMARY_VARIABLES] = {"pressure": {"cells": 1}}
+            d[pp.DISCRETIZATION] = {"pressure": {"diffusion": pp.Mpfa("flow")}}
+
+        cache = pp.DiscretizationCache(self.folder)
+        assembler = pp.Assembler(gb, discretization_cache=cache)
+        assembler.discretize()
+        A_known, _ = assembler.assemble_matrix_rhs()
+
+        for _, d in gb:
+            d[pp.DISCRETIZATION_MATRICES]["flow"] = {}
+        assembler.discretize()
+        A, _ = assembler.assemble_matrix_rhs()
+        self.assertEqual(cache.num_hits, 1)
+        self.assertTrue(np.allclose((A - A_known).data, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -715,6 +715,48 @@ class BasicsTest(unittest.TestCase):
             )
         )
 
+    def test_dual_vem_2d_polygons(self):
+        # Cells with different number of faces are discretized in groups. Compare
+        # with the local matrices computed cell by cell.
+        g = pp.CartGrid([4, 4], [1, 1])
+        g.compute_geometry()
+        subdiv = np.array([0, 0, 1, 2, 0, 3, 4, 2, 5, 6, 7, 8, 9, 10, 11, 8])
+        pp.coarsening.generate_coarse_grid(g, subdiv)
+        g.compute_geometry()
+        self.assertTrue(np.unique(np.diff(g.cell_faces.indptr)).size > 1)
+
+        kxx = np.square(g.cell_centers[1, :]) + 1
+        perm = pp.SecondOrderTensor(kxx=kxx, kyy=2 * kxx, kxy=0.1 * kxx, kzz=1)
+        specified_parameters = {"second_order_tensor": perm}
+        data = pp.initialize_default_data(g, {}, "flow", specified_parameters)
+        discr = pp.MVEM("flow")
+        discr.discretize(g, data)
+        mass = data[pp.DISCRETIZATION_MATRICES]["flow"]["mass"].toarray()
+
+        diams = g.cell_diameters()
+        cf = g.cell_faces.tocsc()
+        mass_known = np.zeros((g.num_faces, g.num_faces))
+        for c in range(g.num_cells):
+            loc = slice(cf.indptr[c], cf.indptr[c + 1])
+            faces = cf.indices[loc]
+            A = discr.massHdiv(
+                perm.values[:2, :2, c],
+                g.cell_centers[:2, c],
+                g.cell_volumes[c],
+                g.face_centers[:2, faces],
+                g.face_normals[:2, faces],
+                cf.data[loc],
+                diams[c],
+                1,
+            )[0]
+            mass_known[np.ix_(faces, faces)] += A
+        self.assertTrue(np.allclose(mass, mass_known))
+
+        # A constant velocity field is reproduced by the projection
+        u = np.dot(np.array([1, 2, 0]), g.face_normals)
+        P0u = discr.project_flux(g, u, data)
+        self.assertTrue(np.allclose(P0u, np.array([[1], [2], [0]])))
+
 
 # ------------------------------------------------------------------------------#
 
@@ -0,0 +1,91 @@
+""" Tests of the management of gmsh processes.
+
+The gmsh executable is replaced by an executable python script, which copies the
+input file to the output file, and appends the command line arguments.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from porepy.grids.gmsh import gmsh_interface
+
+_SCRIPT = """
+import os, sys, time
+args = sys.argv[1:]
+opts = dict(zip(args[4::2], args[5::2]))
+time.sleep(float(opts.get("-sleep", 0)))
+with open(args[3], "w") as f:
+    f.write(open(args[1]).read() + " " + " ".join(args) + " " + os.getcwd())
+sys.exit(int(opts.get("-status", 0)))
+"""
+
+
+class TestRunGmshParallel(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        script = os.path.join(self.folder, "gmsh.py")
+        with open(script, "w") as f:
+            f.write("#!" + sys.executable + "\n" + _SCRIPT)
+        os.chmod(script, 0o755)
+        config = {"gmsh_path": script, "num_processors": 4}
+        patcher = mock.patch.object(
+            gmsh_interface.read_config, "read", return_value=config
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.jobs = []
+        for i in range(4):
+            in_file = os.path.join(self.folder, "in_" + str(i) + ".geo")
+            with open(in_file, "w") as f:
+                f.write("job_" + str(i))
+            out_file = os.path.join(self.folder, "out_" + str(i) + ".msh")
+            self.jobs.append((in_file, out_file, 3, {"status": i % 2}))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_status_and_output(self):
+        status = gmsh_interface.run_gmsh_parallel(self.jobs, num_threads=2)
+        self.assertEqual(status, [0, 1, 0, 1])
+
+        for i, job in enumerate(self.jobs):
+            with open(job[1]) as f:
+                content = f.read().split()
+            self.assertEqual(content[0], "job_" + str(i))
+            self.assertEqual(content[1:3], ["-3", job[0]])
+            self.assertIn("-nt", content)
+            # Each job runs in a separate working directory
+            self.assertNotEqual(os.path.dirname(content[-1]), self.folder)
+
+    def test_workers_divided_by_threads(self):
+        with mock.patch.object(
+            gmsh_interface,
+            "ThreadPoolExecutor",
+            wraps=gmsh_interface.ThreadPoolExecutor,
+        ) as executor:
+            gmsh_interface.run_gmsh_parallel(self.jobs, num_threads=2)
+            self.assertEqual(executor.call_args[1]["max_workers"], 2)
+
+            gmsh_interface.run_gmsh_parallel(self.jobs, num_threads=8)
+            self.assertEqual(executor.call_args[1]["max_workers"], 1)
+
+    def test_timeout(self):
+        jobs = [job[:3] + ({"sleep": 10},) for job in self.jobs[:2]]
+        status = gmsh_interface.run_gmsh_parallel(jobs, timeout=0.5, keep_going=True)
+        self.assertEqual(status, [None, None])
+
+        self.assertRaises(
+            subprocess.TimeoutExpired,
+            gmsh_interface.run_gmsh_parallel,
+            jobs,
+            timeout=0.5,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
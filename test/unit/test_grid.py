@@ -1,8 +1,11 @@
 """ Various tests related to the main Grid class.
 """
 
+import gc
 import numpy as np
+import pickle
 import unittest
+import weakref
 
 import porepy as pp
 
@@ -56,6 +59,94 @@ class TestClosestCell(unittest.TestCase):
         self.assertTrue(ind.size == 1)
 
 
+class TestSpatialIndex(unittest.TestCase):
+    def test_closest_cell_and_radius(self):
+        np.random.seed(0)
+        g = pp.StructuredTriangleGrid([4, 5], [1, 1])
+        g.compute_geometry()
+        p = np.random.rand(2, 20)
+        ci, di = g.closest_cell(p, return_distance=True)
+
+        p = np.vstack((p, np.zeros(p.shape[1])))
+        dist = np.linalg.norm(
+            p[:, :, np.newaxis] - g.cell_centers[:, np.newaxis], axis=0
+        )
+        self.assertTrue(np.allclose(di, dist.min(axis=1)))
+        self.assertTrue(np.allclose(dist[np.arange(p.shape[1]), ci], di))
+
+        within = g.cells_within_radius(p, 0.2)
+        for i in range(p.shape[1]):
+            self.assertTrue(np.all(within[i] == np.where(dist[i] <= 0.2)[0]))
+
+    def test_locate_points_tensor_grid(self):
+        # Strongly varying cell sizes
+        np.random.seed(0)
+        x = np.hstack((0, np.logspace(-4, 0, 12)))
+        y = np.array([0, 0.5, 0.51, 2])
+        g = pp.TensorGrid(x, y)
+        g.compute_geometry()
+
+        p = np.random.rand(2, 50) * np.array([[1.2], [2.2]]) - 0.1
+        p[:, :3] = np.array([[5e-5, 0.9, 1], [0.505, 1e-4, 2]])
+        cells = g.locate_points(p)
+
+        ix = np.searchsorted(x, p[0]) - 1
+        iy = np.searchsorted(y, p[1]) - 1
+        known = ix + iy * (x.size - 1)
+        outside = np.logical_or.reduce((p[0] < 0, p[0] > 1, p[1] < 0, p[1] > 2))
+        known[outside] = -1
+        # A point on the boundary between cells is assigned the lower cell index
+        known[2] = g.num_cells - 1
+        self.assertTrue(np.all(cells == known))
+
+    def test_locate_points_tetrahedra(self):
+        np.random.seed(1)
+        g = pp.StructuredTetrahedralGrid([2, 3, 2], [1, 1, 1])
+        g.compute_geometry()
+        p = np.random.rand(3, 40)
+        cells = g.locate_points(p)
+        self.assertTrue(np.all(cells >= 0))
+
+        # Check by barycentric coordinates
+        cn = g.cell_nodes().indices.reshape((4, -1), order="F")
+        for i, c in enumerate(cells):
+            coord = g.nodes[:, cn[:, c]]
+            A = np.vstack((coord, np.ones(4)))
+            weights = np.linalg.solve(A, np.hstack((p[:, i], 1)))
+            self.assertTrue(np.all(weights >= -1e-10))
+
+        self.assertEqual(g.locate_points(np.array([1.5, 0.5, 0.5]))[0], -1)
+
+    def test_reuse_index(self):
+        g = pp.CartGrid([3, 3])
+        g.compute_geometry()
+        index = g.spatial_index()
+        g.closest_cell(np.zeros((3, 1)))
+        self.assertTrue(g.spatial_index() is index)
+
+        # A new geometry requires a new index
+        g.nodes = 2 * g.nodes
+        g.compute_geometry()
+        self.assertFalse(g.spatial_index() is index)
+        self.assertEqual(g.locate_points(np.array([5.9, 5.9, 0]))[0], 8)
+
+    def test_no_reference_cycle(self):
+        g = pp.CartGrid([3, 3])
+        g.compute_geometry()
+        index = g.spatial_index()
+        index.locate_points(np.array([[0.5], [0.5], [0]]))
+        grid_ref = weakref.ref(g)
+
+        # The grid is freed without the cyclic garbage collector
+        gc.disable()
+        try:
+            del g
+            self.assertIsNone(grid_ref())
+        finally:
+            gc.enable()
+        self.assertRaises(ValueError, index.closest_cell, np.zeros((3, 1)))
+
+
 class TestCellFaceAsDense(unittest.TestCase):
     def test_cart_grid(self):
         g = pp.CartGrid([2, 1])
@@ -64,6 +155,42 @@ class TestCellFaceAsDense(unittest.TestCase):
         self.assertTrue(np.allclose(cf, known))
 
 
+class TestConnectivityCache(unittest.TestCase):
+    def test_reuse_and_invalidate(self):
+        g = pp.CartGrid([2, 1])
+        cn = g.cell_nodes()
+        c2c = g.cell_connection_map()
+        cf = g.cell_face_as_dense()
+        self.assertTrue(g.cell_nodes() is cn)
+        self.assertTrue(g.cell_connection_map() is c2c)
+        self.assertTrue(g.cell_face_as_dense() is cf)
+        self.assertFalse(cf.flags.writeable)
+        self.assertTrue(np.all(g.num_cell_nodes() == 4))
+
+        # Reassigning the topology discards the maps
+        g.cell_faces = g.cell_faces.copy()
+        self.assertFalse(g.cell_nodes() is cn)
+        self.assertTrue(np.all(g.cell_nodes().toarray() == cn.toarray()))
+
+        # So does replacing the arrays of the sparse matrices. Flip the normals.
+        g.cell_faces.data = -g.cell_faces.data
+        self.assertTrue(np.all(g.cell_face_as_dense() == cf[::-1]))
+
+        # Changes made in place must be followed by an explicit clearing
+        g.cell_faces.data *= -1
+        g.clear_connectivity_cache()
+        self.assertTrue(np.all(g.cell_face_as_dense() == cf))
+
+    def test_copy_and_pickle(self):
+        g = pp.CartGrid([2, 2])
+        cn = g.cell_nodes()
+        g_pickled = pickle.loads(pickle.dumps(g))
+        self.assertFalse("_connectivity_cache" in g_pickled.__dict__)
+        h = g.copy()
+        self.assertFalse(h.cell_nodes() is cn)
+        self.assertTrue(np.all(h.cell_nodes().toarray() == cn.toarray()))
+
+
 class TestBoundaries(unittest.TestCase):
     def test_bounary_node_cart(self):
         g = pp.CartGrid([2, 2])
@@ -122,6 +122,48 @@ class SplitIntersectingLines2DTest(unittest.TestCase):
         self.assertTrue(np.allclose(new_pts, p))
         self.assertTrue(test_utils.compare_arrays(new_lines, lines_known))
 
+    def test_tags_preserved(self):
+        # Two crossing lines and a line overlapping one of them, with tags
+        p = np.array([[0, 2, 1, 1, 1.5, 3], [0, 0, -1, 1, 0, 0]])
+        lines = np.array([[0, 1, 7], [2, 3, 8], [4, 5, 9]]).T
+
+        new_pts, new_lines = pp.intersections.split_intersecting_segments_2d(p, lines)
+
+        p_known = np.hstack((p, np.array([[1], [0]])))
+        # The overlapping part keeps the tag of the first line
+        lines_known = np.array(
+            [[0, 6, 7], [4, 6, 7], [1, 4, 7], [2, 6, 8], [3, 6, 8], [1, 5, 9]]
+        ).T
+        self.assertTrue(np.allclose(new_pts, p_known))
+        self.assertTrue(test_utils.compare_arrays(new_lines, lines_known, sort=False))
+
+    def test_random_network(self):
+        # After splitting, segments should only meet at their endpoints
+        np.random.seed(0)
+        num_lines = 50
+        start = np.random.rand(2, num_lines)
+        p = np.hstack((start, start + 0.3 * (np.random.rand(2, num_lines) - 0.5)))
+        lines = np.vstack((np.arange(num_lines), num_lines + np.arange(num_lines)))
+
+        new_pts, new_lines = pp.intersections.split_intersecting_segments_2d(p, lines)
+        self.assertTrue(new_lines.shape[1] > num_lines)
+
+        for i in range(new_lines.shape[1]):
+            for j in range(i + 1, new_lines.shape[1]):
+                isect = pp.intersections.segments_2d(
+                    new_pts[:, new_lines[0, i]],
+                    new_pts[:, new_lines[1, i]],
+                    new_pts[:, new_lines[0, j]],
+                    new_pts[:, new_lines[1, j]],
+                )
+                if isect is None:
+                    continue
+                # Only a single, shared endpoint is allowed
+                self.assertEqual(isect.shape[1], 1)
+                shared = np.intersect1d(new_lines[:2, i], new_lines[:2, j])
+                self.assertEqual(shared.size, 1)
+                self.assertTrue(np.allclose(isect.ravel(), new_pts[:, shared[0]]))
+
 
 class LinesIntersectTest(unittest.TestCase):
     def test_lines_intersect_segments_do_not(self):
@@ -68,5 +68,44 @@ class TestGridMappings1d(unittest.TestCase):
         self.assertTrue(np.all(mg.slave_to_mortar_int().A == [0, 1]))
 
 
+class TestProjectionCache(unittest.TestCase):
+    def _mortar_grid(self):
+        gb = pp.grid_buckets_2d.single_horizontal([2, 2], simplex=False)
+        for _, d in gb.edges():
+            return d["mortar_grid"]
+
+    def test_projections_are_reused(self):
+        mg = self._mortar_grid()
+        proj = mg.mortar_to_master_int(nd=2)
+        self.assertIs(mg.mortar_to_master_int(nd=2), proj)
+        self.assertIsNot(mg.mortar_to_master_int(), proj)
+
+        known = sps.kron(mg.master_to_mortar_avg().T, sps.eye(2))
+        self.assertTrue(np.allclose(proj.A, known.A))
+        self.assertTrue(sps.isspmatrix_csc(proj))
+
+    def test_update_slave_clears_cache(self):
+        mg = self._mortar_grid()
+        proj = mg.slave_to_mortar_avg()
+        master = mg.master_to_mortar_int()
+
+        # Split each slave cell in two
+        nc = mg.num_cells // 2
+        side_matrix = sps.csc_matrix(np.kron(np.eye(nc), [[0.5, 0.5]]))
+        mg.update_slave({1: side_matrix, 2: side_matrix})
+
+        new_proj = mg.slave_to_mortar_avg()
+        self.assertIsNot(new_proj, proj)
+        self.assertEqual(new_proj.shape, (2 * nc, 2 * nc))
+        self.assertTrue(np.allclose(new_proj.sum(axis=1), 1))
+        self.assertIsNot(mg.master_to_mortar_int(), master)
+
+    def test_reassigned_mapping_clears_cache(self):
+        mg = self._mortar_grid()
+        proj = mg.master_to_mortar_int()
+        mg._master_to_mortar_int = 2 * mg._master_to_mortar_int
+        self.assertTrue(np.allclose(mg.master_to_mortar_int().A, 2 * proj.A))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -778,6 +778,129 @@ class TestIntersectionPolygonsEmbeddedIn3d(unittest.TestCase):
         self.assertTrue(test_utils.compare_arrays(new_pt, known_points))
 
 
+class TestBroadPhasePolygons3d(unittest.TestCase):
+    def intervals(self, x_min, x_max):
+        # Boxes of zero extent in y and z, that is, intervals on the x-axis
+        zero = np.zeros(len(x_min))
+        return self.rectangles(x_min, x_max, zero, zero)
+
+    def rectangles(self, x_min, x_max, y_min, y_max):
+        # Boxes of zero extent in z
+        zero = np.zeros(len(x_min))
+        pairs = pp.intersections._identify_overlapping_boxes_3d(
+            np.asarray(x_min, dtype=np.float),
+            np.asarray(x_max, dtype=np.float),
+            np.asarray(y_min, dtype=np.float),
+            np.asarray(y_max, dtype=np.float),
+            zero,
+            zero,
+        )
+        # Pairs as a set of tuples, lowest index first
+        return set(tuple(sorted(pair)) for pair in pairs.T)
+
+    def test_intervals_no_overlap(self):
+        self.assertEqual(self.intervals([0, 2], [1, 3]), set())
+
+    def test_intervals_overlap(self):
+        self.assertEqual(self.intervals([0, 1], [2, 3]), {(0, 1)})
+        self.assertEqual(self.intervals([1, 0], [3, 2]), {(0, 1)})
+
+    def test_intervals_shared_endpoints(self):
+        self.assertEqual(self.intervals([0, 0], [3, 2]), {(0, 1)})
+        self.assertEqual(self.intervals([0, 1], [3, 3]), {(0, 1)})
+        self.assertEqual(self.intervals([0, 0], [3, 3]), {(0, 1)})
+
+    def test_intervals_touching(self):
+        # Intervals which only share an endpoint are overlapping
+        self.assertEqual(self.intervals([0, 1], [1, 2]), {(0, 1)})
+
+    def test_point_interval(self):
+        # An interval of zero length
+        self.assertEqual(self.intervals([0, 1], [0, 2]), set())
+        self.assertEqual(self.intervals([1, 0], [1, 2]), {(0, 1)})
+        # Two coinciding points
+        self.assertEqual(self.intervals([1, 1], [1, 1]), {(0, 1)})
+
+    def test_three_intervals(self):
+        self.assertEqual(self.intervals([1, 0, 3], [2, 2, 4]), {(0, 1)})
+        self.assertEqual(
+            self.intervals([1, 0, 1], [2, 2, 3]), {(0, 1), (0, 2), (1, 2)}
+        )
+        self.assertEqual(self.intervals([0, 0, 2], [1, 3, 3]), {(0, 1), (1, 2)})
+
+    def test_rectangles_on_diagonal_no_overlap(self):
+        self.assertEqual(self.rectangles([0, 2], [1, 3], [0, 2], [1, 3]), set())
+
+    def test_rectangles_overlap_in_x_not_y(self):
+        self.assertEqual(self.rectangles([0, 0], [2, 2], [0, 5], [2, 7]), set())
+
+    def test_rectangles_overlap_in_x_and_y(self):
+        self.assertEqual(self.rectangles([0, 0], [2, 2], [0, 1], [2, 3]), {(0, 1)})
+
+    def test_lines_in_square(self):
+        # The sides of the unit square, as boxes of zero width. Neighboring sides
+        # touch at the corners, opposite sides do not overlap.
+        pairs = self.rectangles([0, 1, 0, 0], [1, 1, 1, 0], [0, 0, 1, 0], [0, 1, 1, 1])
+        self.assertEqual(pairs, {(0, 1), (0, 3), (1, 2), (2, 3)})
+
+    def test_overlapping_boxes_3d(self):
+        # Compare with a check of all pairs
+        np.random.seed(0)
+        lo = np.random.rand(3, 40)
+        hi = lo + 0.2 * np.random.rand(3, 40)
+        # Boxes which only touch are also overlapping
+        lo[:, 1] = hi[:, 0]
+
+        pairs = pp.intersections._identify_overlapping_boxes_3d(
+            lo[0], hi[0], lo[1], hi[1], lo[2], hi[2]
+        )
+        overlap = np.all(
+            np.logical_and(
+                lo[:, :, np.newaxis] <= hi[:, np.newaxis, :],
+                lo[:, np.newaxis, :] <= hi[:, :, np.newaxis],
+            ),
+            axis=0,
+        )
+        known = np.vstack(np.where(np.triu(overlap, k=1)))
+
+        pairs = np.sort(pairs, axis=0)
+        known = np.sort(known, axis=0)
+        self.assertTrue(np.any(np.all(pairs == np.array([[0], [1]]), axis=0)))
+        self.assertTrue(test_utils.compare_arrays(pairs, known))
+
+    def random_polygons(self, num_polys):
+        np.random.seed(1)
+        polys = []
+        for _ in range(num_polys):
+            center = np.random.rand(3, 1)
+            a, b = 0.2 * (np.random.rand(3, 2) - 0.5).T
+            polys.append(center + np.vstack((a + b, a - b, -a - b, -a + b)).T)
+        return polys
+
+    def test_parallel_equals_serial(self):
+        polys = self.random_polygons(20)
+        serial = pp.intersections.polygons_3d(polys)
+        parallel = pp.intersections.polygons_3d(polys, num_workers=2)
+
+        self.assertTrue(np.allclose(serial[0], parallel[0]))
+        for s, p in zip(serial[1:4], parallel[1:4]):
+            for si, pi in zip(s, p):
+                self.assertTrue(np.all(si == pi))
+        self.assertTrue(np.all(serial[4] == parallel[4]))
+
+    def test_plane_filter_keeps_coplanar_pairs(self):
+        f_1 = np.array([[0, 1, 1, 0], [0, 0, 1, 1], [0, 0, 0, 0]])
+        f_2 = np.array([[0.5, 2, 2, 0.5], [0.5, 0.5, 2, 2], [0, 0, 0, 0]])
+        # Parallel to f_1, but in a different plane
+        f_3 = f_1 + np.array([[0], [0], [0.1]])
+        polys = [f_1, f_2, f_3]
+        normals = np.array([[0, 0, 1]] * 3).T
+        pairs = np.array([[0, 0, 1], [1, 2, 2]])
+
+        crossed = pp.intersections._polygon_planes_crossed(polys, pairs, normals, 1e-8)
+        self.assertTrue(np.all(crossed == [True, False, False]))
+
+
 class TestPolygonPolyhedronIntersection(unittest.TestCase):
     def setUp(self):
         west = np.array([[0, 0, 0, 0], [0, 1, 1, 0], [0, 0, 1, 1]])
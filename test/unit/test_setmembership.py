@@ -179,6 +179,34 @@ class TestUniqueColumns(unittest.TestCase):
                 np.min(np.sum(np.abs(p_known[:, i] - p_unique), axis=0)) == 0
             )
 
+    def test_points_within_tolerance(self):
+        # Points are merged with the first kept point within the tolerance
+        p = np.array([[0, 1, 1e-9, 2, 1 + 1e-9, 0], [0, 0, 0, 0, 0, 1]])
+        p_unique, new_2_old, old_2_new = setmembership.unique_columns_tol(p)
+
+        self.assertTrue(np.allclose(p_unique, p[:, [0, 1, 3, 5]]))
+        self.assertTrue(np.all(new_2_old == [0, 1, 3, 5]))
+        self.assertTrue(np.all(old_2_new == [0, 1, 0, 2, 1, 3]))
+
+    def test_chain_of_points(self):
+        # Each point is within the tolerance of its neighbors, but not of the
+        # next neighbors. Every second point is kept.
+        x = np.arange(50)
+        p = np.vstack((x, np.zeros(x.size)))
+        # The tolerance is scaled by the square root of the dimension
+        tol = 1.5 / np.sqrt(2)
+        p_unique, new_2_old, old_2_new = setmembership.unique_columns_tol(p, tol)
+
+        self.assertTrue(np.all(new_2_old == np.arange(0, 50, 2)))
+        self.assertTrue(np.all(old_2_new == x // 2))
+
+        # Permute the points: The result follows the order of the points
+        p_unique, new_2_old, old_2_new = setmembership.unique_columns_tol(
+            p[:, ::-1], tol
+        )
+        self.assertTrue(np.all(new_2_old == np.arange(0, 50, 2)))
+        self.assertTrue(np.allclose(p_unique[0], x[::-1][::2]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,87 @@
+""" Tests of the compact storage of second and fourth order tensors.
+"""
+import unittest
+
+import numpy as np
+
+import porepy as pp
+
+
+class TestSecondOrderTensor(unittest.TestCase):
+    def test_values_from_components(self):
+        kxx = np.array([1.0, 2.0])
+        k = pp.SecondOrderTensor(kxx, kxy=np.array([0.1, 0.2]), kzz=np.ones(2))
+        # Nothing is expanded before the values are requested
+        self.assertIsNone(k._values)
+
+        known = np.zeros((3, 3, 2))
+        known[0, 0] = known[1, 1] = kxx
+        known[2, 2] = 1
+        known[0, 1] = known[1, 0] = [0.1, 0.2]
+        self.assertTrue(np.allclose(k.values, known))
+
+        # The input arrays are not shared with the tensor
+        kxx[:] = 0
+        self.assertTrue(np.allclose(k.values, known))
+
+    def test_modified_values_are_kept(self):
+        k = pp.SecondOrderTensor(np.ones(3))
+        k.values[0, 0, 1] = 4
+        self.assertEqual(k.values[0, 0, 1], 4)
+        self.assertEqual(k.copy().values[0, 0, 1], 4)
+        self.assertEqual(k.restrict(np.array([1])).values[0, 0, 0], 4)
+
+    def test_restrict(self):
+        kxx = np.arange(1, 5, dtype=np.float)
+        k = pp.SecondOrderTensor(kxx, kyy=2 * kxx, kyz=0.1 * kxx)
+        cells = np.array([3, 1, 1])
+        sub_k = k.restrict(cells)
+        self.assertIsNone(k._values)
+        self.assertIsNone(sub_k._values)
+        self.assertTrue(np.allclose(sub_k.values, k.values[:, :, cells]))
+
+    def test_copy_is_independent(self):
+        k = pp.SecondOrderTensor(np.ones(2))
+        k_copy = k.copy()
+        k_copy.values[0, 0] = 3
+        self.assertTrue(np.allclose(k.values[0, 0], 1))
+
+    def test_scalar_components(self):
+        k = pp.SecondOrderTensor(np.array([1.0, 2.0, 3.0]), kyy=2, kzz=1, kxy=0.5)
+        sub_k = k.restrict(np.array([2, 0]))
+        self.assertTrue(np.allclose(sub_k.values[1, 1], 2))
+        self.assertTrue(np.allclose(sub_k.values[0, 1], 0.5))
+        self.assertTrue(np.allclose(sub_k.values[0, 0], [3, 1]))
+
+
+class TestFourthOrderTensor(unittest.TestCase):
+    def test_values_from_lame_parameters(self):
+        mu = np.array([1.0, 2.0])
+        lmbda = np.array([3.0, 5.0])
+        c = pp.FourthOrderTensor(mu, lmbda)
+        self.assertIsNone(c._values)
+
+        # xx-xx, xx-yy and xy-xy components
+        self.assertTrue(np.allclose(c.values[0, 0], 2 * mu + lmbda))
+        self.assertTrue(np.allclose(c.values[0, 4], lmbda))
+        self.assertTrue(np.allclose(c.values[1, 1], mu))
+        self.assertTrue(np.allclose(c.values[1, 3], mu))
+        self.assertEqual(c.values.shape, (9, 9, 2))
+
+    def test_restrict(self):
+        mu = np.arange(1, 5, dtype=np.float)
+        c = pp.FourthOrderTensor(mu, 2 * mu, phi=0.1 * mu)
+        cells = np.array([2, 0])
+        sub_c = c.restrict(cells)
+        self.assertIsNone(sub_c._values)
+        self.assertTrue(np.allclose(sub_c.mu, mu[cells]))
+        self.assertTrue(np.allclose(sub_c.lmbda, 2 * mu[cells]))
+        self.assertTrue(np.allclose(sub_c.values, c.values[:, :, cells]))
+
+        # A tensor with expanded values is restricted by the values
+        c.values[0, 0, 2] = -1
+        self.assertEqual(c.restrict(cells).values[0, 0, 0], -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -80,6 +80,26 @@ class TestTPFA(unittest.TestCase):
 
         return a
 
+    def test_tpfa_scalar_components(self):
+        # Scalar tensor components are expanded to all cells
+        g = pp.CartGrid([3, 2])
+        g.compute_geometry()
+        kxx = 1 + np.arange(g.num_cells)
+        bound_faces = g.get_all_boundary_faces()
+        bound = pp.BoundaryCondition(g, bound_faces, ["dir"] * bound_faces.size)
+
+        flux = []
+        for perm in [
+            pp.SecondOrderTensor(kxx, kyy=2, kzz=1),
+            pp.SecondOrderTensor(kxx, kyy=2 * np.ones(6), kzz=np.ones(6)),
+        ]:
+            d = pp.initialize_default_data(
+                g, {}, "flow", {"second_order_tensor": perm, "bc": bound}
+            )
+            pp.Tpfa("flow").discretize(g, d)
+            flux.append(d[pp.DISCRETIZATION_MATRICES]["flow"]["flux"])
+        self.assertTrue(np.allclose((flux[0] - flux[1]).data, 0))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,122 @@
+""" Tests of the time stepping of advection problems in mixed-dimensional grids.
+"""
+import numpy as np
+import unittest
+
+import porepy as pp
+
+
+def _setup_gb(nx, scheme, keyword="transport"):
+    # Vertical flow through a domain with a horizontal fracture. The concentration
+    # is 1 at the bottom boundary, and zero initially.
+    gb = pp.grid_buckets_2d.single_horizontal(nx, simplex=False)
+    a = 1e-2
+    upwind = pp.Upwind(keyword)
+    for g, d in gb:
+        aperture = np.ones(g.num_cells) * np.power(a, gb.dim_max() - g.dim)
+        specified_parameters = {
+            "mass_weight": aperture,
+            "darcy_flux": upwind.darcy_flux(g, [0, 1, 0], aperture),
+        }
+        bound_faces = g.tags["domain_boundary_faces"].nonzero()[0]
+        if bound_faces.size != 0:
+            y = g.face_centers[1, bound_faces]
+            labels = np.array(["neu"] * bound_faces.size)
+            labels[np.logical_or(y < 1e-3, y > 1 - 1e-3)] = "dir"
+            bc_val = np.zeros(g.num_faces)
+            bc_val[bound_faces[y < 1e-3]] = 1
+            bound = pp.BoundaryCondition(g, bound_faces, labels)
+            specified_parameters.update({"bc": bound, "bc_values": bc_val})
+        pp.initialize_default_data(g, d, keyword, specified_parameters)
+
+    for e, d in gb.edges():
+        g_h = gb.nodes_of_edge(e)[1]
+        darcy_flux = gb.node_props(g_h, pp.PARAMETERS)[keyword]["darcy_flux"]
+        sign = np.zeros(g_h.num_faces)
+        faces = g_h.get_all_boundary_faces()
+        sign[faces] = g_h.sign_of_faces(faces)
+        mg = d["mortar_grid"]
+        mortar_flux = (mg.master_to_mortar_avg() * sign) * (
+            mg.master_to_mortar_avg() * darcy_flux
+        )
+        pp.initialize_data(mg, d, keyword, {"darcy_flux": mortar_flux})
+
+    return gb, pp.TransportSolver(gb, keyword, scheme=scheme)
+
+
+class TestTransportSolver(unittest.TestCase):
+    def test_steady_state(self):
+        # A long implicit step gives the steady state of the full system, with
+        # mortar variables
+        gb, solver = _setup_gb([2, 2], "implicit")
+        c = solver.step(np.zeros(solver.num_dof()), 1e8)
+
+        assembler = pp.Assembler(gb, active_variables=["tracer", "mortar_tracer"])
+        A, b = assembler.assemble_matrix_rhs()
+        x = np.linalg.solve(A.A, b)
+        for g, _ in gb:
+            known = x[assembler.dof_ind(g, "tracer")]
+            self.assertTrue(np.allclose(c[solver.dof_ind(g)], known))
+        self.assertTrue(np.allclose(c, 1))
+
+    def test_explicit_substeps(self):
+        gb, solver = _setup_gb([4, 4], "explicit")
+        # The fracture cells have the smallest mass relative to the outflow: The
+        # ratio is the aperture divided by the Darcy flux
+        self.assertTrue(np.isclose(solver.cfl(), 1e-2))
+        self.assertEqual(solver.num_substeps(0.1), 10)
+
+        # The solution is bounded by the initial and boundary values, and
+        # eventually reaches the steady state.
+        c = np.zeros(solver.num_dof())
+        for _ in range(50):
+            c = solver.step(c, 0.1)
+            self.assertTrue(np.all(c >= 0) and np.all(c <= 1 + 1e-12))
+        self.assertTrue(np.allclose(c, 1, atol=1e-3))
+
+    def test_imex_treats_fracture_implicitly(self):
+        gb, solver = _setup_gb([4, 4], "imex")
+        self.assertTrue(np.isclose(solver.cfl(), 1 / 4))
+
+        _, explicit = _setup_gb([4, 4], "explicit")
+        c, c_explicit = np.zeros(solver.num_dof()), np.zeros(solver.num_dof())
+        for _ in range(50):
+            c = solver.step(c, 0.01)
+            c_explicit = explicit.step(c_explicit, 0.01)
+        self.assertTrue(np.allclose(c, c_explicit, atol=2e-2))
+
+    def test_multiple_components(self):
+        # Components are advanced together, with a common or separate right hand
+        # side
+        for scheme in ["explicit", "implicit", "imex"]:
+            _, solver = _setup_gb([3, 2], scheme)
+            c = solver.step(np.zeros(solver.num_dof()), 0.2)
+
+            c0 = np.zeros((solver.num_dof(), 3))
+            c0[:, 2] = 1
+            r = solver._rhs
+            both = solver.step(c0, 0.2, rhs=np.vstack((r, 2 * r, r)).T)
+            self.assertTrue(np.allclose(both[:, 0], c))
+            self.assertTrue(np.allclose(both[:, 1], 2 * c))
+            self.assertTrue(np.allclose(both[:, 2], 1))
+
+    def test_factorizations_are_reused(self):
+        gb, solver = _setup_gb([2, 2], "implicit")
+        solver.max_factorizations = 2
+        c = np.zeros(solver.num_dof())
+        solver.step(c, 0.1)
+        first = solver._factorization(0.1)
+        solver.step(c, 0.2)
+        # The least recently used factorization is discarded
+        solver.step(c, 0.1)
+        solver.step(c, 0.3)
+        self.assertEqual(list(solver._factorizations.keys()), [0.1, 0.3])
+        self.assertIs(solver._factorization(0.1), first)
+
+    def test_unknown_scheme(self):
+        gb = pp.grid_buckets_2d.single_horizontal([2, 2], simplex=False)
+        self.assertRaises(ValueError, pp.TransportSolver, gb, scheme="crank")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -491,6 +491,77 @@ class TestUpwindDiscretization(unittest.TestCase):
 
     # Below follows other tests
 
+    def test_upwind_rediscretization_new_darcy_flux(self):
+        # Discretizing with an updated flux gives the same matrix as a first
+        # discretization, and the sparsity pattern is kept
+        g = pp.StructuredTriangleGrid([3, 2])
+        g.compute_geometry()
+
+        bf = g.tags["domain_boundary_faces"].nonzero()[0]
+        bc = pp.BoundaryCondition(g, bf, bf.size * ["dir"])
+        solver = pp.Upwind()
+        specified_parameters = {
+            "bc": bc,
+            "bc_values": np.ones(g.num_faces),
+            "darcy_flux": solver.darcy_flux(g, [1, 2, 0]),
+        }
+        data = pp.initialize_default_data(g, {}, "transport", specified_parameters)
+        solver.discretize(g, data)
+        # The matrix is refilled by the next discretization
+        M_first = solver.assemble_matrix(g, data).copy()
+
+        darcy_flux = solver.darcy_flux(g, [-1, 0.5, 0])
+        data[pp.PARAMETERS]["transport"]["darcy_flux"] = darcy_flux
+        solver.discretize(g, data)
+        M, rhs = solver.assemble_matrix_rhs(g, data)
+
+        specified_parameters["darcy_flux"] = darcy_flux
+        g_new = pp.StructuredTriangleGrid([3, 2])
+        g_new.compute_geometry()
+        data_new = pp.initialize_default_data(
+            g_new, {}, "transport", specified_parameters
+        )
+        solver.discretize(g_new, data_new)
+        M_known, rhs_known = solver.assemble_matrix_rhs(g_new, data_new)
+
+        self.assertTrue(np.allclose(M.todense(), M_known.todense()))
+        self.assertTrue(np.allclose(rhs, rhs_known))
+        self.assertTrue(np.all(M.indptr == M_first.indptr))
+        self.assertTrue(np.all(M.indices == M_first.indices))
+
+    def test_upwind_rediscretization_known_values(self):
+        # Three cells in a row. The flux is reversed and doubled between the
+        # discretizations: The matrix is refilled in place, with explicit zeros for
+        # the pairs of cells without flux between them.
+        g = pp.CartGrid([3, 1], [3, 1])
+        g.compute_geometry()
+
+        bf = g.tags["domain_boundary_faces"].nonzero()[0]
+        bc = pp.BoundaryCondition(g, bf, bf.size * ["dir"])
+        solver = pp.Upwind()
+        specified_parameters = {
+            "bc": bc,
+            "bc_values": np.ones(g.num_faces),
+            "darcy_flux": solver.darcy_flux(g, [1, 0, 0]),
+        }
+        data = pp.initialize_default_data(g, {}, "transport", specified_parameters)
+        solver.discretize(g, data)
+        M_first = solver.assemble_matrix(g, data)
+        data_first = M_first.data
+
+        data[pp.PARAMETERS]["transport"]["darcy_flux"] = solver.darcy_flux(
+            g, [-2, 0, 0]
+        )
+        solver.discretize(g, data)
+        M, rhs = solver.assemble_matrix_rhs(g, data)
+
+        self.assertTrue(M is M_first)
+        self.assertTrue(M.data is data_first)
+        self.assertTrue(np.array_equal(M.indptr, [0, 2, 5, 7]))
+        self.assertTrue(np.array_equal(M.indices, [0, 1, 0, 1, 2, 1, 2]))
+        self.assertTrue(np.allclose(M.data, [2, -2, 0, 2, -2, 0, 2]))
+        self.assertTrue(np.allclose(rhs, [0, 0, 2]))
+
     def test_upwind_example_1(self, if_export=False):
         #######################
         # Simple 2d upwind problem with explicit Euler scheme in time
@@ -0,0 +1,200 @@
+""" Tests of the writer of vtu files from numpy arrays, and its use in the Exporter.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import porepy as pp
+from porepy.viz import vtu_writer
+
+try:
+    import vtk
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    if_vtk = True
+except ImportError:
+    if_vtk = False
+
+
+def _read(file_name):
+    reader = vtk.vtkXMLUnstructuredGridReader()
+    reader.SetFileName(file_name)
+    reader.Update()
+    return reader.GetOutput()
+
+
+class TestVtuGeometry(unittest.TestCase):
+    def test_polygons(self):
+        # Cells of a Cartesian grid are represented by their nodes in a loop
+        g = pp.CartGrid([2, 1])
+        geometry = vtu_writer.VtuGeometry.from_grids([g])
+
+        self.assertEqual(geometry.num_cells, 2)
+        self.assertTrue(np.all(geometry.cell_types == vtu_writer.VTK_POLYGON))
+        self.assertTrue(np.all(geometry.cell_points(0) == [0, 3, 4, 1]))
+        self.assertTrue(np.all(geometry.cell_points(1) == [1, 4, 5, 2]))
+
+    def test_polyhedra(self):
+        g = pp.CartGrid([1, 1, 1])
+        g.compute_geometry()
+        geometry = vtu_writer.VtuGeometry.from_grids([g, g])
+
+        self.assertEqual(geometry.num_points, 16)
+        self.assertTrue(np.all(geometry.cell_points(1) == 8 + np.arange(8)))
+        stream = geometry.cell_faces(1)
+        # Six faces, each with four nodes of the second grid
+        self.assertEqual(stream.size, 1 + 6 * 5)
+        self.assertEqual(stream[0], 6)
+        faces = stream[1:].reshape((6, 5))
+        self.assertTrue(np.all(faces[:, 0] == 4))
+        self.assertTrue(np.all(faces[:, 1:] >= 8))
+
+        # The nodes of a face are sorted around the face: Consecutive nodes are
+        # connected by an edge of the cube.
+        for nodes in faces[:, 1:] - 8:
+            x = g.nodes[:, nodes]
+            dist = np.linalg.norm(x - np.roll(x, 1, axis=1), axis=0)
+            self.assertTrue(np.allclose(dist, 1))
+
+    def test_face_node_order_simplex(self):
+        # The nodes of the faces of a simplex grid are sorted as by
+        # sort_point_plane, for faces of all orientations
+        np.random.seed(0)
+        g = pp.TetrahedralGrid(np.random.rand(3, 40))
+        g.compute_geometry()
+        sorted_nodes = vtu_writer._sort_face_nodes(g)
+
+        ptr = g.face_nodes.indptr
+        for f in range(g.num_faces):
+            nodes = g.face_nodes.indices[ptr[f] : ptr[f + 1]]
+            order = pp.utils.sort_points.sort_point_plane(
+                g.nodes[:, nodes],
+                g.face_centers[:, f].reshape((-1, 1)),
+                g.face_normals[:, f],
+            )
+            self.assertTrue(np.all(sorted_nodes[ptr[f] : ptr[f + 1]] == nodes[order]))
+
+    def test_cache(self):
+        g = pp.CartGrid([2, 1, 1])
+        g.compute_geometry()
+        folder = tempfile.mkdtemp()
+        try:
+            geometry = vtu_writer.VtuGeometry.from_grids([g], cache_folder=folder)
+            self.assertEqual(len(os.listdir(folder)), 1)
+            stored = vtu_writer.VtuGeometry.from_grids([g], cache_folder=folder)
+            for attr in ["points", "connectivity", "offsets", "faces"]:
+                self.assertTrue(
+                    np.all(getattr(geometry, attr) == getattr(stored, attr))
+                )
+
+            # A modified grid has a separate entry
+            g.nodes[0] += 0.1
+            g.compute_geometry()
+            vtu_writer.VtuGeometry.from_grids([g], cache_folder=folder)
+            self.assertEqual(len(os.listdir(folder)), 2)
+        finally:
+            shutil.rmtree(folder)
+
+
+class TestWriteVtu(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _compare_with_vtk_backend(self, grid, data, **kwargs):
+        # Export with both backends, and compare the files as read by vtk
+        files = {}
+        for backend in ["vtk", "numpy"]:
+            save = pp.Exporter(grid, backend, self.folder, backend=backend, **kwargs)
+            save.write_vtk(data)
+            save.flush()
+            files[backend] = os.path.join(self.folder, backend + ".vtu")
+
+        g_vtk, g_np = _read(files["vtk"]), _read(files["numpy"])
+        self.assertEqual(g_vtk.GetNumberOfCells(), g_np.GetNumberOfCells())
+        self.assertTrue(
+            np.allclose(
+                vtk_to_numpy(g_vtk.GetPoints().GetData()),
+                vtk_to_numpy(g_np.GetPoints().GetData()),
+            )
+        )
+        for c in range(g_vtk.GetNumberOfCells()):
+            c_vtk, c_np = g_vtk.GetCell(c), g_np.GetCell(c)
+            self.assertEqual(c_vtk.GetCellType(), c_np.GetCellType())
+            self.assertEqual(c_vtk.GetNumberOfFaces(), c_np.GetNumberOfFaces())
+            p_vtk = [c_vtk.GetPointId(i) for i in range(c_vtk.GetNumberOfPoints())]
+            p_np = [c_np.GetPointId(i) for i in range(c_np.GetNumberOfPoints())]
+            self.assertEqual(sorted(p_vtk), sorted(p_np))
+
+        d_vtk, d_np = g_vtk.GetCellData(), g_np.GetCellData()
+        self.assertEqual(d_vtk.GetNumberOfArrays(), d_np.GetNumberOfArrays())
+        for i in range(d_vtk.GetNumberOfArrays()):
+            name = d_vtk.GetArrayName(i)
+            self.assertTrue(
+                np.allclose(
+                    vtk_to_numpy(d_vtk.GetArray(name)),
+                    vtk_to_numpy(d_np.GetArray(name)),
+                )
+            )
+
+    @unittest.skipUnless(if_vtk, "vtk is not available")
+    def test_2d_binary(self):
+        g = pp.StructuredTriangleGrid([3, 2])
+        g.compute_geometry()
+        data = {"scalar": np.arange(g.num_cells), "vector": np.ones((3, g.num_cells))}
+        self._compare_with_vtk_backend(g, data)
+
+    @unittest.skipUnless(if_vtk, "vtk is not available")
+    def test_3d_ascii(self):
+        g = pp.CartGrid([2, 2, 1])
+        g.compute_geometry()
+        data = {"scalar": np.random.rand(g.num_cells)}
+        self._compare_with_vtk_backend(g, data, binary=False)
+
+    def test_asynchronous_time_series(self):
+        # Files written on the background thread equal those written directly,
+        # even if the data is modified after it is passed to the exporter
+        g = pp.CartGrid([3, 3])
+        g.compute_geometry()
+        p = np.zeros(g.num_cells)
+        sync = pp.Exporter(g, "sync", self.folder, backend="numpy")
+        asyn = pp.Exporter(g, "async", self.folder, backend="numpy", asynchronous=True)
+        for step in range(5):
+            p[:] = step
+            sync.write_vtk({"p": p}, time_step=step)
+            asyn.write_vtk({"p": p}, time_step=step)
+        asyn.write_pvd(np.arange(5))
+
+        for step in range(5):
+            name = "_" + str(step).zfill(6) + ".vtu"
+            with open(os.path.join(self.folder, "sync" + name), "rb") as f:
+                content_sync = f.read()
+            with open(os.path.join(self.folder, "async" + name), "rb") as f:
+                content_async = f.read()
+            self.assertEqual(content_sync, content_async)
+
+    def test_asynchronous_requires_numpy_backend(self):
+        g = pp.CartGrid([3, 3])
+        self.assertRaises(
+            ValueError, pp.Exporter, g, "grid", self.folder, asynchronous=True
+        )
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_errors_are_raised(self):
+        def fail():
+            raise RuntimeError
+
+        writer = vtu_writer.BackgroundWriter()
+        writer.submit(fail)
+        self.assertRaises(RuntimeError, writer.flush)
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()